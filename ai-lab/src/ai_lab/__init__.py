@@ -1,6 +1,7 @@
 # ai-lab
 from .strategy_generator import generate_strategy, generate_strategies_batch
-from .optuna_optimizer import optimize, suggest_strategy_params
+from .optuna_optimizer import optimize, resolve_storage, suggest_strategy_params
+from .param_sweep import evaluate_candidates, load_sweep_panel, optimize_family, sweep, walk_forward
 from .rl_trader import create_rl_env, train_ppo, train_sac, predict_signal
 
 __all__ = [
@@ -8,6 +9,12 @@ __all__ = [
     "generate_strategies_batch",
     "optimize",
     "suggest_strategy_params",
+    "resolve_storage",
+    "sweep",
+    "walk_forward",
+    "optimize_family",
+    "evaluate_candidates",
+    "load_sweep_panel",
     "create_rl_env",
     "train_ppo",
     "train_sac",
@@ -5,24 +5,46 @@ from typing import Any, Callable, Dict, Optional
 import optuna
 
 
+def resolve_storage(storage: Any = None) -> Any:
+    """
+    Study storage for parallel trials: None (in-memory), an RDB URL such as
+    ``sqlite:///optuna.db``, or ``journal:<path>`` for a local journal file that several
+    processes can append to. Storage objects are returned unchanged.
+    """
+    if not isinstance(storage, str) or not storage.startswith("journal:"):
+        return storage
+    path = storage[len("journal:"):]
+    try:
+        from optuna.storages.journal import JournalFileBackend
+    except ImportError:  # optuna < 4
+        from optuna.storages import JournalFileStorage as JournalFileBackend
+    return optuna.storages.JournalStorage(JournalFileBackend(path))
+
+
 def optimize(
     objective: Callable[[optuna.Trial], float],
     n_trials: int = 50,
     direction: str = "maximize",
     study_name: Optional[str] = None,
-    storage: Optional[str] = None,
+    storage: Any = None,
+    pruner: Optional[optuna.pruners.BasePruner] = None,
+    sampler: Optional[optuna.samplers.BaseSampler] = None,
+    n_jobs: int = 1,
 ) -> optuna.Study:
     """
     Run Optuna study. objective(trial) returns metric to maximize/minimize.
-    direction: maximize or minimize.
+    direction: maximize or minimize. storage: see resolve_storage; workers sharing the same
+    storage and study_name run trials in parallel. n_jobs: threads within this process.
     """
     study = optuna.create_study(
         direction=direction,
         study_name=study_name or "strategy_opt",
-        storage=storage,
+        storage=resolve_storage(storage),
         load_if_exists=True,
+        pruner=pruner,
+        sampler=sampler,
     )
-    study.optimize(objective, n_trials=n_trials)
+    study.optimize(objective, n_trials=n_trials, n_jobs=n_jobs)
     return study
 
 
@@ -0,0 +1,399 @@
+"""
+Vectorized parameter sweeps and walk-forward optimization for the built-in strategy families.
+
+A sweep evaluates many parameter combinations of one family (trend_following, mean_reversion,
+breakout) over a whole dates x symbols price panel. Indicators are computed once per distinct
+period on the 2-D panel (feature_engine.kernels), the signal matrices of all combinations are laid
+side by side and backtested by one vectorbt ``Portfolio.from_signals`` call per chunk of at most
+``max_columns`` (combination, symbol) columns. Per-combination metrics are averaged over symbols.
+
+- ``sweep``: grid (dict of value lists, cartesian product) or explicit list of parameter dicts;
+- ``walk_forward``: rolling train/test windows; the best combination on each train window is
+  scored on the following test window (indicators are causal, so they are computed once on the
+  full panel and sliced);
+- ``optimize_family``: Optuna search for the non-grid case. Symbols are evaluated in chunks and the
+  running score is reported after each one so pruners stop weak trials early; ``storage`` accepts an
+  RDB URL or ``journal:<path>`` so several worker processes can share one study;
+- ``load_sweep_panel``: close/high/low frames from the backtest-engine price panel cache.
+
+Signals match strategy_engine's per-symbol functions for the same parameters.
+"""
+
+from __future__ import annotations
+
+import itertools
+import warnings
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+FAMILIES = ("trend_following", "mean_reversion", "breakout")
+
+# Same ranges as suggest_strategy_params / alpha_factory candidates, on a coarse step.
+DEFAULT_GRIDS: Dict[str, Dict[str, Sequence[Any]]] = {
+    "trend_following": {"fast_period": range(5, 31, 5), "slow_period": range(30, 121, 10)},
+    "mean_reversion": {
+        "rsi_period": (7, 14, 21),
+        "oversold": (20.0, 25.0, 30.0, 35.0, 40.0),
+        "overbought": (60.0, 65.0, 70.0, 75.0, 80.0),
+    },
+    "breakout": {"lookback": range(10, 51, 5)},
+}
+
+METRICS = ("sharpe_ratio", "total_return", "max_drawdown", "trade_count")
+
+Grid = Union[Mapping[str, Iterable[Any]], Sequence[Mapping[str, Any]]]
+
+
+def _valid(family: str, params: Mapping[str, Any]) -> bool:
+    if family == "trend_following":
+        return 0 < int(params["fast_period"]) < int(params["slow_period"])
+    if family == "mean_reversion":
+        return int(params["rsi_period"]) > 0 and float(params["oversold"]) < float(params["overbought"])
+    if family == "breakout":
+        return int(params["lookback"]) > 0
+    raise ValueError(f"Unknown strategy family: {family}")
+
+
+def expand_grid(family: str, grid: Optional[Grid] = None) -> List[Dict[str, Any]]:
+    """Cartesian product of a value grid (or an explicit list of dicts), minus invalid combinations."""
+    if grid is None:
+        grid = DEFAULT_GRIDS[family]
+    if isinstance(grid, Mapping):
+        keys = list(grid)
+        combos = [dict(zip(keys, values)) for values in itertools.product(*(list(grid[k]) for k in keys))]
+    else:
+        combos = [dict(p) for p in grid]
+    return [p for p in combos if _valid(family, p)]
+
+
+class _SignalBuilder:
+    """Entry/exit matrices per parameter set; indicators are cached per period."""
+
+    def __init__(self, family: str, close: np.ndarray, high: Optional[np.ndarray], low: Optional[np.ndarray]):
+        if family not in FAMILIES:
+            raise ValueError(f"Unknown strategy family: {family}")
+        if family == "breakout" and (high is None or low is None):
+            raise ValueError("breakout sweeps need high and low panels")
+        self.family = family
+        self.close = close
+        self.high = high
+        self.low = low
+        self._cache: Dict[Tuple[str, int], np.ndarray] = {}
+
+    def _indicator(self, name: str, period: int) -> np.ndarray:
+        key = (name, period)
+        out = self._cache.get(key)
+        if out is None:
+            from feature_engine import kernels
+
+            if name == "sma":
+                out = kernels.rolling_mean(self.close, period)
+            elif name == "rsi":
+                out = kernels.rsi(self.close, period=period)
+            else:
+                # channel over the previous ``period`` bars, excluding the current one
+                src = self.high if name == "highest" else self.low
+                fn = kernels.rolling_max if name == "highest" else kernels.rolling_min
+                out = np.full(src.shape, np.nan)
+                out[1:] = fn(src[:-1], period)
+            self._cache[key] = out
+        return out
+
+    def signals(self, params: Mapping[str, Any]) -> Tuple[np.ndarray, np.ndarray]:
+        with np.errstate(invalid="ignore"):
+            if self.family == "trend_following":
+                fast = self._indicator("sma", int(params["fast_period"]))
+                slow = self._indicator("sma", int(params["slow_period"]))
+                entries = np.zeros(fast.shape, dtype=bool)
+                exits = np.zeros(fast.shape, dtype=bool)
+                entries[1:] = (fast[:-1] <= slow[:-1]) & (fast[1:] > slow[1:])
+                exits[1:] = (fast[:-1] >= slow[:-1]) & (fast[1:] < slow[1:])
+                return entries, exits
+            if self.family == "mean_reversion":
+                r = self._indicator("rsi", int(params["rsi_period"]))
+                return r < float(params["oversold"]), r > float(params["overbought"])
+            lookback = int(params["lookback"])
+            entries = self.close > self._indicator("highest", lookback)
+            exits = (self.close < self._indicator("lowest", lookback)) & ~entries
+            return entries, exits
+
+
+def _as_panel(close: Union[pd.DataFrame, pd.Series]) -> pd.DataFrame:
+    if isinstance(close, pd.Series):
+        return close.to_frame(close.name or "close")
+    return close
+
+
+def _evaluate(
+    builder: _SignalBuilder,
+    combos: Sequence[Mapping[str, Any]],
+    price: pd.DataFrame,
+    rows: slice,
+    cols: Optional[np.ndarray],
+    init_cash: float,
+    fees: float,
+    max_columns: int,
+) -> Dict[str, np.ndarray]:
+    """Per-combination metrics (symbol average; trade_count summed) over rows × cols of the panel."""
+    import vectorbt as vbt
+
+    px = price.iloc[rows] if cols is None else price.iloc[rows, cols]
+    m = px.shape[1]
+    out = {k: np.full(len(combos), np.nan) for k in METRICS}
+    if m == 0 or len(px) < 2 or not combos:
+        return out
+    per_chunk = max(1, max_columns // m)
+    px_values = px.to_numpy()
+    for lo in range(0, len(combos), per_chunk):
+        chunk = combos[lo : lo + per_chunk]
+        ent, ex = [], []
+        for p in chunk:
+            e, x = builder.signals(p)
+            e, x = e[rows], x[rows]
+            if cols is not None:
+                e, x = e[:, cols], x[:, cols]
+            ent.append(e)
+            ex.append(x)
+        k = len(chunk)
+        close = pd.DataFrame(np.tile(px_values, (1, k)), index=px.index)
+        pf = vbt.Portfolio.from_signals(
+            close,
+            np.concatenate(ent, axis=1),
+            np.concatenate(ex, axis=1),
+            init_cash=init_cash,
+            fees=fees,
+            freq="1D",
+        )
+        with warnings.catch_warnings():
+            # all-NaN symbols / flat equity give NaN or inf ratios; they are dropped from the average
+            warnings.simplefilter("ignore", category=RuntimeWarning)
+            values = {
+                "sharpe_ratio": np.array(pf.sharpe_ratio(), dtype=float),
+                "total_return": np.array(pf.total_return(), dtype=float),
+                "max_drawdown": np.abs(np.asarray(pf.max_drawdown(), dtype=float)),
+                "trade_count": np.asarray(pf.trades.count(), dtype=float),
+            }
+            for name, arr in values.items():
+                arr = arr.reshape(k, m)
+                if name == "trade_count":
+                    out[name][lo : lo + k] = arr.sum(axis=1)
+                else:
+                    arr[~np.isfinite(arr)] = np.nan
+                    out[name][lo : lo + k] = np.nanmean(arr, axis=1)
+    return out
+
+
+def _prepare(
+    family: str,
+    close: Union[pd.DataFrame, pd.Series],
+    high: Optional[pd.DataFrame],
+    low: Optional[pd.DataFrame],
+) -> Tuple[_SignalBuilder, pd.DataFrame]:
+    raw = _as_panel(close).astype(float)
+    hi = None if high is None else _as_panel(high).reindex_like(raw).to_numpy(dtype=float)
+    lo = None if low is None else _as_panel(low).reindex_like(raw).to_numpy(dtype=float)
+    builder = _SignalBuilder(family, raw.to_numpy(), hi, lo)
+    # suspended days keep the last price for valuation; signals use the raw (NaN) panel
+    return builder, raw.ffill()
+
+
+def _fees(fees: Optional[float]) -> float:
+    if fees is not None:
+        return float(fees)
+    from backtest_engine import effective_fee_per_order
+
+    return effective_fee_per_order()
+
+
+def sweep(
+    family: str,
+    close: Union[pd.DataFrame, pd.Series],
+    high: Optional[pd.DataFrame] = None,
+    low: Optional[pd.DataFrame] = None,
+    grid: Optional[Grid] = None,
+    init_cash: float = 10000.0,
+    fees: Optional[float] = None,
+    max_columns: int = 20000,
+    sort_by: Optional[str] = "sharpe_ratio",
+) -> pd.DataFrame:
+    """
+    Evaluate every parameter combination over the whole panel (dates × symbols). Returns one row
+    per combination: the parameters, sharpe_ratio / total_return / max_drawdown averaged over
+    symbols, and trade_count summed; sorted best-first by ``sort_by`` (max_drawdown ascending).
+    fees default to the backtest engine's per-leg commission + slippage.
+    """
+    combos = expand_grid(family, grid)
+    builder, price = _prepare(family, close, high, low)
+    metrics = _evaluate(builder, combos, price, slice(None), None, init_cash, _fees(fees), max_columns)
+    df = pd.DataFrame(combos)
+    for name in METRICS:
+        df[name] = metrics[name]
+    if sort_by:
+        df = df.sort_values(sort_by, ascending=sort_by == "max_drawdown", na_position="last", kind="stable")
+    return df.reset_index(drop=True)
+
+
+def walk_forward_windows(n_bars: int, train_bars: int, test_bars: int, step: Optional[int] = None) -> List[Tuple[slice, slice]]:
+    """Rolling (train, test) row slices; step defaults to test_bars (non-overlapping test windows)."""
+    step = step or test_bars
+    out = []
+    start = 0
+    while start + train_bars + test_bars <= n_bars:
+        out.append((slice(start, start + train_bars), slice(start + train_bars, start + train_bars + test_bars)))
+        start += step
+    return out
+
+
+def walk_forward(
+    family: str,
+    close: Union[pd.DataFrame, pd.Series],
+    high: Optional[pd.DataFrame] = None,
+    low: Optional[pd.DataFrame] = None,
+    grid: Optional[Grid] = None,
+    train_bars: int = 250,
+    test_bars: int = 60,
+    step: Optional[int] = None,
+    metric: str = "sharpe_ratio",
+    init_cash: float = 10000.0,
+    fees: Optional[float] = None,
+    max_columns: int = 20000,
+) -> pd.DataFrame:
+    """
+    Walk-forward optimization: for each window pick the combination with the best train ``metric``
+    (highest; lowest for max_drawdown) and score it out of sample. One row per window with the
+    window dates, chosen params, train_<metric> and the test metrics.
+    """
+    combos = expand_grid(family, grid)
+    builder, price = _prepare(family, close, high, low)
+    fee = _fees(fees)
+    rows = []
+    for train, test in walk_forward_windows(len(price), train_bars, test_bars, step):
+        scores = _evaluate(builder, combos, price, train, None, init_cash, fee, max_columns)[metric]
+        if np.all(np.isnan(scores)):
+            continue
+        best = int(np.nanargmin(scores) if metric == "max_drawdown" else np.nanargmax(scores))
+        oos = _evaluate(builder, [combos[best]], price, test, None, init_cash, fee, max_columns)
+        idx = price.index
+        rows.append(
+            {
+                "train_start": idx[train.start],
+                "train_end": idx[train.stop - 1],
+                "test_start": idx[test.start],
+                "test_end": idx[test.stop - 1],
+                "params": combos[best],
+                f"train_{metric}": float(scores[best]),
+                **{f"test_{k}": float(v[0]) for k, v in oos.items()},
+            }
+        )
+    return pd.DataFrame(rows)
+
+
+def optimize_family(
+    family: str,
+    close: Union[pd.DataFrame, pd.Series],
+    high: Optional[pd.DataFrame] = None,
+    low: Optional[pd.DataFrame] = None,
+    n_trials: int = 100,
+    metric: str = "sharpe_ratio",
+    symbol_chunks: int = 4,
+    study_name: Optional[str] = None,
+    storage: Any = None,
+    pruner: Any = None,
+    sampler: Any = None,
+    n_jobs: int = 1,
+    init_cash: float = 10000.0,
+    fees: Optional[float] = None,
+    max_columns: int = 20000,
+    seed: int = 0,
+):
+    """
+    Optuna search over suggest_strategy_params(family). Each trial scores symbol chunks in turn and
+    reports the running average so ``pruner`` (default MedianPruner) can stop it early. Pass a shared
+    ``storage`` (RDB URL or ``journal:<path>``) and the same ``study_name`` from several processes to
+    run trials in parallel; ``n_jobs`` adds threads within this process.
+    """
+    import optuna
+
+    from .optuna_optimizer import optimize, suggest_strategy_params
+
+    builder, price = _prepare(family, close, high, low)
+    fee = _fees(fees)
+    order = np.random.default_rng(seed).permutation(price.shape[1])
+    chunks = [c for c in np.array_split(order, max(1, min(symbol_chunks, price.shape[1]))) if len(c)]
+    maximize = metric != "max_drawdown"
+
+    def objective(trial: "optuna.Trial") -> float:
+        params = suggest_strategy_params(trial, family)
+        if not _valid(family, params):
+            raise optuna.TrialPruned()
+        total, n = 0.0, 0
+        for step, cols in enumerate(chunks):
+            value = _evaluate(builder, [params], price, slice(None), np.sort(cols), init_cash, fee, max_columns)[metric][0]
+            if not np.isnan(value):
+                total += value * len(cols)
+                n += len(cols)
+            if n:
+                trial.report(total / n, step)
+                if trial.should_prune():
+                    raise optuna.TrialPruned()
+        if not n:
+            raise optuna.TrialPruned()
+        return total / n
+
+    return optimize(
+        objective,
+        n_trials=n_trials,
+        direction="maximize" if maximize else "minimize",
+        study_name=study_name or f"sweep_{family}_{metric}",
+        storage=storage,
+        pruner=pruner or optuna.pruners.MedianPruner(n_startup_trials=5),
+        sampler=sampler,
+        n_jobs=n_jobs,
+    )
+
+
+def evaluate_candidates(
+    candidates: Sequence[Mapping[str, Any]],
+    close: Union[pd.DataFrame, pd.Series],
+    high: Optional[pd.DataFrame] = None,
+    low: Optional[pd.DataFrame] = None,
+    **kwargs: Any,
+) -> List[Dict[str, Any]]:
+    """
+    Score alpha_factory-style candidates ({"strategy_type", "params", ...}) in one sweep per family.
+    Returns copies with a "metrics" dict (None for unknown or invalid candidates), in input order.
+    """
+    out = [dict(c, metrics=None) for c in candidates]
+    by_family: Dict[str, List[int]] = {}
+    for i, c in enumerate(candidates):
+        fam = c.get("strategy_type")
+        if fam in FAMILIES and (fam != "breakout" or (high is not None and low is not None)):
+            if _valid(fam, c.get("params") or {}):
+                by_family.setdefault(fam, []).append(i)
+    for fam, idxs in by_family.items():
+        df = sweep(fam, close, high, low, grid=[candidates[i]["params"] for i in idxs], sort_by=None, **kwargs)
+        for i, row in zip(idxs, df[list(METRICS)].to_dict("records")):
+            out[i]["metrics"] = row
+    return out
+
+
+def load_sweep_panel(
+    symbols: Optional[Sequence[str]] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    conn: Any = None,
+) -> Dict[str, pd.DataFrame]:
+    """close/high/low date × code frames from the cached price panel (codes as in a_stock_daily, e.g. 600519.SH)."""
+    from backtest_engine.panel_store import get_panel_store
+
+    panel = get_panel_store().get(conn=conn, start_date=start_date)
+    if panel is None:
+        return {}
+    out = {}
+    for f in ("close", "high", "low"):
+        values, dates, codes = panel.matrix(f, symbols, start_date, end_date)
+        out[f] = pd.DataFrame(values, index=pd.DatetimeIndex(dates), columns=codes)
+    keep = out["close"].notna().any(axis=1).to_numpy()
+    return {k: v.loc[keep] for k, v in out.items()}
@@ -3,19 +3,88 @@
 from typing import Any, Dict, Optional
 
 # Optional: from stable_baselines3 import PPO, SAC; from sb3_contrib import RecurrentPPO
-# Env: observation = features, action = position or trade signal, reward = PnL or Sharpe.
+# Env: simulation_world.VectorMarketEnv — N parallel episodes over a_stock_daily + features_daily,
+# observation = recent returns + stored features + position, reward = net return / differential Sharpe.
 
 
 def create_rl_env(
-    df_prices: Any,
+    df_prices: Any = None,
     reward_type: str = "returns",
     **kwargs: Any,
 ) -> Any:
     """
-    Create gym-style env for RL (stub). In production use gym.Env with price/feature df.
-    reward_type: returns | sharpe | sortino.
+    Create a vectorized RL env over real daily bars (simulation_world.VectorMarketEnv).
+    df_prices: HistoricalPanel, close DataFrame (index = dates, columns = symbols) or None
+    (load a_stock_daily + features_daily from the unified DuckDB; ``symbols`` / ``start_date`` /
+    ``end_date`` kwargs narrow the load). reward_type: returns | log_returns | sharpe.
+    Remaining kwargs go to VectorMarketEnv (num_envs, episode_length, window, action_type, fee_rate, seed).
     """
-    return None  # Stub: return custom env wrapping df_prices
+    from simulation_world import HistoricalPanel, VectorMarketEnv
+
+    load_keys = ("symbols", "start_date", "end_date", "feature_columns")
+    load = {k: kwargs.pop(k) for k in load_keys if k in kwargs}
+    if isinstance(df_prices, HistoricalPanel):
+        panel = df_prices
+    elif df_prices is None:
+        panel = HistoricalPanel.from_db(**load)
+    else:
+        panel = HistoricalPanel.from_arrays(df_prices)
+    return VectorMarketEnv(panel, reward_type=reward_type, **kwargs)
+
+
+def _sb3_env(env: Any) -> Any:
+    """Wrap a VectorMarketEnv as a stable_baselines3 VecEnv (other envs are passed through)."""
+    from simulation_world import VectorMarketEnv
+
+    if not isinstance(env, VectorMarketEnv):
+        return env
+    from stable_baselines3.common.vec_env import VecEnv
+
+    class _VectorMarketVecEnv(VecEnv):
+        def __init__(self, venv: VectorMarketEnv):
+            self.venv = venv
+            self._actions: Any = None
+            super().__init__(venv.num_envs, venv.single_observation_space, venv.single_action_space)
+
+        def reset(self) -> Any:
+            obs, _ = self.venv.reset()
+            return obs
+
+        def seed(self, seed: Optional[int] = None) -> list:
+            self.venv.reset(seed=seed)
+            return [seed] * self.num_envs
+
+        def step_async(self, actions: Any) -> None:
+            self._actions = actions
+
+        def step_wait(self) -> Any:
+            obs, rewards, terminated, truncated, infos = self.venv.step(self._actions)
+            dones = terminated | truncated
+            out = [{} for _ in range(self.num_envs)]
+            for i in dones.nonzero()[0]:
+                # SB3 bootstraps truncated episodes from terminal_observation
+                out[i] = {
+                    "terminal_observation": infos["final_observation"][i],
+                    "TimeLimit.truncated": bool(truncated[i]),
+                }
+            return obs, rewards, dones, out
+
+        def close(self) -> None:
+            self.venv.close()
+
+        def get_attr(self, attr_name: str, indices: Any = None) -> list:
+            return [getattr(self.venv, attr_name)] * len(self._get_indices(indices))
+
+        def set_attr(self, attr_name: str, value: Any, indices: Any = None) -> None:
+            setattr(self.venv, attr_name, value)
+
+        def env_method(self, method_name: str, *method_args: Any, indices: Any = None, **method_kwargs: Any) -> list:
+            return [getattr(self.venv, method_name)(*method_args, **method_kwargs)]
+
+        def env_is_wrapped(self, wrapper_class: Any, indices: Any = None) -> list:
+            return [False] * len(self._get_indices(indices))
+
+    return _VectorMarketVecEnv(env)
 
 
 def train_ppo(
@@ -24,13 +93,13 @@ def train_ppo(
     policy_kwargs: Optional[Dict[str, Any]] = None,
     **kwargs: Any,
 ) -> Any:
-    """Train PPO agent (stub). Requires stable_baselines3."""
+    """Train PPO agent. Requires stable_baselines3; a VectorMarketEnv is wrapped as an SB3 VecEnv."""
     try:
         from stable_baselines3 import PPO
 
         model = PPO(
             "MlpPolicy",
-            env,
+            _sb3_env(env),
             policy_kwargs=policy_kwargs or {},
             **kwargs,
         )
@@ -45,11 +114,11 @@ def train_sac(
     total_timesteps: int = 100_000,
     **kwargs: Any,
 ) -> Any:
-    """Train SAC agent (stub). Requires stable_baselines3."""
+    """Train SAC agent. Requires stable_baselines3; use a VectorMarketEnv with action_type="continuous"."""
     try:
         from stable_baselines3 import SAC
 
-        model = SAC("MlpPolicy", env, **kwargs)
+        model = SAC("MlpPolicy", _sb3_env(env), **kwargs)
         model.learn(total_timesteps=total_timesteps)
         return model
     except ImportError:
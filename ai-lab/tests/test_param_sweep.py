@@ -0,0 +1,102 @@
+"""Tests for vectorized parameter sweeps."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("vectorbt")
+
+from ai_lab.param_sweep import (
+    evaluate_candidates,
+    expand_grid,
+    optimize_family,
+    sweep,
+    walk_forward,
+    walk_forward_windows,
+)
+
+
+def _panel(n=300, m=4, seed=3):
+    rng = np.random.default_rng(seed)
+    idx = pd.bdate_range("2024-01-01", periods=n)
+    close = pd.DataFrame(50 * np.cumprod(1 + rng.normal(0, 0.02, (n, m)), axis=0), index=idx, columns=[f"S{i}" for i in range(m)])
+    close.iloc[:40, 0] = np.nan  # listed later
+    high = close * (1 + rng.uniform(0, 0.02, (n, m)))
+    low = close * (1 - rng.uniform(0, 0.02, (n, m)))
+    return close, high, low
+
+
+def _single_backtest(close, entries, exits, fees):
+    import vectorbt as vbt
+
+    pf = vbt.Portfolio.from_signals(close.ffill(), entries, exits, init_cash=10000.0, fees=fees, freq="1D")
+    return float(pf.total_return()), int(pf.trades.count())
+
+
+@pytest.mark.parametrize(
+    "family,params",
+    [
+        ("trend_following", {"fast_period": 5, "slow_period": 30}),
+        ("mean_reversion", {"rsi_period": 14, "oversold": 35.0, "overbought": 65.0}),
+        ("breakout", {"lookback": 20}),
+    ],
+)
+def test_sweep_matches_per_symbol_strategy_signals(family, params):
+    from core import OHLCV
+    import strategy_engine as se
+
+    close, high, low = _panel()
+    fn = {
+        "trend_following": se.trend_following_entries_exits,
+        "mean_reversion": se.mean_reversion_entries_exits,
+        "breakout": se.breakout_entries_exits,
+    }[family]
+    df = sweep(family, close, high, low, grid=[params], fees=0.001)
+    returns, trades = [], 0
+    for code in close.columns:
+        c = close[code].dropna()
+        bars = [OHLCV(code, t, v, high[code][t], low[code][t], v, 0.0, "1d") for t, v in c.items()]
+        ent, ex = fn(bars, **params)
+        r, k = _single_backtest(c, pd.Series(ent, index=c.index), pd.Series(ex, index=c.index), 0.001)
+        returns.append(r)
+        trades += k
+    assert df.loc[0, "trade_count"] == trades
+    assert df.loc[0, "total_return"] == pytest.approx(np.mean(returns), rel=1e-9, abs=1e-12)
+
+
+def test_grid_expansion_walk_forward_and_candidates():
+    combos = expand_grid("trend_following", {"fast_period": [5, 40], "slow_period": [30, 60]})
+    assert combos == [{"fast_period": 5, "slow_period": 30}, {"fast_period": 5, "slow_period": 60}, {"fast_period": 40, "slow_period": 60}]
+
+    close, high, low = _panel()
+    ranked = sweep("breakout", close, high, low, grid={"lookback": [10, 20, 30]}, max_columns=5)
+    assert len(ranked) == 3 and ranked["sharpe_ratio"].is_monotonic_decreasing
+
+    assert walk_forward_windows(300, 200, 50) == [(slice(0, 200), slice(200, 250)), (slice(50, 250), slice(250, 300))]
+    wf = walk_forward("mean_reversion", close, grid={"rsi_period": [7, 14], "oversold": [30.0], "overbought": [70.0]}, train_bars=200, test_bars=50)
+    assert len(wf) == 2 and {"params", "train_sharpe_ratio", "test_total_return"} <= set(wf.columns)
+    assert wf["test_start"].iloc[0] == close.index[200]
+
+    scored = evaluate_candidates(
+        [
+            {"strategy_type": "breakout", "params": {"lookback": 20}},
+            {"strategy_type": "trend_following", "params": {"fast_period": 50, "slow_period": 30}},
+            {"strategy_type": "unknown", "params": {}},
+        ],
+        close,
+        high,
+        low,
+        fees=0.001,
+    )
+    assert scored[0]["metrics"]["trade_count"] > 0
+    assert scored[1]["metrics"] is None and scored[2]["metrics"] is None
+
+
+def test_optimize_family_with_journal_storage(tmp_path):
+    close, _, _ = _panel(n=200, m=6)
+    storage = f"journal:{tmp_path / 'study.log'}"
+    study = optimize_family("trend_following", close, n_trials=8, storage=storage, study_name="t", fees=0.001)
+    assert len(study.trials) == 8
+    # a second worker appends to the same study
+    again = optimize_family("trend_following", close, n_trials=2, storage=storage, study_name="t", fees=0.001)
+    assert len(again.trials) == 10
@@ -13,6 +13,15 @@ def _get_conn():
     return conn
 
 
+def daily_source(conn) -> str:
+    """日 K 全表分析的数据源：已有冷分区视图时读 a_stock_daily_all（主表 + 冷 Parquet）。"""
+    try:
+        from data_pipeline.storage.cold_storage import source_table
+    except ImportError:
+        return "a_stock_daily"
+    return source_table(conn, "a_stock_daily")
+
+
 def write_emotion_state(state: str, stage: str, limit_up_count: int, score: float) -> None:
     conn = get_connection(read_only=False)
     if not conn:
@@ -40,9 +40,11 @@ class EmotionCycleModel:
             limitup = pd.DataFrame(columns=["trade_date", "limitup_count", "max_height"])
         # 市场成交额按日
         try:
-            volume = conn.execute("""
+            from ._storage import daily_source
+
+            volume = conn.execute(f"""
                 SELECT date AS trade_date, SUM(COALESCE(amount, 0)) AS market_volume
-                FROM a_stock_daily
+                FROM {daily_source(conn)}
                 GROUP BY date
             """).fetchdf()
         except Exception:  # pylint: disable=broad-exception-caught
@@ -64,11 +64,14 @@ class HotMoneyAnalyzer:
             pass
         # 用 SQL：daily 上 LEAD(close, N) 得 N 日后收盘，再与龙虎榜 join 算收益
         try:
+            from ._storage import daily_source
+
+            daily = daily_source(conn)
             result = conn.execute(f"""
                 WITH daily_lead AS (
                     SELECT code, date, close AS buy_price,
                            LEAD(close, {forward_days}) OVER (PARTITION BY code ORDER BY date) AS sell_price
-                    FROM a_stock_daily
+                    FROM {daily}
                 ),
                 trades AS (
                     SELECT code, COALESCE(seat_name, code) AS seat, lhb_date AS trade_date
@@ -1,12 +1,26 @@
 # backtest-engine
 from .backtest_result import BacktestResult
 from .cost_models import CommissionModel, SlippageModel, effective_fee_per_order
-from .data_loader import load_ohlcv_from_db, load_signals_from_db
+from .data_loader import (
+    load_close_panel_from_db,
+    load_ohlcv_frame_from_db,
+    load_ohlcv_from_db,
+    load_signal_panels_from_db,
+    load_signals_from_db,
+)
+from .farm import BacktestFarm, BacktestJob, get_backtest_farm, run_backtest_jobs
 from .metrics import compute_metrics
+from .panel_store import OHLCVPanel, OHLCVPanelStore, get_panel_store
 from .portfolio_backtest import run_portfolio_backtest
-from .position_manager import PositionManager, apply_stop_take_series
+from .result_cache import BacktestResultCache, cached_backtest, get_result_cache
+from .position_manager import PositionManager, apply_stop_take_frame, apply_stop_take_series
 from .runner import run_backtest, run_backtest_from_ohlcv
-from .run_with_db import run_backtest_from_db, run_backtest_multi_from_db
+from .run_with_db import (
+    backtest_close_signals,
+    run_backtest_cross_sectional_from_db,
+    run_backtest_from_db,
+    run_backtest_multi_from_db,
+)
 from .strategy_allocator import allocate_weights, get_symbols_for_strategy
 
 __all__ = [
@@ -14,10 +28,22 @@ __all__ = [
     "run_backtest_from_ohlcv",
     "run_backtest_from_db",
     "run_backtest_multi_from_db",
+    "run_backtest_cross_sectional_from_db",
+    "backtest_close_signals",
+    "BacktestFarm",
+    "BacktestJob",
+    "get_backtest_farm",
+    "run_backtest_jobs",
+    "BacktestResultCache",
+    "cached_backtest",
+    "get_result_cache",
     "run_portfolio_backtest",
     "compute_metrics",
     "load_ohlcv_from_db",
+    "load_ohlcv_frame_from_db",
     "load_signals_from_db",
+    "load_close_panel_from_db",
+    "load_signal_panels_from_db",
     "allocate_weights",
     "get_symbols_for_strategy",
     "CommissionModel",
@@ -25,5 +51,9 @@ __all__ = [
     "effective_fee_per_order",
     "PositionManager",
     "apply_stop_take_series",
+    "apply_stop_take_frame",
     "BacktestResult",
+    "OHLCVPanel",
+    "OHLCVPanelStore",
+    "get_panel_store",
 ]
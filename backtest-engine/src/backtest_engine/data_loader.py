@@ -5,9 +5,10 @@ from __future__ import annotations
 
 import logging
 import os
-from datetime import datetime, timezone
+from datetime import timezone
 from typing import Any, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 
 _log = logging.getLogger(__name__)
@@ -28,40 +29,31 @@ def _norm_code(symbol: str) -> str:
     return s if "." in s else f"{code}.SH"
 
 
-def _to_ts(d) -> datetime:
-    if hasattr(d, "to_pydatetime"):
-        t = d.to_pydatetime()
-    elif isinstance(d, str):
-        t = datetime.strptime(d[:10], "%Y-%m-%d")
-    else:
-        t = datetime.now(timezone.utc)
-    if t.tzinfo is None:
-        t = t.replace(tzinfo=timezone.utc)
-    return t
+def _build_ohlcv_frame(df: pd.DataFrame, symbol: str, code: str) -> Any:
+    """DataFrame（date, open, high, low, close, volume）→ OHLCVFrame，列直接取 NumPy 数组。"""
+    from core import OHLCVFrame
+
+    return OHLCVFrame.from_columns(
+        {c: df[c].to_numpy() for c in ("date", "open", "high", "low", "close", "volume")},
+        symbol=symbol or code,
+        interval="1d",
+    )
 
 
 def _build_ohlcv_list(df: pd.DataFrame, symbol: str, code: str) -> List[Any]:
-    """从 DataFrame 构建 OHLCV 对象列表。"""
-    ohlcv_list: List[Any] = []
+    """从 DataFrame 构建 OHLCV 对象列表（兼容旧调用方；时间戳为 UTC aware）。"""
     try:
-        from core import OHLCV
-
-        for _, row in df.iterrows():
-            ohlcv_list.append(
-                OHLCV(
-                    symbol=symbol or code,
-                    timestamp=_to_ts(row["date"]),
-                    open=float(row["open"] or 0),
-                    high=float(row["high"] or 0),
-                    low=float(row["low"] or 0),
-                    close=float(row["close"] or 0),
-                    volume=float(row["volume"] or 0),
-                    interval="1d",
-                )
-            )
+        return _build_ohlcv_frame(df, symbol, code).to_bars(tz=timezone.utc)
     except ImportError:
-        pass
-    return ohlcv_list
+        return []
+
+
+def _iso_date(d: str) -> str:
+    """YYYY-MM-DD / YYYYMMDD -> YYYY-MM-DD（DuckDB DATE 比较需 ISO 格式）。"""
+    s = (d or "").replace("-", "")[:8]
+    if len(s) == 8 and s.isdigit():
+        return f"{s[:4]}-{s[4:6]}-{s[6:]}"
+    return (d or "")[:10]
 
 
 def _try_close_conn(conn: Any) -> None:
@@ -94,20 +86,43 @@ def _shift_signal_date_key(date_key: str, lag_bdays: int) -> str:
         return date_key
 
 
+def _use_panel(conn: Any, use_panel: Optional[bool]) -> bool:
+    """use_panel=None：仅在使用默认统一库（conn 为 None）且未关闭 OHLCV_PANEL_CACHE 时走面板缓存。"""
+    from .panel_store import panel_cache_enabled
+
+    if use_panel is None:
+        return conn is None and panel_cache_enabled()
+    return bool(use_panel) and panel_cache_enabled()
+
+
+def _panel_for(start_date: str, conn: Any = None):
+    from .panel_store import get_panel_store
+
+    return get_panel_store().get(conn=conn, start_date=_iso_date(start_date))
+
+
 def load_ohlcv_from_db(
     symbol: str,
     start_date: str,
     end_date: str,
     conn: Any = None,
+    use_panel: Optional[bool] = None,
 ) -> Tuple[pd.DataFrame, List[Any]]:
     """
     从 quant_system.duckdb 的 a_stock_daily 加载日 K。
     返回 (DataFrame with columns date, open, high, low, close, volume), list[OHLCV]。
     若 a_stock_daily 无数据则尝试 daily_bars（需 order_book_id）。
+    use_panel: 默认在 conn 为 None 时优先读进程级面板缓存（见 panel_store），未命中再查库。
     """
     code = _norm_code(symbol)
     close_conn = False
 
+    if _use_panel(conn, use_panel):
+        panel = _panel_for(start_date, conn)
+        if panel is not None and panel.has(code):
+            df = panel.frame(code, _iso_date(start_date), _iso_date(end_date))
+            return df, _build_ohlcv_list(df, symbol, code) if not df.empty else []
+
     if conn is None:
         try:
             from data_pipeline.storage.duckdb_manager import get_conn
@@ -117,8 +132,8 @@ def load_ohlcv_from_db(
             _log.warning("load_ohlcv_from_db: no db: %s", e)
             return pd.DataFrame(), []
 
-    start = start_date.replace("-", "")[:8]
-    end = end_date.replace("-", "")[:8]
+    start = _iso_date(start_date)
+    end = _iso_date(end_date)
     out_df = pd.DataFrame()
     ohlcv_list: List[Any] = []
 
@@ -148,6 +163,52 @@ def load_ohlcv_from_db(
     return out_df, ohlcv_list
 
 
+def load_ohlcv_frame_from_db(
+    symbol: str,
+    start_date: str,
+    end_date: str,
+    conn: Any = None,
+    use_panel: Optional[bool] = None,
+) -> Any:
+    """
+    与 load_ohlcv_from_db 相同的数据，直接返回列式 OHLCVFrame（不构建 DataFrame / OHLCV 对象）。
+    面板命中且区间内无缺失日时各列为面板矩阵的视图；查库时由 fetchnumpy() 的列数组构建。
+    """
+    from core import OHLCVFrame
+
+    code = _norm_code(symbol)
+    if _use_panel(conn, use_panel):
+        panel = _panel_for(start_date, conn)
+        if panel is not None and panel.has(code):
+            j = panel.code_index[code]
+            rs = panel.row_slice(_iso_date(start_date), _iso_date(end_date))
+            cols = {f: panel.fields[f][rs, j] for f in ("open", "high", "low", "close", "volume")}
+            cols["date"] = panel.dates[rs]
+            mask = ~np.isnan(cols["close"])
+            if not mask.all():
+                cols = {k: v[mask] for k, v in cols.items()}
+            return OHLCVFrame.from_columns(cols, symbol=symbol or code, interval="1d")
+
+    conn, close_conn = _open_conn_if_needed(conn, "load_ohlcv_frame_from_db")
+    if conn is None:
+        return OHLCVFrame.empty(symbol or code)
+    try:
+        cols = conn.execute(
+            """SELECT date, open, high, low, close, volume
+               FROM a_stock_daily
+               WHERE code = ? AND date >= ? AND date <= ?
+               ORDER BY date""",
+            [code, _iso_date(start_date), _iso_date(end_date)],
+        ).fetchnumpy()
+        return OHLCVFrame.from_columns(cols, symbol=symbol or code, interval="1d")
+    except Exception:
+        _log.exception("load_ohlcv_frame_from_db failed: %s", symbol)
+        return OHLCVFrame.empty(symbol or code)
+    finally:
+        if close_conn:
+            _try_close_conn(conn)
+
+
 def _is_entry_signal(sig: str) -> bool:
     """判断是否为买入信号。"""
     return any(x in sig for x in ("buy", "long", "买入", "多"))
@@ -222,8 +283,8 @@ def load_signals_from_db(
             _log.warning("load_signals_from_db: no db: %s", e)
             return {}, {}
 
-    start = start_date.replace("-", "")[:8]
-    end = end_date.replace("-", "")[:8]
+    start = _iso_date(start_date)
+    end = _iso_date(end_date)
     entries: dict = {}
     exits: dict = {}
     lag = int(execution_lag_bdays) if execution_lag_bdays is not None else _execution_lag_bdays()
@@ -251,3 +312,135 @@ def load_signals_from_db(
             _try_close_conn(conn)
 
     return entries, exits
+
+
+def _open_conn_if_needed(conn: Any, caller: str) -> Tuple[Any, bool]:
+    """conn 为 None 时打开统一库连接；返回 (conn, 是否需由调用方关闭)。"""
+    if conn is not None:
+        return conn, False
+    try:
+        from data_pipeline.storage.duckdb_manager import get_conn
+
+        return get_conn(read_only=True), True
+    except Exception as e:
+        _log.warning("%s: no db: %s", caller, e)
+        return None, False
+
+
+def load_close_panel_from_db(
+    symbols: List[str],
+    start_date: str,
+    end_date: str,
+    conn: Any = None,
+    use_panel: Optional[bool] = None,
+) -> pd.DataFrame:
+    """
+    截面模式：一次查询加载多标的收盘价矩阵。
+    返回 DataFrame，index 为日期（DatetimeIndex，各标的日期并集），columns 为规范化 code；
+    某标的当日无 K 线时为 NaN（停牌/未上市），由调用方决定如何填充。
+    use_panel 语义同 load_ohlcv_from_db。
+    """
+    codes = list(dict.fromkeys(c for c in (_norm_code(s) for s in symbols or []) if c))
+    if not codes:
+        return pd.DataFrame()
+    if _use_panel(conn, use_panel):
+        panel = _panel_for(start_date, conn)
+        if panel is not None:
+            return panel.close_frame(codes, _iso_date(start_date), _iso_date(end_date))
+    conn, close_conn = _open_conn_if_needed(conn, "load_close_panel_from_db")
+    if conn is None:
+        return pd.DataFrame()
+
+    try:
+        df = conn.execute(
+            """SELECT code, date, close
+               FROM a_stock_daily
+               WHERE list_contains(?, code) AND date >= ? AND date <= ?
+               ORDER BY date, code""",
+            [codes, _iso_date(start_date), _iso_date(end_date)],
+        ).fetchdf()
+        if df is None or df.empty:
+            return pd.DataFrame()
+        df["date"] = pd.to_datetime(df["date"])
+        panel = df.pivot_table(index="date", columns="code", values="close", aggfunc="last")
+        panel.columns.name = None
+        return panel.reindex(columns=[c for c in codes if c in panel.columns]).astype(float)
+    except Exception:
+        _log.exception("load_close_panel_from_db failed: %d symbols", len(codes))
+        return pd.DataFrame()
+    finally:
+        if close_conn:
+            _try_close_conn(conn)
+
+
+_ENTRY_PATTERN = "buy|long|买入|多"
+_EXIT_PATTERN = "sell|short|卖出|空"
+
+
+def load_signal_panels_from_db(
+    symbols: List[str],
+    start_date: str,
+    end_date: str,
+    signal_source: str = "trade_signals",
+    strategy_id: Optional[str] = None,
+    conn: Any = None,
+    execution_lag_bdays: Optional[int] = None,
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    截面模式：一次查询加载多标的信号，返回 (entries, exits) 布尔矩阵（index 为生效日，columns 为 code）。
+    信号判定与 T+N 执行滞后规则与 load_signals_from_db 一致；无信号时返回两个空 DataFrame。
+    """
+    codes = list(dict.fromkeys(c for c in (_norm_code(s) for s in symbols or []) if c))
+    empty = (pd.DataFrame(dtype=bool), pd.DataFrame(dtype=bool))
+    if not codes:
+        return empty
+    conn, close_conn = _open_conn_if_needed(conn, "load_signal_panels_from_db")
+    if conn is None:
+        return empty
+
+    lag = int(execution_lag_bdays) if execution_lag_bdays is not None else _execution_lag_bdays()
+    start = _iso_date(start_date)
+    end = _iso_date(end_date)
+    try:
+        if signal_source == "trade_signals":
+            sql = """SELECT code, signal AS sig, snapshot_time
+                     FROM trade_signals
+                     WHERE list_contains(?, code) AND DATE(snapshot_time) >= ? AND DATE(snapshot_time) <= ?"""
+            params: List[Any] = [codes, start, end]
+            if strategy_id and str(strategy_id).strip():
+                sql += " AND strategy_id = ?"
+                params.append(str(strategy_id).strip())
+        else:
+            sql = """SELECT code, signal_type AS sig, snapshot_time
+                     FROM market_signals
+                     WHERE list_contains(?, code) AND DATE(snapshot_time) >= ? AND DATE(snapshot_time) <= ?"""
+            params = [codes, start, end]
+        df = conn.execute(sql, params).fetchdf()
+        if df is None or df.empty:
+            return empty
+
+        df = df.dropna(subset=["snapshot_time"])
+        dates = pd.DatetimeIndex(pd.to_datetime(df["snapshot_time"])).normalize()
+        if lag > 0:
+            dates = dates + pd.tseries.offsets.BDay(lag)
+        sig = df["sig"].fillna("").astype(str).str.lower()
+        flags = pd.DataFrame(
+            {
+                "date": dates,
+                "code": df["code"].to_numpy(),
+                "entry": sig.str.contains(_ENTRY_PATTERN, regex=True).to_numpy(),
+                "exit": sig.str.contains(_EXIT_PATTERN, regex=True).to_numpy(),
+            }
+        )
+        grouped = flags.groupby(["date", "code"])[["entry", "exit"]].any()
+        entries = grouped["entry"].unstack("code", fill_value=False).astype(bool)
+        exits = grouped["exit"].unstack("code", fill_value=False).astype(bool)
+        entries.columns.name = None
+        exits.columns.name = None
+        return entries, exits
+    except Exception:
+        _log.exception("load_signal_panels_from_db failed: %d symbols", len(codes))
+        return empty
+    finally:
+        if close_conn:
+            _try_close_conn(conn)
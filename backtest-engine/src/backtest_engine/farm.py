@@ -0,0 +1,497 @@
+"""
+本地回测农场：ProcessPoolExecutor 并行跑大批单标的回测（OpenClaw 种群评估、批量策略回测），无需 Celery broker。
+
+- 父进程每批只加载一次数据：所需标的的收盘价矩阵走 ``load_close_panel_from_db``（默认命中 panel_store），
+  信号按 (signal_source, strategy_id, 区间) 分组、每组一次 ``load_signal_panels_from_db``；
+  三块矩阵打包进一段 ``multiprocessing.shared_memory``，worker 在 initializer 中映射为只读视图，不再各自连库；
+- 任务只携带列号与行区间；单任务超时（worker 内 setitimer）返回 ``error="timeout"``，不拖住整批；
+- 结果按 ``BacktestJob.cache_key()``（任务参数哈希）+ 日 K/信号数据版本缓存（result_cache：进程内 LRU +
+  backtest_result_cache 表），批内重复任务只算一次，跨代 / 跨进程未变的个体不重复回测，新数据落库后自动失效；
+- 返回顺序与输入一致，与 worker 完成顺序无关；
+- 任务数少于 ``BACKTEST_FARM_MIN_PARALLEL`` 或当前进程为 daemon（如 Celery prefork worker）时在本进程顺序执行。
+
+环境变量：``BACKTEST_FARM_WORKERS``（默认 CPU 数）、``BACKTEST_FARM_TIMEOUT_SEC``（默认 120，0 不限）、
+``BACKTEST_FARM_CACHE_SIZE``（默认 4096）、``BACKTEST_FARM_CACHE_TTL_SEC``（内存层 TTL，默认 3600）、``BACKTEST_FARM_MIN_PARALLEL``（默认 16）、
+``BACKTEST_FARM_START_METHOD``（POSIX 默认 fork：worker 继承已导入的 vectorbt 与已编译的 numba 内核，
+spawn 下每个 worker 需重新 JIT；在多线程宿主进程中调用可设为 spawn/forkserver）。
+"""
+
+from __future__ import annotations
+
+import copy
+import hashlib
+import json
+import logging
+import math
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, wait
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+_log = logging.getLogger(__name__)
+
+_ALIGN = 64
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(0, int(os.environ.get(name, str(default)).strip()))
+    except ValueError:
+        return default
+
+
+def _empty_result(error: Optional[str] = None) -> Dict[str, Any]:
+    return {
+        "equity_curve": [],
+        "sharpe_ratio": None,
+        "max_drawdown": None,
+        "total_return": None,
+        "win_rate_pct": None,
+        "profit_factor": None,
+        "total_profit": None,
+        "trade_count": None,
+        "error": error,
+    }
+
+
+@dataclass
+class BacktestJob:
+    """一次单标的回测；字段与 run_backtest_from_db 同名参数一致。params 仅参与缓存键（如基因参数）。"""
+
+    symbol: str
+    start_date: str
+    end_date: str
+    signal_source: str = "trade_signals"
+    strategy_id: Optional[str] = None
+    init_cash: float = 10000.0
+    fees: float = 0.0002
+    slippage: float = 0.001
+    stop_loss_pct: Optional[float] = None
+    take_profit_pct: Optional[float] = None
+    params: Dict[str, Any] = field(default_factory=dict)
+
+    def normalized(self) -> "BacktestJob":
+        from .data_loader import _iso_date, _norm_code
+
+        sid = str(self.strategy_id).strip() if self.strategy_id else None
+        return BacktestJob(
+            symbol=_norm_code(self.symbol),
+            start_date=_iso_date(self.start_date),
+            end_date=_iso_date(self.end_date),
+            signal_source=self.signal_source or "trade_signals",
+            strategy_id=sid or None,
+            init_cash=float(self.init_cash),
+            fees=float(self.fees),
+            slippage=float(self.slippage),
+            stop_loss_pct=self.stop_loss_pct,
+            take_profit_pct=self.take_profit_pct,
+            params=self.params or {},
+        )
+
+    def cache_key(self) -> str:
+        raw = json.dumps(asdict(self.normalized()), sort_keys=True, default=str, ensure_ascii=False)
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def signal_key(self) -> Tuple[Any, ...]:
+        sid = self.strategy_id if self.signal_source == "trade_signals" else None
+        return (self.signal_source, sid, self.start_date, self.end_date)
+
+
+# ---------------------------------------------------------------------------
+# 共享内存：多块数组打包进一段 SharedMemory，worker 侧按 layout 还原只读视图
+
+
+def _pack_shared(arrays: Dict[str, np.ndarray]):
+    from multiprocessing import shared_memory
+
+    layout: Dict[str, Tuple[int, Tuple[int, ...], str, str]] = {}
+    offset = 0
+    for name, arr in arrays.items():
+        order = "F" if arr.ndim > 1 and arr.flags.f_contiguous else "C"
+        layout[name] = (offset, arr.shape, arr.dtype.str, order)
+        offset += -(-arr.nbytes // _ALIGN) * _ALIGN
+    shm = shared_memory.SharedMemory(create=True, size=max(offset, _ALIGN))
+    for name, arr in arrays.items():
+        off, shape, dtype, order = layout[name]
+        view = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=off, order=order)
+        view[...] = arr
+    return shm, layout
+
+
+def _views(buf: Any, layout: Dict[str, Tuple[int, Tuple[int, ...], str, str]]) -> Dict[str, np.ndarray]:
+    out = {}
+    for name, (off, shape, dtype, order) in layout.items():
+        view = np.ndarray(shape, dtype=dtype, buffer=buf, offset=off, order=order)
+        view.setflags(write=False)
+        out[name] = view
+    return out
+
+
+# worker 进程内的共享数组（initializer 写入；本进程顺序执行时直接指向父进程数组）
+_WORKER: Dict[str, Any] = {}
+
+
+def _init_worker(shm_name: str, layout: Dict[str, Any], paths: List[str]) -> None:
+    for p in reversed(paths):
+        if p not in sys.path:
+            sys.path.insert(0, p)
+    from multiprocessing import shared_memory
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _WORKER["shm"] = shm
+    _WORKER["arrays"] = _views(shm.buf, layout)
+
+
+class _JobTimeout(Exception):
+    pass
+
+
+@contextmanager
+def _deadline(seconds: float) -> Iterator[None]:
+    """主线程内用 SIGALRM 限时；非主线程或平台不支持时不限时。"""
+    usable = (
+        seconds > 0
+        and hasattr(signal, "setitimer")
+        and threading.current_thread() is threading.main_thread()
+    )
+    if not usable:
+        yield
+        return
+
+    def _raise(_signum, _frame):
+        raise _JobTimeout()
+
+    prev = signal.signal(signal.SIGALRM, _raise)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, prev)
+
+
+def _run_task(task: Tuple[Any, ...]) -> Tuple[int, Dict[str, Any]]:
+    """(序号, 标的列, 信号列, 行起, 行止, 回测参数, 超时) → (序号, 结果)。"""
+    idx, sym_col, sig_col, lo, hi, kwargs, timeout = task
+    arrays = _WORKER["arrays"]
+    try:
+        close = arrays["close"][lo:hi, sym_col]
+        mask = ~np.isnan(close)
+        if not mask.any():
+            return idx, _empty_result("no_ohlcv")
+        index = pd.DatetimeIndex(arrays["dates"][lo:hi][mask])
+        close_s = pd.Series(close[mask], index=index)
+        if close_s.max() <= 0:
+            return idx, _empty_result("invalid_prices")
+        if sig_col >= 0:
+            entries = pd.Series(arrays["entries"][lo:hi, sig_col][mask], index=index)
+            exits = pd.Series(arrays["exits"][lo:hi, sig_col][mask], index=index)
+        else:
+            entries = exits = pd.Series(False, index=index)
+
+        from .run_with_db import backtest_close_signals
+
+        with _deadline(timeout):
+            out = _empty_result()
+            out.update(backtest_close_signals(close_s, entries, exits, **kwargs))
+        return idx, out
+    except _JobTimeout:
+        return idx, _empty_result("timeout")
+    except Exception as e:
+        return idx, _empty_result(str(e))
+
+
+class BacktestFarm:
+    """批量回测：共享内存面板 + 进程池 + 参数哈希结果缓存。"""
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        timeout_sec: Optional[float] = None,
+        cache_size: Optional[int] = None,
+        min_parallel: Optional[int] = None,
+        cache_ttl_sec: Optional[float] = None,
+    ) -> None:
+        self.workers = (
+            workers if workers is not None else _env_int("BACKTEST_FARM_WORKERS", os.cpu_count() or 1)
+        )
+        self.timeout_sec = (
+            float(timeout_sec)
+            if timeout_sec is not None
+            else float(_env_int("BACKTEST_FARM_TIMEOUT_SEC", 120))
+        )
+        self.cache_size = cache_size if cache_size is not None else _env_int("BACKTEST_FARM_CACHE_SIZE", 4096)
+        self.min_parallel = (
+            min_parallel if min_parallel is not None else _env_int("BACKTEST_FARM_MIN_PARALLEL", 16)
+        )
+        self.cache_ttl_sec = (
+            float(cache_ttl_sec)
+            if cache_ttl_sec is not None
+            else float(_env_int("BACKTEST_FARM_CACHE_TTL_SEC", 3600))
+        )
+        from .result_cache import BacktestResultCache
+
+        self.cache = BacktestResultCache(max_size=self.cache_size, ttl_sec=self.cache_ttl_sec)
+        self.stats = {
+            "jobs": 0,
+            "cache_hits": 0,
+            "disk_hits": 0,
+            "computed": 0,
+            "timeouts": 0,
+            "pool_runs": 0,
+        }
+
+    # -- 缓存 -------------------------------------------------------------
+
+    def clear_cache(self) -> None:
+        """清内存层；库表中的结果在数据版本不变时仍会命中。"""
+        self.cache.clear()
+
+    def _versions(self, jobs: Sequence[BacktestJob], conn: Any) -> Dict[str, Optional[str]]:
+        """每个信号源的数据版本（日 K + 信号水位）；读不到时为 None（只用内存层、键不含版本）。"""
+        from .result_cache import data_version
+
+        out: Dict[str, Optional[str]] = {}
+        for src in dict.fromkeys(j.signal_source for j in jobs):
+            out[src] = data_version(conn, src) if conn is not None else None
+            self.cache.observe_version(src, out[src], conn)
+        return out
+
+    # -- 主流程 -----------------------------------------------------------
+
+    def run(
+        self,
+        jobs: Sequence[BacktestJob],
+        conn: Any = None,
+        use_panel: Optional[bool] = None,
+    ) -> List[Dict[str, Any]]:
+        """按输入顺序返回每个任务的回测结果（结构同 run_backtest_from_db）。"""
+        from .result_cache import result_key
+
+        norm = [j.normalized() for j in jobs]
+        self.stats["jobs"] += len(norm)
+        # 元数据连接（版本水位 / 库表缓存）不跨进程池计算持有
+        with self._meta_conn(conn) as meta:
+            versions = self._versions(norm, meta)
+            keys = [result_key(j.cache_key(), versions[j.signal_source]) for j in norm]
+            disk_before = self.cache.stats["disk_hits"]
+            hits = self.cache.get_many(keys, meta)
+            self.stats["disk_hits"] += self.cache.stats["disk_hits"] - disk_before
+        results: List[Optional[Dict[str, Any]]] = [hits.get(k) for k in keys]
+        self.stats["cache_hits"] += sum(r is not None for r in results)
+        pending: "OrderedDict[str, BacktestJob]" = OrderedDict()
+        for job, key, res in zip(norm, keys, results):
+            if res is None and key not in pending:
+                pending[key] = job
+
+        if pending:
+            computed = self._compute(list(pending.values()), conn=conn, use_panel=use_panel)
+            self.stats["computed"] += len(computed)
+            by_key = dict(zip(pending.keys(), computed))
+            self.stats["timeouts"] += sum(r.get("error") == "timeout" for r in by_key.values())
+            with self._meta_conn(conn) as meta:
+                for src, version in versions.items():
+                    self.cache.put_many(
+                        {
+                            k: r
+                            for k, r in by_key.items()
+                            if r.get("error") != "timeout" and pending[k].signal_source == src
+                        },
+                        meta,
+                        signal_source=src,
+                        version=version,
+                    )
+            for i, key in enumerate(keys):
+                if results[i] is None:
+                    results[i] = by_key[key]
+        return [copy.deepcopy(r) for r in results]
+
+    @staticmethod
+    @contextmanager
+    def _meta_conn(conn: Any) -> Iterator[Any]:
+        if conn is not None:
+            yield conn
+            return
+        from .result_cache import _open_conn
+
+        own = _open_conn()
+        try:
+            yield own
+        finally:
+            if own is not None:
+                own.close()
+
+    def _compute(
+        self, jobs: List[BacktestJob], conn: Any = None, use_panel: Optional[bool] = None
+    ) -> List[Dict[str, Any]]:
+        try:
+            arrays, tasks = self._prepare(jobs, conn=conn, use_panel=use_panel)
+        except Exception as e:
+            _log.exception("backtest farm: load panels failed for %d jobs", len(jobs))
+            return [_empty_result(str(e)) for _ in jobs]
+        results: List[Dict[str, Any]] = [_empty_result("no_ohlcv") for _ in jobs]
+        runnable = [t for t in tasks if t[1] >= 0]
+        if not runnable:
+            return results
+
+        workers = min(self.workers, len(runnable))
+        if workers <= 1 or len(runnable) < self.min_parallel or multiprocessing.current_process().daemon:
+            _WORKER["arrays"] = arrays
+            try:
+                for t in runnable:
+                    i, res = _run_task(t)
+                    results[i] = res
+            finally:
+                _WORKER.pop("arrays", None)
+            return results
+
+        for i, res in self._run_pool(arrays, runnable, workers):
+            results[i] = res
+        return results
+
+    def _prepare(
+        self, jobs: List[BacktestJob], conn: Any = None, use_panel: Optional[bool] = None
+    ) -> Tuple[Dict[str, np.ndarray], List[Tuple[Any, ...]]]:
+        """一次加载整批收盘价与信号矩阵，生成 worker 任务（列号/行区间/回测参数）。"""
+        from .data_loader import load_close_panel_from_db, load_signal_panels_from_db
+
+        codes = list(dict.fromkeys(j.symbol for j in jobs))
+        start = min(j.start_date for j in jobs)
+        end = max(j.end_date for j in jobs)
+        close_df = load_close_panel_from_db(codes, start, end, conn=conn, use_panel=use_panel)
+        if close_df is None or close_df.empty:
+            close_df = pd.DataFrame(index=pd.DatetimeIndex([], name="date"), dtype=float)
+        close_df = close_df.sort_index()
+        date_index = pd.DatetimeIndex(close_df.index)
+        sym_col = {c: i for i, c in enumerate(close_df.columns)}
+
+        groups: "OrderedDict[Tuple[Any, ...], List[str]]" = OrderedDict()
+        for j in jobs:
+            if j.symbol in sym_col:
+                groups.setdefault(j.signal_key(), [])
+                if j.symbol not in groups[j.signal_key()]:
+                    groups[j.signal_key()].append(j.symbol)
+        sig_col: Dict[Tuple[Any, ...], int] = {}
+        ent_cols: List[np.ndarray] = []
+        ex_cols: List[np.ndarray] = []
+        for gkey, gcodes in groups.items():
+            source, sid, g_start, g_end = gkey
+            entries_df, exits_df = load_signal_panels_from_db(
+                gcodes, g_start, g_end, signal_source=source, strategy_id=sid, conn=conn
+            )
+            if entries_df.empty and exits_df.empty:
+                continue
+            ent = entries_df.reindex(index=date_index, columns=gcodes, fill_value=False)
+            ex = exits_df.reindex(index=date_index, columns=gcodes, fill_value=False)
+            for c in gcodes:
+                sig_col[gkey + (c,)] = len(ent_cols)
+                ent_cols.append(ent[c].to_numpy(dtype=bool))
+                ex_cols.append(ex[c].to_numpy(dtype=bool))
+
+        n_dates = len(date_index)
+        arrays = {
+            "dates": date_index.values.astype("datetime64[D]"),
+            "close": np.asfortranarray(close_df.to_numpy(dtype=np.float64).reshape(n_dates, len(sym_col))),
+            "entries": np.asfortranarray(
+                np.column_stack(ent_cols) if ent_cols else np.zeros((n_dates, 0), dtype=bool)
+            ),
+            "exits": np.asfortranarray(
+                np.column_stack(ex_cols) if ex_cols else np.zeros((n_dates, 0), dtype=bool)
+            ),
+        }
+        day = arrays["dates"]
+        tasks = []
+        for i, j in enumerate(jobs):
+            lo = int(np.searchsorted(day, np.datetime64(j.start_date, "D"), "left"))
+            hi = int(np.searchsorted(day, np.datetime64(j.end_date, "D"), "right"))
+            kwargs = {
+                "init_cash": j.init_cash,
+                "fees": j.fees,
+                "slippage": j.slippage,
+                "stop_loss_pct": j.stop_loss_pct,
+                "take_profit_pct": j.take_profit_pct,
+            }
+            tasks.append(
+                (
+                    i,
+                    sym_col.get(j.symbol, -1),
+                    sig_col.get(j.signal_key() + (j.symbol,), -1),
+                    lo,
+                    max(lo, hi),
+                    kwargs,
+                    self.timeout_sec,
+                )
+            )
+        return arrays, tasks
+
+    def _run_pool(
+        self, arrays: Dict[str, np.ndarray], tasks: List[Tuple[Any, ...]], workers: int
+    ) -> List[Tuple[int, Dict[str, Any]]]:
+        default_method = "fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn"
+        method = os.environ.get("BACKTEST_FARM_START_METHOD", "").strip() or default_method
+        shm, layout = _pack_shared(arrays)
+        self.stats["pool_runs"] += 1
+        out: List[Tuple[int, Dict[str, Any]]] = []
+        not_done: set = set()
+        t0 = time.perf_counter()
+        pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context(method),
+            initializer=_init_worker,
+            initargs=(shm.name, layout, list(sys.path)),
+        )
+        try:
+            futures = {pool.submit(_run_task, t): t[0] for t in tasks}
+            # worker 内已按任务限时；整批兜底等待 = 单任务超时 × 轮数 + 进程启动余量
+            budget = None
+            if self.timeout_sec > 0:
+                budget = self.timeout_sec * math.ceil(len(tasks) / workers) + 60
+            done, not_done = wait(futures, timeout=budget)
+            for fut in done:
+                try:
+                    out.append(fut.result())
+                except Exception as e:
+                    out.append((futures[fut], _empty_result(str(e) or type(e).__name__)))
+            for fut in not_done:
+                fut.cancel()
+                out.append((futures[fut], _empty_result("timeout")))
+        finally:
+            # 有卡死任务时不等待其进程退出，避免整批被拖住
+            pool.shutdown(wait=not not_done, cancel_futures=True)
+            shm.close()
+            shm.unlink()
+        _log.info(
+            "backtest farm: %d jobs on %d workers in %.2fs", len(tasks), workers, time.perf_counter() - t0
+        )
+        return out
+
+
+_FARM: Optional[BacktestFarm] = None
+_FARM_LOCK = threading.Lock()
+
+
+def get_backtest_farm() -> BacktestFarm:
+    """进程级单例（结果缓存跨批次复用）。"""
+    global _FARM
+    if _FARM is None:
+        with _FARM_LOCK:
+            if _FARM is None:
+                _FARM = BacktestFarm()
+    return _FARM
+
+
+def run_backtest_jobs(
+    jobs: Sequence[BacktestJob], conn: Any = None, use_panel: Optional[bool] = None
+) -> List[Dict[str, Any]]:
+    """用进程级农场跑一批回测，结果顺序与 jobs 一致。"""
+    return get_backtest_farm().run(jobs, conn=conn, use_panel=use_panel)
@@ -37,7 +37,7 @@ def compute_metrics(
             sharpe = float(val) if pd.notna(val) else None
         elif "sortino" in n:
             sortino = float(val) if pd.notna(val) else None
-        elif "max drawdown" in n or "max_drawdown" in n:
+        elif ("max drawdown" in n or "max_drawdown" in n) and "duration" not in n:
             max_dd = float(val) if pd.notna(val) else None
         elif "win rate" in n or "win_rate" in n:
             win_rate = float(val) if pd.notna(val) else None
@@ -0,0 +1,311 @@
+"""
+进程级 OHLCV 面板缓存：a_stock_daily 按字段存为 NumPy 矩阵，供回测、OpenClaw 评估与 Gateway 共享。
+
+- 每个字段一块连续 float64 矩阵，形状 (n_dates, n_codes)，列主序（单标的整列连续，切片为视图）；
+- code → 列号用 dict，date → 行号用有序 datetime64 数组 + searchsorted；
+- 首次访问时从 DuckDB 懒加载（``peek()`` 只取已加载且未过检查期的快照，不触发任何 I/O）；之后每 ``OHLCV_PANEL_CHECK_SEC`` 秒最多查一次水位
+  （a_stock_daily 的 MAX(date)/COUNT(*) 与 pipeline_meta['a_stock_daily_version']），水位变化才重载；
+- 环境变量 ``OHLCV_PANEL_CACHE=0`` 关闭，``OHLCV_PANEL_LOOKBACK_DAYS`` 控制加载窗口（默认 1100 天）。
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+_log = logging.getLogger(__name__)
+
+PANEL_FIELDS: Tuple[str, ...] = ("open", "high", "low", "close", "volume", "amount")
+OHLCV_WATERMARK_KEY = "a_stock_daily_version"
+
+
+def panel_cache_enabled() -> bool:
+    return os.environ.get("OHLCV_PANEL_CACHE", "1").strip().lower() not in ("0", "false", "no", "off")
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(0, int(os.environ.get(name, str(default)).strip()))
+    except ValueError:
+        return default
+
+
+def _to_day(d: Any) -> np.datetime64:
+    if isinstance(d, np.datetime64):
+        return d.astype("datetime64[D]")
+    s = str(d).strip()
+    if len(s) >= 8 and s[:8].isdigit():
+        s = f"{s[:4]}-{s[4:6]}-{s[6:8]}"
+    return np.datetime64(pd.Timestamp(s[:10]).date(), "D")
+
+
+def read_daily_watermark(conn: Any) -> Tuple[Any, ...]:
+    """a_stock_daily 数据版本：MAX(date)/COUNT(*)，及日 K 写入方记录的 pipeline_meta 版本（若有）。"""
+    row = conn.execute("SELECT MAX(date), COUNT(*) FROM a_stock_daily").fetchone()
+    mark: Tuple[Any, ...] = (str(row[0]) if row and row[0] is not None else None, int(row[1] or 0))
+    try:
+        r2 = conn.execute(
+            "SELECT v, updated_at FROM pipeline_meta WHERE k = ?", [OHLCV_WATERMARK_KEY]
+        ).fetchone()
+        if r2:
+            mark = mark + (str(r2[0]), str(r2[1]))
+    except Exception:
+        pass
+    return mark
+
+
+@dataclass(frozen=True)
+class OHLCVPanel:
+    """
+    只读面板快照。column / row_slice 与不带 codes 的 matrix 返回底层数组的视图；
+    指定 codes 的 matrix 与 frame / close_frame 会复制所选数据（frame 按掩码去掉无 K 线日期）。
+    """
+
+    dates: np.ndarray
+    codes: Tuple[str, ...]
+    fields: Dict[str, np.ndarray]
+    code_index: Dict[str, int]
+    watermark: Tuple[Any, ...] = ()
+    loaded_at: float = field(default_factory=time.time)
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return (len(self.dates), len(self.codes))
+
+    def has(self, code: str) -> bool:
+        return code in self.code_index
+
+    def row_slice(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> slice:
+        """日期区间 [start, end] → 行切片（闭区间，按 searchsorted 定位）。"""
+        lo = 0 if start_date is None else int(np.searchsorted(self.dates, _to_day(start_date), "left"))
+        hi = (
+            len(self.dates)
+            if end_date is None
+            else int(np.searchsorted(self.dates, _to_day(end_date), "right"))
+        )
+        return slice(lo, max(lo, hi))
+
+    def column(
+        self,
+        code: str,
+        field_name: str = "close",
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+    ) -> Optional[np.ndarray]:
+        """单标的单字段序列（连续视图）；未知 code 返回 None。"""
+        j = self.code_index.get(code)
+        if j is None:
+            return None
+        return self.fields[field_name][self.row_slice(start_date, end_date), j]
+
+    def matrix(
+        self,
+        field_name: str = "close",
+        codes: Optional[Sequence[str]] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+    ) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+        """
+        (dates × codes) 子矩阵，返回 (values, dates, codes)。
+        codes=None 时为整块视图；指定 codes 时仅保留面板内存在的列（花式索引会复制）。
+        """
+        rs = self.row_slice(start_date, end_date)
+        arr = self.fields[field_name]
+        if codes is None:
+            return arr[rs, :], self.dates[rs], list(self.codes)
+        present = [c for c in codes if c in self.code_index]
+        cols = [self.code_index[c] for c in present]
+        return arr[rs][:, cols], self.dates[rs], present
+
+    def frame(
+        self,
+        code: str,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+    ) -> pd.DataFrame:
+        """与 load_ohlcv_from_db 相同列的 DataFrame（date, open, high, low, close, volume），去掉无 K 线日期。"""
+        j = self.code_index.get(code)
+        if j is None:
+            return pd.DataFrame()
+        rs = self.row_slice(start_date, end_date)
+        close = self.fields["close"][rs, j]
+        mask = ~np.isnan(close)
+        if not mask.any():
+            return pd.DataFrame()
+        data = {"date": pd.DatetimeIndex(self.dates[rs][mask])}
+        for f in ("open", "high", "low", "close", "volume"):
+            data[f] = self.fields[f][rs, j][mask]
+        return pd.DataFrame(data)
+
+    def close_frame(
+        self,
+        codes: Sequence[str],
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+    ) -> pd.DataFrame:
+        """截面收盘价矩阵（index 为日期、columns 为 code），去掉所选标的全为空的日期行。"""
+        values, dates, present = self.matrix("close", codes, start_date, end_date)
+        if not present:
+            return pd.DataFrame()
+        df = pd.DataFrame(values, index=pd.DatetimeIndex(dates, name="date"), columns=present)
+        return df.dropna(how="all")
+
+
+def _build_panel(cols: Dict[str, np.ndarray], watermark: Tuple[Any, ...]) -> OHLCVPanel:
+    """由 fetchnumpy() 的列数组构建面板：np.unique 反查行列号后一次散射写入。"""
+    code_arr = np.asarray(cols["code"]).astype(str)
+    date_arr = np.asarray(cols["date"]).astype("datetime64[D]")
+    codes, ci = np.unique(code_arr, return_inverse=True)
+    dates, di = np.unique(date_arr, return_inverse=True)
+    fields: Dict[str, np.ndarray] = {}
+    for f in PANEL_FIELDS:
+        block = np.full((len(dates), len(codes)), np.nan, dtype=np.float64, order="F")
+        vals = np.ma.filled(np.ma.asarray(cols[f], dtype=np.float64), np.nan)
+        block[di, ci] = vals
+        block.setflags(write=False)
+        fields[f] = block
+    code_tuple = tuple(codes.tolist())
+    dates.setflags(write=False)
+    return OHLCVPanel(
+        dates=dates,
+        codes=code_tuple,
+        fields=fields,
+        code_index={c: i for i, c in enumerate(code_tuple)},
+        watermark=watermark,
+    )
+
+
+class OHLCVPanelStore:
+    """懒加载 + 水位失效的面板缓存；线程安全，重载期间其它线程继续读旧快照。"""
+
+    def __init__(
+        self,
+        lookback_days: Optional[int] = None,
+        check_interval_sec: Optional[float] = None,
+    ) -> None:
+        self.lookback_days = (
+            lookback_days if lookback_days is not None else _env_int("OHLCV_PANEL_LOOKBACK_DAYS", 1100)
+        )
+        self.check_interval_sec = (
+            float(check_interval_sec)
+            if check_interval_sec is not None
+            else float(_env_int("OHLCV_PANEL_CHECK_SEC", 60))
+        )
+        self._lock = threading.Lock()
+        self._panel: Optional[OHLCVPanel] = None
+        self._min_date: Optional[str] = None
+        self._last_check = 0.0
+        self._stats_lock = threading.Lock()
+        self.stats = {"loads": 0, "hits": 0, "watermark_checks": 0}
+
+    def _count(self, key: str) -> None:
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    @staticmethod
+    def _read_watermark(conn: Any) -> Tuple[Any, ...]:
+        return read_daily_watermark(conn)
+
+    def _default_min_date(self) -> str:
+        return (datetime.now() - timedelta(days=self.lookback_days)).strftime("%Y-%m-%d")
+
+    def _load(self, conn: Any, min_date: str, watermark: Tuple[Any, ...]) -> OHLCVPanel:
+        t0 = time.perf_counter()
+        cols = conn.execute(
+            """SELECT code, date, open, high, low, close, volume, amount
+               FROM a_stock_daily
+               WHERE date >= ?""",
+            [min_date],
+        ).fetchnumpy()
+        panel = _build_panel(cols, watermark)
+        self._count("loads")
+        _log.info(
+            "ohlcv panel loaded: %d dates × %d codes since %s in %.2fs",
+            panel.shape[0], panel.shape[1], min_date, time.perf_counter() - t0,
+        )
+        return panel
+
+    def get(self, conn: Any = None, start_date: Optional[str] = None) -> Optional[OHLCVPanel]:
+        """
+        返回覆盖 start_date 起的面板快照；conn 为 None 时仅在需要查水位/加载时临时打开统一库连接。
+        start_date 早于已加载窗口时扩展窗口并重载。失败返回 None，调用方应回落到 SQL 路径。
+        """
+        want_min = self._default_min_date()
+        if start_date:
+            want_min = min(want_min, str(_to_day(start_date)))
+        panel = self._panel
+        now = time.monotonic()
+        if (
+            panel is not None
+            and self._min_date is not None
+            and self._min_date <= want_min
+            and now - self._last_check < self.check_interval_sec
+        ):
+            self._count("hits")
+            return panel
+
+        with self._lock:
+            panel = self._panel
+            need_min = want_min if self._min_date is None else min(self._min_date, want_min)
+            own_conn = conn is None
+            try:
+                if own_conn:
+                    from data_pipeline.storage.duckdb_manager import get_conn
+
+                    conn = get_conn(read_only=True)
+                self._count("watermark_checks")
+                mark = self._read_watermark(conn)
+                self._last_check = time.monotonic()
+                if panel is not None and panel.watermark == mark and self._min_date == need_min:
+                    self._count("hits")
+                    return panel
+                panel = self._load(conn, need_min, mark)
+                self._panel = panel
+                self._min_date = need_min
+                return panel
+            except Exception as e:
+                _log.warning("ohlcv panel unavailable: %s", e)
+                return self._panel
+            finally:
+                if own_conn and conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+
+    def peek(self) -> Optional[OHLCVPanel]:
+        """已加载且在水位检查期内的快照；冷缓存或已过期返回 None（不查库、不加载）。"""
+        panel = self._panel
+        if panel is None or time.monotonic() - self._last_check >= self.check_interval_sec:
+            return None
+        self._count("hits")
+        return panel
+
+    def invalidate(self) -> None:
+        """丢弃当前快照，下次 get() 重新加载。"""
+        with self._lock:
+            self._panel = None
+            self._min_date = None
+            self._last_check = 0.0
+
+
+_STORE: Optional[OHLCVPanelStore] = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_panel_store() -> OHLCVPanelStore:
+    """进程级单例。"""
+    global _STORE
+    if _STORE is None:
+        with _STORE_LOCK:
+            if _STORE is None:
+                _STORE = OHLCVPanelStore()
+    return _STORE
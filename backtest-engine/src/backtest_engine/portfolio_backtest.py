@@ -90,6 +90,8 @@ def run_portfolio_backtest(
                 fees=fees,
                 slippage=slippage,
                 conn=conn,
+                # 自开连接即默认统一库，日 K 可走进程级面板缓存
+                use_panel=True if close_conn else None,
             )
             result["per_strategy"].append(
                 {
@@ -93,3 +93,38 @@ def apply_stop_take_series(
             in_pos = False
             ref = np.nan
     return e, x
+
+
+def apply_stop_take_frame(
+    close: pd.DataFrame,
+    entries: pd.DataFrame,
+    exits: pd.DataFrame,
+    *,
+    stop_loss_pct: Optional[float] = None,
+    take_profit_pct: Optional[float] = None,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Column-wise ``apply_stop_take_series`` over a (dates x codes) panel: same close-based rule, one pass over dates."""
+    px = close.to_numpy(dtype=float)
+    e = entries.reindex_like(close).fillna(False).to_numpy(dtype=bool).copy()
+    x = exits.reindex_like(close).fillna(False).to_numpy(dtype=bool).copy()
+    ref = np.full(px.shape[1], np.nan)
+    in_pos = np.zeros(px.shape[1], dtype=bool)
+    with np.errstate(invalid="ignore"):
+        for i in range(px.shape[0]):
+            price = px[i]
+            in_pos |= e[i]
+            ref = np.where(e[i], price, ref)
+            armed = in_pos & (ref > 0)
+            hit = np.zeros_like(in_pos)
+            if stop_loss_pct is not None:
+                hit |= armed & (price <= ref * (1.0 - float(stop_loss_pct)))
+            if take_profit_pct is not None:
+                hit |= armed & (price >= ref * (1.0 + float(take_profit_pct)))
+            x[i] |= hit
+            closed = in_pos & x[i]
+            in_pos &= ~closed
+            ref = np.where(closed, np.nan, ref)
+    return (
+        pd.DataFrame(e, index=close.index, columns=close.columns),
+        pd.DataFrame(x, index=close.index, columns=close.columns),
+    )
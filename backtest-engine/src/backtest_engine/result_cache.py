@@ -0,0 +1,273 @@
+"""
+回测结果内容寻址缓存：键 = 回测参数哈希 + 数据版本水位，内存 LRU + DuckDB 表两级存储。
+
+- 键：``result_key(spec, version)``。spec 为策略参数、标的集合、区间、成本模型、信号源等（JSON 规范化后 sha1）；
+  version 为 ``data_version(conn, signal_source)``：a_stock_daily 水位（同 panel_store）+ 信号表
+  MAX(snapshot_time)/COUNT(*)。新日 K 或新信号落库后版本变化，旧结果不再命中；
+- 一级：进程内 LRU（``BACKTEST_RESULT_CACHE_SIZE``，默认 4096；可选 TTL）；
+- 二级：DuckDB 表 backtest_result_cache，跨进程 / 重启复用（``BACKTEST_RESULT_CACHE_PERSIST=0`` 关闭）。
+  只落库无错误的结果；观察到某信号源的版本变化时删除该源旧版本的行；
+- ``stats``：memory_hits / disk_hits / misses / stores / invalidations。
+
+``BACKTEST_RESULT_CACHE=0`` 关闭 ``cached_backtest``（每次重算）。
+"""
+
+from __future__ import annotations
+
+import copy
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+_log = logging.getLogger(__name__)
+
+CACHE_TABLE_DDL = """
+    CREATE TABLE IF NOT EXISTS backtest_result_cache (
+        cache_key VARCHAR PRIMARY KEY,
+        signal_source VARCHAR,
+        data_version VARCHAR,
+        result_json VARCHAR,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+
+def _env_flag(name: str, default: str = "1") -> bool:
+    return os.environ.get(name, default).strip().lower() not in ("0", "false", "no", "off")
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(0, int(os.environ.get(name, str(default)).strip()))
+    except ValueError:
+        return default
+
+
+def result_cache_enabled() -> bool:
+    return _env_flag("BACKTEST_RESULT_CACHE")
+
+
+def data_version(conn: Any, signal_source: str = "trade_signals") -> Optional[str]:
+    """日 K + 信号源的数据版本短哈希；读不到水位（表缺失等）返回 None，调用方不应缓存。"""
+    from .panel_store import read_daily_watermark
+
+    try:
+        parts = [signal_source, *map(str, read_daily_watermark(conn))]
+        # 与 data_loader 一致：trade_signals 以外的信号源都读 market_signals
+        table = "trade_signals" if signal_source == "trade_signals" else "market_signals"
+        row = conn.execute(f"SELECT MAX(snapshot_time), COUNT(*) FROM {table}").fetchone()
+        parts += [str(row[0]), str(row[1])]
+    except Exception:
+        return None
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+def result_key(spec: Any, version: Optional[str]) -> str:
+    raw = json.dumps({"spec": spec, "version": version or ""}, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class BacktestResultCache:
+    """两级结果缓存；线程安全。get/put 返回与保存的都是调用方对象本身，需要隔离时由调用方拷贝。"""
+
+    def __init__(
+        self,
+        max_size: Optional[int] = None,
+        ttl_sec: Optional[float] = None,
+        persist: Optional[bool] = None,
+    ) -> None:
+        self.max_size = max_size if max_size is not None else _env_int("BACKTEST_RESULT_CACHE_SIZE", 4096)
+        self.ttl_sec = float(ttl_sec) if ttl_sec is not None else 0.0
+        self.persist = persist if persist is not None else _env_flag("BACKTEST_RESULT_CACHE_PERSIST")
+        self._mem: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._versions: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "invalidations": 0}
+
+    # -- 内存 -------------------------------------------------------------
+
+    def _mem_get(self, key: str) -> Optional[Dict[str, Any]]:
+        hit = self._mem.get(key)
+        if hit is None:
+            return None
+        if self.ttl_sec > 0 and time.monotonic() - hit[0] > self.ttl_sec:
+            del self._mem[key]
+            return None
+        self._mem.move_to_end(key)
+        return hit[1]
+
+    def _mem_put(self, key: str, result: Dict[str, Any]) -> None:
+        if self.max_size <= 0:
+            return
+        self._mem[key] = (time.monotonic(), result)
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_size:
+            self._mem.popitem(last=False)
+
+    def clear(self) -> None:
+        """只清内存层；库表中的结果仍可命中（数据版本变化才失效）。"""
+        with self._lock:
+            self._mem.clear()
+
+    # -- 两级读写 ---------------------------------------------------------
+
+    def get_many(self, keys: Iterable[str], conn: Any = None) -> Dict[str, Dict[str, Any]]:
+        """先查内存，未命中的一次 SQL 查库表（conn 为 None 或未开启持久化时跳过），库表命中回填内存。"""
+        keys = list(dict.fromkeys(keys))
+        out: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            for k in keys:
+                hit = self._mem_get(k)
+                if hit is not None:
+                    out[k] = hit
+            self.stats["memory_hits"] += len(out)
+        missing = [k for k in keys if k not in out]
+        if missing and self.persist and conn is not None:
+            try:
+                conn.execute(CACHE_TABLE_DDL)
+                rows = conn.execute(
+                    "SELECT cache_key, result_json FROM backtest_result_cache WHERE cache_key IN (SELECT UNNEST(?))",
+                    [missing],
+                ).fetchall()
+            except Exception:
+                _log.debug("backtest result cache: disk read failed", exc_info=True)
+                rows = []
+            with self._lock:
+                for k, raw in rows:
+                    res = json.loads(raw)
+                    out[k] = res
+                    self._mem_put(k, res)
+                self.stats["disk_hits"] += len(rows)
+        with self._lock:
+            self.stats["misses"] += len(keys) - len(out)
+        return out
+
+    def put_many(
+        self,
+        entries: Dict[str, Dict[str, Any]],
+        conn: Any = None,
+        signal_source: str = "",
+        version: Optional[str] = None,
+    ) -> None:
+        """
+        只缓存无错误的结果（失败可能是暂时的，下次应重新计算）：写入内存，persist 且 version 已知时
+        INSERT OR REPLACE 进库表（一次批量）。
+        """
+        entries = {k: res for k, res in entries.items() if not res.get("error")}
+        if not entries:
+            return
+        with self._lock:
+            for k, res in entries.items():
+                self._mem_put(k, res)
+            self.stats["stores"] += len(entries)
+        if not (self.persist and conn is not None and version):
+            return
+        rows = [(k, signal_source, version, json.dumps(res, default=str)) for k, res in entries.items()]
+        try:
+            import pandas as pd
+
+            conn.execute(CACHE_TABLE_DDL)
+            df = pd.DataFrame(rows, columns=["cache_key", "signal_source", "data_version", "result_json"])
+            conn.register("_bt_cache_rows", df)
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO backtest_result_cache (cache_key, signal_source, data_version, result_json) "
+                    "SELECT cache_key, signal_source, data_version, result_json FROM _bt_cache_rows"
+                )
+            finally:
+                conn.unregister("_bt_cache_rows")
+        except Exception:
+            _log.debug("backtest result cache: disk write failed", exc_info=True)
+
+    def observe_version(self, signal_source: str, version: Optional[str], conn: Any = None) -> None:
+        """记录该信号源当前数据版本；与上次不同（新日 K / 新信号落库）时删除库表中该源的旧版本结果。"""
+        if not version:
+            return
+        with self._lock:
+            prev = self._versions.get(signal_source)
+            self._versions[signal_source] = version
+        if prev is None or prev == version:
+            return
+        with self._lock:
+            self.stats["invalidations"] += 1
+        if self.persist and conn is not None:
+            try:
+                conn.execute(CACHE_TABLE_DDL)
+                conn.execute(
+                    "DELETE FROM backtest_result_cache WHERE signal_source = ? AND data_version <> ?",
+                    [signal_source, version],
+                )
+            except Exception:
+                _log.debug("backtest result cache: invalidation failed", exc_info=True)
+
+
+_CACHE: Optional[BacktestResultCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_result_cache() -> BacktestResultCache:
+    """进程级单例（Gateway 回测接口、流水线任务、单基因评估共用）。"""
+    global _CACHE
+    if _CACHE is None:
+        with _CACHE_LOCK:
+            if _CACHE is None:
+                _CACHE = BacktestResultCache()
+    return _CACHE
+
+
+def _open_conn() -> Any:
+    try:
+        from data_pipeline.storage.duckdb_manager import get_conn, get_db_path
+
+        if not os.path.isfile(get_db_path()):
+            return None
+        return get_conn(read_only=False)
+    except Exception:
+        return None
+
+
+def cached_backtest(
+    spec: Dict[str, Any],
+    compute: Callable[[], Dict[str, Any]],
+    signal_source: str = "trade_signals",
+    conn: Any = None,
+) -> Dict[str, Any]:
+    """
+    按 spec + 当前数据版本查缓存，未命中时调用 compute() 并写回。conn 为 None 时临时打开统一库
+    （计算期间不占用连接）；读不到数据版本或关闭缓存时直接计算。
+    """
+    if not result_cache_enabled():
+        return compute()
+    cache = get_result_cache()
+    own = conn is None
+    c = _open_conn() if own else conn
+    if c is None:
+        return compute()
+    try:
+        version = data_version(c, signal_source)
+        if version is None:
+            return compute()
+        cache.observe_version(signal_source, version, c)
+        key = result_key(spec, version)
+        hit = cache.get_many([key], c).get(key)
+        if hit is not None:
+            return copy.deepcopy(hit)
+    finally:
+        if own:
+            c.close()
+    out = compute()
+    if out.get("error"):
+        return out
+    c = _open_conn() if own else conn
+    if c is not None:
+        try:
+            cache.put_many({key: copy.deepcopy(out)}, c, signal_source=signal_source, version=version)
+        finally:
+            if own:
+                c.close()
+    return out
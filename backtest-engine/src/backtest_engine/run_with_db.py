@@ -9,9 +9,14 @@ from typing import Any, Dict, List, Optional
 import pandas as pd
 
 from .cost_models import CommissionModel, SlippageModel, effective_fee_per_order
-from .data_loader import load_ohlcv_from_db, load_signals_from_db
+from .data_loader import (
+    load_close_panel_from_db,
+    load_ohlcv_from_db,
+    load_signal_panels_from_db,
+    load_signals_from_db,
+)
 from .metrics import compute_metrics
-from .position_manager import apply_stop_take_series
+from .position_manager import apply_stop_take_frame, apply_stop_take_series
 from .runner import run_backtest, run_backtest_from_ohlcv
 
 _log = logging.getLogger(__name__)
@@ -58,6 +63,56 @@ def _extract_trade_count(pf, result: Dict[str, Any]) -> None:
         pass
 
 
+def backtest_close_signals(
+    close: pd.Series,
+    entries: pd.Series,
+    exits: pd.Series,
+    init_cash: float = 10000.0,
+    fees: float = 0.0002,
+    slippage: float = 0.001,
+    stop_loss_pct: Optional[float] = None,
+    take_profit_pct: Optional[float] = None,
+    use_legacy_fee_combine: bool = False,
+) -> Dict[str, Any]:
+    """
+    单标的日频回测核心：已对齐的收盘价与 entries/exits → 与 run_backtest_from_db 相同结构的结果。
+    供 run_backtest_from_db 与回测农场（farm）进程共用，异常向上抛出。
+    """
+    result: Dict[str, Any] = {"equity_curve": [], "trade_count": None, "error": None}
+    ent = entries.reindex(close.index).fillna(False)
+    ex = exits.reindex(close.index).fillna(False)
+    if stop_loss_pct is not None or take_profit_pct is not None:
+        ent, ex = apply_stop_take_series(
+            close, ent, ex,
+            stop_loss_pct=stop_loss_pct,
+            take_profit_pct=take_profit_pct,
+        )
+
+    effective_fees = _effective_fees(fees, slippage, use_legacy_fee_combine)
+    pf = run_backtest(
+        close,
+        ent,
+        ex,
+        init_cash=init_cash,
+        fees=effective_fees,
+        freq="1D",
+    )
+
+    metrics = compute_metrics(pf, freq="1D")
+    result.update({
+        "sharpe_ratio": metrics.get("sharpe_ratio"),
+        "max_drawdown": metrics.get("max_drawdown"),
+        "total_return": metrics.get("total_return"),
+        "win_rate_pct": metrics.get("win_rate_pct"),
+        "profit_factor": metrics.get("profit_factor"),
+        "total_profit": metrics.get("total_profit"),
+    })
+
+    _extract_equity_curve(pf, result)
+    _extract_trade_count(pf, result)
+    return result
+
+
 def run_backtest_from_db(
     symbol: str,
     start_date: str,
@@ -71,6 +126,7 @@ def run_backtest_from_db(
     stop_loss_pct: Optional[float] = None,
     take_profit_pct: Optional[float] = None,
     use_legacy_fee_combine: bool = False,
+    use_panel: Optional[bool] = None,
 ) -> Dict[str, Any]:
     """
     从 quant_system.duckdb 读取日 K 与信号，跑回测，返回资金曲线与风险指标。
@@ -82,6 +138,7 @@ def run_backtest_from_db(
       slippage: 单边滑点占价（默认 0.001 = 千一）；与 fees 合并为 vectorbt 单参数时默认 per_order=fees+slippage
       stop_loss_pct / take_profit_pct: 可选，如 0.08 表示 8% 止损（简化日频模型）
       use_legacy_fee_combine: True 时使用旧式 fees + 2*slippage
+      use_panel: 日 K 是否读进程级面板缓存（None=conn 为空时自动启用，见 panel_store）
     输出：
       equity_curve: [{"date": "YYYY-MM-DD", "value": float}, ...]
       sharpe_ratio, max_drawdown, total_return, win_rate_pct, ...
@@ -100,7 +157,9 @@ def run_backtest_from_db(
     }
 
     try:
-        ohlcv_df, _ = load_ohlcv_from_db(symbol, start_date, end_date, conn=conn)
+        ohlcv_df, _ = load_ohlcv_from_db(
+            symbol, start_date, end_date, conn=conn, use_panel=use_panel
+        )
         if ohlcv_df is None or ohlcv_df.empty:
             result["error"] = "no_ohlcv"
             return result
@@ -122,44 +181,18 @@ def run_backtest_from_db(
             result["error"] = "invalid_prices"
             return result
 
-        ent = entries.reindex(close.index).fillna(False)
-        ex = exits.reindex(close.index).fillna(False)
-        if stop_loss_pct is not None or take_profit_pct is not None:
-            ent, ex = apply_stop_take_series(
-                close, ent, ex,
+        result.update(
+            backtest_close_signals(
+                close, entries, exits,
+                init_cash=init_cash,
+                fees=fees,
+                slippage=slippage,
                 stop_loss_pct=stop_loss_pct,
                 take_profit_pct=take_profit_pct,
+                use_legacy_fee_combine=use_legacy_fee_combine,
             )
-
-        if use_legacy_fee_combine:
-            effective_fees = float(fees) + 2.0 * float(slippage)
-        else:
-            effective_fees = effective_fee_per_order(
-                CommissionModel(rate_per_leg=float(fees)),
-                SlippageModel(rate_per_leg=float(slippage)),
-            )
-        pf = run_backtest(
-            close,
-            ent,
-            ex,
-            init_cash=init_cash,
-            fees=effective_fees,
-            freq="1D",
         )
 
-        metrics = compute_metrics(pf, freq="1D")
-        result.update({
-            "sharpe_ratio": metrics.get("sharpe_ratio"),
-            "max_drawdown": metrics.get("max_drawdown"),
-            "total_return": metrics.get("total_return"),
-            "win_rate_pct": metrics.get("win_rate_pct"),
-            "profit_factor": metrics.get("profit_factor"),
-            "total_profit": metrics.get("total_profit"),
-        })
-
-        _extract_equity_curve(pf, result)
-        _extract_trade_count(pf, result)
-
     except Exception as e:
         _log.exception("run_backtest_from_db failed: %s", symbol)
         result["error"] = str(e)
@@ -191,6 +224,122 @@ def _metrics_from_equity_curve(equity_curve: List[Dict[str, Any]]) -> Dict[str,
     return out
 
 
+def _effective_fees(fees: float, slippage: float, use_legacy_fee_combine: bool) -> float:
+    if use_legacy_fee_combine:
+        return float(fees) + 2.0 * float(slippage)
+    return effective_fee_per_order(
+        CommissionModel(rate_per_leg=float(fees)),
+        SlippageModel(rate_per_leg=float(slippage)),
+    )
+
+
+def run_backtest_cross_sectional_from_db(
+    symbols: List[str],
+    start_date: str,
+    end_date: str,
+    signal_source: str = "trade_signals",
+    strategy_id: Optional[str] = None,
+    init_cash: float = 10000.0,
+    fees: float = 0.0002,
+    slippage: float = 0.001,
+    conn: Any = None,
+    stop_loss_pct: Optional[float] = None,
+    take_profit_pct: Optional[float] = None,
+    use_legacy_fee_combine: bool = False,
+    cash_sharing: bool = False,
+    use_panel: Optional[bool] = None,
+) -> Dict[str, Any]:
+    """
+    截面向量化多标的回测：收盘价矩阵（dates × codes）与信号矩阵各一次查询，
+    单个按列的 vbt.Portfolio.from_signals 跑全部标的，并按组合汇总为一条资金曲线。
+    cash_sharing=False：每个标的独立资金池，init_cash 按传入的 symbols 个数等分；无日线的标的
+    其份额不参与回测、不计入资金曲线（与逐标的路径跳过出错标的的口径一致）；
+    cash_sharing=True：所有标的共享 init_cash，按信号先卖后买。
+    止损/止盈与逐标的路径相同：按收盘价触发、当日收盘平仓（apply_stop_take_frame），
+    不用 vectorbt 的 sl_stop/tp_stop（其按止损价成交，口径不同）。
+    返回格式与 run_backtest_from_db 一致。
+    """
+    result = {
+        "equity_curve": [],
+        "sharpe_ratio": None,
+        "max_drawdown": None,
+        "total_return": None,
+        "win_rate_pct": None,
+        "profit_factor": None,
+        "total_profit": None,
+        "trade_count": None,
+        "error": None,
+    }
+    if not symbols:
+        result["error"] = "no_symbols"
+        return result
+
+    try:
+        raw_close = load_close_panel_from_db(
+            symbols, start_date, end_date, conn=conn, use_panel=use_panel
+        )
+        if raw_close is None or raw_close.empty:
+            result["error"] = "no_ohlcv_or_signals"
+            return result
+        raw_close = raw_close.loc[:, (raw_close > 0).any()]
+        if raw_close.empty:
+            result["error"] = "invalid_prices"
+            return result
+
+        entries_df, exits_df = load_signal_panels_from_db(
+            list(raw_close.columns), start_date, end_date,
+            signal_source=signal_source,
+            strategy_id=strategy_id,
+            conn=conn,
+        )
+        # 无 K 线（未上市/停牌）的日期不可成交；价格仅为估值前后填充
+        tradable = raw_close.notna() & (raw_close > 0)
+        close = raw_close.ffill().bfill()
+        entries = entries_df.reindex(index=close.index, columns=close.columns, fill_value=False)
+        exits = exits_df.reindex(index=close.index, columns=close.columns, fill_value=False)
+        entries = entries.astype(bool) & tradable
+        exits = exits.astype(bool) & tradable
+
+        if stop_loss_pct is not None or take_profit_pct is not None:
+            entries, exits = apply_stop_take_frame(
+                close, entries, exits,
+                stop_loss_pct=stop_loss_pct,
+                take_profit_pct=take_profit_pct,
+            )
+
+        import vectorbt as vbt
+
+        pf = vbt.Portfolio.from_signals(
+            close,
+            entries,
+            exits,
+            init_cash=float(init_cash) if cash_sharing else float(init_cash) / len(symbols),
+            fees=_effective_fees(fees, slippage, use_legacy_fee_combine),
+            freq="1D",
+            group_by=True,
+            cash_sharing=cash_sharing,
+            call_seq="auto" if cash_sharing else None,
+        )
+
+        metrics = compute_metrics(pf, freq="1D")
+        result.update({
+            "win_rate_pct": metrics.get("win_rate_pct"),
+            "profit_factor": metrics.get("profit_factor"),
+            "total_profit": metrics.get("total_profit"),
+        })
+        _extract_equity_curve(pf, result)
+        _extract_trade_count(pf, result)
+        agg = _metrics_from_equity_curve(result["equity_curve"])
+        result["total_return"] = agg.get("total_return")
+        result["max_drawdown"] = agg.get("max_drawdown")
+        result["sharpe_ratio"] = agg.get("sharpe_ratio")
+    except Exception as e:
+        _log.exception("run_backtest_cross_sectional_from_db failed: %d symbols", len(symbols))
+        result["error"] = str(e)
+
+    return result
+
+
 def run_backtest_multi_from_db(
     symbols: List[str],
     start_date: str,
@@ -204,11 +353,33 @@ def run_backtest_multi_from_db(
     stop_loss_pct: Optional[float] = None,
     take_profit_pct: Optional[float] = None,
     use_legacy_fee_combine: bool = False,
+    cross_sectional: bool = True,
+    cash_sharing: bool = False,
+    use_panel: Optional[bool] = None,
 ) -> Dict[str, Any]:
     """
-    多标的组合回测：等权分配初始资金，分别回测后合并资金曲线与指标。
+    多标的组合回测：等权分配初始资金，合并资金曲线与指标。
+    cross_sectional=True（默认）走 run_backtest_cross_sectional_from_db（一次查询 + 单个按列 Portfolio）；
+    False 时沿用逐标的回测后按日期加总的旧路径。
     返回格式与 run_backtest_from_db 一致；equity_curve 为合并后的总权益。
     """
+    if cross_sectional:
+        return run_backtest_cross_sectional_from_db(
+            symbols=symbols,
+            start_date=start_date,
+            end_date=end_date,
+            signal_source=signal_source,
+            strategy_id=strategy_id,
+            init_cash=init_cash,
+            fees=fees,
+            slippage=slippage,
+            conn=conn,
+            stop_loss_pct=stop_loss_pct,
+            take_profit_pct=take_profit_pct,
+            use_legacy_fee_combine=use_legacy_fee_combine,
+            cash_sharing=cash_sharing,
+            use_panel=use_panel,
+        )
     result = {
         "equity_curve": [],
         "sharpe_ratio": None,
@@ -240,6 +411,7 @@ def run_backtest_multi_from_db(
             stop_loss_pct=stop_loss_pct,
             take_profit_pct=take_profit_pct,
             use_legacy_fee_combine=use_legacy_fee_combine,
+            use_panel=use_panel,
         )
         if r.get("error"):
             continue
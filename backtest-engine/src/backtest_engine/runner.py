@@ -8,7 +8,7 @@ import numpy as np
 import pandas as pd
 import vectorbt as vbt
 
-from core import OHLCV
+from core import OHLCVFrame, OHLCVLike, as_ohlcv_frame
 
 _log = logging.getLogger(__name__)
 
@@ -41,20 +41,24 @@ def run_backtest(
 
 
 def run_backtest_from_ohlcv(
-    ohlcv_list: List[OHLCV],
+    ohlcv_list: OHLCVLike,
     entries: List[bool],
     exits: List[bool],
     init_cash: float = 10000.0,
     fees: float = 0.001,
     interval: str = "1h",
 ) -> vbt.Portfolio:
-    """Run backtest from OHLCV list and signal lists. entries/exits must match length of ohlcv_list."""
+    """
+    Run backtest from an OHLCVFrame (or legacy OHLCV list) and signal lists.
+    entries/exits must match the number of bars.
+    """
     if len(ohlcv_list) != len(entries) or len(ohlcv_list) != len(exits):
         raise ValueError("ohlcv_list, entries, exits must have same length")
-    close = pd.Series(
-        [b.close for b in ohlcv_list],
-        index=pd.DatetimeIndex([b.timestamp for b in ohlcv_list]),
-    )
+    if isinstance(ohlcv_list, OHLCVFrame):
+        index = pd.DatetimeIndex(ohlcv_list.timestamp)
+    else:
+        index = pd.DatetimeIndex([b.timestamp for b in ohlcv_list])
+    close = pd.Series(as_ohlcv_frame(ohlcv_list).close, index=index)
     ent = pd.Series(entries, index=close.index)
     ex = pd.Series(exits, index=close.index)
     return run_backtest(close, ent, ex, init_cash=init_cash, fees=fees, freq=interval)
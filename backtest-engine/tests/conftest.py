@@ -0,0 +1,55 @@
+"""backtest-engine 测试共用：内存 DuckDB 日线 / 信号库工厂。"""
+
+import duckdb
+import numpy as np
+import pandas as pd
+import pytest
+
+
+@pytest.fixture
+def daily_db():
+    """工厂：daily_db(bars, signals=(), with_meta=False) → 已建表并写入数据的内存连接。"""
+
+    def make(bars, signals=(), with_meta=False):
+        conn = duckdb.connect(":memory:")
+        conn.execute(
+            """CREATE TABLE a_stock_daily (code VARCHAR, date DATE, open DOUBLE, high DOUBLE,
+               low DOUBLE, close DOUBLE, volume DOUBLE, amount DOUBLE, PRIMARY KEY (code, date))"""
+        )
+        conn.execute(
+            """CREATE TABLE trade_signals (code VARCHAR, signal VARCHAR, strategy_id VARCHAR,
+               snapshot_time TIMESTAMP)"""
+        )
+        if with_meta:
+            conn.execute("CREATE TABLE pipeline_meta (k VARCHAR PRIMARY KEY, v VARCHAR, updated_at TIMESTAMP)")
+        conn.executemany("INSERT INTO a_stock_daily VALUES (?, ?, ?, ?, ?, ?, ?, ?)", list(bars))
+        if signals:
+            conn.executemany("INSERT INTO trade_signals VALUES (?, ?, ?, ?)", list(signals))
+        return conn
+
+    return make
+
+
+@pytest.fixture
+def random_walk_db(daily_db):
+    """
+    工厂：random_walk_db(codes, periods, seed, sigma, trades, listing_step=0) → (conn, dates)。
+    日线为随机游走（OHLC 同价），第 k 个代码晚 k*listing_step 个交易日上市；
+    trades 为 (code, strategy_id, 买入日序号, 卖出日序号)。
+    """
+
+    def make(codes, periods, seed, sigma, trades, listing_step=0):
+        dates = pd.bdate_range("2024-01-02", periods=periods)
+        rng = np.random.default_rng(seed)
+        bars = []
+        for k, code in enumerate(codes):
+            px = 10 * np.cumprod(1 + rng.normal(0, sigma, len(dates)))
+            for d, p in list(zip(dates, px))[k * listing_step:]:
+                bars.append((code, d.date(), p, p, p, p, 1e5, 1e6))
+        signals = []
+        for code, sid, buy, sell in trades:
+            signals.append((code, "buy", sid, dates[buy].to_pydatetime()))
+            signals.append((code, "sell", sid, dates[sell].to_pydatetime()))
+        return daily_db(bars, signals), dates
+
+    return make
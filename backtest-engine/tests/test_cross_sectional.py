@@ -0,0 +1,78 @@
+"""截面向量化多标的回测：与逐标的旧路径口径一致。"""
+
+import pytest
+
+
+TRADES = [("600519.SH", "s1", 3, 20), ("000001.SZ", "s1", 10, 30), ("300750.SZ", "s1", 25, 40)]
+
+
+@pytest.fixture
+def conn(random_walk_db):
+    return random_walk_db(("600519.SH", "000001.SZ", "300750.SZ"), 60, seed=7, sigma=0.01, trades=TRADES)[0]
+
+
+def test_load_panels_single_query_shapes(conn):
+    from backtest_engine import load_close_panel_from_db, load_signal_panels_from_db
+
+    close = load_close_panel_from_db(["600519", "000001", "300750"], "2024-01-01", "2024-12-31", conn=conn)
+    assert close.shape == (60, 3)
+    assert list(close.columns) == ["600519.SH", "000001.SZ", "300750.SZ"]
+    entries, exits = load_signal_panels_from_db(
+        list(close.columns), "2024-01-01", "2024-12-31", conn=conn, execution_lag_bdays=1
+    )
+    assert int(entries.values.sum()) == 3
+    assert int(exits.values.sum()) == 3
+
+
+def test_cross_sectional_matches_per_symbol_loop(conn):
+    from backtest_engine import run_backtest_multi_from_db
+
+    syms = ["600519.SH", "000001.SZ", "300750.SZ"]
+    kw = dict(start_date="2024-01-01", end_date="2024-12-31", init_cash=30000.0, conn=conn)
+    fast = run_backtest_multi_from_db(syms, **kw)
+    slow = run_backtest_multi_from_db(syms, cross_sectional=False, **kw)
+    assert fast["error"] is None and slow["error"] is None
+    assert len(fast["equity_curve"]) == len(slow["equity_curve"]) == 60
+    assert fast["equity_curve"][-1]["value"] == pytest.approx(slow["equity_curve"][-1]["value"])
+    assert fast["total_return"] == pytest.approx(slow["total_return"])
+    assert fast["trade_count"] == slow["trade_count"] == 3
+
+
+def test_cross_sectional_sizes_by_requested_symbols(conn):
+    """无日线的标的仍占一份 init_cash，与逐标的路径的单标的仓位大小一致。"""
+    from backtest_engine import run_backtest_multi_from_db
+
+    syms = ["600519.SH", "000001.SZ", "300750.SZ", "688999.SH"]
+    kw = dict(start_date="2024-01-01", end_date="2024-12-31", init_cash=40000.0, conn=conn)
+    fast = run_backtest_multi_from_db(syms, **kw)
+    slow = run_backtest_multi_from_db(syms, cross_sectional=False, **kw)
+    assert fast["equity_curve"][0]["value"] == pytest.approx(30000.0)
+    assert fast["equity_curve"][-1]["value"] == pytest.approx(slow["equity_curve"][-1]["value"])
+
+
+def test_cross_sectional_cash_sharing(conn):
+    from backtest_engine import run_backtest_cross_sectional_from_db
+
+    out = run_backtest_cross_sectional_from_db(
+        ["600519.SH", "000001.SZ"], "2024-01-01", "2024-12-31", init_cash=10000.0,
+        conn=conn, cash_sharing=True,
+    )
+    assert out["error"] is None
+    assert out["equity_curve"][0]["value"] == pytest.approx(10000.0)
+
+
+def test_cross_sectional_stops_match_per_symbol_close_rule(conn):
+    """止损/止盈按收盘价触发、收盘平仓，与逐标的 apply_stop_take_series 口径一致。"""
+    from backtest_engine import run_backtest_multi_from_db
+
+    syms = ["600519.SH", "000001.SZ", "300750.SZ"]
+    kw = dict(start_date="2024-01-01", end_date="2024-12-31", init_cash=30000.0, conn=conn,
+              stop_loss_pct=0.01, take_profit_pct=0.01)
+    fast = run_backtest_multi_from_db(syms, **kw)
+    slow = run_backtest_multi_from_db(syms, cross_sectional=False, **kw)
+    plain = run_backtest_multi_from_db(syms, start_date="2024-01-01", end_date="2024-12-31",
+                                       init_cash=30000.0, conn=conn)
+    assert fast["error"] is None and slow["error"] is None
+    assert fast["total_return"] != pytest.approx(plain["total_return"])  # 止损/止盈确有触发
+    assert [p["value"] for p in fast["equity_curve"]] == pytest.approx([p["value"] for p in slow["equity_curve"]])
+    assert fast["trade_count"] == slow["trade_count"]
@@ -0,0 +1,153 @@
+"""本地回测农场：与 run_backtest_from_db 口径一致、顺序确定、参数哈希缓存、单任务超时。"""
+
+import pytest
+
+SYMS = ("600519.SH", "000001.SZ", "300750.SZ")
+
+
+TRADES = [
+    (code, sid, buy + shift, sell + shift)
+    for sid, shift in (("s1", 0), ("s2", 7))
+    for code, buy, sell in (("600519.SH", 12, 30), ("000001.SZ", 15, 40), ("300750.SZ", 25, 60))
+]
+
+
+@pytest.fixture
+def seed_db(random_walk_db):
+    """每次调用建一个独立库；上市日各不相同。"""
+    return lambda: random_walk_db(SYMS, 80, seed=11, sigma=0.015, trades=TRADES, listing_step=5)[0]
+
+
+def _jobs():
+    from backtest_engine.farm import BacktestJob
+
+    return [
+        BacktestJob(symbol=sym, start_date=start, end_date="2024-12-31", strategy_id=sid)
+        for sid in ("s1", "s2")
+        for sym in SYMS
+        for start in ("2024-01-01", "2024-02-01")
+    ]
+
+
+def test_farm_matches_run_backtest_from_db_in_order(seed_db):
+    from backtest_engine import run_backtest_from_db
+    from backtest_engine.farm import BacktestFarm
+
+    conn = seed_db()
+    jobs = _jobs() + [_jobs()[0]]
+    got = BacktestFarm(workers=1).run(jobs, conn=conn)
+    assert len(got) == len(jobs)
+    for job, res in zip(jobs, got):
+        ref = run_backtest_from_db(
+            job.symbol, job.start_date, job.end_date, strategy_id=job.strategy_id, conn=conn
+        )
+        assert res["error"] is None and ref["error"] is None
+        assert res["total_return"] == pytest.approx(ref["total_return"])
+        assert res["trade_count"] == ref["trade_count"]
+        assert res["equity_curve"] == ref["equity_curve"]
+
+
+def test_cache_dedups_by_parameter_hash(seed_db):
+    from backtest_engine.farm import BacktestFarm, BacktestJob
+
+    conn = seed_db()
+    farm = BacktestFarm(workers=1)
+    a = BacktestJob("600519", "2024-01-01", "2024-12-31", strategy_id="s1", params={"stop_loss": 0.05})
+    b = BacktestJob("600519.SH", "20240101", "2024-12-31", strategy_id=" s1 ", params={"stop_loss": 0.05})
+    c = BacktestJob("600519.SH", "2024-01-01", "2024-12-31", strategy_id="s1", params={"stop_loss": 0.08})
+    assert a.cache_key() == b.cache_key() != c.cache_key()
+    farm.run([a, b], conn=conn)
+    assert farm.stats["computed"] == 1
+    farm.run([b, c], conn=conn)
+    assert farm.stats["cache_hits"] == 1 and farm.stats["computed"] == 2
+
+
+def test_missing_symbol_and_timeout_do_not_block_batch(monkeypatch, seed_db):
+    import time
+
+    from backtest_engine import run_with_db
+    from backtest_engine.farm import BacktestFarm, BacktestJob
+
+    conn = seed_db()
+    real = run_with_db.backtest_close_signals
+
+    def slow_for_big_cash(close, entries, exits, **kw):
+        if kw["init_cash"] > 50000:
+            time.sleep(2)
+        return real(close, entries, exits, **kw)
+
+    monkeypatch.setattr(run_with_db, "backtest_close_signals", slow_for_big_cash)
+    farm = BacktestFarm(workers=1, timeout_sec=0.2)
+    res = farm.run(
+        [
+            BacktestJob("688999.SH", "2024-01-01", "2024-12-31"),
+            BacktestJob("600519.SH", "2024-01-01", "2024-12-31", init_cash=1e6),
+            BacktestJob("600519.SH", "2024-01-01", "2024-12-31"),
+        ],
+        conn=conn,
+    )
+    assert [r["error"] for r in res] == ["no_ohlcv", "timeout", None]
+    assert farm.stats["timeouts"] == 1
+
+
+def test_process_pool_reads_shared_panel(seed_db):
+    from backtest_engine.farm import BacktestFarm
+
+    jobs = _jobs()
+    inline = BacktestFarm(workers=1).run(jobs, conn=seed_db())
+    pooled_farm = BacktestFarm(workers=2, min_parallel=1)
+    pooled = pooled_farm.run(jobs, conn=seed_db())  # 独立库：不命中 inline 落下的结果缓存表
+    assert pooled_farm.stats["pool_runs"] == 1
+    assert [r["total_return"] for r in pooled] == pytest.approx([r["total_return"] for r in inline])
+
+
+def test_result_cache_table_is_shared_and_invalidated_by_new_data(seed_db):
+    from backtest_engine.farm import BacktestFarm
+
+    conn = seed_db()
+    jobs = _jobs()[:4]
+    first = BacktestFarm(workers=1).run(jobs, conn=conn)
+    # 新农场（如另一进程）内存为空，直接命中库表
+    farm = BacktestFarm(workers=1)
+    again = farm.run(jobs, conn=conn)
+    assert farm.stats["computed"] == 0 and farm.stats["disk_hits"] == 4
+    assert again == first
+
+    # 新信号落库 → 数据版本变化，旧结果失效并从库表清除
+    conn.execute("INSERT INTO trade_signals VALUES ('600519.SH', 'buy', 's9', TIMESTAMP '2024-03-01')")
+    farm.run(jobs, conn=conn)
+    assert farm.stats["computed"] == 4 and farm.cache.stats["invalidations"] == 1
+    assert conn.execute("SELECT COUNT(DISTINCT data_version) FROM backtest_result_cache").fetchone()[0] == 1
+
+
+def test_error_results_are_not_cached(seed_db):
+    from backtest_engine.result_cache import BacktestResultCache, cached_backtest, get_result_cache
+
+    cache = BacktestResultCache(persist=False)
+    cache.put_many({"bad": {"error": "timeout"}, "good": {"error": None, "total_return": 1.0}})
+    assert set(cache.get_many(["bad", "good"])) == {"good"}
+
+    conn = seed_db()
+    get_result_cache().clear()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {"error": "no_ohlcv"} if len(calls) == 1 else {"error": None, "total_return": 2.0}
+
+    spec = {"symbol": "600519.SH", "case": "error_not_cached"}
+    assert cached_backtest(spec, compute, conn=conn)["error"] == "no_ohlcv"
+    assert cached_backtest(spec, compute, conn=conn)["total_return"] == 2.0  # 失败未入缓存，重新计算
+    assert cached_backtest(spec, compute, conn=conn)["total_return"] == 2.0
+    assert len(calls) == 2
+
+
+def test_data_version_tracks_market_signals_for_unlisted_sources(seed_db):
+    from backtest_engine.result_cache import data_version
+
+    conn = seed_db()
+    conn.execute("CREATE TABLE market_signals (code VARCHAR, signal_type VARCHAR, snapshot_time TIMESTAMP)")
+    before = {src: data_version(conn, src) for src in ("market_signals", "sniper")}
+    conn.execute("INSERT INTO market_signals VALUES ('600519.SH', 'buy', TIMESTAMP '2024-03-01')")
+    for src, version in before.items():  # data_loader 对非 trade_signals 的来源读 market_signals
+        assert version is not None and data_version(conn, src) != version
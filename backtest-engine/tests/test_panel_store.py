@@ -0,0 +1,80 @@
+"""进程级 OHLCV 面板缓存：切片为视图、水位失效、与 SQL 路径结果一致。"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest_engine.panel_store import OHLCVPanelStore
+
+
+@pytest.fixture
+def seeded(daily_db):
+    """近 30 个交易日两只股票，000001 停牌一天；带 pipeline_meta 水位表。"""
+    dates = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=30)
+    rows = []
+    for k, code in enumerate(("000001.SZ", "600519.SH")):
+        for i, d in enumerate(dates):
+            if code == "000001.SZ" and i == 5:
+                continue  # 停牌一天
+            p = 10.0 + k * 100 + i
+            rows.append((code, d.date(), p, p + 1, p - 1, p, 1000.0 + i, 1e4))
+    return daily_db(rows, with_meta=True), dates
+
+
+def test_panel_slices_are_views_and_match_sql(seeded):
+    conn, dates = seeded
+    store = OHLCVPanelStore(lookback_days=365, check_interval_sec=3600)
+    panel = store.get(conn=conn)
+    assert panel.shape == (30, 2)
+    col = panel.column("600519.SH", "close")
+    assert np.shares_memory(col, panel.fields["close"])
+    assert col.flags["C_CONTIGUOUS"]
+
+    from backtest_engine import load_ohlcv_from_db
+
+    start, end = str(dates[3].date()), str(dates[20].date())
+    sql_df, _ = load_ohlcv_from_db("000001.SZ", start, end, conn=conn, use_panel=False)
+    pan_df = panel.frame("000001.SZ", start, end)
+    assert len(pan_df) == len(sql_df) == 17
+    np.testing.assert_allclose(pan_df["close"].to_numpy(), sql_df["close"].to_numpy())
+
+
+def test_panel_hits_without_db_and_reloads_on_watermark(seeded):
+    conn, dates = seeded
+    store = OHLCVPanelStore(lookback_days=365, check_interval_sec=3600)
+    first = store.get(conn=conn)
+    for _ in range(50):
+        assert store.get(conn=conn) is first
+    assert store.stats["loads"] == 1 and store.stats["watermark_checks"] == 1
+
+    store.check_interval_sec = 0
+    assert store.get(conn=conn) is first
+    conn.execute(
+        "INSERT INTO pipeline_meta VALUES ('a_stock_daily_version', 'x', CURRENT_TIMESTAMP)"
+    )
+    conn.execute("UPDATE a_stock_daily SET close = 1.0 WHERE code = '600519.SH'")
+    second = store.get(conn=conn)
+    assert second is not first and store.stats["loads"] == 2
+    assert float(second.column("600519.SH")[-1]) == 1.0
+
+
+def test_peek_never_loads_and_expires_with_check_interval(seeded):
+    conn, _ = seeded
+    store = OHLCVPanelStore(lookback_days=365, check_interval_sec=3600)
+    assert store.peek() is None and store.stats["loads"] == 0  # 冷缓存不加载
+    panel = store.get(conn=conn)
+    assert store.peek() is panel
+    store.check_interval_sec = 0
+    assert store.peek() is None and store.stats["loads"] == 1
+
+
+def test_ohlcv_frame_loader_matches_legacy_list(seeded):
+    conn, dates = seeded
+    from backtest_engine import load_ohlcv_frame_from_db, load_ohlcv_from_db
+
+    start, end = str(dates[3].date()), str(dates[20].date())
+    _, bars = load_ohlcv_from_db("000001", start, end, conn=conn, use_panel=False)
+    frame = load_ohlcv_frame_from_db("000001", start, end, conn=conn, use_panel=False)
+    assert len(frame) == len(bars) == 17 and frame.symbol == "000001"
+    np.testing.assert_allclose(frame.close, [b.close for b in bars])
+    assert frame.to_bars(tz=bars[0].timestamp.tzinfo) == bars
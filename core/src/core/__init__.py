@@ -1,9 +1,13 @@
 # core shared types and utilities
 from .types import OHLCV, Position, Signal
+from .ohlcv_frame import OHLCVFrame, OHLCVLike, as_ohlcv_frame
 from .constants import INTERVALS, INTERVAL_TO_TABLE, TABLE_1M, TABLE_5M, TABLE_1H, TABLE_1D
 
 __all__ = [
     "OHLCV",
+    "OHLCVFrame",
+    "OHLCVLike",
+    "as_ohlcv_frame",
     "Position",
     "Signal",
     "INTERVALS",
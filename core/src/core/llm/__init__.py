@@ -0,0 +1,16 @@
+# Shared LLM call layer (pooled HTTP, provider fallback chain, response cache, batching)
+from .cache import LLMResponseCache, prompt_key
+from .client import LLMClient, LLMResult, get_llm_client, parse_json_object
+from .providers import Provider, resolve_chain, resolve_provider
+
+__all__ = [
+    "LLMClient",
+    "LLMResult",
+    "LLMResponseCache",
+    "Provider",
+    "get_llm_client",
+    "parse_json_object",
+    "prompt_key",
+    "resolve_chain",
+    "resolve_provider",
+]
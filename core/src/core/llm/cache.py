@@ -0,0 +1,162 @@
+"""
+Prompt-hash LLM response cache: in-process LRU plus a DuckDB table, both with a TTL.
+
+The key hashes the messages, generation parameters, provider chain and a caller namespace, so
+asking the same question again within the TTL costs no API call. Only successful responses
+are stored. DuckDB file: ``LLM_CACHE_DB_PATH``, otherwise ``llm_cache.duckdb`` next to the unified
+market DB -- a separate file, so cache writes never take the market DB's write lock. Each put also
+deletes rows older than the TTL. ``LLM_CACHE_TTL_SEC`` (default 86400), ``LLM_CACHE_SIZE``
+(default 512), ``LLM_CACHE=0`` disables.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+_log = logging.getLogger(__name__)
+
+CACHE_TABLE_DDL = """
+    CREATE TABLE IF NOT EXISTS llm_response_cache (
+        cache_key VARCHAR PRIMARY KEY,
+        provider VARCHAR,
+        model VARCHAR,
+        response VARCHAR,
+        created_epoch DOUBLE
+    )
+"""
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return max(0.0, float(os.environ.get(name, str(default)).strip()))
+    except ValueError:
+        return default
+
+
+def cache_enabled() -> bool:
+    return os.environ.get("LLM_CACHE", "1").strip().lower() not in ("0", "false", "no", "off")
+
+
+def prompt_key(messages: Any, params: Dict[str, Any], namespace: str = "") -> str:
+    raw = json.dumps(
+        {"messages": messages, "params": params, "ns": namespace},
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def cache_db_path() -> str:
+    path = os.environ.get("LLM_CACHE_DB_PATH", "").strip()
+    if path:
+        return path
+    from core.config import get_db_path
+
+    return os.path.join(os.path.dirname(get_db_path()), "llm_cache.duckdb")
+
+
+def _open_conn() -> Any:
+    try:
+        import duckdb
+
+        path = cache_db_path()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        return duckdb.connect(path)
+    except Exception:
+        _log.debug("llm cache: cannot open DuckDB", exc_info=True)
+        return None
+
+
+class LLMResponseCache:
+    """Two-level cache of {"text", "provider", "model"} dicts; thread-safe."""
+
+    def __init__(self, max_size: Optional[int] = None, ttl_sec: Optional[float] = None, persist: bool = True):
+        self.max_size = int(max_size if max_size is not None else _env_float("LLM_CACHE_SIZE", 512))
+        self.ttl_sec = float(ttl_sec) if ttl_sec is not None else _env_float("LLM_CACHE_TTL_SEC", 86400)
+        self.persist = persist
+        self._mem: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0}
+
+    def get(self, key: str, ttl_sec: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        ttl = self.ttl_sec if ttl_sec is None else ttl_sec
+        if ttl <= 0:
+            return None
+        now = time.time()
+        with self._lock:
+            hit = self._mem.get(key)
+            if hit is not None and now - hit[0] <= ttl:
+                self._mem.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return hit[1]
+        row = None
+        if self.persist:
+            with self._db_lock:
+                conn = _open_conn()
+                if conn is not None:
+                    try:
+                        conn.execute(CACHE_TABLE_DDL)
+                        row = conn.execute(
+                            "SELECT response, provider, model, created_epoch FROM llm_response_cache "
+                            "WHERE cache_key = ? AND created_epoch >= ?",
+                            [key, now - ttl],
+                        ).fetchone()
+                    except Exception:
+                        _log.debug("llm cache: disk read failed", exc_info=True)
+                    finally:
+                        conn.close()
+        with self._lock:
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            value = {"text": row[0], "provider": row[1], "model": row[2]}
+            self._mem_put(key, value, float(row[3]))
+            self.stats["disk_hits"] += 1
+            return value
+
+    def _mem_put(self, key: str, value: Dict[str, Any], at: float) -> None:
+        if self.max_size <= 0:
+            return
+        self._mem[key] = (at, value)
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_size:
+            self._mem.popitem(last=False)
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        now = time.time()
+        with self._lock:
+            self._mem_put(key, value, now)
+            self.stats["stores"] += 1
+        if not self.persist:
+            return
+        with self._db_lock:
+            conn = _open_conn()
+            if conn is None:
+                return
+            try:
+                conn.execute(CACHE_TABLE_DDL)
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_response_cache (cache_key, provider, model, response, created_epoch) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [key, value.get("provider"), value.get("model"), value.get("text"), now],
+                )
+                if self.ttl_sec > 0:
+                    conn.execute("DELETE FROM llm_response_cache WHERE created_epoch < ?", [now - self.ttl_sec])
+            except Exception:
+                _log.debug("llm cache: disk write failed", exc_info=True)
+            finally:
+                conn.close()
+
+    def clear(self) -> None:
+        """Memory layer only; DuckDB rows expire by TTL and are deleted on the next put."""
+        with self._lock:
+            self._mem.clear()
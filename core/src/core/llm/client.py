@@ -0,0 +1,251 @@
+"""
+Shared LLM chat client: pooled keep-alive HTTP, per-provider concurrency caps, provider
+fallback chain, prompt-hash response cache and multi-item prompt batching.
+
+All providers speak the OpenAI-compatible ``/chat/completions`` protocol (see ``providers``).
+``chat`` is synchronous (FastAPI sync routes); ``achat`` / ``achat_many`` run the same pooled
+client in worker threads, so the per-provider caps (``LLM_MAX_CONCURRENCY[_<NAME>]``) hold across
+sync and async callers in one process.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import re
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .cache import LLMResponseCache, cache_enabled, prompt_key
+from .providers import Provider, max_concurrency, resolve_chain
+
+_log = logging.getLogger(__name__)
+
+Messages = List[Dict[str, str]]
+
+
+@dataclass
+class LLMResult:
+    text: Optional[str]
+    provider: Optional[str] = None
+    model: Optional[str] = None
+    cached: bool = False
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return bool(self.text)
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, str(default)))
+    except ValueError:
+        return default
+
+
+def _error_message(data: Any, raw: str) -> str:
+    if isinstance(data, dict):
+        err = data.get("error")
+        if isinstance(err, dict) and err.get("message"):
+            return str(err["message"])[:200]
+        if data.get("message"):
+            return str(data["message"])[:200]
+    return raw[:200]
+
+
+def parse_json_object(text: str) -> Optional[Dict[str, Any]]:
+    """First JSON object in a model reply (tolerates ```json fences and surrounding prose)."""
+    s = (text or "").strip()
+    s = re.sub(r"^```(?:json)?\s*|\s*```$", "", s)
+    for candidate in (s, *(m.group(0) for m in [re.search(r"\{[\s\S]*\}", s)] if m)):
+        try:
+            data = json.loads(candidate)
+        except (json.JSONDecodeError, TypeError):
+            continue
+        if isinstance(data, dict):
+            return data
+    return None
+
+
+class LLMClient:
+    def __init__(self, cache: Optional[LLMResponseCache] = None, timeout: Optional[float] = None):
+        self.cache = cache if cache is not None else LLMResponseCache()
+        self.timeout = timeout if timeout is not None else _env_float("LLM_TIMEOUT_SEC", 90.0)
+        self._http: Any = None
+        self._lock = threading.Lock()
+        self._sems: Dict[str, threading.BoundedSemaphore] = {}
+        self.stats = {"requests": 0, "cache_hits": 0, "fallbacks": 0, "errors": 0}
+
+    # -- transport --------------------------------------------------------
+
+    def _client(self) -> Any:
+        if self._http is None:
+            with self._lock:
+                if self._http is None:
+                    import httpx
+
+                    pool = max(8, int(_env_float("LLM_HTTP_POOL_SIZE", 16)))
+                    self._http = httpx.Client(
+                        limits=httpx.Limits(max_connections=pool, max_keepalive_connections=pool),
+                        timeout=self.timeout,
+                    )
+        return self._http
+
+    def _sem(self, name: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            sem = self._sems.get(name)
+            if sem is None:
+                sem = self._sems[name] = threading.BoundedSemaphore(max_concurrency(name))
+            return sem
+
+    def _post(self, p: Provider, body: Dict[str, Any], timeout: float) -> Tuple[Optional[str], Optional[str]]:
+        """One request to one provider -> (text, error)."""
+        with self._sem(p.name):
+            with self._lock:
+                self.stats["requests"] += 1
+            try:
+                r = self._client().post(
+                    p.url,
+                    headers={"Authorization": f"Bearer {p.api_key}", "Content-Type": "application/json"},
+                    json={**body, "model": p.model},
+                    timeout=timeout,
+                )
+            except Exception as e:
+                return None, f"{p.name}:{e!s}"[:300]
+        try:
+            data = r.json()
+        except ValueError:
+            data = None
+        if r.status_code != 200:
+            return None, f"{p.name}_http_{r.status_code}: {_error_message(data, r.text)}"
+        choices = (data or {}).get("choices") or []
+        if not choices:
+            return None, f"{p.name}_empty_choices"
+        text = ((choices[0].get("message") or {}).get("content") or "").strip()
+        return (text, None) if text else (None, f"{p.name}_empty_content")
+
+    # -- public -----------------------------------------------------------
+
+    def chat(
+        self,
+        messages: Messages,
+        *,
+        providers: Optional[Sequence[str]] = None,
+        max_tokens: int = 2000,
+        temperature: Optional[float] = None,
+        timeout: Optional[float] = None,
+        cache_ttl: Optional[float] = None,
+        namespace: str = "",
+    ) -> LLMResult:
+        """
+        Try each configured provider in order until one answers. providers are specs such as
+        ``["dashscope:qwen-max", "dashscope:qwen-turbo", "openai"]`` (default ``LLM_PROVIDER_CHAIN``).
+        cache_ttl=0 bypasses the cache for this call.
+        """
+        chain = resolve_chain(providers)
+        if not chain:
+            return LLMResult(None, error="no_llm_key")
+        body: Dict[str, Any] = {"messages": messages, "max_tokens": max_tokens}
+        if temperature is not None:
+            body["temperature"] = temperature
+        use_cache = cache_enabled() and cache_ttl != 0
+        key = ""
+        if use_cache:
+            key = prompt_key(messages, {**body, "chain": [p.label for p in chain]}, namespace)
+            hit = self.cache.get(key, ttl_sec=cache_ttl)
+            if hit is not None:
+                with self._lock:
+                    self.stats["cache_hits"] += 1
+                return LLMResult(hit["text"], hit.get("provider"), hit.get("model"), cached=True)
+        errors: List[str] = []
+        for i, p in enumerate(chain):
+            text, err = self._post(p, body, timeout or self.timeout)
+            if text is not None:
+                if i:
+                    with self._lock:
+                        self.stats["fallbacks"] += 1
+                    _log.info("llm: %s answered after fallback (%s)", p.label, "; ".join(errors))
+                if use_cache:
+                    self.cache.put(key, {"text": text, "provider": p.name, "model": p.model})
+                return LLMResult(text, p.name, p.model)
+            errors.append(err or f"{p.name}_error")
+        with self._lock:
+            self.stats["errors"] += 1
+        return LLMResult(None, error=" | ".join(errors)[:600])
+
+    async def achat(self, messages: Messages, **kwargs: Any) -> LLMResult:
+        return await asyncio.to_thread(self.chat, messages, **kwargs)
+
+    async def achat_many(self, batch: Sequence[Messages], **kwargs: Any) -> List[LLMResult]:
+        """Concurrent ``achat`` calls; provider caps bound the requests actually in flight."""
+        return list(await asyncio.gather(*(self.achat(m, **kwargs) for m in batch)))
+
+    async def achat_batched(
+        self,
+        items: Sequence[Tuple[str, str]],
+        *,
+        system: str,
+        instruction: str,
+        batch_size: Optional[int] = None,
+        **kwargs: Any,
+    ) -> Tuple[Dict[str, Any], List[str]]:
+        """
+        Pack (id, description) items into prompts of ``batch_size`` items (``LLM_BATCH_SIZE``,
+        default 10) that ask for one JSON object keyed by id; run the prompts concurrently.
+        Returns ({id: value}, errors); ids missing from a reply are absent from the dict.
+        """
+        size = max(1, int(batch_size or _env_float("LLM_BATCH_SIZE", 10)))
+        chunks = [list(items[i : i + size]) for i in range(0, len(items), size)]
+        prompts: List[Messages] = []
+        for chunk in chunks:
+            listing = "\n".join(f"[{k}] {desc}" for k, desc in chunk)
+            ids = ", ".join(k for k, _ in chunk)
+            prompts.append(
+                [
+                    {"role": "system", "content": system},
+                    {
+                        "role": "user",
+                        "content": f"{instruction}\n\n{listing}\n\n"
+                        f"仅输出一个 JSON 对象，键为以下 id：{ids}；每个键对应该条目的结果。",
+                    },
+                ]
+            )
+        results = await self.achat_many(prompts, **kwargs)
+        out: Dict[str, Any] = {}
+        errors: List[str] = []
+        for chunk, res in zip(chunks, results):
+            if not res.ok:
+                errors.append(res.error or "llm_error")
+                continue
+            data = parse_json_object(res.text or "")
+            if data is None:
+                errors.append(f"{res.provider}_invalid_json")
+                continue
+            for k, _ in chunk:
+                if k in data:
+                    out[k] = data[k]
+        return out, errors
+
+    def close(self) -> None:
+        with self._lock:
+            if self._http is not None:
+                self._http.close()
+                self._http = None
+
+
+_CLIENT: Optional[LLMClient] = None
+_CLIENT_LOCK = threading.Lock()
+
+
+def get_llm_client() -> LLMClient:
+    """Process-wide client (one HTTP pool, one set of provider caps, one cache)."""
+    global _CLIENT
+    if _CLIENT is None:
+        with _CLIENT_LOCK:
+            if _CLIENT is None:
+                _CLIENT = LLMClient()
+    return _CLIENT
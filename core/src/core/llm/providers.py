@@ -0,0 +1,98 @@
+"""OpenAI-compatible chat providers configured from the environment, and provider chains."""
+
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# name -> (api key env names, base url env, default base url, model env, default model)
+PROVIDERS: Dict[str, Tuple[Tuple[str, ...], str, str, str, str]] = {
+    "dashscope": (
+        ("DASHSCOPE_API_KEY", "BAILIAN_API_KEY"),
+        "DASHSCOPE_API_BASE",
+        "https://dashscope.aliyuncs.com/compatible-mode/v1",
+        "RESEARCH_LLM_MODEL",
+        "qwen-turbo",
+    ),
+    "openai": (
+        ("OPENAI_API_KEY",),
+        "OPENAI_BASE_URL",
+        "https://api.openai.com/v1",
+        "RESEARCH_OPENAI_MODEL",
+        "gpt-4o-mini",
+    ),
+    "doubao": (
+        ("DOUBAO_API_KEY", "VOLCANO_ENGINE_API_KEY"),
+        "ARK_API_BASE",
+        "https://ark.cn-beijing.volces.com/api/v3",
+        "DOUBAO_MODEL",
+        "",
+    ),
+    "deepseek": (
+        ("DEEPSEEK_API_KEY",),
+        "DEEPSEEK_API_BASE",
+        "https://api.deepseek.com/v1",
+        "DEEPSEEK_MODEL",
+        "deepseek-chat",
+    ),
+}
+
+DEFAULT_CHAIN = ("dashscope", "openai")
+
+
+@dataclass(frozen=True)
+class Provider:
+    name: str
+    base_url: str
+    api_key: str
+    model: str
+
+    @property
+    def url(self) -> str:
+        return f"{self.base_url.rstrip('/')}/chat/completions"
+
+    @property
+    def label(self) -> str:
+        return f"{self.name}:{self.model}"
+
+
+def max_concurrency(name: str) -> int:
+    """In-flight request cap per provider: ``LLM_MAX_CONCURRENCY_<NAME>``, else ``LLM_MAX_CONCURRENCY`` (4)."""
+    raw = os.environ.get(f"LLM_MAX_CONCURRENCY_{name.upper()}") or os.environ.get("LLM_MAX_CONCURRENCY", "4")
+    try:
+        return max(1, int(raw))
+    except ValueError:
+        return 4
+
+
+def resolve_provider(spec: str) -> Optional[Provider]:
+    """``"dashscope"`` or ``"dashscope:qwen-max"`` -> Provider; None when unknown or no key / model is set."""
+    name, _, model = spec.partition(":")
+    name = name.strip().lower()
+    cfg = PROVIDERS.get(name)
+    if cfg is None:
+        return None
+    key_envs, base_env, base_default, model_env, model_default = cfg
+    key = next((os.environ[k] for k in key_envs if os.environ.get(k)), "")
+    model = model.strip() or (os.environ.get(model_env) or model_default).strip()
+    if not key or not model:
+        return None
+    base = (os.environ.get(base_env) or base_default).strip()
+    return Provider(name=name, base_url=base, api_key=key, model=model)
+
+
+def resolve_chain(specs: Optional[Sequence[str]] = None) -> List[Provider]:
+    """
+    Configured providers in fallback order. specs default to ``LLM_PROVIDER_CHAIN``
+    (comma separated, default ``dashscope,openai``); unconfigured entries are skipped.
+    """
+    if specs is None:
+        raw = os.environ.get("LLM_PROVIDER_CHAIN", "")
+        specs = [s for s in raw.split(",") if s.strip()] or list(DEFAULT_CHAIN)
+    out: List[Provider] = []
+    for s in specs:
+        p = resolve_provider(s)
+        if p is not None and p not in out:
+            out.append(p)
+    return out
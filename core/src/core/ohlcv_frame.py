@@ -0,0 +1,197 @@
+"""Columnar OHLCV container: one NumPy array per field plus a symbol/interval header."""
+
+from __future__ import annotations
+
+import datetime
+from dataclasses import dataclass
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Union
+
+import numpy as np
+
+from .types import OHLCV
+
+PRICE_FIELDS = ("open", "high", "low", "close", "volume")
+_TIMESTAMP_KEYS = ("timestamp", "date", "ts", "trade_date")
+
+
+def _float_column(values: Any) -> np.ndarray:
+    """float64 view of a column; copies only for non-float64 input or masked (NULL) values."""
+    if isinstance(values, np.ma.MaskedArray):
+        return values.astype(np.float64).filled(np.nan)
+    return np.asarray(values, dtype=np.float64)
+
+
+def _naive_utc(t: Any) -> Any:
+    if isinstance(t, datetime.datetime) and t.tzinfo is not None:
+        return t.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return t
+
+
+def _time_column(values: Any) -> np.ndarray:
+    """datetime64 column (any unit, kept as-is); python datetimes are converted to naive UTC."""
+    if isinstance(values, np.ma.MaskedArray):
+        values = values.filled(np.datetime64("NaT"))
+    arr = np.asarray(values)
+    if arr.dtype.kind == "M":
+        return arr
+    if hasattr(values, "dt"):  # pandas Series with tz-aware dtype
+        values = values.dt.tz_convert("UTC").dt.tz_localize(None) if values.dt.tz is not None else values
+        return np.asarray(values, dtype="datetime64[ns]")
+    return np.array([_naive_utc(t) for t in arr.tolist()], dtype="datetime64[us]")
+
+
+@dataclass(frozen=True)
+class OHLCVFrame:
+    """
+    Struct of arrays for one symbol's bars. Fields are 1-D arrays of equal length:
+    timestamp (datetime64, naive UTC) and float64 open/high/low/close/volume.
+    Construction from fetchnumpy()/Arrow float64 columns and slicing do not copy.
+    """
+
+    symbol: str
+    interval: str
+    timestamp: np.ndarray
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+
+    def __post_init__(self) -> None:
+        n = len(self.timestamp)
+        for name in PRICE_FIELDS:
+            if len(getattr(self, name)) != n:
+                raise ValueError(f"OHLCVFrame column {name!r} has length {len(getattr(self, name))}, expected {n}")
+
+    def __len__(self) -> int:
+        return len(self.timestamp)
+
+    def __getitem__(self, key: Union[slice, np.ndarray]) -> "OHLCVFrame":
+        """Row selection; a slice returns views, a boolean/index array copies."""
+        if isinstance(key, (int, np.integer)):
+            raise TypeError("OHLCVFrame rows are selected with a slice or mask; use to_bars() for single bars")
+        return OHLCVFrame(
+            self.symbol,
+            self.interval,
+            self.timestamp[key],
+            *(getattr(self, name)[key] for name in PRICE_FIELDS),
+        )
+
+    @classmethod
+    def empty(cls, symbol: str = "", interval: str = "1d") -> "OHLCVFrame":
+        z = np.empty(0, dtype=np.float64)
+        return cls(symbol, interval, np.empty(0, dtype="datetime64[us]"), z, z, z, z, z)
+
+    @classmethod
+    def from_columns(
+        cls,
+        columns: Mapping[str, Any],
+        symbol: str = "",
+        interval: str = "1d",
+    ) -> "OHLCVFrame":
+        """
+        Build from a mapping of column arrays, e.g. ``conn.execute(sql).fetchnumpy()`` or a
+        DataFrame. The time column may be named timestamp, date, ts or trade_date; a missing
+        volume column is filled with zeros.
+        """
+        key = next((k for k in _TIMESTAMP_KEYS if k in columns), None)
+        if key is None:
+            raise KeyError("OHLCVFrame.from_columns needs a timestamp/date column")
+        ts = _time_column(columns[key])
+        fields = {}
+        for name in PRICE_FIELDS:
+            if name in columns:
+                fields[name] = _float_column(columns[name])
+            elif name == "volume":
+                fields[name] = np.zeros(len(ts), dtype=np.float64)
+            else:
+                raise KeyError(f"OHLCVFrame.from_columns missing column {name!r}")
+        return cls(symbol, interval, ts, **fields)
+
+    @classmethod
+    def from_arrow(cls, table: Any, symbol: str = "", interval: str = "1d") -> "OHLCVFrame":
+        """Build from a pyarrow Table or RecordBatchReader (DuckDB ``fetch_arrow_table()``)."""
+        if hasattr(table, "read_all"):
+            table = table.read_all()
+        # single-chunk primitive columns without nulls convert without copying
+        cols = {name: table.column(name).to_numpy() for name in table.column_names}
+        return cls.from_columns(cols, symbol=symbol, interval=interval)
+
+    @classmethod
+    def from_bars(cls, bars: Sequence[OHLCV], symbol: Optional[str] = None, interval: Optional[str] = None) -> "OHLCVFrame":
+        """Convert a legacy List[OHLCV]; symbol/interval default to the first bar's."""
+        if not bars:
+            return cls.empty(symbol or "", interval or "1d")
+        first = bars[0]
+        return cls(
+            symbol if symbol is not None else first.symbol,
+            interval if interval is not None else first.interval,
+            np.array([_naive_utc(b.timestamp) for b in bars], dtype="datetime64[us]"),
+            *(np.fromiter((getattr(b, name) for b in bars), dtype=np.float64, count=len(bars)) for name in PRICE_FIELDS),
+        )
+
+    @classmethod
+    def split_long(
+        cls,
+        columns: Mapping[str, Any],
+        interval: str = "1d",
+        symbol_key: str = "code",
+    ) -> Dict[str, "OHLCVFrame"]:
+        """
+        Split a long-format result (one row per symbol and bar, e.g. a whole-market fetchnumpy())
+        into per-symbol frames. Rows already grouped by symbol (``ORDER BY code, date``) yield
+        views into the shared arrays; otherwise the rows are stably reordered once.
+        """
+        symbols = np.asarray(columns[symbol_key])
+        full = cls.from_columns(columns, interval=interval)
+        if len(symbols) == 0:
+            return {}
+        starts = np.flatnonzero(symbols[1:] != symbols[:-1]) + 1
+        if len(np.unique(symbols[np.r_[0, starts]])) != len(starts) + 1:
+            order = np.argsort(symbols, kind="stable")
+            symbols = symbols[order]
+            full = full[order]
+            starts = np.flatnonzero(symbols[1:] != symbols[:-1]) + 1
+        bounds = np.r_[0, starts, len(symbols)]
+        out: Dict[str, OHLCVFrame] = {}
+        for lo, hi in zip(bounds[:-1], bounds[1:]):
+            sym = str(symbols[lo])
+            out[sym] = full[int(lo) : int(hi)].with_header(symbol=sym)
+        return out
+
+    def with_header(self, symbol: Optional[str] = None, interval: Optional[str] = None) -> "OHLCVFrame":
+        return OHLCVFrame(
+            self.symbol if symbol is None else symbol,
+            self.interval if interval is None else interval,
+            self.timestamp,
+            self.open,
+            self.high,
+            self.low,
+            self.close,
+            self.volume,
+        )
+
+    def to_bars(self, tz: Optional[datetime.tzinfo] = None) -> List[OHLCV]:
+        """Materialize the legacy List[OHLCV]; tz attaches a tzinfo to the (UTC) timestamps."""
+        stamps = self.timestamp.astype("datetime64[us]").tolist()
+        if tz is not None:
+            stamps = [t.replace(tzinfo=tz) if t is not None else t for t in stamps]
+        cols = [getattr(self, name).tolist() for name in PRICE_FIELDS]
+        return [
+            OHLCV(self.symbol, t, o, h, lo, c, v, self.interval)
+            for t, o, h, lo, c, v in zip(stamps, *cols)
+        ]
+
+    def to_dict(self) -> Dict[str, np.ndarray]:
+        """Column mapping (shares the arrays); suitable for pandas.DataFrame(...)."""
+        return {"timestamp": self.timestamp, **{name: getattr(self, name) for name in PRICE_FIELDS}}
+
+
+OHLCVLike = Union[OHLCVFrame, Sequence[OHLCV]]
+
+
+def as_ohlcv_frame(data: OHLCVLike) -> OHLCVFrame:
+    """Accept either an OHLCVFrame (returned unchanged) or a legacy List[OHLCV]."""
+    if isinstance(data, OHLCVFrame):
+        return data
+    return OHLCVFrame.from_bars(list(data))
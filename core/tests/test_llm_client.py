@@ -0,0 +1,121 @@
+"""core.llm: cache, fallback chain, concurrency caps and batching against a local mock server."""
+
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from core.llm import LLMClient, LLMResponseCache
+
+
+class _MockLLM:
+    def __init__(self):
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.fail_paths = set()
+        self.delay = 0.0
+        self.lock = threading.Lock()
+
+
+@pytest.fixture
+def mock_llm(monkeypatch, tmp_path):
+    state = _MockLLM()
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            with state.lock:
+                state.calls.append((self.path, body))
+                state.in_flight += 1
+                state.max_in_flight = max(state.max_in_flight, state.in_flight)
+            time.sleep(state.delay)
+            with state.lock:
+                state.in_flight -= 1
+            if any(self.path.startswith(p) for p in state.fail_paths):
+                payload, code = {"error": {"message": "overloaded"}}, 503
+            else:
+                prompt = body["messages"][-1]["content"]
+                ids = prompt.rsplit("：", 1)[-1].split("；", 1)[0] if "JSON 对象" in prompt else ""
+                text = json.dumps({k.strip(): f"ok-{k.strip()}" for k in ids.split(",")}) if ids else f"echo:{prompt}"
+                payload, code = {"choices": [{"message": {"content": text}}]}, 200
+            raw = json.dumps(payload).encode()
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(raw)))
+            self.end_headers()
+            self.wfile.write(raw)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    monkeypatch.setenv("DASHSCOPE_API_KEY", "k1")
+    monkeypatch.setenv("DASHSCOPE_API_BASE", f"{base}/ds")
+    monkeypatch.setenv("OPENAI_API_KEY", "k2")
+    monkeypatch.setenv("OPENAI_BASE_URL", f"{base}/oai")
+    monkeypatch.setenv("LLM_CACHE_DB_PATH", str(tmp_path / "llm_cache.duckdb"))
+    yield state
+    server.shutdown()
+
+
+def test_cache_hit_survives_new_client_and_fallback(mock_llm):
+    msgs = [{"role": "user", "content": "summarize"}]
+    a = LLMClient().chat(msgs, providers=["dashscope", "openai"])
+    assert a.ok and a.provider == "dashscope" and not a.cached
+    b = LLMClient(cache=LLMResponseCache()).chat(msgs, providers=["dashscope", "openai"])  # disk hit
+    assert b.cached and b.text == a.text
+    assert len(mock_llm.calls) == 1
+
+    mock_llm.fail_paths.add("/ds")
+    c = LLMClient().chat([{"role": "user", "content": "other"}], providers=["dashscope", "openai"])
+    assert c.ok and c.provider == "openai"
+    assert [p for p, _ in mock_llm.calls[1:]] == ["/ds/chat/completions", "/oai/chat/completions"]
+
+    mock_llm.fail_paths.add("/oai")
+    d = LLMClient().chat([{"role": "user", "content": "x"}], providers=["dashscope", "openai"], cache_ttl=0)
+    assert not d.ok and "dashscope_http_503" in d.error and "openai_http_503" in d.error
+
+
+def test_concurrency_cap_and_batching(mock_llm, monkeypatch):
+    monkeypatch.setenv("LLM_MAX_CONCURRENCY_DASHSCOPE", "2")
+    mock_llm.delay = 0.05
+    client = LLMClient()
+    results = asyncio.run(
+        client.achat_many([[{"role": "user", "content": f"q{i}"}] for i in range(8)], providers=["dashscope"])
+    )
+    assert all(r.ok for r in results)
+    assert mock_llm.max_in_flight == 2
+
+    mock_llm.calls.clear()
+    items = [(f"S{i:02d}", f"stock {i}") for i in range(25)]
+    out, errors = asyncio.run(
+        client.achat_batched(items, system="analyst", instruction="rate", batch_size=10, providers=["dashscope"])
+    )
+    assert not errors
+    assert len(mock_llm.calls) == 3
+    assert out["S24"] == "ok-S24" and len(out) == 25
+
+
+def test_cache_uses_separate_file_and_prunes_expired_rows(monkeypatch, tmp_path):
+    import duckdb
+
+    monkeypatch.delenv("LLM_CACHE_DB_PATH", raising=False)
+    monkeypatch.setenv("QUANT_DB_PATH", str(tmp_path / "market" / "quant_system.duckdb"))
+    cache = LLMResponseCache(ttl_sec=60)
+    cache.put("old", {"text": "a", "provider": "p", "model": "m"})
+    path = tmp_path / "market" / "llm_cache.duckdb"
+    assert path.exists() and not (tmp_path / "market" / "quant_system.duckdb").exists()
+
+    conn = duckdb.connect(str(path))
+    conn.execute("UPDATE llm_response_cache SET created_epoch = created_epoch - 120")
+    conn.close()
+    cache.put("new", {"text": "b", "provider": "p", "model": "m"})
+    conn = duckdb.connect(str(path))
+    assert [r[0] for r in conn.execute("SELECT cache_key FROM llm_response_cache").fetchall()] == ["new"]
+    conn.close()
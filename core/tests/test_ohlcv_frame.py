@@ -0,0 +1,80 @@
+"""Tests for the columnar OHLCVFrame."""
+
+from datetime import datetime, timezone
+
+import duckdb
+import numpy as np
+import pytest
+
+from core import OHLCV, OHLCVFrame, as_ohlcv_frame
+
+
+def _bars(n=5):
+    return [
+        OHLCV("600519", datetime(2026, 1, 1 + i), 10.0 + i, 11.0 + i, 9.0 + i, 10.5 + i, 100.0 * i, "1d")
+        for i in range(n)
+    ]
+
+
+def test_round_trip_with_legacy_list():
+    bars = _bars()
+    frame = OHLCVFrame.from_bars(bars)
+    assert len(frame) == 5 and frame.symbol == "600519" and frame.interval == "1d"
+    assert frame.close.dtype == np.float64
+    assert frame.to_bars() == bars
+    assert as_ohlcv_frame(frame) is frame
+    assert len(OHLCVFrame.from_bars([])) == 0
+
+    aware = [OHLCV("X", datetime(2026, 1, 1, 8, tzinfo=timezone.utc), 1, 1, 1, 1, 1, "1h")]
+    assert OHLCVFrame.from_bars(aware).to_bars(tz=timezone.utc) == aware
+
+
+def test_from_fetchnumpy_is_zero_copy_and_nulls_become_nan():
+    conn = duckdb.connect()
+    cols = conn.execute(
+        """SELECT DATE '2026-01-01' + CAST(i AS INTEGER) AS date, i * 1.0 AS open, i + 1.0 AS high,
+                  i - 1.0 AS low, i + 0.5 AS close, CASE WHEN i = 2 THEN NULL ELSE 10.0 END AS volume
+           FROM range(4) t(i)"""
+    ).fetchnumpy()
+    frame = OHLCVFrame.from_columns(cols, symbol="000001", interval="1d")
+    assert np.shares_memory(frame.close, cols["close"])
+    assert np.isnan(frame.volume[2]) and frame.volume[0] == 10.0
+    assert frame.to_bars()[1].timestamp == datetime(2026, 1, 2)
+
+    head = frame[:2]
+    assert len(head) == 2 and np.shares_memory(head.close, frame.close)
+
+
+
+def test_from_arrow_matches_fetchnumpy():
+    pytest.importorskip("pyarrow")
+    conn = duckdb.connect()
+    sql = "SELECT DATE '2026-01-01' + CAST(i AS INTEGER) AS date, i AS open, i AS high, i AS low, i AS close FROM range(3) t(i)"
+    a = OHLCVFrame.from_arrow(conn.execute(sql).fetch_arrow_table())
+    b = OHLCVFrame.from_columns(conn.execute(sql).fetchnumpy())
+    assert a.to_bars() == b.to_bars()
+    np.testing.assert_array_equal(a.volume, np.zeros(3))
+
+
+def test_split_long_returns_per_symbol_views():
+    conn = duckdb.connect()
+    cols = conn.execute(
+        """SELECT c AS code, TIMESTAMP '2026-01-01' + to_days(CAST(i AS INTEGER)) AS timestamp,
+                  i AS open, i AS high, i AS low, CAST(i + k AS DOUBLE) AS close, 1.0 AS volume
+           FROM range(3) t(i), (VALUES ('000001', 0), ('600519', 100)) v(c, k)
+           ORDER BY code, timestamp"""
+    ).fetchnumpy()
+    frames = OHLCVFrame.split_long(cols)
+    assert sorted(frames) == ["000001", "600519"]
+    assert frames["600519"].symbol == "600519"
+    np.testing.assert_array_equal(frames["600519"].close, [100.0, 101.0, 102.0])
+    assert np.shares_memory(frames["600519"].close, cols["close"])
+
+    shuffled = {k: v[::-1] for k, v in cols.items()}
+    again = OHLCVFrame.split_long(shuffled)
+    np.testing.assert_array_equal(again["000001"].close, [2.0, 1.0, 0.0])
+
+
+def test_length_mismatch_rejected():
+    with pytest.raises(ValueError):
+        OHLCVFrame("X", "1d", np.zeros(2, dtype="datetime64[us]"), *(np.zeros(2),) * 4, np.zeros(3))
@@ -14,7 +14,7 @@ from .connector_astock_duckdb import (
     get_duckdb_data_status,
     get_news_from_astock_duckdb,
 )
-from .clickhouse_storage import get_client, ensure_tables, insert_ohlcv, query_ohlcv
+from .clickhouse_storage import get_client, ensure_tables, insert_ohlcv, query_ohlcv, query_ohlcv_frame
 from .data_pipeline import run_pipeline, run_pipeline_batch, run_pipeline_ashare
 from .realtime_stream import stream_klines, stream_klines_async
 
@@ -34,6 +34,7 @@ __all__ = [
     "ensure_tables",
     "insert_ohlcv",
     "query_ohlcv",
+    "query_ohlcv_frame",
     "run_pipeline",
     "run_pipeline_batch",
     "run_pipeline_ashare",
@@ -1,11 +1,11 @@
 """ClickHouse storage for OHLCV. Tables: market_1m, market_5m, market_1h, market_1d."""
 
 import datetime as dt
-from typing import List
+from typing import Any, Dict, List, Tuple
 
 from clickhouse_driver import Client
 
-from core import OHLCV, INTERVAL_TO_TABLE
+from core import OHLCV, OHLCVFrame, INTERVAL_TO_TABLE
 
 
 def get_client(host: str = "localhost", port: int = 9000, database: str = "default") -> Client:
@@ -59,21 +59,19 @@ def insert_ohlcv(client: Client, rows: List[OHLCV], interval: str) -> None:
     )
 
 
-def query_ohlcv(  # pylint: disable=too-many-positional-arguments
-    client: Client,
+def _ohlcv_query(
     symbol: str,
     interval: str,
-    start: dt.datetime | None = None,
-    end: dt.datetime | None = None,
-    limit: int = 10000,
-) -> List[OHLCV]:
-    """Query OHLCV from storage."""
+    start: dt.datetime | None,
+    end: dt.datetime | None,
+    limit: int,
+) -> Tuple[str, Dict[str, Any]]:
     table = INTERVAL_TO_TABLE.get(interval)
     if not table:
         raise ValueError(f"Unknown interval: {interval}")
 
     where = ["symbol = %(symbol)s"]
-    params = {"symbol": symbol, "limit": limit}
+    params: Dict[str, Any] = {"symbol": symbol, "limit": limit}
     if start is not None:
         where.append("timestamp >= %(start)s")
         params["start"] = start
@@ -88,6 +86,19 @@ def query_ohlcv(  # pylint: disable=too-many-positional-arguments
         ORDER BY timestamp
         LIMIT %(limit)s
     """
+    return q, params
+
+
+def query_ohlcv(  # pylint: disable=too-many-positional-arguments
+    client: Client,
+    symbol: str,
+    interval: str,
+    start: dt.datetime | None = None,
+    end: dt.datetime | None = None,
+    limit: int = 10000,
+) -> List[OHLCV]:
+    """Query OHLCV from storage."""
+    q, params = _ohlcv_query(symbol, interval, start, end, limit)
     result = client.execute(q, params)
     return [
         OHLCV(
@@ -102,3 +113,20 @@ def query_ohlcv(  # pylint: disable=too-many-positional-arguments
         )
         for row in result
     ]
+
+
+def query_ohlcv_frame(  # pylint: disable=too-many-positional-arguments
+    client: Client,
+    symbol: str,
+    interval: str,
+    start: dt.datetime | None = None,
+    end: dt.datetime | None = None,
+    limit: int = 10000,
+) -> OHLCVFrame:
+    """Query OHLCV as a columnar OHLCVFrame (columnar fetch; no per-bar objects)."""
+    q, params = _ohlcv_query(symbol, interval, start, end, limit)
+    cols = client.execute(q, params, columnar=True)
+    if not cols:
+        return OHLCVFrame.empty(symbol, interval)
+    names = ("symbol", "timestamp", "open", "high", "low", "close", "volume", "interval")
+    return OHLCVFrame.from_columns(dict(zip(names, cols)), symbol=symbol, interval=interval)
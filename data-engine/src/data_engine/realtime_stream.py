@@ -3,7 +3,7 @@
 import datetime as dt
 import json
 import threading
-from typing import Callable, Optional
+from typing import Callable, List, Optional
 
 import websocket
 
@@ -64,3 +64,41 @@ def stream_klines_async(
     )
     t.start()
     return t
+
+
+def stream_klines_multi(
+    symbols: List[str],
+    interval: str = "1m",
+    on_bar: Optional[Callable[[OHLCV], None]] = None,
+    ws_url: str = "wss://stream.binance.com:9443/stream",
+) -> None:
+    """
+    Subscribe to many symbols over one Binance combined-stream connection
+    (``/stream?streams=a@kline_1m/b@kline_1m``) instead of one socket per symbol.
+    Runs in current thread.
+    """
+    streams = "/".join(f"{s.lower().replace('/', '')}@kline_{interval}" for s in symbols)
+    url = f"{ws_url}?streams={streams}"
+
+    def on_message(_ws, message):  # pylint: disable=unused-argument
+        data = json.loads(message).get("data") or {}
+        if "k" in data and on_bar:
+            on_bar(_parse_ws_kline(data))
+
+    ws = websocket.WebSocketApp(url, on_message=on_message)
+    ws.run_forever()
+
+
+def stream_klines_multi_async(
+    symbols: List[str],
+    interval: str = "1m",
+    on_bar: Optional[Callable[[OHLCV], None]] = None,
+) -> threading.Thread:
+    """Start a combined-stream subscription in a background thread. Returns the thread."""
+    t = threading.Thread(
+        target=stream_klines_multi,
+        kwargs={"symbols": symbols, "interval": interval, "on_bar": on_bar},
+        daemon=True,
+    )
+    t.start()
+    return t
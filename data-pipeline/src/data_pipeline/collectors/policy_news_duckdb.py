@@ -4,6 +4,7 @@ from __future__ import annotations
 
 POLICY_SYMBOL = "__POLICY__"
 POLICY_SOURCE_SITE = "policy"
+RELATED_CODES_MAX = 20
 
 
 def _sentiment_label(score: float | None) -> str | None:
@@ -19,11 +20,14 @@ def _sentiment_label(score: float | None) -> str | None:
 def sync_policy_news_to_duckdb(items: list[dict]) -> int:
     """
     将 policy-news 采集条目写入 ``news_items``（去重：同 symbol 下优先 url，否则 title+publish_time）。
+    标题 + 正文中提及的个股经共享名称索引标注到 related_codes（逗号分隔，最多 RELATED_CODES_MAX 只）。
     """
     from ..storage.duckdb_manager import ensure_tables, get_conn
+    from ..storage.stock_name_index import get_stock_name_index
 
     conn = get_conn(read_only=False)
     ensure_tables(conn)
+    index = get_stock_name_index(conn)
     inserted = 0
     for item in items:
         title = (item.get("title") or "").strip()
@@ -44,6 +48,7 @@ def sync_policy_news_to_duckdb(items: list[dict]) -> int:
         except (TypeError, ValueError):
             sc = 0.0
         lbl = _sentiment_label(sc)
+        related = ",".join(c[:6] for c in index.codes_in(f"{title}\n{content}", limit=RELATED_CODES_MAX))
 
         by_url = 0
         if url:
@@ -63,8 +68,8 @@ def sync_policy_news_to_duckdb(items: list[dict]) -> int:
                 """
                 INSERT INTO news_items
                 (symbol, source_site, source, title, content, url, keyword, tag, publish_time,
-                 sentiment_score, sentiment_label)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                 sentiment_score, sentiment_label, related_codes)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """,
                 [
                     POLICY_SYMBOL,
@@ -78,6 +83,7 @@ def sync_policy_news_to_duckdb(items: list[dict]) -> int:
                     pub or None,
                     sc,
                     lbl,
+                    related or None,
                 ],
             )
             inserted += 1
@@ -55,6 +55,8 @@ def update_realtime_quotes() -> int:
             out[c] = 0.0 if c != "name" else ""
     out = out[need].fillna(0)
 
+    from ..storage.latest_quote import upsert_latest_quotes
+
     conn = get_conn()
     ensure_tables(conn)
     conn.register("tmp", out)
@@ -62,6 +64,8 @@ def update_realtime_quotes() -> int:
         INSERT INTO a_stock_realtime (code, name, latest_price, change_pct, volume, amount, snapshot_time)
         SELECT code, name, latest_price, change_pct, volume, amount, snapshot_time FROM tmp
     """)
+    upsert_latest_quotes(conn, "tmp")
+    conn.unregister("tmp")
     n = len(out)
     conn.close()
     return n
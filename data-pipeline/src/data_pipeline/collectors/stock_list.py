@@ -12,6 +12,7 @@ def update_stock_list() -> int:
     except ImportError:
         return 0
     from ..storage.duckdb_manager import get_conn, ensure_tables
+    from ..storage.stock_name_index import invalidate_stock_name_index
 
     # 尝试获取 A 股股票池（沪A+深A），不强制要求北交所数据
     try:
@@ -47,4 +48,5 @@ def update_stock_list() -> int:
     conn.execute("INSERT INTO a_stock_basic (code, name) SELECT code, name FROM df")
     n = conn.execute("SELECT COUNT(*) FROM a_stock_basic").fetchone()[0]
     conn.close()
+    invalidate_stock_name_index()
     return int(n)
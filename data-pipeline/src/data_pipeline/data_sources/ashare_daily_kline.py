@@ -6,13 +6,14 @@ from __future__ import annotations
 
 import os
 import sys
-import time
-from collections import defaultdict
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from .base import BaseDataSource, register_source
 
+# stock_zh_a_hist_em / stock_zh_a_hist 均请求东财行情历史接口，共用一个令牌桶
+_EM_HOST = "push2his.eastmoney.com"
+
 
 def _pop_proxy_env_vars() -> Dict[str, str]:
     """
@@ -99,6 +100,88 @@ class AShareDailyKlineSource(BaseDataSource):
             return None
         return out
 
+    def __init__(self, api: Any = None):
+        # api：提供 stock_zh_a_hist_em / stock_zh_a_hist 的对象，默认 akshare；测试可注入本地桩
+        self._api = api
+
+    def _load_api(self) -> Any:
+        if self._api is not None:
+            return self._api
+        try:
+            import akshare as ak
+        except ImportError:
+            return None
+        return ak
+
+    @staticmethod
+    def _start_from_key(start_key: Optional[str], end: str) -> str:
+        """增量 key（已有最后一日）→ 拉取起始日；无 key 时约一年历史。"""
+        if not start_key:
+            return (datetime.now() - timedelta(days=365)).strftime("%Y%m%d")
+        try:
+            from_d = datetime.strptime(start_key[:8], "%Y%m%d") + timedelta(days=1)
+            return from_d.strftime("%Y%m%d")
+        except Exception:
+            return end
+
+    def _fetch_one(self, api: Any, task: Tuple[str, str, str], throttle: Any) -> Any:
+        """
+        拉取单只 (code, start, end)：东财 stock_zh_a_hist_em，空表或异常时走 stock_zh_a_hist。
+        东财接口异常且备用接口未拿到数据时向上抛出，由 FetchEngine 退避重试；空表返回 None（不重试）。
+        """
+        code, start, end = task
+        df = None
+        err: Optional[Exception] = None
+        if getattr(api, "stock_zh_a_hist_em", None):
+            throttle(_EM_HOST)
+            try:
+                df = api.stock_zh_a_hist_em(
+                    symbol=code, period="daily", start_date=start, end_date=end, adjust="qfq"
+                )
+            except Exception as e:
+                err = e
+        if df is None or df.empty:
+            throttle(_EM_HOST)
+            try:
+                df = api.stock_zh_a_hist(
+                    symbol=code, start_date=start, end_date=end, period="daily", adjust="qfq"
+                )
+            except Exception:
+                if err is not None:
+                    raise
+                return None
+            if (df is None or df.empty) and err is not None:
+                raise err  # 东财瞬时异常 + 备用接口空表：交给退避重试
+        return self._hist_df_to_standard(df, code)
+
+    def _engine(self, api: Any, **kwargs: Any) -> Any:
+        """
+        按 kwargs 构造并发拉取引擎：workers / max_retries 覆盖环境变量；
+        兼容旧参数 request_sleep_sec（>0 时改为本次运行独占的 1/request_sleep_sec 次/秒限速）。
+        """
+        from .fetch_engine import FetchEngine
+
+        # 勿用 pop：run_incremental 会对多批重复传入同一 kwargs
+        request_sleep_sec = float(kwargs.get("request_sleep_sec") or 0)
+        rate = 1.0 / request_sleep_sec if request_sleep_sec > 0 else kwargs.get("rate")
+        return FetchEngine.from_env(
+            lambda task, throttle: self._fetch_one(api, task, throttle),
+            workers=kwargs.get("workers"),
+            max_retries=kwargs.get("max_retries"),
+            backoff_base=kwargs.get("backoff_base"),
+            rate=rate,
+            burst=1.0 if request_sleep_sec > 0 else kwargs.get("burst"),
+        )
+
+    @staticmethod
+    def _normalize_codes(codes: List[str]) -> List[str]:
+        out = []
+        for code in codes:
+            code = str(code).strip().split(".", maxsplit=1)[0]
+            if code and len(code) >= 5:
+                out.append(code)
+        return out
+
     def fetch(
         self,
         start_key: Optional[str] = None,
@@ -115,52 +198,16 @@ class AShareDailyKlineSource(BaseDataSource):
         strip_proxy_env = bool(kwargs.get("strip_proxy_env", False))
         saved_proxy = _pop_proxy_env_vars() if strip_proxy_env else {}
         try:
-            try:
-                import akshare as ak
-            except ImportError:
+            api = self._load_api()
+            if api is None:
                 return None
             end = end_key or self.default_end_key()
-            if not start_key:
-                start = (datetime.now() - timedelta(days=365)).strftime("%Y%m%d")
-            else:
-                try:
-                    from_d = datetime.strptime(start_key[:8], "%Y%m%d") + timedelta(days=1)
-                    start = from_d.strftime("%Y%m%d")
-                except Exception:
-                    start = end
+            start = self._start_from_key(start_key, end)
             if start > end:
                 return pd.DataFrame()
-            # 勿用 pop：run_incremental 会对多批重复传入同一 kwargs
-            request_sleep_sec = float(kwargs.get("request_sleep_sec") or 0)
-            out = []
-            for code in codes:
-                code = str(code).strip().split(".", maxsplit=1)[0]
-                if not code or len(code) < 5:
-                    continue
-                df = None
-                if getattr(ak, "stock_zh_a_hist_em", None):
-                    try:
-                        df = ak.stock_zh_a_hist_em(
-                            symbol=code, period="daily", start_date=start, end_date=end, adjust="qfq"
-                        )
-                    except Exception:
-                        pass
-                if df is None or df.empty:
-                    try:
-                        df = ak.stock_zh_a_hist(
-                            symbol=code, start_date=start, end_date=end, period="daily", adjust="qfq"
-                        )
-                    except Exception:
-                        continue
-                std = self._hist_df_to_standard(df, code)
-                if std is None:
-                    continue
-                out.append(std)
-                if request_sleep_sec > 0:
-                    time.sleep(request_sleep_sec)
-            if not out:
-                return pd.DataFrame()
-            return pd.concat(out, ignore_index=True)
+            tasks = [(code, start, end) for code in self._normalize_codes(codes)]
+            data, _ = self._engine(api, **kwargs).run(tasks)
+            return data
         finally:
             _restore_env(saved_proxy)
 
@@ -175,19 +222,11 @@ class AShareDailyKlineSource(BaseDataSource):
         """抽样说明单标的拉取失败原因（网络/代理/空表/列名）。"""
         saved_proxy = _pop_proxy_env_vars() if strip_proxy_env else {}
         try:
-            try:
-                import akshare as ak
-            except ImportError as e:
-                return f"未安装 akshare: {e}"
+            ak = self._load_api()
+            if ak is None:
+                return "未安装 akshare"
             end = end_key or self.default_end_key()
-            if not start_key:
-                start = (datetime.now() - timedelta(days=365)).strftime("%Y%m%d")
-            else:
-                try:
-                    from_d = datetime.strptime(start_key[:8], "%Y%m%d") + timedelta(days=1)
-                    start = from_d.strftime("%Y%m%d")
-                except Exception:
-                    start = end
+            start = self._start_from_key(start_key, end)
             parts: List[str] = []
             df_em = None
             if getattr(ak, "stock_zh_a_hist_em", None):
@@ -244,6 +283,18 @@ class AShareDailyKlineSource(BaseDataSource):
             except Exception:
                 pass
         n = len(data)
+        try:
+            # 回测面板缓存（backtest_engine.panel_store）据此水位失效，覆盖历史回补不抬高 MAX(date) 的情形
+            conn.execute(
+                """
+                INSERT INTO pipeline_meta (k, v, updated_at)
+                VALUES ('a_stock_daily_version', ?, CURRENT_TIMESTAMP)
+                ON CONFLICT (k) DO UPDATE SET v = EXCLUDED.v, updated_at = CURRENT_TIMESTAMP
+                """,
+                [datetime.now().isoformat(timespec="microseconds")],
+            )
+        except Exception:
+            pass
         return int(n)
 
     def run_incremental(
@@ -259,10 +310,15 @@ class AShareDailyKlineSource(BaseDataSource):
         未传 codes 时从 **a_stock_basic** 取列表（全市场回填入口），不再优先用 a_stock_daily
         （否则只会反复更新已有 K 线的少数股票，无法扩量）。
 
-        非 force_full 时：尚无日线的 code 约一年历史回填；已有数据者按**各 code 自身** MAX(date) 分组续拉
-        （避免全局 MAX(date) 被少数「多一天」标的抬高导致 start>end、整批 0 行）。
+        非 force_full 时：尚无日线的 code 约一年历史回填；已有数据者按**各 code 自身** MAX(date) 续拉
+        （避免全局 MAX(date) 被少数「多一天」标的抬高导致 start>end、整批 0 行）。各 code 末日由一次
+        GROUP BY 查询取得。
 
-        verbose=True 时每完成一批（默认 250 只）打印进度到 stderr。
+        拉取经 FetchEngine 并发执行（KLINE_FETCH_WORKERS 线程，东财 host 令牌桶限速
+        KLINE_FETCH_RATE 次/秒，异常退避重试），单写线程每攒 KLINE_FETCH_BATCH_ROWS 行写一次库。
+        kwargs 可传 workers / max_retries / backoff_base / rate 覆盖；request_sleep_sec 兼容旧参数（折算为限速）。
+
+        verbose=True 时每写完一批打印进度到 stderr，结束后对失败/空结果抽样诊断。
         """
         from ..storage.duckdb_manager import ensure_tables
 
@@ -297,61 +353,9 @@ class AShareDailyKlineSource(BaseDataSource):
             return 0
 
         end = kwargs.pop("end_key", self.default_end_key())
-        chunk_size = 250
-        total_written = 0
+        codes = self._normalize_codes(codes)
         strip_proxy_env = bool(kwargs.get("strip_proxy_env", False))
 
-        def _write_chunk(start_key: Optional[str], chunk: List[str]) -> int:
-            if not chunk:
-                return 0
-            data = self.fetch(start_key=start_key, end_key=end, codes=chunk, **kwargs)
-            if data is None or (hasattr(data, "empty") and data.empty):
-                return 0
-            return self.write(conn, data)
-
-        def _run_batches(
-            label: str,
-            start_key: Optional[str],
-            code_list: List[str],
-            batch_num_start: int,
-            total_batches: int,
-        ) -> None:
-            nonlocal total_written
-            b = batch_num_start
-            empty_diag_left = 3
-            for i in range(0, len(code_list), chunk_size):
-                chunk = code_list[i : i + chunk_size]
-                n = _write_chunk(start_key, chunk)
-                total_written += n
-                if verbose:
-                    lo, hi = chunk[0], chunk[-1]
-                    _log(
-                        f"批次 {b}/{total_batches} [{label}] 标的×{len(chunk)} "
-                        f"({lo}…{hi}) → +{n} 行，累计 {total_written} 行"
-                    )
-                    if n == 0 and chunk and empty_diag_left > 0:
-                        _log(
-                            f"  抽样诊断 {chunk[0]}: "
-                            f"{self._diagnose_one_code(chunk[0], start_key, end, strip_proxy_env=strip_proxy_env)}"
-                        )
-                        empty_diag_left -= 1
-                b += 1
-
-        if force_full:
-            nb = (len(codes) + chunk_size - 1) // chunk_size
-            _log(f"开始 force_full：共 {len(codes)} 只，分 {nb} 批（每批最多 {chunk_size} 只）")
-            _run_batches("全量重拉", None, codes, 1, nb)
-            _log(f"完成，本 run 共写入 {total_written} 行")
-            return total_written
-
-        global_last = self.get_last_key(conn)
-        if not global_last:
-            nb = (len(codes) + chunk_size - 1) // chunk_size
-            _log(f"开始（无全局最新日）：共 {len(codes)} 只，分 {nb} 批")
-            _run_batches("历史回填", None, codes, 1, nb)
-            _log(f"完成，本 run 共写入 {total_written} 行")
-            return total_written
-
         def _date_to_yyyymmdd(d: Any) -> str:
             if d is None:
                 return ""
@@ -360,43 +364,77 @@ class AShareDailyKlineSource(BaseDataSource):
             s = str(d).replace("-", "")[:8]
             return s if len(s) >= 8 and s.isdigit() else ""
 
-        need_full: List[str] = []
-        incr_by_last: dict[str, List[str]] = defaultdict(list)
-        for c in codes:
+        # 各 code 自身末日：一次分组查询，替代逐只 SELECT MAX(date)
+        last_by_code: Dict[str, str] = {}
+        if not force_full:
             try:
-                row = conn.execute(
-                    "SELECT MAX(date) AS d FROM a_stock_daily WHERE code = ?",
-                    [c],
-                ).fetchone()
-                if not row or row[0] is None:
-                    need_full.append(c)
-                else:
-                    lk = _date_to_yyyymmdd(row[0])
+                rows = conn.execute(
+                    """
+                    SELECT code, MAX(date) FROM a_stock_daily
+                    WHERE code IN (SELECT UNNEST(?)) GROUP BY code
+                    """,
+                    [codes],
+                ).fetchall()
+                for c, d in rows:
+                    lk = _date_to_yyyymmdd(d)
                     if lk:
-                        incr_by_last[lk].append(c)
-                    else:
-                        need_full.append(c)
+                        last_by_code[str(c)] = lk
             except Exception:
-                need_full.append(c)
+                last_by_code = {}
 
-        nf = (len(need_full) + chunk_size - 1) // chunk_size
-        ni_total = sum(
-            (len(lst) + chunk_size - 1) // chunk_size for lst in incr_by_last.values()
+        tasks: List[Tuple[str, str, str]] = []
+        n_full = 0
+        for c in codes:
+            lk = last_by_code.get(c)
+            if lk is None:
+                n_full += 1
+            start = self._start_from_key(lk, end)
+            if start <= end:
+                tasks.append((c, start, end))
+        label = "全量重拉" if force_full else "增量"
+        _log(
+            f"开始{label}：候选 {len(codes)} 只 → 需历史回填 {n_full} 只，"
+            f"需续拉 {len(codes) - n_full} 只，已最新 {len(codes) - len(tasks)} 只；"
+            f"最新日 {max(last_by_code.values()) if last_by_code else '无'}"
         )
-        total_batches = max(1, nf + ni_total)
-        n_incr_codes = sum(len(lst) for lst in incr_by_last.values())
+        if not tasks:
+            return 0
+
+        saved_proxy = _pop_proxy_env_vars() if strip_proxy_env else {}
+        try:
+            api = self._load_api()
+            if api is None:
+                _log("未安装 akshare，跳过")
+                return 0
+            engine = self._engine(api, **kwargs)
+
+            def _on_batch(n: int, st: Any, done: int) -> None:
+                _log(
+                    f"写入批次 {st.batches_written}：+{n} 行，累计 {st.rows_written} 行；"
+                    f"已完成 {done}/{st.tasks} 只（空 {st.empty}，失败 {st.failed}，重试 {st.retries}）"
+                )
+
+            _, stats = engine.run(
+                tasks,
+                writer=lambda df: self.write(conn, df),
+                on_batch=_on_batch if verbose else None,
+            )
+        finally:
+            _restore_env(saved_proxy)
+
         _log(
-            f"开始增量：候选 {len(codes)} 只 → 需历史回填 {len(need_full)} 只（{nf} 批）"
-            f"，需续拉 {n_incr_codes} 只（末日分 {len(incr_by_last)} 组，约 {ni_total} 批）；全局最新日 {global_last}"
+            f"完成，本 run 共写入 {stats.rows_written} 行，耗时 {stats.elapsed_sec:.1f}s"
+            f"（限速等待 {stats.throttle_wait_sec:.1f}s）"
         )
-        _run_batches("历史回填", None, need_full, 1, total_batches)
-        bnum = nf + 1
-        for last_k in sorted(incr_by_last.keys()):
-            lst = incr_by_last[last_k]
-            _run_batches(f"增量(末{last_k})", last_k, lst, bnum, total_batches)
-            bnum += (len(lst) + chunk_size - 1) // chunk_size
-        _log(f"完成，本 run 共写入 {total_written} 行")
-        return total_written
+        if verbose:
+            for task, err in stats.errors:
+                _log(f"  失败 {task[0]}: {err}")
+            for code, start, _end in stats.empty_samples:
+                _log(
+                    f"  抽样诊断 {code}: "
+                    f"{self._diagnose_one_code(code, last_by_code.get(code), end, strip_proxy_env=strip_proxy_env)}"
+                )
+        return stats.rows_written
 
 
 register_source("ashare_daily_kline", AShareDailyKlineSource())
@@ -0,0 +1,275 @@
+"""
+并发限速拉取引擎：多标的按 code 拉取外部接口（如东财日 K），替代逐只串行 + ``time.sleep``。
+
+- 工作线程池：``workers`` 个线程并发执行 ``fetch_one(task, throttle)``；
+- 限速：每个上游 host 一个令牌桶（``rate`` 次/秒，突发 ``burst``），``fetch_one`` 在每次请求前
+  调用 ``throttle(host)`` 取令牌；默认桶为进程级共享，多个并发任务合计不超过限额；
+- 重试：``fetch_one`` 抛异常时按指数退避（带抖动）重试 ``max_retries`` 次；返回 None/空表视为
+  「无数据」，不重试；
+- 写入：结果进入有界队列，由**单个**写线程攒够 ``batch_rows`` 行后调用一次 ``writer(df)``，
+  DuckDB 写连接只在该线程使用。
+
+``fetch_one`` 可替换为本地桩函数，便于离线测试。
+"""
+
+from __future__ import annotations
+
+import os
+import queue
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+class TokenBucket:
+    """线程安全令牌桶：``rate`` 个/秒匀速补充，最多积累 ``burst`` 个；``rate<=0`` 表示不限速。"""
+
+    def __init__(self, rate: float, burst: float = 1.0):
+        self.rate = float(rate)
+        self.burst = max(1.0, float(burst))
+        self._tokens = self.burst
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """取 ``tokens`` 个令牌，不足时阻塞；返回等待秒数。"""
+        if self.rate <= 0:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+                self._stamp = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                delay = (tokens - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+_buckets: Dict[str, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def get_bucket(host: str) -> TokenBucket:
+    """进程级共享的上游 host 令牌桶，速率取 ``KLINE_FETCH_RATE``（次/秒，默认 8）/ ``KLINE_FETCH_BURST``。"""
+    bucket = _buckets.get(host)
+    if bucket is not None:
+        return bucket
+    with _buckets_lock:
+        bucket = _buckets.get(host)
+        if bucket is None:
+            bucket = TokenBucket(
+                rate=float(os.environ.get("KLINE_FETCH_RATE", "8")),
+                burst=float(os.environ.get("KLINE_FETCH_BURST", "8")),
+            )
+            _buckets[host] = bucket
+    return bucket
+
+
+@dataclass
+class FetchStats:
+    """一次 ``FetchEngine.run`` 的计数。"""
+
+    tasks: int = 0
+    fetched: int = 0
+    empty: int = 0
+    failed: int = 0
+    retries: int = 0
+    rows_fetched: int = 0
+    rows_written: int = 0
+    batches_written: int = 0
+    throttle_wait_sec: float = 0.0
+    elapsed_sec: float = 0.0
+    empty_samples: List[Any] = field(default_factory=list)
+    errors: List[Tuple[Any, str]] = field(default_factory=list)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+_SAMPLE_LIMIT = 3
+_DONE = object()
+
+
+class FetchEngine:
+    """
+    并发拉取 + 单写线程批量落库。
+
+    fetch_one(task, throttle) -> DataFrame | None：拉取单个任务，请求上游前调用 ``throttle(host)``。
+    rate/burst：本引擎独占的每 host 令牌桶；为 None 时使用进程级共享桶（``get_bucket``）。
+    """
+
+    def __init__(
+        self,
+        fetch_one: Callable[[Any, Callable[[str], None]], Any],
+        *,
+        workers: int = 8,
+        rate: Optional[float] = None,
+        burst: Optional[float] = None,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        batch_rows: int = 50000,
+    ):
+        self.fetch_one = fetch_one
+        self.workers = max(1, int(workers))
+        self.rate = rate
+        self.burst = burst
+        self.max_retries = max(0, int(max_retries))
+        self.backoff_base = max(0.0, float(backoff_base))
+        self.backoff_max = max(0.0, float(backoff_max))
+        self.batch_rows = max(1, int(batch_rows))
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+        self._stats = FetchStats()
+
+    @classmethod
+    def from_env(cls, fetch_one: Callable[[Any, Callable[[str], None]], Any], **overrides: Any):
+        """按环境变量构造：``KLINE_FETCH_WORKERS`` / ``KLINE_FETCH_RETRIES`` / ``KLINE_FETCH_BATCH_ROWS``。"""
+        kw: Dict[str, Any] = {
+            "workers": int(os.environ.get("KLINE_FETCH_WORKERS", "8")),
+            "max_retries": int(os.environ.get("KLINE_FETCH_RETRIES", "3")),
+            "batch_rows": int(os.environ.get("KLINE_FETCH_BATCH_ROWS", "50000")),
+        }
+        kw.update({k: v for k, v in overrides.items() if v is not None})
+        return cls(fetch_one, **kw)
+
+    def _bucket(self, host: str) -> TokenBucket:
+        if self.rate is None:
+            return get_bucket(host)
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = TokenBucket(self.rate, self.burst if self.burst is not None else 1.0)
+                self._buckets[host] = bucket
+        return bucket
+
+    def throttle(self, host: str) -> None:
+        waited = self._bucket(host).acquire()
+        if waited:
+            with self._lock:
+                self._stats.throttle_wait_sec += waited
+
+    def _call(self, task: Any) -> Tuple[Any, bool]:
+        """返回 (结果, 是否重试耗尽仍失败)。"""
+        attempt = 0
+        while True:
+            try:
+                return self.fetch_one(task, self.throttle), False
+            except Exception as e:
+                if attempt >= self.max_retries:
+                    with self._lock:
+                        self._stats.failed += 1
+                        if len(self._stats.errors) < _SAMPLE_LIMIT:
+                            self._stats.errors.append((task, repr(e)))
+                    return None, True
+                delay = min(self.backoff_max, self.backoff_base * (2**attempt))
+                attempt += 1
+                with self._lock:
+                    self._stats.retries += 1
+                if delay > 0:
+                    time.sleep(delay * random.uniform(0.5, 1.0))
+
+    def _work(self, task: Any, out: "queue.Queue[Any]", stop: threading.Event) -> None:
+        if stop.is_set():  # 写入已失败：剩余任务不再拉取
+            out.put(None)
+            return
+        df, failed = self._call(task)
+        ok = df is not None and not (hasattr(df, "empty") and df.empty)
+        with self._lock:
+            if ok:
+                self._stats.fetched += 1
+                self._stats.rows_fetched += len(df)
+            elif not failed:
+                self._stats.empty += 1
+                if len(self._stats.empty_samples) < _SAMPLE_LIMIT:
+                    self._stats.empty_samples.append(task)
+        out.put(df if ok else None)
+
+    def run(
+        self,
+        tasks: Iterable[Any],
+        writer: Optional[Callable[[Any], int]] = None,
+        on_batch: Optional[Callable[[int, FetchStats, int], None]] = None,
+    ) -> Tuple[Any, FetchStats]:
+        """
+        并发执行全部任务。writer 为 None 时返回拼接后的 DataFrame；否则由写线程分批调用
+        ``writer(df)``（返回写入行数），函数返回 (None, stats)。
+        on_batch(rows, stats, done)：每写完一批回调（在写线程中），done 为已完成任务数。
+        writer / on_batch 抛出异常时停止写入与后续拉取，写线程继续排空队列（工作线程不会阻塞在
+        有界队列上），异常在全部任务结束后于调用线程重新抛出。
+        """
+        import pandas as pd
+
+        task_list = list(tasks)
+        self._stats = FetchStats(tasks=len(task_list))
+        start = time.perf_counter()
+        # 有界队列：写入慢于拉取时让工作线程背压等待，内存占用不随标的数增长
+        results: "queue.Queue[Any]" = queue.Queue(maxsize=self.workers * 4)
+        collected: List[Any] = []
+        write_error: List[BaseException] = []
+        stop = threading.Event()
+
+        def _flush(parts: List[Any], done: int) -> None:
+            if not parts:
+                return
+            batch = pd.concat(parts, ignore_index=True)
+            if writer is None:
+                collected.append(batch)
+                return
+            n = int(writer(batch) or 0)
+            with self._lock:
+                self._stats.rows_written += n
+                self._stats.batches_written += 1
+            if on_batch is not None:
+                on_batch(n, self._stats, done)
+
+        def _safe_flush(parts: List[Any], done: int) -> None:
+            try:
+                _flush(parts, done)
+            except BaseException as e:  # 交回调用线程处理
+                write_error.append(e)
+                stop.set()
+
+        def _write_loop() -> None:
+            parts: List[Any] = []
+            rows = 0
+            done = 0
+            while True:
+                item = results.get()
+                if item is _DONE:
+                    if not stop.is_set():
+                        _safe_flush(parts, done)
+                    return
+                done += 1
+                if item is None or stop.is_set():
+                    continue  # 出错后只排空队列
+                parts.append(item)
+                rows += len(item)
+                if rows >= self.batch_rows:
+                    _safe_flush(parts, done)
+                    parts, rows = [], 0
+
+        writer_thread = threading.Thread(target=_write_loop, name="fetch-engine-writer", daemon=True)
+        writer_thread.start()
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="fetch-engine") as ex:
+                for f in [ex.submit(self._work, t, results, stop) for t in task_list]:
+                    f.result()
+        finally:
+            results.put(_DONE)
+            writer_thread.join()
+            self._stats.elapsed_sec = time.perf_counter() - start
+        if write_error:
+            raise write_error[0]
+        if writer is not None:
+            return None, self._stats
+        if not collected:
+            return pd.DataFrame(), self._stats
+        return pd.concat(collected, ignore_index=True), self._stats
@@ -1,23 +1,217 @@
-"""因子构建：基于 a_stock_daily 计算简单因子，可扩展对接 feature-engine。"""
+"""
+因子构建：a_stock_daily → features_daily（增量特征库）。
+
+每只标的的指标递推状态（EMA/Wilder 均值、VWAP 累计量、动量/波动率所需的尾部收盘价）存于
+features_state；日常刷新只读取 last_date 之后的新 K 线并向 features_daily 追加新行，耗时随新增
+bar 数增长而非全历史。无状态（新上市）的标的从全历史批量计算；仍在预热期的标的只记一条
+状态字段为 NULL 的占位行（仅 last_date），有新 K 线时才整段重算。
+``rebuild=True`` 按标的分块、bars × symbols 批量全量重算，只删除并重写 features_daily 与 features_state
+中 a_stock_daily 现有标的的行（其它代码的特征行不受影响）；补录历史 K 线或修改周期参数后使用。
+日常入口：system_core.data_orchestrator.update（日 K 更新后）与
+scripts/compute_features_to_duckdb.py（进化循环的特征步骤）。
+"""
 
 from __future__ import annotations
 
+import os
+from dataclasses import asdict, fields
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+_REBUILD_CHUNK = int(os.environ.get("FEATURES_REBUILD_CHUNK", "500"))
+
+_BAR_COLUMNS = ["open", "high", "low", "close", "volume"]
 
-def build_factors(code: str | None = None, lookback: int = 60) -> int:
+
+def _load_bars(conn, where: str = "", params: Optional[list] = None) -> pd.DataFrame:
+    return conn.execute(
+        f"""
+        SELECT d.code, d.date, d.open, d.high, d.low, d.close, d.volume
+        FROM a_stock_daily d
+        WHERE d.close IS NOT NULL {where}
+        ORDER BY d.code, d.date
+        """,
+        params or [],
+    ).fetchdf()
+
+
+def _right_aligned(
+    bars: pd.DataFrame,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, Dict[str, np.ndarray]]:
     """
-    基于日线计算动量/波动等因子，写入 features_daily 或单独因子表（当前为占位，可对接 feature-engine）。
-    code: 单只标的；None 表示全表。
-    lookback: 计算窗口。
-    返回处理条数。
+    长表（已按 code, date 排序）→ bars × symbols 矩阵，各标的最后一根 bar 对齐到最后一行，
+    较短历史前部补 NaN（kernels 视为未上市）。返回 (codes, 行号, 列号, 字段矩阵)。
     """
-    from ..storage.duckdb_manager import get_conn
+    codes, start, counts = np.unique(bars["code"].to_numpy(), return_index=True, return_counts=True)
+    n_rows = int(counts.max())
+    col = np.repeat(np.arange(len(codes)), counts)
+    row = np.arange(len(bars)) - np.repeat(start, counts) + np.repeat(n_rows - counts, counts)
+    mats = {}
+    for name in _BAR_COLUMNS:
+        m = np.full((n_rows, len(codes)), np.nan)
+        m[row, col] = bars[name].to_numpy(dtype=float)
+        mats[name] = m
+    return codes, row, col, mats
 
-    conn = get_conn()
-    # 占位：仅统计日线条数；后续可在此调用 feature_engine.build_feature_matrix 并落库
+
+def _compute_from_history(bars: pd.DataFrame, params) -> Tuple[pd.DataFrame, List[tuple]]:
+    """全历史批量计算：返回 features_daily 行与 (code, last_date, state)；预热期标的 state 为 None。"""
+    from feature_engine.incremental import FEATURE_COLUMNS, compute_with_state
+
+    if bars.empty:
+        return pd.DataFrame(), []
+    codes, row, col, mats = _right_aligned(bars)
+    feats, states = compute_with_state(
+        mats["high"], mats["low"], mats["close"], mats["volume"], params
+    )
+    out = bars.rename(columns={"code": "symbol", "date": "trade_date"}).reset_index(drop=True)
+    for name in FEATURE_COLUMNS:
+        out[name] = feats[name][row, col]
+    last_dates = bars.groupby("code", sort=True)["date"].max()
+    saved = [(str(code), last_dates[code], st) for code, st in zip(codes, states)]
+    return out, saved
+
+
+def _advance_codes(bars: pd.DataFrame, states: dict, params) -> Tuple[pd.DataFrame, List[tuple]]:
+    """对已有状态的标的只推进新 bar。"""
+    from feature_engine.incremental import FEATURE_COLUMNS, advance
+
+    if bars.empty:
+        return pd.DataFrame(), []
+    parts = []
+    saved = []
+    for code, g in bars.groupby("code", sort=False):
+        feats, st = advance(
+            states[code],
+            g["high"].to_numpy(dtype=float),
+            g["low"].to_numpy(dtype=float),
+            g["close"].to_numpy(dtype=float),
+            g["volume"].to_numpy(dtype=float),
+            params,
+        )
+        part = g.rename(columns={"code": "symbol", "date": "trade_date"})
+        for name in FEATURE_COLUMNS:
+            part[name] = feats[name]
+        parts.append(part)
+        saved.append((str(code), g["date"].iloc[-1], st))
+    return pd.concat(parts, ignore_index=True), saved
+
+
+def _load_states(conn, code: Optional[str]) -> dict:
+    from feature_engine.incremental import FeatureState
+
+    names = [f.name for f in fields(FeatureState)]
+    sql = f"SELECT code, {', '.join(names)} FROM features_state WHERE ema_fast IS NOT NULL"
+    rows = conn.execute(sql + (" AND code = ?" if code else ""), [code] if code else []).fetchall()
+    return {r[0]: FeatureState(**dict(zip(names, r[1:]))) for r in rows}
+
+
+def _write(conn, rows: pd.DataFrame, saved: List[tuple]) -> int:
+    from feature_engine.incremental import FEATURE_COLUMNS
+
+    if not rows.empty:
+        cols = ["symbol", "trade_date"] + _BAR_COLUMNS + list(FEATURE_COLUMNS)
+        # 预热期 NaN 落库为 NULL（与 scripts/compute_features_to_duckdb.py 一致）
+        select = ", ".join(f"NULLIF({c}, 'NaN'::DOUBLE)" if c in FEATURE_COLUMNS else c for c in cols)
+        conn.register("tmp_features", rows[cols])
+        conn.execute(f"""
+            INSERT OR REPLACE INTO features_daily ({", ".join(cols)})
+            SELECT {select} FROM tmp_features
+        """)
+        conn.unregister("tmp_features")
+    ready = [(code, last_date, st) for code, last_date, st in saved if st is not None]
+    warmup = [(code, last_date) for code, last_date, st in saved if st is None]
+    if warmup:
+        # 预热期占位：状态字段为 NULL，有新 K 线前不再重算
+        conn.executemany(
+            "INSERT OR REPLACE INTO features_state (code, last_date, updated_at) VALUES (?, ?, CURRENT_TIMESTAMP)",
+            warmup,
+        )
+    if ready:
+        state_df = pd.DataFrame(
+            [{"code": code, "last_date": last_date, **asdict(st)} for code, last_date, st in ready]
+        )
+        names = list(state_df.columns)
+        conn.register("tmp_features_state", state_df)
+        conn.execute(f"""
+            INSERT OR REPLACE INTO features_state ({", ".join(names)}, updated_at)
+            SELECT {", ".join(names)}, CURRENT_TIMESTAMP FROM tmp_features_state
+        """)
+        conn.unregister("tmp_features_state")
+    return len(rows)
+
+
+def _rebuild(conn, code: Optional[str], params) -> int:
     if code:
-        r = conn.execute("SELECT COUNT(*) FROM a_stock_daily WHERE code = ?", [code]).fetchone()
+        codes = [code]
     else:
-        r = conn.execute("SELECT COUNT(*) FROM a_stock_daily").fetchone()
-    n = int(r[0]) if r else 0
-    conn.close()
-    return n
+        codes = [
+            r[0]
+            for r in conn.execute(
+                "SELECT DISTINCT code FROM a_stock_daily WHERE close IS NOT NULL ORDER BY code"
+            ).fetchall()
+        ]
+    written = 0
+    for i in range(0, len(codes), _REBUILD_CHUNK):
+        chunk = codes[i : i + _REBUILD_CHUNK]
+        conn.execute("DELETE FROM features_daily WHERE symbol IN (SELECT UNNEST(?))", [chunk])
+        conn.execute("DELETE FROM features_state WHERE code IN (SELECT UNNEST(?))", [chunk])
+        bars = _load_bars(conn, "AND d.code IN (SELECT UNNEST(?))", [chunk])
+        rows, saved = _compute_from_history(bars, params)
+        written += _write(conn, rows, saved)
+    return written
+
+
+def build_factors(code: str | None = None, rebuild: bool = False, params=None) -> int:
+    """
+    基于日线计算 RSI/MACD/VWAP/ATR/动量/波动率，写入 features_daily。
+    code: 单只标的；None 表示全表。
+    rebuild: True 时删除这些标的已有的特征与状态并全量批量重算；默认增量，仅追加 last_date 之后的新行。
+    params: feature_engine.incremental.FeatureParams；修改周期后须 rebuild。
+    返回写入（新增或覆盖）的行数。
+    """
+    from feature_engine.incremental import FeatureParams
+
+    from ..storage.duckdb_manager import ensure_tables, get_conn
+
+    params = params or FeatureParams()
+    conn = get_conn()
+    try:
+        ensure_tables(conn)
+        if rebuild:
+            return _rebuild(conn, code, params)
+
+        code_filter = "AND d.code = ?" if code else ""
+        code_args = [code] if code else []
+        states = _load_states(conn, code)
+        new_bars = _load_bars(
+            conn,
+            f"""AND d.date > (
+                SELECT s.last_date FROM features_state s WHERE s.code = d.code AND s.ema_fast IS NOT NULL
+            ) {code_filter}""",
+            code_args,
+        )
+        rows, saved = _advance_codes(new_bars, states, params)
+        written = _write(conn, rows, saved)
+
+        # 无状态，或预热期占位且有新 K 线的标的：从全历史重算
+        stale = [
+            r[0]
+            for r in conn.execute(
+                f"""
+                SELECT d.code FROM a_stock_daily d LEFT JOIN features_state s ON s.code = d.code
+                WHERE d.close IS NOT NULL {code_filter}
+                GROUP BY d.code
+                HAVING MAX(s.ema_fast) IS NULL AND (MAX(s.last_date) IS NULL OR MAX(d.date) > MAX(s.last_date))
+                """,
+                code_args,
+            ).fetchall()
+        ]
+        fresh = _load_bars(conn, "AND d.code IN (SELECT UNNEST(?))", [stale]) if stale else pd.DataFrame()
+        rows, saved = _compute_from_history(fresh, params)
+        written += _write(conn, rows, saved)
+        return written
+    finally:
+        conn.close()
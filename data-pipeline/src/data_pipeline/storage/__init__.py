@@ -1,3 +1,6 @@
 from .duckdb_manager import get_db_path, get_conn, ensure_tables
+from .connection_pool import close_pools, pool_stats
+from .cold_storage import run_compaction, source_table
+from .stock_name_index import get_stock_name_index
 
-__all__ = ["get_db_path", "get_conn", "ensure_tables"]
+__all__ = ["get_db_path", "get_conn", "ensure_tables", "close_pools", "pool_stats", "run_compaction", "source_table", "get_stock_name_index"]
@@ -0,0 +1,206 @@
+"""
+冷热分层存储：把主库中超过保留期的快照 / 日 K 行压实为按年月分区的 Parquet，主库只留热数据。
+
+- 目录：``COLD_STORAGE_DIR``（默认库文件同级 ``cold/``），布局 ``<table>/year=YYYY/month=M/<batch>_<i>.parquet``；
+- 保留期：``COLD_RETAIN_DAYS_<TABLE>``（天，0 = 不压实），默认见 ``COLD_TIERS``。a_stock_daily 默认不压实：
+  回测 / 特征等大量读方直接查主表，开启前确认其只需近 N 天。audit_log / news_items 同样默认不压实：
+  /api/audit、新闻列表 / 覆盖率 / 政策接口、红山政策新闻库（按 rowid 取详情）与各采集器的 URL 去重
+  仍只查主表，开启后历史行会从这些接口消失、已压实的文章会被重复写入；迁到 ``source_table`` 之后再开启；
+- 视图：``<table>_all`` = 主表 UNION ALL BY NAME 冷分区（hive 分区 + Parquet 行组统计，按时间过滤可跳过旧文件）。
+  全表分析（情绪周期、游资胜率）经 ``source_table(conn, table)`` 读视图；
+- 压实：``compact_table`` 在一个事务内 COPY 到暂存目录 + DELETE 热行 + 在 pipeline_meta 记录批次，提交后再把
+  暂存文件移入分区目录。进程在两步之间退出时，下次运行按 pipeline_meta 是否有记录决定补移或丢弃暂存，
+  冷热两侧不会重复或丢行；
+- ``run_compaction`` 依次处理全部分层表并 CHECKPOINT（Celery ``run_cold_compaction_task`` 每日调用）。
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import logging
+import os
+import shutil
+import uuid
+from typing import Any, Dict, Iterable, Optional
+
+_log = logging.getLogger(__name__)
+
+# 表 -> (时间列, 默认热数据保留天数；0 = 不压实)
+COLD_TIERS: Dict[str, tuple] = {
+    "a_stock_realtime": ("snapshot_time", 7),
+    "a_stock_fundflow": ("snapshot_time", 30),
+    "audit_log": ("created_at", 0),  # 读方与去重未迁到 *_all 前不压实（见模块说明）
+    "news_items": ("ts", 0),
+    "a_stock_daily": ("date", 0),
+}
+
+_STAGING = "_staging"
+_PENDING_PREFIX = "cold_pending:"
+
+
+def cold_dir() -> str:
+    from .duckdb_manager import get_db_path
+
+    d = os.environ.get("COLD_STORAGE_DIR", "").strip()
+    return d or os.path.join(os.path.dirname(os.path.abspath(get_db_path())), "cold")
+
+
+def retain_days(table: str) -> int:
+    default = COLD_TIERS[table][1]
+    try:
+        return max(0, int(os.environ.get(f"COLD_RETAIN_DAYS_{table.upper()}", str(default)).strip()))
+    except ValueError:
+        return default
+
+
+def _table_dir(table: str) -> str:
+    return os.path.join(cold_dir(), table)
+
+
+def _glob(table: str) -> str:
+    return os.path.join(_table_dir(table), "year=*", "month=*", "*.parquet")
+
+
+def _has_cold_files(table: str) -> bool:
+    import glob
+
+    return bool(glob.glob(_glob(table)))
+
+
+def _sql_str(s: str) -> str:
+    return "'" + s.replace("'", "''") + "'"
+
+
+def ensure_cold_views(conn: Any, tables: Optional[Iterable[str]] = None) -> None:
+    """为分层表建 ``<table>_all`` 视图；尚无冷文件时视图只含主表。"""
+    for table in tables or COLD_TIERS:
+        if _has_cold_files(table):
+            cold = (
+                f"SELECT * EXCLUDE (year, month) FROM read_parquet({_sql_str(_glob(table))}, "
+                "hive_partitioning = true, union_by_name = true)"
+            )
+            conn.execute(f"CREATE OR REPLACE VIEW {table}_all AS SELECT * FROM {table} UNION ALL BY NAME {cold}")
+        else:
+            conn.execute(f"CREATE OR REPLACE VIEW {table}_all AS SELECT * FROM {table}")
+
+
+def source_table(conn: Any, table: str) -> str:
+    """分析查询的数据源：``<table>_all`` 视图存在时用视图（含冷分区），否则主表。"""
+    try:
+        n = conn.execute(
+            "SELECT COUNT(*) FROM duckdb_views() WHERE view_name = ?", [f"{table}_all"]
+        ).fetchone()[0]
+        return f"{table}_all" if n else table
+    except Exception:
+        return table
+
+
+def _meta_batches(conn: Any, table: str) -> set:
+    rows = conn.execute(
+        "SELECT v FROM pipeline_meta WHERE k LIKE ?", [f"{_PENDING_PREFIX}{table}:%"]
+    ).fetchall()
+    return {r[0] for r in rows}
+
+
+def _publish_batch(table: str, batch: str) -> int:
+    """把暂存批次文件移入正式分区目录，返回文件数。"""
+    src_root = os.path.join(_table_dir(table), _STAGING, batch)
+    moved = 0
+    for dirpath, _dirs, files in os.walk(src_root):
+        rel = os.path.relpath(dirpath, src_root)
+        for name in files:
+            if not name.endswith(".parquet"):
+                continue
+            dst_dir = os.path.join(_table_dir(table), rel)
+            os.makedirs(dst_dir, exist_ok=True)
+            os.replace(os.path.join(dirpath, name), os.path.join(dst_dir, f"{batch}_{name}"))
+            moved += 1
+    shutil.rmtree(src_root, ignore_errors=True)
+    return moved
+
+
+def recover_staging(conn: Any, table: str) -> None:
+    """处理上次中断留下的暂存批次：已提交（pipeline_meta 有记录）的补移入分区，未提交的删除。"""
+    staging = os.path.join(_table_dir(table), _STAGING)
+    if not os.path.isdir(staging):
+        return
+    committed = _meta_batches(conn, table)
+    for batch in os.listdir(staging):
+        if batch in committed:
+            _publish_batch(table, batch)
+        else:
+            shutil.rmtree(os.path.join(staging, batch), ignore_errors=True)
+    for batch in committed:
+        conn.execute("DELETE FROM pipeline_meta WHERE k = ?", [f"{_PENDING_PREFIX}{table}:{batch}"])
+
+
+def compact_table(conn: Any, table: str, days: Optional[int] = None, now: Optional[dt.datetime] = None) -> Dict[str, Any]:
+    """
+    把 table 中时间列早于 now - days 的行移到冷分区；返回 {table, cutoff, rows, files}。
+    days 为 0 或表中无过期行时不做任何事。
+    """
+    col = COLD_TIERS[table][0]
+    days = retain_days(table) if days is None else days
+    out: Dict[str, Any] = {"table": table, "cutoff": None, "rows": 0, "files": 0}
+    if days <= 0:
+        return out
+    recover_staging(conn, table)
+    cutoff = (now or dt.datetime.now()) - dt.timedelta(days=days)
+    if col == "date":
+        cutoff = cutoff.date()
+    out["cutoff"] = cutoff.isoformat()
+    n = conn.execute(f"SELECT COUNT(*) FROM {table} WHERE {col} < ?", [cutoff]).fetchone()[0]
+    if not n:
+        return out
+
+    batch = f"b{dt.datetime.now():%Y%m%d%H%M%S}_{uuid.uuid4().hex[:8]}"
+    stage = os.path.join(_table_dir(table), _STAGING, batch)
+    os.makedirs(os.path.dirname(stage), exist_ok=True)
+    conn.execute("BEGIN TRANSACTION")
+    try:
+        conn.execute(
+            f"COPY (SELECT *, year({col}) AS year, month({col}) AS month FROM {table} WHERE {col} < ?) "
+            f"TO {_sql_str(stage)} (FORMAT parquet, PARTITION_BY (year, month), FILENAME_PATTERN 'part_{{i}}')",
+            [cutoff],
+        )
+        conn.execute(f"DELETE FROM {table} WHERE {col} < ?", [cutoff])
+        conn.execute(
+            "INSERT INTO pipeline_meta (k, v, updated_at) VALUES (?, ?, CURRENT_TIMESTAMP)",
+            [f"{_PENDING_PREFIX}{table}:{batch}", batch],
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        shutil.rmtree(stage, ignore_errors=True)
+        raise
+    out["rows"] = int(n)
+    out["files"] = _publish_batch(table, batch)
+    conn.execute("DELETE FROM pipeline_meta WHERE k = ?", [f"{_PENDING_PREFIX}{table}:{batch}"])
+    return out
+
+
+def run_compaction(conn: Any = None, tables: Optional[Iterable[str]] = None, now: Optional[dt.datetime] = None) -> Dict[str, Any]:
+    """压实全部分层表（单表失败记入 errors 不影响其余），重建 ``*_all`` 视图并 CHECKPOINT 回收空间。"""
+    from .duckdb_manager import ensure_tables, get_conn
+
+    own = conn is None
+    c = get_conn(read_only=False) if own else conn
+    result: Dict[str, Any] = {"tables": [], "errors": {}}
+    try:
+        ensure_tables(c)
+        for table in tables or COLD_TIERS:
+            try:
+                result["tables"].append(compact_table(c, table, now=now))
+            except Exception as e:
+                _log.warning("cold compaction failed for %s: %s", table, e)
+                result["errors"][table] = str(e)
+        ensure_cold_views(c)
+        if any(t["rows"] for t in result["tables"]):
+            try:
+                c.execute("CHECKPOINT")
+            except Exception:
+                pass
+    finally:
+        if own:
+            c.close()
+    return result
@@ -0,0 +1,408 @@
+"""
+进程级 DuckDB 连接池
+
+每个库文件在进程内只保留一个 ``duckdb.connect`` 实例，``get_conn()`` 从该实例借出游标
+（``DuckDBPyConnection.cursor()``），调用方原有的 ``conn.close()`` 只是把游标归还池中，
+不再反复打开/关闭文件。读写实例首次打开时执行一次 ``ensure_tables``，之后对池化连接调用
+``ensure_tables`` 直接返回。
+
+- 模式：实例按第一个借用者的需要打开。只有 ``read_only=True`` 请求时以真正的 DuckDB 只读模式打开
+  （只持共享锁，其它进程仍可只读打开）；写请求到来时等只读游标归还后重开为读写实例。
+  DuckDB 不允许同一进程对同一文件混用两种模式，因此读写实例打开期间的只读请求共用该实例，
+  游标按语句首词拦截写入。
+- 文件锁：空闲（无借出游标）超过 ``QUANT_DB_POOL_IDLE_SEC`` 秒（默认 2）即关闭实例、释放文件锁，
+  Celery worker、采集脚本等其它进程可以打开同一文件；单进程独占库文件时可设为 0（永不关闭）。
+- 池大小：``QUANT_DB_POOL_SIZE``（默认 16）；借满后等待，超过 ``QUANT_DB_POOL_TIMEOUT`` 秒报错。
+- 嵌套借用：按线程记录借出游标数。已持有游标的线程再借只读游标不让位给排队的写者（写者本就在等
+  它归还）；持有只读实例游标的线程再借读写游标无法升级，立即抛 ``PoolUpgradeError`` 而不是等到超时。
+- 关闭：``QUANT_DB_POOL=0`` 回到每次调用 ``duckdb.connect`` 的旧行为。
+- 指标：``pool_stats()`` 返回各库的借出/空闲/等待次数、等待耗时与当前模式，Gateway ``/metrics`` 暴露。
+
+归还时回滚未提交事务、注销该游标上 ``register`` 的临时视图，避免状态泄漏给下一个借用者。
+DuckDB Python API 不支持向 ``EXECUTE`` 绑定参数，预编译语句缓存不可行；长驻游标省去的是
+文件打开、目录加载与每请求的 DDL 检查。
+"""
+
+from __future__ import annotations
+
+import atexit
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+
+def pool_enabled() -> bool:
+    return os.environ.get("QUANT_DB_POOL", "1").strip().lower() not in ("0", "false", "no", "off")
+
+
+# 只读请求共用本进程已打开的读写实例时，游标只放行这些语句（按语句首词拦截写入）
+_READ_ONLY_VERBS = ("SELECT", "WITH", "FROM", "PRAGMA", "DESCRIBE", "SHOW", "EXPLAIN", "SUMMARIZE")
+
+
+def _check_read_only(query: Any) -> None:
+    head = str(query).lstrip().lstrip("(").lstrip()
+    verb = head.split(None, 1)[0].upper() if head else ""
+    if verb not in _READ_ONLY_VERBS:
+        import duckdb
+
+        raise duckdb.PermissionException(f"read-only connection: {verb or 'empty'} not allowed")
+
+
+class PoolTimeout(RuntimeError):
+    """连接池借出超时（所有游标都在使用中）。"""
+
+
+class PoolUpgradeError(RuntimeError):
+    """本线程仍持有只读实例的游标时请求读写游标：升级要等自己归还，只会死锁。"""
+
+
+class PooledConnection:
+    """借出的游标代理：属性访问转发给 DuckDB 游标，``close()`` 归还而非关闭。"""
+
+    def __init__(self, pool: "DuckDBPool", cursor: Any, read_only: bool = False, owner: int = 0):
+        self._pool = pool
+        self._cursor = cursor
+        self._read_only = read_only
+        self._owner = owner
+        self._registered: List[str] = []
+
+    def __getattr__(self, name: str) -> Any:
+        cursor = self.__dict__.get("_cursor")
+        if cursor is None:
+            raise AttributeError(f"connection already returned to pool ({name})")
+        return getattr(cursor, name)
+
+    @property
+    def tables_ensured(self) -> bool:
+        return self._pool.tables_ensured
+
+    def mark_tables_ensured(self) -> None:
+        self._pool.tables_ensured = True
+
+    # 与 DuckDB 一致返回连接本身（这里是代理），结果集消费完之前游标不会被归还
+    def execute(self, query: Any, parameters: Any = None) -> "PooledConnection":
+        if self._read_only:
+            _check_read_only(query)
+        if parameters is None:
+            self._cursor.execute(query)
+        else:
+            self._cursor.execute(query, parameters)
+        return self
+
+    def executemany(self, query: Any, parameters: Any = None) -> "PooledConnection":
+        if self._read_only:
+            _check_read_only(query)
+        self._cursor.executemany(query, parameters or [])
+        return self
+
+    def sql(self, query: Any, *args: Any, **kwargs: Any) -> Any:
+        if self._read_only:
+            _check_read_only(query)
+        return self._cursor.sql(query, *args, **kwargs)
+
+    # 结果读取方法显式绑定在代理上：``get_conn().execute(q).fetchone()`` 调用期间代理仍存活
+    def fetchone(self, *args: Any, **kwargs: Any) -> Any:
+        return self._cursor.fetchone(*args, **kwargs)
+
+    def fetchall(self, *args: Any, **kwargs: Any) -> Any:
+        return self._cursor.fetchall(*args, **kwargs)
+
+    def fetchmany(self, *args: Any, **kwargs: Any) -> Any:
+        return self._cursor.fetchmany(*args, **kwargs)
+
+    def fetchdf(self, *args: Any, **kwargs: Any) -> Any:
+        return self._cursor.fetchdf(*args, **kwargs)
+
+    def df(self, *args: Any, **kwargs: Any) -> Any:
+        return self._cursor.df(*args, **kwargs)
+
+    def fetchnumpy(self, *args: Any, **kwargs: Any) -> Any:
+        return self._cursor.fetchnumpy(*args, **kwargs)
+
+    def arrow(self, *args: Any, **kwargs: Any) -> Any:
+        return self._cursor.arrow(*args, **kwargs)
+
+    def register(self, view_name: str, python_object: Any) -> Any:
+        self._registered.append(view_name)
+        return self._cursor.register(view_name, python_object)
+
+    def unregister(self, view_name: str) -> Any:
+        if view_name in self._registered:
+            self._registered.remove(view_name)
+        return self._cursor.unregister(view_name)
+
+    def close(self) -> None:
+        cursor, self._cursor = self._cursor, None
+        if cursor is not None:
+            self._pool._release(cursor, self._registered, self._owner)
+
+    def __enter__(self) -> "PooledConnection":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __del__(self) -> None:
+        # 调用方异常路径漏掉 close() 时，引用计数归零即归还
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class DuckDBPool:
+    """单个库文件的长驻实例 + 游标池；实例按需以只读或读写模式打开。"""
+
+    def __init__(
+        self, path: str, max_size: int = 16, timeout: float = 30.0, idle_close_sec: float = 0.0
+    ):
+        self.path = path
+        self.max_size = max(1, int(max_size))
+        self.timeout = float(timeout)
+        self.idle_close_sec = float(idle_close_sec)
+        self.tables_ensured = False
+        self._db: Any = None
+        self._db_read_only = False
+        self._writers_waiting = 0
+        self._closing = False
+        self._idle_timer: Optional[threading.Timer] = None
+        self._idle: List[Any] = []
+        self._in_use = 0
+        self._held: Dict[int, int] = {}  # 线程 ident → 该线程借出未还的游标数
+        self._cond = threading.Condition()
+        self._stats: Dict[str, float] = {
+            "acquired_total": 0,
+            "cursors_created": 0,
+            "waits_total": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+            "timeouts_total": 0,
+            "opens_total": 0,
+        }
+
+    def _open(self, read_only: bool) -> None:
+        """打开库实例（调用方持有 ``_cond``）；读写实例首次打开时执行一次 ensure_tables。"""
+        import duckdb
+
+        if read_only and not os.path.exists(self.path):
+            read_only = False  # 只读无法创建库文件：首次以读写打开并建表
+        self._db = duckdb.connect(self.path, read_only=read_only)
+        self._db_read_only = read_only
+        self._stats["opens_total"] += 1
+        if not read_only and not self.tables_ensured:
+            from .duckdb_manager import ensure_tables
+
+            try:
+                ensure_tables(self._db)
+                self.tables_ensured = True
+                # 建表/补列 DDL 立即落盘：长驻实例的 WAL 若含 ``DEFAULT CURRENT_TIMESTAMP`` 列定义，
+                # 进程未正常关闭时 DuckDB 无法回放（internal error），整个库文件打不开
+                self._db.execute("CHECKPOINT")
+            except Exception:
+                pass  # 旧库 DDL 冲突时保持旧行为：由调用方的 ensure_tables 自行处理
+
+    def _drop_instance(self) -> None:
+        """关闭空闲实例及其游标（调用方持有 ``_cond`` 且 ``_in_use == 0``）。"""
+        idle, self._idle = self._idle, []
+        db, self._db = self._db, None
+        for c in idle:
+            try:
+                c.close()
+            except Exception:
+                pass
+        if db is not None:
+            db.close()
+
+    def _blocked(self, read_only: bool, held: int) -> bool:
+        """调用方持有 ``_cond``：当前是否需要等待；``held`` 为本线程已借出的游标数。"""
+        if not read_only and self._db is not None and self._db_read_only:
+            if held:
+                raise PoolUpgradeError(
+                    f"thread holds {held} read-only cursor(s) on {self.path}; "
+                    "close them before requesting a read-write connection"
+                )
+            if self._in_use:
+                return True  # 只读实例升级为读写：等借出的只读游标全部归还
+            self._drop_instance()
+        if read_only and not held and self._writers_waiting and (self._db is None or self._db_read_only):
+            # 写者优先：读者稍后共用写者打开的读写实例，避免持续的读请求饿死写者。
+            # 已持有游标的线程（嵌套读）不让位：写者正等它归还，让位即互相等到超时
+            return True
+        return not self._idle and self._in_use >= self.max_size
+
+    def acquire(self, read_only: bool = False) -> PooledConnection:
+        start = time.perf_counter()
+        waited = False
+        owner = threading.get_ident()
+        with self._cond:
+            held = self._held.get(owner, 0)
+            if not read_only:
+                self._writers_waiting += 1
+            try:
+                while self._blocked(read_only, held):
+                    waited = True
+                    remaining = self.timeout - (time.perf_counter() - start)
+                    if remaining <= 0:
+                        self._record_wait(time.perf_counter() - start)
+                        self._stats["timeouts_total"] += 1
+                        raise PoolTimeout(
+                            f"DuckDB pool exhausted ({self.max_size} in use) for {self.path}"
+                        )
+                    self._cond.wait(remaining)
+            finally:
+                if not read_only:
+                    self._writers_waiting -= 1
+            if self._idle_timer is not None:
+                self._idle_timer.cancel()
+                self._idle_timer = None
+            self._closing = False
+            if self._db is None:
+                self._open(read_only)
+            cursor = self._idle.pop() if self._idle else None
+            self._in_use += 1
+            self._held[owner] = held + 1
+            self._stats["acquired_total"] += 1
+            if waited:
+                self._record_wait(time.perf_counter() - start)
+            # 只读请求共用本进程已打开的读写实例时，才按语句首词拦截写入
+            filtered = read_only and not self._db_read_only
+            db = self._db
+        if cursor is None:
+            try:
+                cursor = db.cursor()
+            except Exception:
+                with self._cond:
+                    self._in_use -= 1
+                    self._forget_holder(owner)
+                    self._cond.notify_all()
+                raise
+            with self._cond:
+                self._stats["cursors_created"] += 1
+        return PooledConnection(self, cursor, read_only=filtered, owner=owner)
+
+    def _forget_holder(self, owner: int) -> None:
+        """调用方持有 ``_cond``：归还一个 ``owner`` 线程借出的游标。"""
+        n = self._held.get(owner, 0) - 1
+        if n > 0:
+            self._held[owner] = n
+        else:
+            self._held.pop(owner, None)
+
+    def _record_wait(self, wait: float) -> None:
+        self._stats["waits_total"] += 1
+        self._stats["wait_seconds_total"] += wait
+        self._stats["wait_seconds_max"] = max(self._stats["wait_seconds_max"], wait)
+
+    def _release(self, cursor: Any, registered: List[str], owner: int = 0) -> None:
+        reusable = True
+        try:
+            try:
+                cursor.execute("ROLLBACK")
+            except Exception:
+                pass  # 无进行中的事务
+            for name in registered:
+                cursor.unregister(name)
+        except Exception:
+            reusable = False
+        with self._cond:
+            self._in_use -= 1
+            self._forget_holder(owner)
+            if reusable and self._db is not None:
+                self._idle.append(cursor)
+            self._cond.notify_all()
+            idle_now = self._in_use == 0 and self._db is not None
+            close_now = idle_now and self._closing
+            if idle_now and not close_now and self.idle_close_sec > 0:
+                self._idle_timer = threading.Timer(self.idle_close_sec, self._close_if_idle)
+                self._idle_timer.daemon = True
+                self._idle_timer.start()
+        if not reusable:
+            try:
+                cursor.close()
+            except Exception:
+                pass
+        if close_now:
+            self.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "path": self.path,
+                "max_size": self.max_size,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "mode": None if self._db is None else ("read_only" if self._db_read_only else "read_write"),
+                **self._stats,
+            }
+
+    def _close_if_idle(self) -> None:
+        with self._cond:
+            if self._in_use:
+                return
+            self._idle_timer = None
+        self.close()
+
+    def close(self) -> None:
+        with self._cond:
+            if self._in_use:
+                # 仍有借出游标：先丢弃空闲游标，实例在最后一个游标归还时关闭
+                idle, self._idle = self._idle, []
+                db = None
+                self._closing = True
+            else:
+                idle, self._idle = self._idle, []
+                db, self._db = self._db, None
+        for c in idle:
+            try:
+                c.close()
+            except Exception:
+                pass
+        if db is not None:
+            db.close()
+
+
+_pools: Dict[str, DuckDBPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(path: str) -> DuckDBPool:
+    key = os.path.abspath(path)
+    pool = _pools.get(key)
+    if pool is not None:
+        return pool
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = DuckDBPool(
+                key,
+                max_size=int(os.environ.get("QUANT_DB_POOL_SIZE", "16")),
+                timeout=float(os.environ.get("QUANT_DB_POOL_TIMEOUT", "30")),
+                idle_close_sec=float(os.environ.get("QUANT_DB_POOL_IDLE_SEC", "2")),
+            )
+            _pools[key] = pool
+    return pool
+
+
+def pool_stats() -> List[Dict[str, Any]]:
+    """各池化库的使用指标（路径、借出/空闲数、累计借出、等待次数与耗时、超时次数）。"""
+    with _pools_lock:
+        pools = list(_pools.values())
+    return [p.stats() for p in pools]
+
+
+def close_pools(path: Optional[str] = None) -> None:
+    """关闭并移除连接池（``path`` 为空时全部）；外部进程需要独占写锁或测试切换库文件时使用。"""
+    with _pools_lock:
+        if path is None:
+            pools = list(_pools.values())
+            _pools.clear()
+        else:
+            p = _pools.pop(os.path.abspath(path), None)
+            pools = [p] if p else []
+    for p in pools:
+        p.close()
+
+
+# 解释器退出时关闭实例（DuckDB 关闭即 checkpoint），不把未落盘的 WAL 留给下一个进程
+atexit.register(close_pools)
@@ -62,16 +62,35 @@ def get_conn(read_only: bool = False):
     （须先关闭其一再开另一配置）。Gateway 审计中间件在请求结束后单独开写连接，与路由内
     短时只读连接可顺序共存。纯统计类路由（如 ``/api/system/data-overview``）用
     read_only=True，可与**其它进程**的长写连接并发读，避免文件锁冲突。
+
+    默认从进程级连接池借出游标（见 ``connection_pool``）：同一进程所有调用共享一个实例，只有只读请求时
+    以 DuckDB 只读模式打开，有写请求时为读写实例；空闲 ``QUANT_DB_POOL_IDLE_SEC`` 秒后关闭、释放文件锁。
+    ``conn.close()`` 归还游标。``QUANT_DB_POOL=0`` 关闭池化。
     """
     path = get_db_path()
     os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
     import duckdb
 
-    return duckdb.connect(path, read_only=read_only)
+    from .connection_pool import get_pool, pool_enabled
+
+    if not pool_enabled() or path == ":memory:":
+        return duckdb.connect(path, read_only=read_only)
+    try:
+        return get_pool(path).acquire(read_only=read_only)
+    except duckdb.IOException:
+        # 其它进程持有写锁时池无法打开读写实例；只读请求退回独立只读连接
+        if not read_only:
+            raise
+        return duckdb.connect(path, read_only=True)
 
 
 def ensure_tables(conn) -> None:
-    """创建本仓 DuckDB 所需全部表（若不存在）；旧库缺列时由下方 ALTER 补齐。"""
+    """
+    创建本仓 DuckDB 所需全部表（若不存在）；旧库缺列时由下方 ALTER 补齐。
+    池化连接所在实例已执行过时直接返回（每进程每库只跑一次 DDL）。
+    """
+    if getattr(conn, "tables_ensured", False):
+        return
     conn.execute("""
         CREATE TABLE IF NOT EXISTS a_stock_basic (
             code VARCHAR PRIMARY KEY,
@@ -105,6 +124,26 @@ def ensure_tables(conn) -> None:
             snapshot_time TIMESTAMP
         )
     """)
+    # 每只标的最新行情（6 位代码主键），采集写快照时同步 upsert；见 storage/latest_quote.py
+    has_latest = conn.execute(
+        "SELECT COUNT(*) FROM duckdb_tables() WHERE table_name = 'latest_quote'"
+    ).fetchone()[0]
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS latest_quote (
+            code VARCHAR PRIMARY KEY,
+            name VARCHAR,
+            latest_price DOUBLE,
+            change_pct DOUBLE,
+            volume BIGINT,
+            amount DOUBLE,
+            snapshot_time TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    if not has_latest:
+        from .latest_quote import rebuild_latest_quotes
+
+        rebuild_latest_quotes(conn)
     conn.execute("""
         CREATE TABLE IF NOT EXISTS a_stock_fundflow (
             code VARCHAR,
@@ -301,6 +340,16 @@ def ensure_tables(conn) -> None:
             updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
     """)
+    # 回测结果缓存（backtest_engine.result_cache：参数哈希 + 日 K/信号数据版本 → 结果 JSON）
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS backtest_result_cache (
+            cache_key VARCHAR PRIMARY KEY,
+            signal_source VARCHAR,
+            data_version VARCHAR,
+            result_json VARCHAR,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
     conn.execute("""
         CREATE TABLE IF NOT EXISTS backtest_task_errors (
             id INTEGER PRIMARY KEY,
@@ -374,6 +423,38 @@ def ensure_tables(conn) -> None:
             sentiment_label VARCHAR
         )
     """)
+    # 新闻关联个股（逗号分隔 6 位代码；政策新闻入库时由 stock_name_index 标注）
+    try:
+        conn.execute("ALTER TABLE news_items ADD COLUMN related_codes VARCHAR")
+    except Exception:
+        pass
+    # 日线特征（etl.factor_builder 增量追加）+ 每只标的的指标递推状态
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS features_daily (
+            symbol VARCHAR NOT NULL,
+            trade_date DATE NOT NULL,
+            open DOUBLE, high DOUBLE, low DOUBLE, close DOUBLE, volume DOUBLE,
+            rsi DOUBLE, macd DOUBLE, macd_signal DOUBLE, macd_hist DOUBLE,
+            vwap DOUBLE, atr DOUBLE, momentum DOUBLE, volatility DOUBLE,
+            PRIMARY KEY (symbol, trade_date)
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS features_state (
+            code VARCHAR PRIMARY KEY,
+            last_date DATE NOT NULL,
+            ema_fast DOUBLE,
+            ema_slow DOUBLE,
+            macd_signal DOUBLE,
+            avg_gain DOUBLE,
+            avg_loss DOUBLE,
+            atr DOUBLE,
+            cum_tpv DOUBLE,
+            cum_vol DOUBLE,
+            closes DOUBLE[],
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
     # 审计日志：API 请求记录（认证与审计）
     conn.execute("""
         CREATE TABLE IF NOT EXISTS audit_log (
@@ -384,6 +465,13 @@ def ensure_tables(conn) -> None:
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
     """)
+    # audit_log.id 由序列分配（替代 MAX(id)+1）；旧库首次建序列时从现有最大 id 之后开始
+    has_seq = conn.execute(
+        "SELECT COUNT(*) FROM duckdb_sequences() WHERE sequence_name = 'audit_log_id_seq'"
+    ).fetchone()[0]
+    if not has_seq:
+        start = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM audit_log").fetchone()[0]
+        conn.execute(f"CREATE SEQUENCE IF NOT EXISTS audit_log_id_seq START {int(start)}")
     # 风控规则：可配置单票上限、回撤、敞口等
     conn.execute("""
         CREATE TABLE IF NOT EXISTS risk_rules (
@@ -417,14 +505,30 @@ def ensure_tables(conn) -> None:
             filled_at TIMESTAMP
         )
     """)
+    # sim_orders.id 由序列分配（多个写者各自的内存账本不会撞主键）；旧库从现有最大 id 之后开始
+    has_seq = conn.execute(
+        "SELECT COUNT(*) FROM duckdb_sequences() WHERE sequence_name = 'sim_orders_id_seq'"
+    ).fetchone()[0]
+    if not has_seq:
+        start = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM sim_orders").fetchone()[0]
+        conn.execute(f"CREATE SEQUENCE IF NOT EXISTS sim_orders_id_seq START {int(start)}")
+    # seq：写入序号（每次插入/覆盖取新值），增量同步按它取新快照；snapshot_time 可能是回放写入的历史时刻
+    conn.execute("CREATE SEQUENCE IF NOT EXISTS sim_account_snapshots_seq")
     conn.execute("""
         CREATE TABLE IF NOT EXISTS sim_account_snapshots (
             snapshot_time TIMESTAMP PRIMARY KEY,
             cash DOUBLE NOT NULL,
             equity DOUBLE NOT NULL,
-            total_assets DOUBLE NOT NULL
+            total_assets DOUBLE NOT NULL,
+            seq BIGINT DEFAULT nextval('sim_account_snapshots_seq')
         )
     """)
+    try:
+        conn.execute(
+            "ALTER TABLE sim_account_snapshots ADD COLUMN seq BIGINT DEFAULT nextval('sim_account_snapshots_seq')"
+        )
+    except Exception:
+        pass
     # 数据质量巡检报告（scripts/run_data_quality_checks.py 写入）
     conn.execute("""
         CREATE TABLE IF NOT EXISTS data_quality_reports (
@@ -511,3 +615,13 @@ def ensure_tables(conn) -> None:
         conn.execute("ALTER TABLE hongshan_paper_orders ADD COLUMN filled_at TIMESTAMP")
     except Exception:
         pass
+    # 冷热分层的 <table>_all 视图（主表 + 冷分区 Parquet）；见 storage/cold_storage.py
+    try:
+        from .cold_storage import ensure_cold_views
+
+        ensure_cold_views(conn)
+    except Exception:
+        pass
+    mark = getattr(conn, "mark_tables_ensured", None)
+    if mark is not None:
+        mark()
@@ -0,0 +1,130 @@
+"""
+latest_quote：每只标的最新行情（主键为 6 位数字代码）
+
+a_stock_realtime 是追加写入的快照流水，"某只股票现价"需要 ``ORDER BY snapshot_time DESC LIMIT 1``，
+且各处对 code 做 ``split_part(upper(trim(...)))`` 归一化后无法利用任何裁剪。采集写入快照时同步
+``upsert_latest_quotes``（仅当新快照时间不早于已有值才覆盖），查询侧：
+
+- 单只：``lookup_quote(conn, code)`` → 主键点查；
+- 批量：``lookup_quotes(conn, codes)`` → 一条 SQL 将代码列表与 latest_quote 关联，缺实时价的
+  再取 a_stock_daily 最近收盘价与 a_stock_basic 名称，整批委托一次解析。
+
+建表时若 latest_quote 为空，从 a_stock_realtime 按代码取最新一条回填（``rebuild_latest_quotes``）。
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+# SQL 侧代码归一化：与 normalize_code 一致（去空白/后缀，取前 6 位数字）
+CODE6_SQL = "left(regexp_replace(split_part(upper(trim(CAST({col} AS VARCHAR))), '.', 1), '[^0-9]', '', 'g'), 6)"
+
+_QUOTE_COLUMNS = ("name", "latest_price", "change_pct", "volume", "amount", "snapshot_time")
+
+
+def normalize_code(code: Any) -> str:
+    """'600519.SH' / ' sh600519 ' / 600519 → '600519'；无数字时返回空串。"""
+    head = str(code or "").strip().upper().split(".", 1)[0]
+    return "".join(c for c in head if c.isdigit())[:6]
+
+
+def code6_sql(col: str) -> str:
+    return CODE6_SQL.format(col=col)
+
+
+def _raw_variants(keys: Iterable[str]) -> list:
+    """6 位代码 → 库中可能出现的原始写法（纯数字 / 带交易所后缀）。"""
+    return [f"{k}{sfx}" for k in keys for sfx in ("", ".SH", ".SZ", ".BJ")]
+
+
+def upsert_latest_quotes(conn: Any, view: str) -> int:
+    """
+    用已 register 的快照视图（列含 code + _QUOTE_COLUMNS）更新 latest_quote；
+    同一代码取视图内最新一条，且只覆盖 snapshot_time 更早的已有行。返回视图内有效代码数。
+    """
+    cols = ", ".join(_QUOTE_COLUMNS)
+    sets = ", ".join(f"{c} = EXCLUDED.{c}" for c in _QUOTE_COLUMNS)
+    conn.execute(f"""
+        INSERT INTO latest_quote (code, {cols}, updated_at)
+        SELECT code6, {cols}, CURRENT_TIMESTAMP FROM (
+            SELECT {code6_sql("code")} AS code6, {cols},
+                ROW_NUMBER() OVER (
+                    PARTITION BY {code6_sql("code")} ORDER BY snapshot_time DESC NULLS LAST
+                ) AS rn
+            FROM {view}
+        ) s
+        WHERE rn = 1 AND code6 <> ''
+        ON CONFLICT (code) DO UPDATE SET {sets}, updated_at = EXCLUDED.updated_at
+        WHERE latest_quote.snapshot_time IS NULL
+           OR EXCLUDED.snapshot_time >= latest_quote.snapshot_time
+    """)
+    row = conn.execute(
+        f"SELECT COUNT(DISTINCT {code6_sql('code')}) FROM {view} WHERE {code6_sql('code')} <> ''"
+    ).fetchone()
+    return int(row[0] or 0) if row else 0
+
+
+def rebuild_latest_quotes(conn: Any) -> int:
+    """从 a_stock_realtime 全表重建 latest_quote（建表回填 / 修复用）；返回行数。"""
+    conn.execute("DELETE FROM latest_quote")
+    return upsert_latest_quotes(conn, "a_stock_realtime")
+
+
+def lookup_quotes(
+    conn: Any, codes: Iterable[Any], daily_fallback: bool = True
+) -> Dict[str, Tuple[Optional[float], Optional[str]]]:
+    """
+    批量取 {code6: (最新价, 名称)}：优先 latest_quote.latest_price；daily_fallback 时无实时价的
+    取 a_stock_daily 最近一日 close，名称缺失时补 a_stock_basic.name。查不到的代码不出现在结果中。
+    """
+    keys = sorted({normalize_code(c) for c in codes} - {""})
+    if not keys:
+        return {}
+    params: list = [keys]
+    if daily_fallback:
+        # 日线/股票池按原始 code 精确匹配常见写法后再归一化，避免对全表逐行做正则
+        params.append(_raw_variants(keys))
+        sql = f"""
+            WITH k AS (SELECT UNNEST(?) AS code),
+            raw AS (SELECT UNNEST(?) AS code),
+            d AS (
+                SELECT {code6_sql("code")} AS code, arg_max(close, date) AS close
+                FROM a_stock_daily
+                WHERE code IN (SELECT code FROM raw) AND close IS NOT NULL
+                GROUP BY 1
+            ),
+            b AS (
+                SELECT {code6_sql("code")} AS code, any_value(name) AS name
+                FROM a_stock_basic
+                WHERE code IN (SELECT code FROM raw)
+                GROUP BY 1
+            )
+            SELECT k.code,
+                CASE WHEN q.latest_price IS NOT NULL THEN q.latest_price ELSE d.close END,
+                CASE WHEN q.latest_price IS NOT NULL AND NULLIF(TRIM(q.name), '') IS NOT NULL
+                     THEN q.name ELSE b.name END
+            FROM k
+            LEFT JOIN latest_quote q ON q.code = k.code
+            LEFT JOIN d ON d.code = k.code
+            LEFT JOIN b ON b.code = k.code
+        """
+    else:
+        sql = """
+            SELECT q.code, q.latest_price, q.name
+            FROM latest_quote q
+            WHERE q.code IN (SELECT UNNEST(?)) AND q.latest_price IS NOT NULL
+        """
+    out: Dict[str, Tuple[Optional[float], Optional[str]]] = {}
+    for code, price, name in conn.execute(sql, params).fetchall():
+        if price is None:
+            continue
+        out[str(code)] = (float(price), (str(name).strip() or None) if name else None)
+    return out
+
+
+def lookup_quote(
+    conn: Any, code: Any, daily_fallback: bool = True
+) -> Tuple[Optional[float], Optional[str]]:
+    """单只 (最新价, 名称)；无数据时 (None, None)。"""
+    c6 = normalize_code(code)
+    return lookup_quotes(conn, [c6], daily_fallback=daily_fallback).get(c6, (None, None))
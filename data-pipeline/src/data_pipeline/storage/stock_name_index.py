@@ -0,0 +1,302 @@
+"""
+股票名称实体索引：a_stock_basic 简称 → Aho-Corasick 自动机 + 代码 / 别名 / 拼音首字母查找表。
+
+- 抽取：``StockNameIndex.extract(text)`` 一次扫描文本得到全部简称命中（与文本长度线性，和名称数量无关），
+  再按「名称长度降序、同长按库顺序」贪心取不重叠的命中，结果与逐名 ``text.find`` 的旧实现一致；
+- 别名：简称去空白 / 全角转半角（NFKC）、去 ST / *ST 前缀（长度仍 ≥ MIN_NAME_LEN 才收录）；
+  安装 pypinyin 时另收录拼音首字母（仅用于 ``resolve``，不参与文本扫描）；
+- 解析：``resolve(mention)`` 代码 → 精确简称 / 别名 → 简称互含（自动机 + 拼接串查找，不逐名扫描）；
+- 共享：``get_stock_name_index(conn)`` 返回进程级索引，仅在 a_stock_basic 指纹（行数 + code/name 哈希和）
+  变化时重建；``STOCK_NAME_INDEX_CHECK_SEC``（默认 30 秒）内不重复查询指纹。
+
+股票问答实体识别、热点滚动条新闻补代码、政策新闻关联个股共用此索引。
+"""
+
+from __future__ import annotations
+
+import bisect
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+_log = logging.getLogger(__name__)
+
+MIN_NAME_LEN = 3
+
+_ST_PREFIX = re.compile(r"^\*?ST")
+
+
+class AhoCorasick:
+    """多模式串匹配自动机（字符级 trie + 失败指针，输出沿失败链在构建时合并）。"""
+
+    def __init__(self, patterns: Sequence[str]):
+        self.patterns = list(patterns)
+        goto: List[Dict[str, int]] = [{}]
+        out: List[List[int]] = [[]]
+        for pid, p in enumerate(self.patterns):
+            s = 0
+            for ch in p:
+                nxt = goto[s].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[s][ch] = nxt
+                    goto.append({})
+                    out.append([])
+                s = nxt
+            out[s].append(pid)
+        fail = [0] * len(goto)
+        queue = list(goto[0].values())  # 深度 1 的状态失败指针指向根
+        head = 0
+        while head < len(queue):
+            s = queue[head]
+            head += 1
+            for ch, nxt in goto[s].items():
+                queue.append(nxt)
+                f = fail[s]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                out[nxt] = out[nxt] + out[fail[nxt]]
+        self._goto = goto
+        self._fail = fail
+        self._out = [tuple(o) for o in out]
+
+    def iter_matches(self, text: str) -> Iterable[Tuple[int, int]]:
+        """逐个产出 (起始位置, 模式序号)。"""
+        goto, fail, out, patterns = self._goto, self._fail, self._out, self.patterns
+        s = 0
+        for i, ch in enumerate(text):
+            while s and ch not in goto[s]:
+                s = fail[s]
+            s = goto[s].get(ch, 0)
+            if out[s]:
+                for pid in out[s]:
+                    yield i - len(patterns[pid]) + 1, pid
+
+
+def _aliases(name: str) -> List[str]:
+    out: List[str] = []
+    norm = unicodedata.normalize("NFKC", name).replace(" ", "")
+    if norm != name:
+        out.append(norm)
+    bare = _ST_PREFIX.sub("", norm)
+    if bare != norm:
+        out.append(bare)
+    return [a for a in out if len(a) >= MIN_NAME_LEN]
+
+
+def _pinyin_initials_fn() -> Optional[Callable[[str], Optional[str]]]:
+    """pypinyin 可用时返回「简称 → 拼音首字母」函数（每次建索引只导入一次）。"""
+    try:
+        from pypinyin import Style, lazy_pinyin
+    except ImportError:
+        return None
+
+    def initials(name: str) -> Optional[str]:
+        s = "".join(p[0] for p in lazy_pinyin(name, style=Style.FIRST_LETTER) if p).upper()
+        return s if len(s) >= 2 and s.isalnum() else None
+
+    return initials
+
+
+def code_from_db(raw: Any) -> str:
+    """'600519.SH' → '600519'；8 位代码（北交所旧码等）保留 8 位。"""
+    s = str(raw or "").strip().upper().split(".", 1)[0]
+    digits = "".join(c for c in s if c.isdigit())
+    return digits[:8] if len(digits) >= 6 else digits
+
+
+class StockNameIndex:
+    """
+    不可变名称索引。pairs 为 (简称, 代码) 且已按匹配优先级排序（长名在前）；
+    with_aliases=True 时把别名追加进自动机（优先级同样按长度）。
+    """
+
+    def __init__(
+        self,
+        pairs: Sequence[Tuple[str, str]],
+        valid_codes: Optional[Iterable[str]] = None,
+        with_aliases: bool = False,
+        version: Any = None,
+    ):
+        self.pairs = [(n, c) for n, c in pairs if len(n) >= MIN_NAME_LEN]
+        self.version = version
+        self.valid_codes = set(valid_codes) if valid_codes is not None else {c for _, c in self.pairs}
+        entries = list(self.pairs)
+        self.lookup: Dict[str, str] = {}
+        for n, c in self.pairs:
+            self.lookup.setdefault(n, c)
+        if with_aliases:
+            extra = []
+            pinyin = _pinyin_initials_fn()
+            initials: Dict[str, set] = {}
+            for n, c in self.pairs:
+                for a in _aliases(n):
+                    if a not in self.lookup:
+                        self.lookup[a] = c
+                        extra.append((a, c))
+                py = pinyin(n) if pinyin else None
+                if py:
+                    initials.setdefault(py, set()).add(c)
+            # 拼音首字母只保留唯一对应一只股票的（中国银行 / 中国银河 同为 ZGYH，歧义时都不收）
+            for py, codes in initials.items():
+                if len(codes) == 1 and py not in self.lookup:
+                    self.lookup[py] = next(iter(codes))
+            entries = sorted(entries + extra, key=lambda x: -len(x[0]))
+        # 同名多行只保留第一条：其后同名的命中位置必然已被占用
+        patterns: List[str] = []
+        self._codes: List[str] = []
+        seen: set = set()
+        for n, c in entries:
+            if n in seen:
+                continue
+            seen.add(n)
+            patterns.append(n)
+            self._codes.append(c)
+        self._ac = AhoCorasick(patterns)
+        # 「提及是某简称的子串」用拼接串 find + 二分定位名称
+        self._joined = "\x00".join(patterns)
+        self._offsets = []
+        pos = 0
+        for p in patterns:
+            self._offsets.append(pos)
+            pos += len(p) + 1
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple[Any, Any]], version: Any = None) -> "StockNameIndex":
+        """a_stock_basic 的 (code, name) 行 → 索引（长名优先，含别名）。"""
+        pairs: List[Tuple[str, str]] = []
+        valid: set = set()
+        for code, name in rows:
+            c = code_from_db(code)
+            if len(c) >= 6:
+                valid.add(c[:6])
+                if len(c) == 8:
+                    valid.add(c)
+            n = str(name or "").strip()
+            if len(n) >= MIN_NAME_LEN and len(c) >= 6:
+                pairs.append((n, c))
+        pairs.sort(key=lambda x: -len(x[0]))
+        return cls(pairs, valid_codes=valid, with_aliases=True, version=version)
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+    def spans(self, text: str, used: Optional[List[bool]] = None) -> List[Tuple[int, int, int]]:
+        """不重叠命中 (start, end, 模式序号)，按优先级（模式序号）再按位置排列；used 为占位掩码，原地更新。"""
+        if not text or not self._codes:
+            return []
+        if used is None:
+            used = [False] * len(text)
+        hits = sorted((pid, start) for start, pid in self._ac.iter_matches(text))
+        out: List[Tuple[int, int, int]] = []
+        patterns = self._ac.patterns
+        for pid, start in hits:
+            end = start + len(patterns[pid])
+            if any(used[start:end]):
+                continue
+            for i in range(start, end):
+                used[i] = True
+            out.append((start, end, pid))
+        return out
+
+    def extract(self, text: str, used: Optional[List[bool]] = None) -> List[Tuple[str, str]]:
+        """[(命中的简称, 代码)]，顺序同 spans。"""
+        patterns = self._ac.patterns
+        return [(patterns[pid], self._codes[pid]) for _, _, pid in self.spans(text, used)]
+
+    def codes_in(self, text: str, limit: Optional[int] = None) -> List[str]:
+        """文本中提及的代码（去重，按首次出现位置排序）。"""
+        out: List[str] = []
+        for _, _, pid in sorted(self.spans(text)):
+            c = self._codes[pid]
+            if c not in out:
+                out.append(c)
+                if limit is not None and len(out) >= limit:
+                    break
+        return out
+
+    def resolve(self, mention: str) -> Optional[str]:
+        """简称 / 代码 / 别名 / 拼音首字母 → 有效代码；否则取与提及互相包含的最长简称。"""
+        m = (mention or "").strip()
+        if not m:
+            return None
+        if re.fullmatch(r"\d{6}|\d{8}", m):
+            return m if m in self.valid_codes else None
+        c = self.lookup.get(m) or self.lookup.get(m.upper())
+        if c is not None:
+            return c if c in self.valid_codes else None
+        candidates = {pid for _, pid in self._ac.iter_matches(m)}
+        start = self._joined.find(m)
+        while start >= 0:
+            candidates.add(bisect.bisect_right(self._offsets, start) - 1)
+            start = self._joined.find(m, start + 1)
+        for pid in sorted(candidates):
+            if self._codes[pid] in self.valid_codes:
+                return self._codes[pid]
+        return None
+
+
+_EMPTY = StockNameIndex([])
+_lock = threading.Lock()
+_index: Optional[StockNameIndex] = None
+_checked_at = 0.0
+
+
+def _check_interval() -> float:
+    try:
+        return max(0.0, float(os.environ.get("STOCK_NAME_INDEX_CHECK_SEC", "30")))
+    except ValueError:
+        return 30.0
+
+
+def _basic_version(conn: Any) -> Tuple[int, int]:
+    row = conn.execute(
+        "SELECT COUNT(*), COALESCE(SUM(hash(CAST(code AS VARCHAR), CAST(name AS VARCHAR))), 0) FROM a_stock_basic"
+    ).fetchone()
+    return int(row[0]), int(row[1])
+
+
+def invalidate_stock_name_index() -> None:
+    """下次 get_stock_name_index 立即重新比对指纹（a_stock_basic 写入方调用）。"""
+    global _checked_at
+    with _lock:
+        _checked_at = 0.0
+
+
+def get_stock_name_index(conn: Any = None) -> StockNameIndex:
+    """进程级共享索引；a_stock_basic 不可读时返回已有索引（首次则为空索引）。"""
+    global _index, _checked_at
+    now = time.monotonic()
+    cached = _index
+    if cached is not None and now - _checked_at < _check_interval():
+        return cached
+    own = conn is None
+    try:
+        if own:
+            from .duckdb_manager import get_conn, get_db_path
+
+            if not os.path.isfile(get_db_path()):
+                return cached or _EMPTY
+            conn = get_conn(read_only=True)
+        try:
+            version = _basic_version(conn)
+            with _lock:
+                if _index is not None and _index.version == version:
+                    _checked_at = now
+                    return _index
+            rows = conn.execute("SELECT code, name FROM a_stock_basic").fetchall()
+        finally:
+            if own:
+                conn.close()
+    except Exception as e:
+        _log.warning("stock name index: a_stock_basic load failed: %s", e)
+        return cached or _EMPTY
+    index = StockNameIndex.from_rows(rows, version=version)
+    with _lock:
+        _index, _checked_at = index, now
+    return index
@@ -34,27 +34,38 @@ def get_actionable_signals(
         conn.close()
         if df is None or df.empty:
             return buys, sells
-        for _, row in df.iterrows():
-            code = str(row.get("code", ""))
-            score = float(row.get("signal_score") or 0)
-            sig = row.get("signal") or "BUY"
-            rec = {
-                "code": code,
-                "signal": sig,
-                "confidence": float(row.get("confidence") or 0),
-                "target_price": float(row.get("target_price") or 0),
-                "stop_loss": float(row.get("stop_loss") or 0),
-                "signal_score": score,
-            }
-            if score > buy_threshold and sig == "BUY":
-                buys.append(rec)
-            elif score < sell_threshold or sig == "SELL":
-                sells.append(rec)
-        return buys[:limit], sells[:limit]
+        return split_signals(df.to_dict("records"), buy_threshold, sell_threshold, limit)
     except Exception:
         return [], []
 
 
+def split_signals(
+    rows: List[dict],
+    buy_threshold: float = 0.7,
+    sell_threshold: float = 0.3,
+    limit: int = 20,
+) -> Tuple[List[dict], List[dict]]:
+    """trade_signals 行（按时间倒序）→ (买入, 卖出)；模拟盘多日回放按日复用同一规则。"""
+    buys, sells = [], []
+    for row in rows:
+        code = str(row.get("code", ""))
+        score = float(row.get("signal_score") or 0)
+        sig = row.get("signal") or "BUY"
+        rec = {
+            "code": code,
+            "signal": sig,
+            "confidence": float(row.get("confidence") or 0),
+            "target_price": float(row.get("target_price") or 0),
+            "stop_loss": float(row.get("stop_loss") or 0),
+            "signal_score": score,
+        }
+        if score > buy_threshold and sig == "BUY":
+            buys.append(rec)
+        elif score < sell_threshold or sig == "SELL":
+            sells.append(rec)
+    return buys[:limit], sells[:limit]
+
+
 def execute_buy(code: str, confidence: float = 0.0, **kwargs) -> dict:
     """执行买入（当前为占位，可接实盘/模拟）。"""
     return {
@@ -8,12 +8,17 @@ from .engine import (
     DEFAULT_INITIAL_CASH,
     DEFAULT_LOT_SIZE,
 )
+from .ledger import SimLedger
+from .replay import replay_simulated, run_simulated_history
 
 __all__ = [
     "step_simulated",
     "get_positions",
     "get_orders",
     "get_account_snapshots",
+    "SimLedger",
+    "replay_simulated",
+    "run_simulated_history",
     "DEFAULT_INITIAL_CASH",
     "DEFAULT_LOT_SIZE",
 ]
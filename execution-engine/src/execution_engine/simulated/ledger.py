@@ -0,0 +1,280 @@
+"""
+模拟盘内存账本：整步信号在内存中撮合，结束时一次事务批量落库。
+
+- ``SimLedger.load(conn)``：现金、持仓各一次查询读入内存；
+- ``apply_signals``：按 step_simulated 原有规则（先卖后买、每单 lot_size、现金不足跳过）更新内存状态，
+  内存中的订单号只是本轮顺序号；落库时由序列 ``sim_orders_id_seq`` 分配 id，不再 ``SELECT MAX(id)+1``，
+  并发写者不会撞主键；
+- ``snapshot``：记录一条资金快照（默认持仓按 avg_price 计市值，可传入收盘价盯市）；
+- ``flush(conn)``：BEGIN → 订单/快照批量 INSERT、变动持仓先删后插 → COMMIT，失败回滚。
+
+多日回放见 replay.py：逐日推进同一个 SimLedger，结束时只 flush 一次。
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+DEFAULT_INITIAL_CASH = 1_000_000.0
+DEFAULT_LOT_SIZE = 100
+DEFAULT_STUB_PRICE = 10.0
+
+
+def utc_now() -> datetime:
+    """naive UTC 时间（DuckDB TIMESTAMP 列按 UTC 存储）。"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class SimLedger:
+    """模拟盘账户的内存副本：现金、持仓、待落库的订单与快照。"""
+
+    def __init__(
+        self,
+        cash: float = DEFAULT_INITIAL_CASH,
+        positions: Optional[Dict[str, Dict[str, Any]]] = None,
+        next_order_id: int = 1,
+    ):
+        self.cash = float(cash)
+        self.positions: Dict[str, Dict[str, Any]] = dict(positions or {})
+        self.next_order_id = int(next_order_id)
+        self.orders: List[Tuple] = []
+        self.snapshots: List[Tuple] = []
+        self._dirty: set = set()  # 本轮有变动（新增/修改/清仓）的持仓代码
+        # 持仓成本市值（Σ qty × avg_price），买卖时增量维护，供逐单风控 O(1) 读取
+        self.book_value = sum(
+            float(p.get("qty") or 0) * float(p.get("avg_price") or 0) for p in self.positions.values()
+        )
+        self.risk_rejected = 0
+        self.unfilled = 0  # 无成交价而未下单的信号数
+
+    # ---------- 读入 ----------
+
+    @classmethod
+    def load(cls, conn, initial_cash: float = DEFAULT_INITIAL_CASH) -> "SimLedger":
+        """从 sim_* 表读入当前账户；无快照时用 initial_cash。"""
+        cash = initial_cash
+        try:
+            row = conn.execute(
+                "SELECT cash FROM sim_account_snapshots ORDER BY snapshot_time DESC LIMIT 1"
+            ).fetchone()
+            if row:
+                cash = float(row[0])
+        except (ValueError, OSError, RuntimeError):
+            pass
+        positions: Dict[str, Dict[str, Any]] = {}
+        try:
+            for code, side, qty, avg_price, updated_at in conn.execute(
+                "SELECT code, side, qty, avg_price, updated_at FROM sim_positions"
+            ).fetchall():
+                positions[code] = {
+                    "code": code,
+                    "side": side,
+                    "qty": float(qty),
+                    "avg_price": avg_price,
+                    "updated_at": updated_at,
+                }
+        except (ValueError, OSError, RuntimeError):
+            pass
+        return cls(cash=cash, positions=positions)
+
+    # ---------- 撮合 ----------
+
+    def _record_order(self, code: str, side: str, qty: float, price: float, now: datetime) -> None:
+        self.orders.append((self.next_order_id, code, side, float(qty), float(price), "filled", now, now))
+        self.next_order_id += 1
+
+    def sell(self, code: str, price: float, lot_size: int, now: datetime) -> bool:
+        """有持仓则卖出 min(lot_size, 持仓)；返回是否成交。"""
+        pos = self.positions.get(code)
+        if not pos or float(pos.get("qty") or 0) <= 0:
+            return False
+        qty = min(lot_size, float(pos["qty"]))
+        self._record_order(code, "SELL", qty, price, now)
+        self.cash += qty * price
+        self.book_value -= qty * float(pos.get("avg_price") or 0)
+        new_qty = float(pos["qty"]) - qty
+        if new_qty <= 0:
+            self.positions.pop(code, None)
+        else:
+            self.positions[code] = {**pos, "qty": new_qty, "updated_at": now}
+        self._dirty.add(code)
+        return True
+
+    def buy(self, code: str, price: float, lot_size: int, now: datetime) -> bool:
+        """现金足够则买入 lot_size 股并更新均价；返回是否成交。"""
+        cost = lot_size * price
+        if self.cash < cost:
+            return False
+        self._record_order(code, "BUY", lot_size, price, now)
+        self.cash -= cost
+        self.book_value += cost
+        pos = self.positions.get(code)
+        if pos:
+            old_qty, old_avg = float(pos["qty"]), float(pos.get("avg_price") or 0)
+            new_qty = old_qty + lot_size
+            new_avg = (old_qty * old_avg + cost) / new_qty if new_qty else price
+            self.positions[code] = {**pos, "qty": new_qty, "avg_price": new_avg, "updated_at": now}
+        else:
+            self.positions[code] = {
+                "code": code,
+                "side": "LONG",
+                "qty": float(lot_size),
+                "avg_price": price,
+                "updated_at": now,
+            }
+        self._dirty.add(code)
+        return True
+
+    def apply_signals(
+        self,
+        buys: List[dict],
+        sells: List[dict],
+        prices: Dict[str, float],
+        now: datetime,
+        lot_size: int = DEFAULT_LOT_SIZE,
+        max_buys: int = 10,
+        max_sells: int = 10,
+        pre_trade: Optional[Callable[[str, str, float, float], bool]] = None,
+        fill_at_close: bool = False,
+        stub_price: Optional[float] = DEFAULT_STUB_PRICE,
+    ) -> int:
+        """
+        整步信号：先卖后买。成交价取信号 target_price，缺失或非正时取 prices（6 位代码为键），
+        再缺失用 stub_price。fill_at_close=True 时忽略 target_price、一律按 prices 成交（历史回放按执行日收盘）；
+        stub_price=None 时无价的信号不下单（计入 unfilled）。pre_trade(side, code, qty, price) 返回 False
+        的委托不成交（计入 risk_rejected）。返回成交订单数。
+        """
+        from data_pipeline.storage.latest_quote import normalize_code
+
+        def _price(sig: dict) -> Optional[float]:
+            px = 0.0 if fill_at_close else float(sig.get("target_price") or 0)
+            if px <= 0:
+                px = prices.get(normalize_code(sig.get("code"))) or stub_price
+            if px is None or px <= 0:
+                self.unfilled += 1
+                return None
+            return float(px)
+
+        def _allowed(side: str, code: str, qty: float, price: float) -> bool:
+            if pre_trade is None or pre_trade(side, code, qty, price):
+                return True
+            self.risk_rejected += 1
+            return False
+
+        created = 0
+        for s in sells[:max_sells]:
+            code = s.get("code", "")
+            if not code or code not in self.positions:
+                continue
+            px = _price(s)
+            if px is None:
+                continue
+            qty = min(lot_size, float(self.positions[code].get("qty") or 0))
+            if _allowed("SELL", code, qty, px) and self.sell(code, px, lot_size, now):
+                created += 1
+        for b in buys[:max_buys]:
+            code = b.get("code", "")
+            if not code:
+                continue
+            px = _price(b)
+            if px is None or self.cash < lot_size * px or not _allowed("BUY", code, lot_size, px):
+                continue
+            if self.buy(code, px, lot_size, now):
+                created += 1
+        return created
+
+    def risk_checker(self, plan: Any, drawdown: float = 0.0) -> Callable[[str, str, float, float], bool]:
+        """
+        由 risk_engine.RiskPlan 生成 apply_signals 的 pre_trade：持仓按成本价计市值，
+        总资产 = 现金 + book_value（与 step_simulated 的资金快照口径一致）。
+        """
+
+        def _check(side: str, code: str, qty: float, price: float) -> bool:
+            pos = self.positions.get(code)
+            pos_value = float(pos["qty"]) * float(pos.get("avg_price") or 0) if pos else 0.0
+            return plan.check_order(
+                side, qty * price, pos_value, self.book_value, self.cash + self.book_value, drawdown
+            )
+
+        return _check
+
+    # ---------- 资金 ----------
+
+    def equity(self, marks: Optional[Dict[str, float]] = None) -> float:
+        """持仓市值：marks（6 位代码 → 价格）中有价的盯市，其余按 avg_price 近似。"""
+        from data_pipeline.storage.latest_quote import normalize_code
+
+        marks = marks or {}
+        total = 0.0
+        for p in self.positions.values():
+            px = marks.get(normalize_code(p["code"])) or p.get("avg_price") or 0
+            total += float(p["qty"]) * float(px)
+        return total
+
+    def snapshot(self, now: datetime, marks: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+        equity = self.equity(marks)
+        total_assets = self.cash + equity
+        self.snapshots.append((now, self.cash, equity, total_assets))
+        return {"cash": self.cash, "equity": equity, "total_assets": total_assets}
+
+    # ---------- 落库 ----------
+
+    def flush(self, conn) -> Dict[str, int]:
+        """一次事务写入本轮订单、变动持仓与快照；成功后清空待写缓冲。"""
+        import pandas as pd
+
+        dirty = sorted(self._dirty)
+        pos_rows = [
+            (c, p.get("side") or "LONG", float(p["qty"]), p.get("avg_price"), p.get("updated_at"))
+            for c in dirty
+            if (p := self.positions.get(c))
+        ]
+        frames = {
+            "_sim_orders_buf": (
+                self.orders,
+                ["id", "code", "side", "qty", "price", "status", "created_at", "filled_at"],
+            ),
+            "_sim_positions_buf": (pos_rows, ["code", "side", "qty", "avg_price", "updated_at"]),
+            "_sim_snapshots_buf": (self.snapshots, ["snapshot_time", "cash", "equity", "total_assets"]),
+        }
+        conn.execute("BEGIN TRANSACTION")
+        try:
+            for name, (rows, cols) in frames.items():
+                df = pd.DataFrame(rows, columns=cols)
+                for c in cols:
+                    if c.endswith(("_at", "_time")):
+                        df[c] = pd.to_datetime(df[c])
+                conn.register(name, df)
+            if self.orders:
+                conn.execute(
+                    "INSERT INTO sim_orders (id, code, side, qty, price, status, created_at, filled_at)"
+                    " SELECT nextval('sim_orders_id_seq'), code, side, qty, price, status, created_at, filled_at"
+                    " FROM (SELECT * FROM _sim_orders_buf ORDER BY id)"
+                )
+            if dirty:
+                conn.execute("DELETE FROM sim_positions WHERE code IN (SELECT UNNEST(?))", [dirty])
+            if pos_rows:
+                conn.execute(
+                    "INSERT INTO sim_positions (code, side, qty, avg_price, updated_at)"
+                    " SELECT * FROM _sim_positions_buf"
+                )
+            if self.snapshots:
+                conn.execute(
+                    # 覆盖同一时刻的快照时也取新 seq，风控增量同步才能看到改写
+                    "INSERT OR REPLACE INTO sim_account_snapshots (snapshot_time, cash, equity, total_assets, seq)"
+                    " SELECT *, nextval('sim_account_snapshots_seq') FROM _sim_snapshots_buf"
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            for name in frames:
+                try:
+                    conn.unregister(name)
+                except Exception:
+                    pass
+        written = {"orders": len(self.orders), "positions": len(dirty), "snapshots": len(self.snapshots)}
+        self.orders, self.snapshots, self._dirty = [], [], set()
+        return written
@@ -0,0 +1,321 @@
+"""
+模拟盘历史回放：按 a_stock_daily 的交易日逐日推进 SimLedger，输出资金曲线。
+
+与 step_simulated 使用同一套撮合（SimLedger.apply_signals）与风控（risk_engine.evaluate）规则，
+但全部数据在开始前一次性读入内存，逐日循环内不访问数据库：
+
+- 交易日历：a_stock_daily 的 DISTINCT date；
+- 信号：区间内 trade_signals 一次读出，按 BACKTEST_SIGNAL_EXECUTION_LAG_BDAYS（默认 1，与
+  backtest_engine.data_loader 一致）顺延到之后第 N 个交易日执行；每个执行日的买卖拆分与
+  get_actionable_signals / split_signals 相同（按时间倒序取前 limit*2 条，各取前 limit 条），整表向量化完成；
+- 价格：相关标的收盘价一次读成 (交易日 × 标的) 矩阵并前向填充，成交与盯市均取执行日收盘（忽略信号的
+  target_price：那是信号日的报价，T+N 执行时按当日 K 线成交）；执行日之前没有任何 K 线的标的不成交，计入 unfilled；
+- 风控：使用 risk_engine.get_plan 编译好的规则，risk_check=True 时每日开盘前按上一日资金曲线做组合级评估
+  （不通过则当日不下单），通过后每笔委托再做事前检查。
+
+persist=True 时回放结束后一次事务写入 sim_* 表（run_simulated_history）；默认只在内存中回放。
+"""
+
+from __future__ import annotations
+
+import os
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .ledger import DEFAULT_INITIAL_CASH, DEFAULT_LOT_SIZE, SimLedger
+
+
+def _execution_lag_days() -> int:
+    raw = os.environ.get("BACKTEST_SIGNAL_EXECUTION_LAG_BDAYS", "1").strip()
+    try:
+        return max(0, int(raw))
+    except ValueError:
+        return 1
+
+
+def _trading_days(conn, start: date, end: date) -> np.ndarray:
+    rows = conn.execute(
+        "SELECT DISTINCT date FROM a_stock_daily WHERE date BETWEEN ? AND ? ORDER BY date",
+        [start, end],
+    ).fetchall()
+    return np.array([r[0] for r in rows], dtype="datetime64[D]")
+
+
+def _replay_signals(
+    conn,
+    calendar: np.ndarray,
+    start: date,
+    end: date,
+    lag: int,
+    buy_threshold: float,
+    sell_threshold: float,
+    limit: int,
+) -> Dict[int, Tuple[List[dict], List[dict]]]:
+    """
+    trade_signals → {执行日在 calendar 中的下标: (buys, sells)}。
+    lag=0 时信号在当日（非交易日则下一交易日）执行；lag=N 时在信号日之后第 N 个交易日执行。
+    """
+    df = conn.execute(
+        """
+        SELECT code, signal, confidence, target_price, stop_loss, signal_score, snapshot_time
+        FROM trade_signals
+        WHERE snapshot_time >= ? AND snapshot_time < ?
+        """,
+        [datetime.combine(calendar[0].astype(date), time.min), end + timedelta(days=1)],
+    ).fetchdf()
+    if df is None or df.empty:
+        return {}
+
+    sig_day = df["snapshot_time"].values.astype("datetime64[D]")
+    if lag <= 0:
+        exec_idx = np.searchsorted(calendar, sig_day, side="left")
+    else:
+        exec_idx = np.searchsorted(calendar, sig_day, side="right") + lag - 1
+    first = int(np.searchsorted(calendar, np.datetime64(start, "D"), side="left"))
+    df["exec_idx"] = exec_idx
+    df = df[(df["exec_idx"] >= first) & (df["exec_idx"] < len(calendar))]
+    if df.empty:
+        return {}
+
+    # 与 split_signals 相同：每个执行日按时间倒序取前 limit*2 条，再拆买卖各取前 limit 条
+    df = df.sort_values(["exec_idx", "snapshot_time"], ascending=[True, False], kind="stable")
+    df = df[df.groupby("exec_idx").cumcount() < limit * 2].copy()
+    df["code"] = df["code"].fillna("").astype(str)
+    df["signal"] = df["signal"].fillna("BUY")
+    for c in ("confidence", "target_price", "stop_loss"):
+        df[c] = df[c].fillna(0.0).astype(float)
+    score = df["signal_score"].astype(float).fillna(0.0)
+    df["signal_score"] = score
+    is_buy = (score > buy_threshold) & (df["signal"] == "BUY")
+    is_sell = ~is_buy & ((score < sell_threshold) | (df["signal"] == "SELL"))
+    df["side"] = np.where(is_buy, "B", np.where(is_sell, "S", ""))
+    df = df[df["side"] != ""]
+    df = df[df.groupby(["exec_idx", "side"]).cumcount() < limit]
+
+    cols = ["code", "signal", "confidence", "target_price", "stop_loss", "signal_score"]
+    out: Dict[int, Tuple[List[dict], List[dict]]] = {}
+    for idx, side, rec in zip(df["exec_idx"].tolist(), df["side"].tolist(), df[cols].to_dict("records")):
+        buys, sells = out.setdefault(int(idx), ([], []))
+        (buys if side == "B" else sells).append(rec)
+    return out
+
+
+def _close_matrix(conn, codes: List[str], calendar: np.ndarray) -> np.ndarray:
+    """
+    codes（6 位）在 calendar 各交易日的收盘价矩阵 (len(calendar), len(codes))，一次查询读出；
+    以 calendar 首日前最近收盘为起点逐日前向填充（停牌日沿用前收），无任何 K 线处为 NaN。
+    """
+    from data_pipeline.storage.latest_quote import code6_sql
+
+    out = np.full((len(calendar), len(codes)), np.nan)
+    if not codes or not len(calendar):
+        return out
+    raw = [f"{k}{sfx}" for k in codes for sfx in ("", ".SH", ".SZ", ".BJ")]
+    start = calendar[0].astype(date)
+    df = conn.execute(
+        f"""
+        WITH d AS (
+            SELECT date, {code6_sql("code")} AS code6, close
+            FROM a_stock_daily
+            WHERE code IN (SELECT UNNEST(?)) AND date <= ? AND close IS NOT NULL
+        )
+        SELECT ?::DATE AS date, 0 AS seed, code6, arg_max(close, date) AS close
+        FROM d WHERE date < ? GROUP BY code6
+        UNION ALL
+        SELECT date, 1 AS seed, code6, close FROM d WHERE date >= ?
+        """,
+        [raw, calendar[-1].astype(date), start, start, start],
+    ).fetchdf()
+    if df.empty:
+        return out
+    import pandas as pd
+
+    rows = np.searchsorted(calendar, df["date"].values.astype("datetime64[D]"))
+    cols = pd.Index(codes).get_indexer(df["code6"])
+    px = df["close"].to_numpy(dtype=float)
+    seed = df["seed"].to_numpy() == 0
+    ok = (cols >= 0) & (rows < len(calendar))
+    # 先写区间前最近收盘，再写区间内收盘（同一格以当日收盘为准）
+    out[rows[ok & seed], cols[ok & seed]] = px[ok & seed]
+    out[rows[ok & ~seed], cols[ok & ~seed]] = px[ok & ~seed]
+    return pd.DataFrame(out).ffill().to_numpy()
+
+
+def replay_simulated(
+    start: date,
+    end: date,
+    buy_threshold: float = 0.7,
+    sell_threshold: float = 0.3,
+    initial_cash: float = DEFAULT_INITIAL_CASH,
+    lot_size: int = DEFAULT_LOT_SIZE,
+    max_buys: int = 10,
+    max_sells: int = 10,
+    risk_check: bool = False,
+    execution_lag_days: Optional[int] = None,
+    ledger: Optional[SimLedger] = None,
+    persist: bool = False,
+    conn=None,
+) -> Dict[str, Any]:
+    """
+    回放 [start, end] 的交易日：每日先（可选）风控，再以 step_simulated 的规则撮合当日应执行的信号，
+    收盘后按当日收盘盯市记一条资金快照。ledger 缺省时从 initial_cash 空仓开始，不读写 sim_* 表。
+    返回 equity_curve（[{date, value}]）、总收益率与最大回撤（%）等，便于与向量化回测对比。
+    """
+    from data_pipeline.storage.latest_quote import normalize_code
+
+    own = conn is None
+    if own:
+        from execution_engine.simulated.engine import _get_conn
+
+        conn = _get_conn()
+    try:
+        lag = _execution_lag_days() if execution_lag_days is None else max(0, int(execution_lag_days))
+        ledger = ledger if ledger is not None else SimLedger(cash=initial_cash)
+        # 日历向前多取一段，使区间开始前产生的信号也能按 lag 落到区间内
+        calendar = _trading_days(conn, start - timedelta(days=lag * 7 + 7), end)
+        first = int(np.searchsorted(calendar, np.datetime64(start, "D"), side="left"))
+        if first >= len(calendar):
+            return {"ok": True, "days": 0, "orders_created": 0, "equity_curve": []}
+
+        limit = max(max_buys, max_sells)
+        by_day = _replay_signals(conn, calendar, start, end, lag, buy_threshold, sell_threshold, limit)
+        codes = sorted(
+            (
+                {normalize_code(r["code"]) for b, s in by_day.values() for r in b + s}
+                | {normalize_code(c) for c in ledger.positions}
+            )
+            - {""}
+        )
+        col_of = {c: j for j, c in enumerate(codes)}
+        closes = _close_matrix(conn, codes, calendar)
+
+        plan = None
+        if risk_check:
+            try:
+                from execution_engine.simulated.engine import _risk_plan
+
+                plan = _risk_plan(conn)
+            except ImportError:
+                plan = None
+        if plan is not None and plan.empty:
+            plan = None
+
+        base = ledger.cash + ledger.equity()
+        peak_value = 0.0
+        orders_created = 0
+        blocked_days = 0
+        curve: List[float] = []
+        dates: List[str] = []
+        for i in range(first, len(calendar)):
+            row = closes[i]
+            now = datetime.combine(calendar[i].astype(date), time(15, 0))
+            buys, sells = by_day.get(i, ([], []))
+            if buys or sells:
+                allowed = True
+                if plan is not None:
+                    pos_list = [
+                        {"code": p["code"], "qty": p["qty"], "avg_price": p.get("avg_price") or 0}
+                        for p in ledger.positions.values()
+                    ]
+                    total = curve[-1] if curve else ledger.cash + ledger.equity()
+                    allowed = plan.evaluate(pos_list, total, equity_curve=curve).get("pass", True)
+                if allowed:
+                    prices = {}
+                    for r in buys + sells:
+                        j = col_of.get(normalize_code(r["code"]))
+                        if j is not None and not np.isnan(row[j]):
+                            prices[codes[j]] = float(row[j])
+                    pre_trade = None
+                    if plan is not None:
+                        dd = (peak_value - curve[-1]) / peak_value if curve and peak_value > 0 else 0.0
+                        pre_trade = ledger.risk_checker(plan, drawdown=dd)
+                    orders_created += ledger.apply_signals(
+                        buys,
+                        sells,
+                        prices,
+                        now,
+                        lot_size=lot_size,
+                        max_buys=max_buys,
+                        max_sells=max_sells,
+                        pre_trade=pre_trade,
+                        fill_at_close=True,
+                        stub_price=None,
+                    )
+                else:
+                    blocked_days += 1
+            marks = {}
+            for c in ledger.positions:
+                j = col_of.get(normalize_code(c))
+                if j is not None and not np.isnan(row[j]):
+                    marks[codes[j]] = float(row[j])
+            curve.append(ledger.snapshot(now, marks)["total_assets"])
+            peak_value = max(peak_value, curve[-1])
+            dates.append(str(calendar[i]))
+
+        written = ledger.flush(conn) if persist else None
+        arr = np.asarray(curve, dtype=float)
+        peak = np.maximum.accumulate(arr)
+        equity = curve[-1] - ledger.cash if curve else 0.0
+        return {
+            "ok": True,
+            "days": len(curve),
+            "execution_lag_days": lag,
+            "orders_created": orders_created,
+            "risk_blocked_days": blocked_days,
+            "risk_rejected": ledger.risk_rejected,
+            "unfilled": ledger.unfilled,
+            "written": written,
+            "cash": round(ledger.cash, 2),
+            "equity": round(equity, 2),
+            "total_assets": round(curve[-1], 2) if curve else round(ledger.cash, 2),
+            "total_return": round((curve[-1] / base - 1) * 100, 4) if curve and base else 0.0,
+            "max_drawdown": round(float(np.max((peak - arr) / peak)) * 100, 4) if len(arr) else 0.0,
+            "equity_curve": [{"date": d, "value": round(v, 2)} for d, v in zip(dates, curve)],
+        }
+    finally:
+        if own:
+            conn.close()
+
+
+def run_simulated_history(
+    start: date,
+    end: date,
+    buy_threshold: float = 0.7,
+    sell_threshold: float = 0.3,
+    initial_cash: float = DEFAULT_INITIAL_CASH,
+    lot_size: int = DEFAULT_LOT_SIZE,
+    max_buys: int = 10,
+    max_sells: int = 10,
+    risk_check: bool = False,
+    execution_lag_days: Optional[int] = None,
+    conn=None,
+) -> Dict[str, Any]:
+    """
+    在当前模拟盘账户（sim_* 表）上按日回放 [start, end]，结束后订单/持仓/每日快照一次事务落库。
+    """
+    own = conn is None
+    if own:
+        from execution_engine.simulated.engine import _get_conn
+
+        conn = _get_conn()
+    try:
+        return replay_simulated(
+            start,
+            end,
+            buy_threshold=buy_threshold,
+            sell_threshold=sell_threshold,
+            initial_cash=initial_cash,
+            lot_size=lot_size,
+            max_buys=max_buys,
+            max_sells=max_sells,
+            risk_check=risk_check,
+            execution_lag_days=execution_lag_days,
+            ledger=SimLedger.load(conn, initial_cash=initial_cash),
+            persist=True,
+            conn=conn,
+        )
+    finally:
+        if own:
+            conn.close()
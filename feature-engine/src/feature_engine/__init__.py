@@ -3,7 +3,13 @@ from .rsi import rsi, rsi_from_prices
 from .macd import macd, macd_from_prices
 from .vwap import vwap, vwap_from_ohlc
 from .atr import atr, atr_from_prices
-from .pipeline import build_feature_matrix, momentum_returns, volatility_returns
+from .kernels import compute_features
+from .pipeline import (
+    build_feature_matrix,
+    build_feature_panel,
+    momentum_returns,
+    volatility_returns,
+)
 
 __all__ = [
     "rsi",
@@ -14,7 +20,9 @@ __all__ = [
     "vwap_from_ohlc",
     "atr",
     "atr_from_prices",
+    "compute_features",
     "build_feature_matrix",
+    "build_feature_panel",
     "momentum_returns",
     "volatility_returns",
 ]
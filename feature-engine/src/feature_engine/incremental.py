@@ -0,0 +1,216 @@
+"""
+Incremental features: carry each indicator's recursive state between runs.
+
+``compute_with_state`` runs the kernels over full history (1-D or right-aligned bars × symbols)
+and returns, next to the feature arrays, a ``FeatureState`` per column taken at the last bar.
+``advance`` then steps one symbol's state over new bars only, producing the same values the
+full recomputation would (EMA/Wilder recursions, cumulative VWAP sums and the trailing close
+window for momentum/volatility).
+"""
+
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from . import kernels
+from .kernels import ArrayLike
+
+FEATURE_COLUMNS = (
+    "rsi",
+    "macd",
+    "macd_signal",
+    "macd_hist",
+    "vwap",
+    "atr",
+    "momentum",
+    "volatility",
+)
+
+
+@dataclass
+class FeatureParams:
+    rsi_period: int = 14
+    macd_fast: int = 12
+    macd_slow: int = 26
+    macd_signal: int = 9
+    atr_period: int = 14
+    momentum_period: int = 10
+    volatility_period: int = 20
+
+    @property
+    def tail_len(self) -> int:
+        """Trailing closes needed for momentum and volatility windows."""
+        return max(self.momentum_period, self.volatility_period) + 1
+
+
+@dataclass
+class FeatureState:
+    """Indicator state after the last processed bar of one symbol."""
+
+    ema_fast: float
+    ema_slow: float
+    macd_signal: float
+    avg_gain: float
+    avg_loss: float
+    atr: float
+    cum_tpv: float
+    cum_vol: float
+    closes: List[float] = field(default_factory=list)
+
+
+def compute_with_state(
+    high: ArrayLike,
+    low: ArrayLike,
+    close: ArrayLike,
+    volume: ArrayLike,
+    params: Optional[FeatureParams] = None,
+) -> Tuple[Dict[str, np.ndarray], List[Optional[FeatureState]]]:
+    """
+    Full computation plus end-of-series state per column. Multi-symbol input must be aligned
+    on the *last* row (shorter histories padded with leading NaN). A column still in warm-up
+    gets ``None``: it has to be recomputed from history next time.
+    """
+    p = params or FeatureParams()
+    h, was_1d = kernels._as_2d(high)
+    l, _ = kernels._as_2d(low)
+    c, _ = kernels._as_2d(close)
+    v, _ = kernels._as_2d(volume)
+
+    ema_fast = kernels.ema(c, p.macd_fast)
+    ema_slow = kernels.ema(c, p.macd_slow)
+    line = ema_fast - ema_slow
+    sig = kernels.ema(line, p.macd_signal)
+    avg_gain, avg_loss = kernels._rsi_averages(c, p.rsi_period)
+    atr = kernels.atr(h, l, c, p.atr_period)
+    cum_tpv, cum_vol = kernels._vwap_sums(h, l, c, v)
+    vwap = np.full_like(cum_tpv, np.nan)
+    np.divide(cum_tpv, cum_vol, out=vwap, where=cum_vol != 0)
+
+    feats = {
+        "rsi": kernels._rsi_from_averages(avg_gain, avg_loss),
+        "macd": line,
+        "macd_signal": sig,
+        "macd_hist": line - sig,
+        "vwap": vwap,
+        "atr": atr,
+        "momentum": kernels.momentum(c, p.momentum_period),
+        "volatility": kernels.volatility(c, p.volatility_period),
+    }
+
+    states: List[Optional[FeatureState]] = []
+    if c.shape[0] == 0:
+        states = [None] * c.shape[1]
+    else:
+        recursive = np.vstack(
+            [ema_fast[-1], ema_slow[-1], sig[-1], avg_gain[-1], avg_loss[-1], atr[-1]]
+        )
+        tail = c[-p.tail_len :]
+        ready = np.isfinite(recursive).all(axis=0) & (tail.shape[0] == p.tail_len)
+        ready &= np.isfinite(tail).all(axis=0)
+        for j in range(c.shape[1]):
+            if not ready[j]:
+                states.append(None)
+                continue
+            states.append(
+                FeatureState(
+                    ema_fast=float(ema_fast[-1, j]),
+                    ema_slow=float(ema_slow[-1, j]),
+                    macd_signal=float(sig[-1, j]),
+                    avg_gain=float(avg_gain[-1, j]),
+                    avg_loss=float(avg_loss[-1, j]),
+                    atr=float(atr[-1, j]),
+                    cum_tpv=float(cum_tpv[-1, j]),
+                    cum_vol=float(cum_vol[-1, j]),
+                    closes=[float(x) for x in tail[:, j]],
+                )
+            )
+    if was_1d:
+        feats = {k: arr[:, 0] for k, arr in feats.items()}
+    return feats, states
+
+
+def advance(
+    state: FeatureState,
+    high: ArrayLike,
+    low: ArrayLike,
+    close: ArrayLike,
+    volume: ArrayLike,
+    params: Optional[FeatureParams] = None,
+) -> Tuple[Dict[str, np.ndarray], FeatureState]:
+    """Step one symbol's state over its new bars (1-D). Returns (features, new state)."""
+    p = params or FeatureParams()
+    h = np.asarray(high, dtype=float)
+    l = np.asarray(low, dtype=float)
+    c = np.asarray(close, dtype=float)
+    v = np.asarray(volume, dtype=float)
+    k = len(c)
+    out = {name: np.full(k, np.nan) for name in FEATURE_COLUMNS}
+
+    a_fast = 2.0 / (p.macd_fast + 1)
+    a_slow = 2.0 / (p.macd_slow + 1)
+    a_sig = 2.0 / (p.macd_signal + 1)
+    a_rsi = 1.0 / p.rsi_period
+    a_atr = 1.0 / p.atr_period
+    ema_fast, ema_slow, sig = state.ema_fast, state.ema_slow, state.macd_signal
+    avg_gain, avg_loss, atr = state.avg_gain, state.avg_loss, state.atr
+    cum_tpv, cum_vol = state.cum_tpv, state.cum_vol
+    closes = list(state.closes)
+
+    # Non-finite inputs are skipped like the batch recursions do: the output is NaN on that bar
+    # and the state carries forward unchanged, so one bad bar never poisons the stored state.
+    for t in range(k):
+        ct, prev_c = c[t], closes[-1]
+        if math.isfinite(ct):
+            ema_fast = ema_fast + a_fast * (ct - ema_fast)
+            ema_slow = ema_slow + a_slow * (ct - ema_slow)
+            line = ema_fast - ema_slow
+            sig = sig + a_sig * (line - sig)
+            out["macd"][t], out["macd_signal"][t], out["macd_hist"][t] = line, sig, line - sig
+
+        delta = ct - prev_c
+        if math.isfinite(delta):
+            avg_gain = avg_gain + a_rsi * ((delta if delta > 0 else 0.0) - avg_gain)
+            avg_loss = avg_loss + a_rsi * ((-delta if delta < 0 else 0.0) - avg_loss)
+            out["rsi"][t] = 100.0 - 100.0 / (1.0 + (avg_gain / avg_loss if avg_loss != 0 else math.inf))
+
+        ref = prev_c if math.isfinite(prev_c) else ct  # bar after a gap: TR = H - L
+        legs = (h[t] - l[t], abs(h[t] - ref), abs(l[t] - ref))
+        if all(math.isfinite(x) for x in legs):
+            atr = atr + a_atr * (max(legs) - atr)
+            out["atr"][t] = atr
+
+        typical = (h[t] + l[t] + ct) / 3.0
+        if v[t] != 0 and not math.isnan(v[t]) and not math.isnan(typical):
+            cum_tpv += typical * v[t]
+            cum_vol += v[t]
+        if cum_vol != 0:
+            out["vwap"][t] = cum_tpv / cum_vol
+
+        closes.append(float(ct))
+        base = closes[-1 - p.momentum_period]
+        if base != 0:
+            out["momentum"][t] = (ct - base) / base
+        window = np.asarray(closes[-p.volatility_period - 1 :])
+        prev = window[:-1]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rets = (window[1:] - prev) / np.where(prev != 0, prev, np.nan)
+        if not np.isnan(rets).all():
+            out["volatility"][t] = float(np.nanstd(rets))
+        closes = closes[-p.tail_len :]
+
+    new_state = FeatureState(
+        ema_fast=ema_fast,
+        ema_slow=ema_slow,
+        macd_signal=sig,
+        avg_gain=avg_gain,
+        avg_loss=avg_loss,
+        atr=atr,
+        cum_tpv=cum_tpv,
+        cum_vol=cum_vol,
+        closes=closes,
+    )
+    return out, new_state
@@ -0,0 +1,298 @@
+"""
+Indicator kernels over 1-D (bars,) or 2-D (bars × symbols) float arrays.
+
+Every kernel works column-wise and returns an array of the input's shape. Leading NaNs in a
+column (symbol not yet listed / no data) are skipped: warm-up windows start at each column's
+first finite value, so a whole-market panel can be processed in one call. Recursive averages
+seed from the first ``period`` finite values, so NaN bars inside the warm-up only delay the
+seed; NaN bars after it (suspensions) yield NaN and leave the recursive state untouched.
+
+Recursive averages (EMA, Wilder) use a Numba JIT loop when numba is importable and
+``FEATURE_ENGINE_NUMBA`` is not ``0``; otherwise a pure-NumPy path that iterates over bars
+and vectorizes across symbols. Window statistics use ``sliding_window_view`` (no Python loop).
+"""
+
+from __future__ import annotations
+
+import os
+import warnings
+from typing import Dict, Tuple, Union
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+ArrayLike = Union[np.ndarray, list]
+
+try:
+    if os.environ.get("FEATURE_ENGINE_NUMBA", "1").strip() in ("0", "false", "no", "off"):
+        raise ImportError("numba disabled by FEATURE_ENGINE_NUMBA")
+    from numba import njit
+
+    NUMBA_AVAILABLE = True
+except ImportError:
+    njit = None
+    NUMBA_AVAILABLE = False
+
+
+def _as_2d(values: ArrayLike) -> Tuple[np.ndarray, bool]:
+    arr = np.asarray(values, dtype=np.float64)
+    if arr.ndim == 1:
+        return arr.reshape(-1, 1), True
+    if arr.ndim != 2:
+        raise ValueError("kernels expect 1-D (bars,) or 2-D (bars, symbols) arrays")
+    return arr, False
+
+
+def _restore(out: np.ndarray, was_1d: bool) -> np.ndarray:
+    return out[:, 0] if was_1d else out
+
+
+def _first_valid(x: np.ndarray) -> np.ndarray:
+    """Row index of the first finite value per column (n_rows when the column is all NaN)."""
+    finite = np.isfinite(x)
+    return np.where(finite.any(axis=0), finite.argmax(axis=0), x.shape[0])
+
+
+def _recursive_mean_numpy(x: np.ndarray, period: int, alpha: float) -> np.ndarray:
+    n, m = x.shape
+    out = np.full((n, m), np.nan)
+    finite = np.isfinite(x)
+    count = np.cumsum(finite, axis=0)
+    reached = count >= period
+    seed_row = np.where(reached.any(axis=0), reached.argmax(axis=0), n)
+    cols = np.nonzero(seed_row < n)[0]
+    if cols.size == 0:
+        return out
+    # seed: mean of the first ``period`` finite values (NaN bars inside the warm-up are skipped)
+    sums = np.cumsum(np.where(finite, x, 0.0), axis=0)
+    out[seed_row[cols], cols] = sums[seed_row[cols], cols] / period
+    prev = np.full(m, np.nan)
+    prev[cols] = out[seed_row[cols], cols]
+    for t in range(int(seed_row[cols].min()) + 1, n):
+        xt = x[t]
+        upd = prev + alpha * (xt - prev)
+        live = (seed_row < t) & ~np.isnan(xt)
+        prev[live] = upd[live]
+        out[t, live] = upd[live]
+    return out
+
+
+if NUMBA_AVAILABLE:
+
+    @njit(cache=True)
+    def _recursive_mean_numba(x, period, alpha):  # pragma: no cover - exercised when numba present
+        n, m = x.shape
+        out = np.full((n, m), np.nan)
+        for j in range(m):
+            seed = n
+            acc = 0.0
+            count = 0
+            for t in range(n):
+                if np.isfinite(x[t, j]):
+                    acc += x[t, j]
+                    count += 1
+                    if count == period:
+                        seed = t
+                        break
+            if seed >= n:
+                continue
+            prev = acc / period
+            out[seed, j] = prev
+            for t in range(seed + 1, n):
+                if np.isnan(x[t, j]):
+                    continue
+                prev = prev + alpha * (x[t, j] - prev)
+                out[t, j] = prev
+        return out
+
+
+def _recursive_mean(x: np.ndarray, period: int, alpha: float) -> np.ndarray:
+    if NUMBA_AVAILABLE:
+        return _recursive_mean_numba(np.ascontiguousarray(x), int(period), float(alpha))
+    return _recursive_mean_numpy(x, int(period), float(alpha))
+
+
+def ema(values: ArrayLike, period: int) -> np.ndarray:
+    """EMA seeded with the SMA of the first ``period`` finite values; NaN during warm-up."""
+    x, was_1d = _as_2d(values)
+    return _restore(_recursive_mean(x, period, 2.0 / (period + 1)), was_1d)
+
+
+def wilder(values: ArrayLike, period: int) -> np.ndarray:
+    """Wilder smoothing (alpha = 1/period) seeded with the SMA of the first ``period`` finite values."""
+    x, was_1d = _as_2d(values)
+    return _restore(_recursive_mean(x, period, 1.0 / period), was_1d)
+
+
+def _shift(x: np.ndarray, k: int = 1) -> np.ndarray:
+    out = np.full_like(x, np.nan)
+    if k < x.shape[0]:
+        out[k:] = x[:-k]
+    return out
+
+
+def _rolling(x: np.ndarray, period: int, fn) -> np.ndarray:
+    out = np.full_like(x, np.nan)
+    if period <= 0 or x.shape[0] < period:
+        return out
+    windows = sliding_window_view(x, period, axis=0)
+    out[period - 1 :] = fn(windows, axis=-1)
+    return out
+
+
+def rolling_mean(values: ArrayLike, period: int) -> np.ndarray:
+    """Simple moving average over the trailing ``period`` bars (NaN until the window fills)."""
+    x, was_1d = _as_2d(values)
+    return _restore(_rolling(x, period, np.mean), was_1d)
+
+
+def rolling_max(values: ArrayLike, period: int) -> np.ndarray:
+    x, was_1d = _as_2d(values)
+    return _restore(_rolling(x, period, np.max), was_1d)
+
+
+def rolling_min(values: ArrayLike, period: int) -> np.ndarray:
+    x, was_1d = _as_2d(values)
+    return _restore(_rolling(x, period, np.min), was_1d)
+
+
+def rolling_std(values: ArrayLike, period: int) -> np.ndarray:
+    """Population std of the trailing window, ignoring NaNs inside the window."""
+    x, was_1d = _as_2d(values)
+    with warnings.catch_warnings():
+        # all-NaN windows (suspended symbols) legitimately yield NaN
+        warnings.simplefilter("ignore", RuntimeWarning)
+        out = _rolling(x, period, np.nanstd)
+    return _restore(out, was_1d)
+
+
+def returns(closes: ArrayLike) -> np.ndarray:
+    """Simple returns aligned to the bar they end on (row 0 is NaN); zero prices give NaN."""
+    c, was_1d = _as_2d(closes)
+    prev = _shift(c)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = (c - prev) / np.where(prev != 0, prev, np.nan)
+    return _restore(out, was_1d)
+
+
+def momentum(closes: ArrayLike, period: int = 10) -> np.ndarray:
+    c, was_1d = _as_2d(closes)
+    prev = _shift(c, period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = (c - prev) / np.where(prev != 0, prev, np.nan)
+    return _restore(out, was_1d)
+
+
+def volatility(closes: ArrayLike, period: int = 20) -> np.ndarray:
+    """Rolling std of returns; the first value lands ``period`` bars after a column's first close."""
+    c, was_1d = _as_2d(closes)
+    r = returns(c)
+    out = np.full_like(r, np.nan)
+    if r.shape[0] > period:
+        out[1:] = rolling_std(r[1:], period)
+        # windows reaching back before listing would be partial: blank them per column
+        out[np.arange(r.shape[0])[:, None] < (_first_valid(c) + period)[None, :]] = np.nan
+    return _restore(out, was_1d)
+
+
+def _rsi_averages(c: np.ndarray, period: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Wilder-smoothed average gain and loss of a 2-D close array."""
+    delta = c - _shift(c)
+    gain = np.where(delta > 0, delta, np.where(np.isnan(delta), np.nan, 0.0))
+    loss = np.where(delta < 0, -delta, np.where(np.isnan(delta), np.nan, 0.0))
+    return (
+        _recursive_mean(gain, period, 1.0 / period),
+        _recursive_mean(loss, period, 1.0 / period),
+    )
+
+
+def _rsi_from_averages(avg_gain: np.ndarray, avg_loss: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = np.where(avg_loss != 0, avg_gain / avg_loss, np.inf)
+    return np.where(np.isnan(avg_gain), np.nan, 100.0 - 100.0 / (1.0 + rs))
+
+
+def rsi(closes: ArrayLike, period: int = 14) -> np.ndarray:
+    """Wilder RSI; first ``period`` bars are NaN, zero average loss gives 100."""
+    c, was_1d = _as_2d(closes)
+    return _restore(_rsi_from_averages(*_rsi_averages(c, period)), was_1d)
+
+
+def macd(
+    closes: ArrayLike, fast: int = 12, slow: int = 26, signal: int = 9
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(macd_line, signal_line, histogram); the signal EMA starts at the first valid MACD value."""
+    c, was_1d = _as_2d(closes)
+    line = _recursive_mean(c, fast, 2.0 / (fast + 1)) - _recursive_mean(c, slow, 2.0 / (slow + 1))
+    sig = _recursive_mean(line, signal, 2.0 / (signal + 1))
+    hist = line - sig
+    return _restore(line, was_1d), _restore(sig, was_1d), _restore(hist, was_1d)
+
+
+def true_range(high: ArrayLike, low: ArrayLike, close: ArrayLike) -> np.ndarray:
+    h, was_1d = _as_2d(high)
+    l, _ = _as_2d(low)
+    c, _ = _as_2d(close)
+    prev_c = _shift(c)
+    # first bar of each column (and the bar after a gap) has no previous close: TR = H - L
+    prev_c = np.where(np.isnan(prev_c), c, prev_c)
+    tr = np.maximum(h - l, np.maximum(np.abs(h - prev_c), np.abs(l - prev_c)))
+    return _restore(tr, was_1d)
+
+
+def atr(high: ArrayLike, low: ArrayLike, close: ArrayLike, period: int = 14) -> np.ndarray:
+    """Wilder ATR of the true range; first ``period - 1`` bars are NaN."""
+    tr, was_1d = _as_2d(true_range(high, low, close))
+    return _restore(_recursive_mean(tr, period, 1.0 / period), was_1d)
+
+
+def vwap(high: ArrayLike, low: ArrayLike, close: ArrayLike, volume: ArrayLike) -> np.ndarray:
+    """Cumulative typical-price VWAP along the bar axis; zero-volume and NaN bars are skipped."""
+    _, was_1d = _as_2d(close)
+    cum_tpv, cum_vol = _vwap_sums(high, low, close, volume)
+    out = np.full_like(cum_tpv, np.nan)
+    np.divide(cum_tpv, cum_vol, out=out, where=cum_vol != 0)
+    return _restore(out, was_1d)
+
+
+def _vwap_sums(
+    high: ArrayLike, low: ArrayLike, close: ArrayLike, volume: ArrayLike
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Running sums of typical price × volume and of volume (2-D)."""
+    h, _ = _as_2d(high)
+    l, _ = _as_2d(low)
+    c, _ = _as_2d(close)
+    v, _ = _as_2d(volume)
+    typical = (h + l + c) / 3.0
+    vol = np.where((v == 0) | np.isnan(typical), np.nan, v)
+    return np.nancumsum(typical * vol, axis=0), np.nancumsum(vol, axis=0)
+
+
+def compute_features(
+    high: ArrayLike,
+    low: ArrayLike,
+    close: ArrayLike,
+    volume: ArrayLike,
+    rsi_period: int = 14,
+    macd_fast: int = 12,
+    macd_slow: int = 26,
+    macd_signal: int = 9,
+    atr_period: int = 14,
+    momentum_period: int = 10,
+    volatility_period: int = 20,
+) -> Dict[str, np.ndarray]:
+    """
+    Batch API: all feature columns of ``build_feature_matrix`` for a (bars × symbols) panel
+    in one pass. Returns name -> array with the input's shape.
+    """
+    macd_line, macd_sig, macd_hist = macd(close, macd_fast, macd_slow, macd_signal)
+    return {
+        "rsi": rsi(close, rsi_period),
+        "macd": macd_line,
+        "macd_signal": macd_sig,
+        "macd_hist": macd_hist,
+        "vwap": vwap(high, low, close, volume),
+        "atr": atr(high, low, close, atr_period),
+        "momentum": momentum(close, momentum_period),
+        "volatility": volatility(close, volatility_period),
+    }
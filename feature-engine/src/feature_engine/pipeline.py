@@ -1,41 +1,26 @@
 """Feature pipeline: OHLCV -> RSI, MACD, VWAP, ATR, Momentum, Volatility -> feature matrix."""
 
-from typing import List, Optional
+from typing import Dict, Optional
 
 import numpy as np
 import pandas as pd
 
-from core import OHLCV
-from .rsi import rsi
-from .macd import macd
-from .vwap import vwap
-from .atr import atr
+from core import OHLCVFrame, OHLCVLike, as_ohlcv_frame
+from . import kernels
 
 
 def momentum_returns(closes: np.ndarray, period: int = 10) -> np.ndarray:
     """Momentum: (close - close_shift(period)) / close_shift(period)."""
-    c = np.asarray(closes, dtype=float)
-    out = np.full(len(c), np.nan)
-    if len(c) <= period:
-        return out
-    out[period:] = (c[period:] - c[:-period]) / np.where(c[:-period] != 0, c[:-period], np.nan)
-    return out
+    return kernels.momentum(closes, period=period)
 
 
 def volatility_returns(closes: np.ndarray, period: int = 20) -> np.ndarray:
     """Volatility: rolling std of returns."""
-    c = np.asarray(closes, dtype=float)
-    ret = np.diff(c) / np.where(c[:-1] != 0, c[:-1], np.nan)
-    out = np.full(len(c), np.nan)
-    if len(ret) < period:
-        return out
-    for i in range(period - 1, len(ret)):
-        out[i + 1] = np.nanstd(ret[i - period + 1 : i + 1])
-    return out
+    return kernels.volatility(closes, period=period)
 
 
 def build_feature_matrix(
-    ohlcv_list: List[OHLCV],
+    ohlcv_list: OHLCVLike,
     rsi_period: int = 14,
     macd_fast: int = 12,
     macd_slow: int = 26,
@@ -45,44 +30,64 @@ def build_feature_matrix(
     volatility_period: int = 20,
 ) -> pd.DataFrame:
     """
-    Build feature matrix from OHLCV list.
+    Build feature matrix from an OHLCVFrame (columns used as-is) or a legacy OHLCV list.
     Columns: timestamp, open, high, low, close, volume, rsi, macd, macd_signal, macd_hist, vwap, atr, momentum, volatility.
     """
-    if not ohlcv_list:
+    if len(ohlcv_list) == 0:
         return pd.DataFrame()
 
-    n = len(ohlcv_list)
-    timestamps = [b.timestamp for b in ohlcv_list]
-    closes = np.array([b.close for b in ohlcv_list])
-    highs = np.array([b.high for b in ohlcv_list])
-    lows = np.array([b.low for b in ohlcv_list])
-    volumes = np.array([b.volume for b in ohlcv_list])
+    frame = as_ohlcv_frame(ohlcv_list)
+    # legacy lists keep their datetime objects (tz-aware timestamps stay tz-aware)
+    timestamps = frame.timestamp if isinstance(ohlcv_list, OHLCVFrame) else [b.timestamp for b in ohlcv_list]
 
-    rsi_arr = rsi(ohlcv_list, period=rsi_period)
-    macd_line, macd_sig, macd_hist = macd(
-        ohlcv_list, fast=macd_fast, slow=macd_slow, signal_period=macd_signal
+    feats = kernels.compute_features(
+        frame.high,
+        frame.low,
+        frame.close,
+        frame.volume,
+        rsi_period=rsi_period,
+        macd_fast=macd_fast,
+        macd_slow=macd_slow,
+        macd_signal=macd_signal,
+        atr_period=atr_period,
+        momentum_period=momentum_period,
+        volatility_period=volatility_period,
     )
-    vwap_arr = vwap(ohlcv_list)
-    atr_arr = atr(ohlcv_list, period=atr_period)
-    mom_arr = momentum_returns(closes, period=momentum_period)
-    vol_arr = volatility_returns(closes, period=volatility_period)
 
     df = pd.DataFrame(
         {
             "timestamp": timestamps,
-            "open": [b.open for b in ohlcv_list],
-            "high": highs,
-            "low": lows,
-            "close": closes,
-            "volume": volumes,
-            "rsi": rsi_arr,
-            "macd": macd_line,
-            "macd_signal": macd_sig,
-            "macd_hist": macd_hist,
-            "vwap": vwap_arr,
-            "atr": atr_arr,
-            "momentum": mom_arr,
-            "volatility": vol_arr,
+            "open": frame.open,
+            "high": frame.high,
+            "low": frame.low,
+            "close": frame.close,
+            "volume": frame.volume,
+            **feats,
         }
     )
     return df
+
+
+def build_feature_panel(
+    high: pd.DataFrame,
+    low: pd.DataFrame,
+    close: pd.DataFrame,
+    volume: pd.DataFrame,
+    **params: int,
+) -> Dict[str, pd.DataFrame]:
+    """
+    Whole-market variant of build_feature_matrix: inputs are date × code frames sharing one
+    index/columns (NaN where a symbol has no bar). Returns feature name -> date × code frame.
+    ``params`` are the period keyword arguments of build_feature_matrix.
+    """
+    feats = kernels.compute_features(
+        high.to_numpy(dtype=float),
+        low.to_numpy(dtype=float),
+        close.to_numpy(dtype=float),
+        volume.to_numpy(dtype=float),
+        **params,
+    )
+    return {
+        name: pd.DataFrame(arr, index=close.index, columns=close.columns)
+        for name, arr in feats.items()
+    }
@@ -0,0 +1,50 @@
+"""增量推进：advance 逐 bar 推进状态的结果与全量 compute_with_state 一致。"""
+
+import numpy as np
+
+from feature_engine import compute_features
+from feature_engine.incremental import FEATURE_COLUMNS, advance, compute_with_state
+
+
+def _ohlcv(n=120, seed=0):
+    rng = np.random.default_rng(seed)
+    c = 100.0 + np.cumsum(rng.normal(size=n))
+    return c + rng.random(n), c - rng.random(n), c, rng.integers(0, 3, n) * 1000.0
+
+
+def test_compute_with_state_matches_batch_features():
+    h, l, c, v = _ohlcv()
+    feats, states = compute_with_state(h, l, c, v)
+    ref = compute_features(h, l, c, v)
+    for name in FEATURE_COLUMNS:
+        np.testing.assert_array_equal(feats[name], ref[name])
+    assert states[0] is not None and len(states[0].closes) == 21
+
+
+def test_advance_matches_full_recompute():
+    h, l, c, v = _ohlcv()
+    full, _ = compute_with_state(h, l, c, v)
+    for cut in (40, 100, 119):
+        _, (state,) = compute_with_state(h[:cut], l[:cut], c[:cut], v[:cut])
+        out, _ = advance(state, h[cut:], l[cut:], c[cut:], v[cut:])
+        for name in FEATURE_COLUMNS:
+            np.testing.assert_allclose(out[name], full[name][cut:], rtol=1e-12, err_msg=name)
+
+
+def test_warmup_column_has_no_state():
+    h, l, c, v = _ohlcv(30)
+    _, states = compute_with_state(h, l, c, v)
+    assert states == [None]
+
+
+def test_advance_skips_nan_bars_like_batch():
+    h, l, c, v = _ohlcv()
+    h[60], l[60] = np.nan, np.nan  # 缺 high/low 的一根 bar
+    c[75] = np.nan  # 缺收盘价的一根 bar
+    full, _ = compute_with_state(h, l, c, v)
+    _, (state,) = compute_with_state(h[:50], l[:50], c[:50], v[:50])
+    out, new_state = advance(state, h[50:], l[50:], c[50:], v[50:])
+    for name in FEATURE_COLUMNS:
+        np.testing.assert_allclose(out[name], full[name][50:], rtol=1e-12, err_msg=name)
+    assert np.isfinite(out["atr"][-1]) and np.isfinite(new_state.atr)
+    assert np.isfinite(new_state.ema_fast) and np.isfinite(new_state.avg_gain)
@@ -0,0 +1,103 @@
+"""指标内核：与逐元素参考实现一致，2-D 面板按列独立计算（含未上市的前导 NaN）。"""
+
+import numpy as np
+import pandas as pd
+
+from feature_engine import build_feature_panel, compute_features, kernels
+
+
+def _ref_wilder_rsi(c, period=14):
+    n = len(c)
+    out = np.full(n, np.nan)
+    delta = np.diff(c)
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = np.where(delta < 0, -delta, 0.0)
+    ag, al = np.mean(gain[:period]), np.mean(loss[:period])
+    out[period] = 100 - 100 / (1 + ag / al)
+    for i in range(period + 1, n):
+        ag = (ag * (period - 1) + gain[i - 1]) / period
+        al = (al * (period - 1) + loss[i - 1]) / period
+        out[i] = 100 - 100 / (1 + ag / al)
+    return out
+
+
+def _ref_ema(v, period):
+    out = np.full(len(v), np.nan)
+    out[period - 1] = np.mean(v[:period])
+    mult = 2.0 / (period + 1)
+    for i in range(period, len(v)):
+        out[i] = (v[i] - out[i - 1]) * mult + out[i - 1]
+    return out
+
+
+def _prices(n=200, seed=0):
+    rng = np.random.default_rng(seed)
+    return 100.0 + np.cumsum(rng.normal(size=n))
+
+
+def test_rsi_and_ema_match_reference_loops():
+    c = _prices()
+    np.testing.assert_allclose(kernels.rsi(c, 14), _ref_wilder_rsi(c, 14), equal_nan=True)
+    np.testing.assert_allclose(kernels.ema(c, 12), _ref_ema(c, 12), equal_nan=True)
+
+
+def test_rolling_std_and_volatility():
+    c = _prices()
+    s = pd.Series(c)
+    np.testing.assert_allclose(
+        kernels.rolling_std(c, 20), s.rolling(20).std(ddof=0).to_numpy(), equal_nan=True
+    )
+    vol = kernels.volatility(c, 20)
+    ret = s.pct_change().rolling(20).std(ddof=0).to_numpy()
+    np.testing.assert_allclose(vol, ret, equal_nan=True)
+    assert np.isnan(vol[:20]).all() and not np.isnan(vol[20])
+
+
+def test_panel_columns_equal_single_series_with_late_listing():
+    a = _prices(seed=1)
+    b = _prices(n=150, seed=2)
+    panel = np.column_stack([a, np.r_[np.full(50, np.nan), b]])
+    high, low, vol = panel + 1.0, panel - 1.0, np.full_like(panel, 1000.0)
+
+    feats = compute_features(high, low, panel, vol)
+    single = compute_features(b + 1.0, b - 1.0, b, np.full_like(b, 1000.0))
+    for name in ("rsi", "macd", "macd_signal", "atr", "vwap", "momentum", "volatility"):
+        assert feats[name].shape == panel.shape
+        np.testing.assert_allclose(feats[name][50:, 1], single[name], equal_nan=True, err_msg=name)
+        assert np.isnan(feats[name][:50, 1]).all()
+
+
+def test_build_feature_panel_keeps_labels():
+    idx = pd.bdate_range("2024-01-01", periods=60)
+    close = pd.DataFrame({"000001": _prices(60, 3), "600519": _prices(60, 4)}, index=idx)
+    out = build_feature_panel(close + 1, close - 1, close, close * 0 + 100.0, rsi_period=6)
+    assert set(out) >= {"rsi", "macd", "atr", "volatility"}
+    assert out["rsi"].index.equals(idx) and list(out["rsi"].columns) == ["000001", "600519"]
+    np.testing.assert_allclose(
+        out["rsi"]["600519"].to_numpy(), kernels.rsi(close["600519"].to_numpy(), 6), equal_nan=True
+    )
+
+
+def test_suspension_gap_does_not_poison_recursive_state():
+    c = _prices(80, 5)
+    gapped = c.copy()
+    gapped[40:43] = np.nan
+    for fn in (lambda x: kernels.ema(x, 10), lambda x: kernels.rsi(x, 14)):
+        out = fn(gapped)
+        assert np.isnan(out[40:43]).all()
+        assert np.isfinite(out[45:]).all()
+
+
+def test_nan_inside_warmup_delays_seed_instead_of_poisoning():
+    c = _prices(80, 5)
+    gapped = c.copy()
+    gapped[5] = np.nan
+    kept = np.delete(np.arange(80), 5)
+    out = kernels.ema(gapped, 10)
+    assert np.isnan(out[:10]).all() and np.isnan(out[5])
+    np.testing.assert_allclose(out[kept], _ref_ema(c[kept], 10), equal_nan=True)
+    np.testing.assert_allclose(
+        kernels._recursive_mean_numpy(gapped.reshape(-1, 1), 10, 2.0 / 11)[:, 0], out, equal_nan=True
+    )
+    r = kernels.rsi(gapped, 14)
+    assert np.isfinite(r[17:]).all()
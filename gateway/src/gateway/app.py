@@ -82,7 +82,7 @@ app.include_router(_health_api, prefix="/api", tags=["health"])
 
 @app.middleware("http")
 async def audit_log_middleware(request, call_next):
-    """审计：记录请求 method、path、client_host 到 audit_log 表；记录耗时到 Prometheus。"""
+    """审计：method/path/client_host 入队，后台 audit_writer 批量写 audit_log；耗时记入 Prometheus。"""
     import time
 
     start = time.perf_counter()
@@ -95,20 +95,10 @@ async def audit_log_middleware(request, call_next):
         pass
     try:
         _ensure_repo_paths()
-        from data_pipeline.storage.duckdb_manager import get_conn, ensure_tables, get_db_path
-        import os
-
-        if os.path.isfile(get_db_path()):
-            conn = get_conn(read_only=False)
-            ensure_tables(conn)
-            r = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 AS n FROM audit_log").fetchone()
-            nid = int(r[0]) if r else 1
-            host = request.client.host if request.client else ""
-            conn.execute(
-                "INSERT INTO audit_log (id, method, path, client_host) VALUES (?, ?, ?, ?)",
-                [nid, request.method, request.url.path or "", host],
-            )
-            conn.close()
+        from .audit_writer import get_audit_writer
+
+        host = request.client.host if request.client else ""
+        get_audit_writer().record(request.method, request.url.path or "", host)
     except Exception:
         pass
     return response
@@ -152,6 +142,18 @@ def metrics():
     try:
         from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
 
+        from .metrics import (
+            record_audit_metrics,
+            record_backtest_cache_metrics,
+            record_db_pool_metrics,
+            record_market_hub_metrics,
+        )
+
+        _ensure_repo_paths()
+        record_db_pool_metrics()
+        record_audit_metrics()
+        record_market_hub_metrics()
+        record_backtest_cache_metrics()
         return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
     except ImportError:
         return Response(content="# prometheus_client not installed\n", media_type="text/plain")
@@ -0,0 +1,176 @@
+"""
+审计日志后台批量写入
+
+``audit_log_middleware`` 只把 (method, path, client_host, created_at) 放进内存有界队列，
+后台线程每 ``AUDIT_LOG_FLUSH_MS`` 毫秒或攒满 ``AUDIT_LOG_BATCH_ROWS`` 行时用一次 DataFrame
+批量 INSERT 写入 audit_log，id 取自序列 ``audit_log_id_seq``。请求路径上不再有 DuckDB 写锁。
+
+队列容量 ``AUDIT_LOG_QUEUE_SIZE``；满时按 ``AUDIT_LOG_DROP_POLICY`` 丢弃：``oldest``（默认，
+环形缓冲覆盖最旧记录）或 ``newest``（丢弃新到记录）。``stats()`` 返回入队/丢弃/写入/失败计数。
+"""
+
+from __future__ import annotations
+
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+_log = logging.getLogger(__name__)
+
+AuditRecord = Tuple[str, str, str, datetime]
+
+
+class AuditLogWriter:
+    """有界内存队列 + 后台批量刷写线程。"""
+
+    def __init__(
+        self,
+        flush_interval_ms: int = 500,
+        batch_rows: int = 500,
+        queue_size: int = 10000,
+        drop_policy: str = "oldest",
+    ):
+        self.flush_interval = max(1, int(flush_interval_ms)) / 1000.0
+        self.batch_rows = max(1, int(batch_rows))
+        self.queue_size = max(1, int(queue_size))
+        self.drop_policy = "newest" if drop_policy == "newest" else "oldest"
+        self._queue: Deque[AuditRecord] = deque()
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._stats: Dict[str, float] = {
+            "enqueued_total": 0,
+            "dropped_total": 0,
+            "written_total": 0,
+            "batches_total": 0,
+            "flush_errors_total": 0,
+            "last_flush_ms": 0.0,
+        }
+
+    def record(self, method: str, path: str, client_host: str) -> None:
+        """请求路径调用：只入队，不触库。"""
+        item = (method or "", path or "", client_host or "", datetime.now())
+        with self._cond:
+            if len(self._queue) >= self.queue_size:
+                self._stats["dropped_total"] += 1
+                if self.drop_policy == "newest":
+                    return
+                self._queue.popleft()
+            self._queue.append(item)
+            self._stats["enqueued_total"] += 1
+            if len(self._queue) >= self.batch_rows:
+                self._cond.notify()
+        if self._thread is None:
+            self._start()
+
+    def _start(self) -> None:
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="audit-log-writer", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if not self._stopping and len(self._queue) < self.batch_rows:
+                    self._cond.wait(self.flush_interval)
+                stopping = self._stopping
+            self.flush()
+            if stopping:
+                return
+
+    def _drain(self) -> List[AuditRecord]:
+        with self._cond:
+            n = min(len(self._queue), self.batch_rows)
+            return [self._queue.popleft() for _ in range(n)]
+
+    def flush(self) -> int:
+        """把队列中已有记录全部写入 audit_log；返回写入行数。可在读审计日志前同步调用。"""
+        written = 0
+        with self._flush_lock:
+            while True:
+                batch = self._drain()
+                if not batch:
+                    return written
+                start = time.perf_counter()
+                try:
+                    written += self._write(batch)
+                except Exception:
+                    with self._cond:
+                        self._stats["flush_errors_total"] += 1
+                        self._stats["dropped_total"] += len(batch)
+                    _log.debug("audit log flush failed", exc_info=True)
+                    return written
+                with self._cond:
+                    self._stats["batches_total"] += 1
+                    self._stats["last_flush_ms"] = (time.perf_counter() - start) * 1000.0
+
+    def _write(self, batch: List[AuditRecord]) -> int:
+        import pandas as pd
+
+        from data_pipeline.storage.duckdb_manager import ensure_tables, get_conn, get_db_path
+
+        if not os.path.isfile(get_db_path()):
+            # 与旧行为一致：库文件不存在时不为审计新建库
+            with self._cond:
+                self._stats["dropped_total"] += len(batch)
+            return 0
+        df = pd.DataFrame(batch, columns=["method", "path", "client_host", "created_at"])
+        conn = get_conn(read_only=False)
+        try:
+            ensure_tables(conn)
+            conn.register("tmp_audit_log", df)
+            conn.execute("""
+                INSERT INTO audit_log (id, method, path, client_host, created_at)
+                SELECT nextval('audit_log_id_seq'), method, path, client_host, created_at
+                FROM tmp_audit_log
+            """)
+            conn.unregister("tmp_audit_log")
+        finally:
+            conn.close()
+        with self._cond:
+            self._stats["written_total"] += len(batch)
+        return len(batch)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """停止后台线程并刷写剩余记录。"""
+        with self._cond:
+            thread = self._thread
+            self._stopping = True
+            self._cond.notify()
+        if thread is not None:
+            thread.join(timeout)
+        with self._cond:
+            self._thread = None
+        self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {"queued": len(self._queue), "queue_size": self.queue_size, **self._stats}
+
+
+_writer: Optional[AuditLogWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_audit_writer() -> AuditLogWriter:
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = AuditLogWriter(
+                    flush_interval_ms=int(os.environ.get("AUDIT_LOG_FLUSH_MS", "500")),
+                    batch_rows=int(os.environ.get("AUDIT_LOG_BATCH_ROWS", "500")),
+                    queue_size=int(os.environ.get("AUDIT_LOG_QUEUE_SIZE", "10000")),
+                    drop_policy=os.environ.get("AUDIT_LOG_DROP_POLICY", "oldest").strip().lower(),
+                )
+                atexit.register(_writer.stop)
+    return _writer
@@ -101,6 +101,50 @@ def _normalize_sym_show(code_used: str) -> str:
     return sym_show
 
 
+def _klines_from_ohlcv_panel(symbol: str, lim: int) -> Optional[dict]:
+    """
+    进程级 OHLCV 面板缓存（backtest_engine.panel_store）已预热时直接切片；未安装/关闭/冷缓存/未命中返回 None。
+    单标的请求不触发全市场面板加载，冷缓存时由调用方回落到单标的 SQL。
+    """
+    try:
+        from backtest_engine.panel_store import get_panel_store, panel_cache_enabled
+    except ImportError:
+        return None
+    if not panel_cache_enabled():
+        return None
+    panel = get_panel_store().peek()
+    if panel is None:
+        return None
+    for code_try in _pipeline_code_variants(symbol):
+        if not panel.has(code_try):
+            continue
+        df = panel.frame(code_try)
+        if df.empty:
+            continue
+        df = df.tail(lim).fillna(0.0)
+        data = [
+            {
+                "t": _row_date_to_utc_iso(td),
+                "o": float(o),
+                "h": float(h),
+                "l": float(l),
+                "c": float(c),
+                "close": float(c),
+                "v": float(v),
+            }
+            for td, o, h, l, c, v in zip(
+                df["date"], df["open"], df["high"], df["low"], df["close"], df["volume"]
+            )
+        ]
+        return {
+            "symbol": _normalize_sym_show(code_try),
+            "interval": "1d",
+            "limit": len(data),
+            "data": data,
+        }
+    return None
+
+
 def _fetch_klines_from_a_stock_daily(symbol: str, limit: int = 120) -> Optional[dict]:
     """
     当 astock daily_bars 无数据时，从 a_stock_daily 读最近 N 根日线（纯 SQL + fetchall，不依赖 pandas）。
@@ -114,6 +158,9 @@ def _fetch_klines_from_a_stock_daily(symbol: str, limit: int = 120) -> Optional[
         if not path or not os.path.isfile(path):
             return None
         lim = max(10, min(int(limit or 120), 500))
+        cached = _klines_from_ohlcv_panel(symbol, lim)
+        if cached is not None:
+            return cached
         conn = get_conn(read_only=False)
         try:
             for code_try in _pipeline_code_variants(symbol):
@@ -928,7 +975,21 @@ def _market_db_query(table: str, order_by: str, limit: int = 100) -> list:
 
 @router.get("/market/realtime")
 def get_market_realtime(limit: int = 100) -> list:
-    """实时行情快照（数据管道 a_stock_realtime），按成交额降序。"""
+    """
+    实时行情快照（数据管道 a_stock_realtime），按成交额降序。
+    Hub 因 WebSocket 订阅正在轮询时读内存最新快照，不扫表；REST 请求本身不启动轮询。
+    """
+    try:
+        from .market_hub import get_market_hub, hub_enabled
+
+        if hub_enabled():
+            hub = get_market_hub()
+            rows = hub.latest("ashare") if hub.polling else None
+            if rows is not None:
+                rows.sort(key=lambda r: (r.get("amount") is None, -(r.get("amount") or 0)))
+                return rows[:limit]
+    except Exception:
+        pass
     try:
         from data_pipeline.storage.duckdb_manager import get_conn, get_db_path
         import os
@@ -937,7 +998,7 @@ def get_market_realtime(limit: int = 100) -> list:
             return []
         conn = get_conn(read_only=False)
         df = conn.execute(
-            "SELECT code, name, latest_price, change_pct, volume, amount, snapshot_time FROM a_stock_realtime ORDER BY amount DESC NULLS LAST LIMIT ?",
+            "SELECT code, name, latest_price, change_pct, volume, amount, snapshot_time FROM latest_quote ORDER BY amount DESC NULLS LAST LIMIT ?",
             [limit],
         ).fetchdf()
         conn.close()
@@ -978,7 +1039,7 @@ def get_market_limitup(limit: int = 100) -> list:
                 r.snapshot_time
             FROM ranked r
             LEFT JOIN a_stock_basic b ON b.code = r.code
-            LEFT JOIN a_stock_realtime rt ON rt.code = r.code
+            LEFT JOIN latest_quote rt ON rt.code = r.code
             LEFT JOIN (
                 SELECT code, close AS c,
                     ROW_NUMBER() OVER (PARTITION BY code ORDER BY date DESC) AS rn
@@ -1091,7 +1152,7 @@ def get_market_longhubang(limit: int = 100) -> list:
                 r.snapshot_time
             FROM ranked r
             LEFT JOIN a_stock_basic b ON b.code = r.code
-            LEFT JOIN a_stock_realtime rt ON rt.code = r.code
+            LEFT JOIN latest_quote rt ON rt.code = r.code
             LEFT JOIN (
                 SELECT code, close AS c,
                     ROW_NUMBER() OVER (PARTITION BY code ORDER BY date DESC) AS rn
@@ -1159,7 +1220,7 @@ def get_market_fundflow(limit: int = 100) -> list:
                 rt.change_pct AS change_pct
             FROM ranked r
             LEFT JOIN a_stock_basic b ON b.code = r.code
-            LEFT JOIN a_stock_realtime rt ON rt.code = r.code
+            LEFT JOIN latest_quote rt ON rt.code = r.code
             LEFT JOIN (
                 SELECT code, close AS c,
                     ROW_NUMBER() OVER (PARTITION BY code ORDER BY date DESC) AS rn
@@ -1313,7 +1374,7 @@ def get_strategy_signals(limit: int = 50) -> list:
                 t.snapshot_time
             FROM trade_signals t
             LEFT JOIN a_stock_basic b ON b.code = t.code
-            LEFT JOIN a_stock_realtime rt ON rt.code = t.code
+            LEFT JOIN latest_quote rt ON rt.code = t.code
             LEFT JOIN (
                 SELECT code, close AS c,
                     ROW_NUMBER() OVER (PARTITION BY code ORDER BY date DESC) AS rn
@@ -1524,15 +1585,8 @@ def get_sniper_candidates(limit: int = 50) -> list:
                     FROM a_stock_limitup
                 ),
                 rt_rn AS (
-                    SELECT
-                        split_part(CAST(code AS VARCHAR), '.', 1) AS code6,
-                        latest_price,
-                        change_pct,
-                        ROW_NUMBER() OVER (
-                            PARTITION BY split_part(CAST(code AS VARCHAR), '.', 1)
-                            ORDER BY snapshot_time DESC NULLS LAST
-                        ) AS rn
-                    FROM a_stock_realtime
+                    SELECT code AS code6, latest_price, change_pct, 1 AS rn
+                    FROM latest_quote
                 )
                 SELECT
                     r.code,
@@ -1970,7 +2024,7 @@ def _policy_news_from_duckdb(
         ensure_tables(conn)
         q = (
             "SELECT title, source, tag, content, url, keyword, publish_time, "
-            "sentiment_score, sentiment_label "
+            "sentiment_score, sentiment_label, related_codes "
             "FROM news_items WHERE symbol = ? AND (? IS NULL OR tag = ?) "
             "ORDER BY COALESCE(publish_time, '') DESC, ts DESC LIMIT ? OFFSET ?"
         )
@@ -1985,6 +2039,7 @@ def _policy_news_from_duckdb(
             pub = (row[6] or "")[:19] if row[6] else ""
             sc = row[7]
             lbl = row[8]
+            related = [c for c in (row[9] or "").split(",") if c]
             items.append(
                 {
                     "title": title,
@@ -1996,6 +2051,7 @@ def _policy_news_from_duckdb(
                     "keyword": keyword,
                     "sentiment_score": float(sc) if sc is not None else None,
                     "sentiment_label": lbl or _policy_sentiment_label(sc),
+                    "related_codes": related,
                 }
             )
         return items, True
@@ -2054,10 +2110,14 @@ def get_news_coverage() -> dict:
 
 
 def _hot_ticker_from_duckdb_news(limit: int = 16) -> List[dict]:
-    """热榜、东财实时均失败时，用 DuckDB news_items 近期标题兜底（日内任务写入后可滚动展示）。"""
+    """
+    热榜、东财实时均失败时，用 DuckDB news_items 近期标题兜底（日内任务写入后可滚动展示）。
+    无个股 symbol 的快讯 / 政策新闻按标题中首个提及的股票简称补 code（共享名称索引，一次扫描）。
+    """
     out: List[dict] = []
     try:
         from data_pipeline.storage.duckdb_manager import get_conn, get_db_path
+        from data_pipeline.storage.stock_name_index import get_stock_name_index
 
         if not os.path.isfile(get_db_path()):
             return out
@@ -2071,6 +2131,7 @@ def _hot_ticker_from_duckdb_news(limit: int = 16) -> List[dict]:
             """,
             [max(4, int(limit))],
         ).fetchall()
+        index = get_stock_name_index(conn)
         conn.close()
         for title, sym in rows or []:
             t = str(title or "").strip()[:72]
@@ -2078,6 +2139,9 @@ def _hot_ticker_from_duckdb_news(limit: int = 16) -> List[dict]:
                 continue
             code = str(sym or "").strip()
             code6 = code[-6:] if len(code) >= 6 and code[-6:].isdigit() else None
+            if code6 is None:
+                found = index.codes_in(t, limit=1)
+                code6 = found[0][:6] if found else None
             out.append({"type": "news_db", "text": t, "code": code6})
     except Exception:
         pass
@@ -2308,10 +2372,11 @@ def post_news_web_insight(payload: dict = Body(default_factory=dict)) -> dict:
     """
     用现有 DOUBAO 或 DASHSCOPE Key 做「联网向」舆情问答（抖音/中文热点依赖方舟是否开启联网内容插件）。
     Body: { "query": "...", "provider": "doubao" | "dashscope" }
+    同一问题在 NEWS_WEB_INSIGHT_CACHE_SEC（默认 600 秒）内命中共享 LLM 响应缓存。
     """
     import os
 
-    import requests
+    from core.llm import get_llm_client
 
     query = (payload.get("query") or "").strip()
     if not query or len(query) > 2000:
@@ -2324,6 +2389,8 @@ def post_news_web_insight(payload: dict = Body(default_factory=dict)) -> dict:
     )
     user_msg = f"用户问题：\n{query}"
 
+    if provider not in ("doubao", "dashscope"):
+        raise HTTPException(status_code=400, detail='provider 仅支持 "doubao" 或 "dashscope"')
     if provider == "doubao":
         key = os.environ.get("DOUBAO_API_KEY") or os.environ.get("VOLCANO_ENGINE_API_KEY")
         model = (os.environ.get("DOUBAO_MODEL") or "").strip()
@@ -2333,76 +2400,43 @@ def post_news_web_insight(payload: dict = Body(default_factory=dict)) -> dict:
                 "error": "missing_doubao_config",
                 "hint": "配置 DOUBAO_API_KEY 与 DOUBAO_MODEL（推理接入点 ID）。抖音类时效需在火山方舟为该接入点开启联网内容插件，见 docs/NEWS_CHANNELS_WITH_EXISTING_KEYS.md",
             }
-        base = os.environ.get("ARK_API_BASE", "https://ark.cn-beijing.volces.com/api/v3")
-        try:
-            r = requests.post(
-                f"{base.rstrip('/')}/chat/completions",
-                headers={"Authorization": f"Bearer {key}", "Content-Type": "application/json"},
-                timeout=120,
-                json={
-                    "model": model,
-                    "messages": [
-                        {"role": "system", "content": sys_msg},
-                        {"role": "user", "content": user_msg},
-                    ],
-                    "max_tokens": 4096,
-                },
-            )
-            data = r.json()
-            if r.status_code != 200:
-                return {
-                    "ok": False,
-                    "error": f"ark_http_{r.status_code}",
-                    "detail": str(data)[:500],
-                }
-            text = (data.get("choices") or [{}])[0].get("message", {}).get("content") or ""
-            return {
-                "ok": True,
-                "provider": "doubao",
-                "text": text.strip(),
-                "note": "是否含实时检索取决于方舟接入点是否启用联网内容插件",
-            }
-        except Exception as e:
-            return {"ok": False, "error": str(e)[:300]}
-
-    if provider == "dashscope":
+    else:
         key = os.environ.get("DASHSCOPE_API_KEY") or os.environ.get("BAILIAN_API_KEY")
         model = os.environ.get("NEWS_WEB_INSIGHT_MODEL", "qwen-turbo")
         if not key:
             return {"ok": False, "error": "missing_DASHSCOPE_API_KEY"}
-        try:
-            r = requests.post(
-                "https://dashscope.aliyuncs.com/compatible-mode/v1/chat/completions",
-                headers={"Authorization": f"Bearer {key}", "Content-Type": "application/json"},
-                timeout=120,
-                json={
-                    "model": model,
-                    "messages": [
-                        {"role": "system", "content": sys_msg},
-                        {"role": "user", "content": user_msg},
-                    ],
-                    "max_tokens": 4096,
-                },
-            )
-            data = r.json()
-            if r.status_code != 200:
-                return {
-                    "ok": False,
-                    "error": f"dashscope_{r.status_code}",
-                    "detail": str(data)[:500],
-                }
-            text = (data.get("choices") or [{}])[0].get("message", {}).get("content") or ""
-            return {
-                "ok": True,
-                "provider": "dashscope",
-                "model": model,
-                "text": text.strip(),
-                "note": "通义侧若应用开启联网/搜索能力则时效更强，见百炼控制台",
-            }
-        except Exception as e:
-            return {"ok": False, "error": str(e)[:300]}
 
-    raise HTTPException(status_code=400, detail='provider 仅支持 "doubao" 或 "dashscope"')
+    # 热点问答时效性强：同一问题默认只缓存 10 分钟
+    res = get_llm_client().chat(
+        [
+            {"role": "system", "content": sys_msg},
+            {"role": "user", "content": user_msg},
+        ],
+        providers=[f"{provider}:{model}"],
+        max_tokens=4096,
+        timeout=120,
+        cache_ttl=float(os.environ.get("NEWS_WEB_INSIGHT_CACHE_SEC", "600")),
+        namespace="news_web_insight",
+    )
+    if not res.ok:
+        err = res.error or ""
+        return {"ok": False, "error": err.split(":", 1)[0][:300], "detail": err[:500]}
+    if provider == "doubao":
+        return {
+            "ok": True,
+            "provider": "doubao",
+            "text": res.text,
+            "cached": res.cached,
+            "note": "是否含实时检索取决于方舟接入点是否启用联网内容插件",
+        }
+    return {
+        "ok": True,
+        "provider": "dashscope",
+        "model": model,
+        "text": res.text,
+        "cached": res.cached,
+        "note": "通义侧若应用开启联网/搜索能力则时效更强，见百炼控制台",
+    }
 
 
 def _fetch_news_for_research(symbol: Optional[str], limit: int) -> tuple[List[dict], Optional[str]]:
@@ -2436,10 +2470,13 @@ def _fetch_news_for_research(symbol: Optional[str], limit: int) -> tuple[List[di
 def _llm_news_summary(blob: str, symbol_label: str, focus: str) -> tuple[Optional[str], Optional[str], Optional[str]]:
     """
     调用大模型生成投研向新闻摘要。返回 (summary_text, model_used, error)。
-    优先 DashScope（BAILIAN/DASHSCOPE_API_KEY），其次 OPENAI_API_KEY。
+    经共享 LLM 客户端：DashScope（BAILIAN/DASHSCOPE_API_KEY）失败时回退 OPENAI_API_KEY；
+    同一新闻列表 + 关注点在缓存 TTL 内重复请求不再调用模型。
     """
     import os
 
+    from core.llm import get_llm_client
+
     sys_prompt = (
         "你是 A 股投研助手。根据用户提供的新闻列表，用中文输出：\n"
         "1) 【核心摘要】300 字以内；\n"
@@ -2453,65 +2490,21 @@ def _llm_news_summary(blob: str, symbol_label: str, focus: str) -> tuple[Optiona
         user_prompt += f"用户关注点：{focus}\n"
     user_prompt += "新闻列表：\n" + blob[:12000]
 
-    key = os.environ.get("DASHSCOPE_API_KEY") or os.environ.get("BAILIAN_API_KEY")
     model_ds = os.environ.get("RESEARCH_LLM_MODEL", "qwen-turbo")
-    if key:
-        try:
-            import requests
-
-            r = requests.post(
-                "https://dashscope.aliyuncs.com/compatible-mode/v1/chat/completions",
-                headers={"Authorization": f"Bearer {key}", "Content-Type": "application/json"},
-                timeout=90,
-                json={
-                    "model": model_ds,
-                    "messages": [
-                        {"role": "system", "content": sys_prompt},
-                        {"role": "user", "content": user_prompt},
-                    ],
-                    "max_tokens": 2000,
-                },
-            )
-            data = r.json()
-            if r.status_code != 200:
-                err = data.get("message") or data.get("error", {}).get("message") or r.text[:200]
-                return None, None, f"dashscope_http_{r.status_code}: {err}"
-            choices = data.get("choices") or []
-            if not choices:
-                return None, None, "dashscope_empty_choices"
-            text = (choices[0].get("message") or {}).get("content") or ""
-            return text.strip() or None, model_ds, None
-        except Exception as e:
-            return None, None, f"dashscope:{e!s}"[:300]
-
-    key_oai = os.environ.get("OPENAI_API_KEY")
     model_oai = os.environ.get("RESEARCH_OPENAI_MODEL", "gpt-4o-mini")
-    if key_oai:
-        try:
-            import requests
-
-            r = requests.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers={"Authorization": f"Bearer {key_oai}", "Content-Type": "application/json"},
-                timeout=90,
-                json={
-                    "model": model_oai,
-                    "messages": [
-                        {"role": "system", "content": sys_prompt},
-                        {"role": "user", "content": user_prompt},
-                    ],
-                    "max_tokens": 2000,
-                },
-            )
-            data = r.json()
-            if r.status_code != 200:
-                return None, None, f"openai_{r.status_code}:{str(data)[:200]}"
-            text = (data.get("choices") or [{}])[0].get("message", {}).get("content") or ""
-            return text.strip() or None, model_oai, None
-        except Exception as e:
-            return None, None, f"openai:{e!s}"[:300]
-
-    return None, None, "no_llm_key"
+    res = get_llm_client().chat(
+        [
+            {"role": "system", "content": sys_prompt},
+            {"role": "user", "content": user_prompt},
+        ],
+        providers=[f"dashscope:{model_ds}", f"openai:{model_oai}"],
+        max_tokens=2000,
+        timeout=90,
+        namespace="research_news_summary",
+    )
+    if not res.ok:
+        return None, None, res.error
+    return res.text, res.model, None
 
 
 @router.post("/research/news-summary")
@@ -2731,20 +2724,36 @@ def _run_backtest_internal(
         _p = os.path.join(_root, _d)
         if os.path.isdir(_p) and _p not in sys.path:
             sys.path.insert(0, _p)
-    from backtest_engine import run_backtest_from_db, run_backtest_multi_from_db
+    from backtest_engine import cached_backtest, run_backtest_from_db, run_backtest_multi_from_db
+    from backtest_engine.farm import BacktestJob
 
     end = end_date or datetime.now().strftime("%Y-%m-%d")
     start = start_date or (datetime.now() - timedelta(days=365)).strftime("%Y-%m-%d")
     sym_list = [s.strip() for s in (symbols or symbol).split(",") if s.strip()]
+    # 同参数 + 同数据版本（日 K / 信号水位）的回测直接取缓存，重复点击不重算
     if len(sym_list) > 1:
-        out = run_backtest_multi_from_db(
-            symbols=sym_list,
-            start_date=start,
-            end_date=end,
+        spec = {
+            "kind": "multi",
+            "symbols": sym_list,
+            "start_date": start,
+            "end_date": end,
+            "signal_source": signal_source,
+            "init_cash": init_cash,
+            "fees": fees,
+            "slippage": slippage,
+        }
+        out = cached_backtest(
+            spec,
+            lambda: run_backtest_multi_from_db(
+                symbols=sym_list,
+                start_date=start,
+                end_date=end,
+                signal_source=signal_source,
+                init_cash=init_cash,
+                fees=fees,
+                slippage=slippage,
+            ),
             signal_source=signal_source,
-            init_cash=init_cash,
-            fees=fees,
-            slippage=slippage,
         )
         base = {
             "symbols": sym_list,
@@ -2754,7 +2763,7 @@ def _run_backtest_internal(
         }
     else:
         sym = sym_list[0] if sym_list else symbol
-        out = run_backtest_from_db(
+        job = BacktestJob(
             symbol=sym,
             start_date=start,
             end_date=end,
@@ -2763,6 +2772,19 @@ def _run_backtest_internal(
             fees=fees,
             slippage=slippage,
         )
+        out = cached_backtest(
+            job.cache_key(),
+            lambda: run_backtest_from_db(
+                symbol=sym,
+                start_date=start,
+                end_date=end,
+                signal_source=signal_source,
+                init_cash=init_cash,
+                fees=fees,
+                slippage=slippage,
+            ),
+            signal_source=signal_source,
+        )
         base = {"symbol": sym, "start_date": start, "end_date": end, "signal_source": signal_source}
     return {
         **base,
@@ -2920,12 +2942,48 @@ def get_portfolio_weights() -> dict:
 
 @router.get("/risk/status")
 def risk_status() -> dict:
-    """Risk checks status (stub)."""
-    return {
-        "drawdown_ok": True,
-        "exposure_ok": True,
-        "volatility_ok": True,
-    }
+    """
+    模拟盘风控状态：回撤 / EWMA 波动 / 滚动 VaR / 行业暴露（risk_engine.metrics 增量维护）。
+    每次只读新的资金快照；持仓价格由行情 Hub 的 A 股增量按 tick 更新。
+    drawdown_ok / exposure_ok / volatility_ok 的阈值取 risk_rules 与 RISK_MAX_VOLATILITY。
+    """
+    ok = {"drawdown_ok": True, "exposure_ok": True, "volatility_ok": True}
+    try:
+        from data_pipeline.storage.duckdb_manager import get_conn, get_db_path
+        import os
+
+        _risk_engine_module()
+        from risk_engine.metrics import get_risk_metrics
+
+        service = get_risk_metrics()
+        _attach_risk_metrics(service)
+        if not os.path.isfile(get_db_path()):
+            return {**ok, **service.status()}
+        conn = get_conn(read_only=True)
+        try:
+            return service.status(conn)
+        finally:
+            conn.close()
+    except Exception as e:
+        return {**ok, "error": str(e)}
+
+
+_risk_metrics_attached = False
+
+
+def _attach_risk_metrics(service: Any) -> None:
+    """首次调用时把风控指标挂到行情 Hub（MARKET_HUB 关闭时不挂）。"""
+    global _risk_metrics_attached
+    if _risk_metrics_attached:
+        return
+    _risk_metrics_attached = True
+    try:
+        from .market_hub import get_market_hub, hub_enabled
+
+        if hub_enabled():
+            get_market_hub().add_listener(service.on_market_deltas)
+    except Exception:
+        pass
 
 
 def _risk_engine_module():
@@ -3051,6 +3109,9 @@ def get_audit_logs(limit: int = 100) -> dict:
         from data_pipeline.storage.duckdb_manager import get_conn, get_db_path
         import os
 
+        from .audit_writer import get_audit_writer
+
+        get_audit_writer().flush()
         if not os.path.isfile(get_db_path()):
             return {"logs": []}
         conn = get_conn(read_only=False)
@@ -206,6 +206,24 @@ def build_health_detail_payload() -> Dict[str, Any]:
     out["celery"] = _celery_inspect_brief()
     out["pipeline_meta_recent"] = _pipeline_meta_recent()
     out["prometheus_metrics_path"] = "/metrics"
+    try:
+        from data_pipeline.storage.connection_pool import pool_stats
+
+        out["db_pool"] = pool_stats()
+    except Exception:
+        out["db_pool"] = []
+    try:
+        from .audit_writer import get_audit_writer
+
+        out["audit_writer"] = get_audit_writer().stats()
+    except Exception:
+        out["audit_writer"] = {}
+    try:
+        from .market_hub import get_market_hub
+
+        out["market_hub"] = get_market_hub().stats()
+    except Exception:
+        out["market_hub"] = {}
     _webhook = os.environ.get("ALERT_WEBHOOK_URL", "").strip()
     out["alert_webhook_configured"] = bool(_webhook)
     return out
@@ -195,6 +195,8 @@ def _run_pipeline_job(job_id: str) -> None:
                     all_staged.append(s)
 
         if mode in ("evolve_then_backtest", "backtest_only"):
+            from backtest_engine.farm import BacktestJob
+            from backtest_engine.result_cache import cached_backtest
             from backtest_engine.run_with_db import run_backtest_from_db
 
             bt = payload.get("backtest") or {}
@@ -205,7 +207,7 @@ def _run_pipeline_job(job_id: str) -> None:
                 except Exception as e:
                     result_parts.setdefault("backtest_errors", []).append(str(e)[:200])
                     continue
-                out = run_backtest_from_db(
+                job = BacktestJob(
                     symbol=b.symbol,
                     start_date=b.start_date,
                     end_date=b.end_date,
@@ -215,6 +217,21 @@ def _run_pipeline_job(job_id: str) -> None:
                     fees=b.fees,
                     slippage=b.slippage,
                 )
+                out = cached_backtest(
+                    job.cache_key(),
+                    lambda b=b: run_backtest_from_db(
+                        symbol=b.symbol,
+                        start_date=b.start_date,
+                        end_date=b.end_date,
+                        signal_source=b.signal_source,
+                        strategy_id=b.strategy_id_filter,
+                        init_cash=b.init_cash,
+                        fees=b.fees,
+                        slippage=b.slippage,
+                    ),
+                    signal_source=b.signal_source,
+                    conn=conn,
+                )
                 c = _candidate_from_backtest(b.name, b.strategy_id, out)
                 if c and _passes_gates(c, gates):
                     all_staged.append(c)
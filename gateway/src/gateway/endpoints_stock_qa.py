@@ -13,7 +13,7 @@ import re
 import threading
 import uuid
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, Union
 
 from fastapi import APIRouter, BackgroundTasks
 from fastapi.responses import PlainTextResponse
@@ -23,11 +23,13 @@ from core.ashare_symbol import normalize_ashare_symbol
 
 from .response_utils import json_fail, json_ok
 
+if TYPE_CHECKING:
+    from data_pipeline.storage.stock_name_index import StockNameIndex
+
 _log = logging.getLogger(__name__)
 
 _MAX_TEXT_LEN = 32_000
 _MAX_SYMBOLS = 12
-_MIN_NAME_LEN = 3
 
 _REPO_ROOT = Path(__file__).resolve().parents[3]
 
@@ -57,77 +59,26 @@ def extract_six_digit_codes(text: str) -> List[str]:
 
 def extract_name_matches(
     text: str,
-    names_sorted: List[Tuple[str, str]],
+    names_sorted: Union["StockNameIndex", List[Tuple[str, str]]],
     used: Optional[List[bool]] = None,
 ) -> List[Tuple[str, str]]:
+    """
+    简称匹配（长名优先、不重叠）。names_sorted 为共享 StockNameIndex，或已按长度降序的 (简称, 代码) 列表
+    （临时建自动机）；一次扫描文本，不逐名 find。
+    """
+    from data_pipeline.storage.stock_name_index import StockNameIndex
+
     if not text.strip():
         return []
-    if used is None:
-        used = [False] * len(text)
-    matches: List[Tuple[str, str]] = []
-    for name, code in names_sorted:
-        if len(name) < _MIN_NAME_LEN:
-            continue
-        start = 0
-        while True:
-            idx = text.find(name, start)
-            if idx < 0:
-                break
-            end = idx + len(name)
-            if any(used[idx:end]):
-                start = idx + 1
-                continue
-            for i in range(idx, end):
-                used[i] = True
-            matches.append((name, code))
-            start = end
-    return matches
-
-
-def _load_name_pairs(conn: Any) -> List[Tuple[str, str]]:
-    try:
-        rows = conn.execute(
-            """
-            SELECT CAST(name AS VARCHAR), CAST(code AS VARCHAR)
-            FROM a_stock_basic
-            WHERE name IS NOT NULL AND TRIM(CAST(name AS VARCHAR)) != ''
-            """
-        ).fetchall()
-    except Exception as e:
-        _log.warning("stock_qa: a_stock_basic load failed: %s", e)
-        return []
-    pairs: List[Tuple[str, str]] = []
-    for row in rows or []:
-        n, c = str(row[0] or "").strip(), _code6_from_db_code(str(row[1] or ""))
-        if len(n) < _MIN_NAME_LEN or len(c) < 6:
-            continue
-        pairs.append((n, c))
-    pairs.sort(key=lambda x: -len(x[0]))
-    return pairs
+    index = names_sorted if isinstance(names_sorted, StockNameIndex) else StockNameIndex(names_sorted)
+    return index.extract(text, used)
 
 
-def _name_to_code_map(name_pairs: List[Tuple[str, str]]) -> Dict[str, str]:
-    return {n: c for n, c in name_pairs}
+def _load_name_index(conn: Any) -> StockNameIndex:
+    """a_stock_basic 名称索引（进程级共享，库表变化时才重建）。"""
+    from data_pipeline.storage.stock_name_index import get_stock_name_index
 
-
-def _resolve_mention_to_code(mention: str, name_pairs: List[Tuple[str, str]], valid_codes: set) -> Optional[str]:
-    """将 LLM 或用户给出的简称解析为 6/8 位代码。"""
-    m = (mention or "").strip()
-    if not m:
-        return None
-    if re.fullmatch(r"\d{6}", m) and m in valid_codes:
-        return m
-    if re.fullmatch(r"\d{8}", m) and m in valid_codes:
-        return m
-    nm = _name_to_code_map(name_pairs)
-    if m in nm:
-        c = nm[m]
-        return c if c in valid_codes else None
-    for n, c in name_pairs:
-        if m in n or n in m:
-            if c in valid_codes:
-                return c
-    return None
+    return get_stock_name_index(conn)
 
 
 def _parse_llm_json_array(raw: str) -> List[Dict[str, Any]]:
@@ -156,11 +107,13 @@ def _parse_llm_json_array(raw: str) -> List[Dict[str, Any]]:
 
 def _llm_extract_stock_entities(text: str) -> Tuple[List[Dict[str, Any]], Optional[str]]:
     """
-    调用 DashScope/OpenAI 从文本抽取 A 股相关公司/代码。
+    调用共享 LLM 客户端（DashScope → OpenAI 回退，同文本命中响应缓存）从文本抽取 A 股相关公司/代码。
     返回 (entities, error)；entities 项含 mention、code(可选)、source=llm_ner。
     """
     import os as _os
 
+    from core.llm import get_llm_client
+
     snippet = text.strip()[:14_000]
     sys_prompt = (
         "你是 A 股证券信息抽取助手。从用户文本中识别提到的中国上市公司（沪深北），"
@@ -170,98 +123,37 @@ def _llm_extract_stock_entities(text: str) -> Tuple[List[Dict[str, Any]], Option
     )
     user_prompt = "文本：\n" + snippet
 
-    key = _os.environ.get("DASHSCOPE_API_KEY") or _os.environ.get("BAILIAN_API_KEY")
     model_ds = _os.environ.get("STOCK_QA_LLM_MODEL", _os.environ.get("RESEARCH_LLM_MODEL", "qwen-turbo"))
-    if key:
-        try:
-            import requests
-
-            r = requests.post(
-                "https://dashscope.aliyuncs.com/compatible-mode/v1/chat/completions",
-                headers={"Authorization": f"Bearer {key}", "Content-Type": "application/json"},
-                timeout=60,
-                json={
-                    "model": model_ds,
-                    "messages": [
-                        {"role": "system", "content": sys_prompt},
-                        {"role": "user", "content": user_prompt},
-                    ],
-                    "max_tokens": 2000,
-                },
-            )
-            data = r.json()
-            if r.status_code != 200:
-                err = data.get("message") or str(data)[:200]
-                return [], f"dashscope_http_{r.status_code}: {err}"
-            choices = data.get("choices") or []
-            if not choices:
-                return [], "dashscope_empty_choices"
-            content = (choices[0].get("message") or {}).get("content") or ""
-            arr = _parse_llm_json_array(content)
-            out: List[Dict[str, Any]] = []
-            for item in arr:
-                mention = str(item.get("mention") or item.get("name") or "").strip()
-                code = str(item.get("code") or "").strip()
-                if not mention and not code:
-                    continue
-                if not mention:
-                    mention = code
-                out.append(
-                    {
-                        "mention": mention[:80],
-                        "code_hint": code[:8] if code else "",
-                        "source": "llm_ner",
-                    }
-                )
-            return out, None
-        except Exception as e:
-            return [], f"dashscope:{e!s}"[:300]
-
-    key_oai = _os.environ.get("OPENAI_API_KEY")
     model_oai = _os.environ.get("STOCK_QA_OPENAI_MODEL", _os.environ.get("RESEARCH_OPENAI_MODEL", "gpt-4o-mini"))
-    if key_oai:
-        try:
-            import requests
-
-            r = requests.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers={"Authorization": f"Bearer {key_oai}", "Content-Type": "application/json"},
-                timeout=60,
-                json={
-                    "model": model_oai,
-                    "messages": [
-                        {"role": "system", "content": sys_prompt},
-                        {"role": "user", "content": user_prompt},
-                    ],
-                    "max_tokens": 2000,
-                },
-            )
-            data = r.json()
-            if r.status_code != 200:
-                return [], f"openai_{r.status_code}"
-            content = (data.get("choices") or [{}])[0].get("message", {}).get("content") or ""
-            arr = _parse_llm_json_array(content)
-            out = []
-            for item in arr:
-                mention = str(item.get("mention") or "").strip()
-                code = str(item.get("code") or "").strip()
-                if not mention and not code:
-                    continue
-                if not mention:
-                    mention = code
-                out.append({"mention": mention[:80], "code_hint": code[:8] if code else "", "source": "llm_ner"})
-            return out, None
-        except Exception as e:
-            return [], f"openai:{e!s}"[:300]
-
-    return [], "no_llm_key"
+    res = get_llm_client().chat(
+        [
+            {"role": "system", "content": sys_prompt},
+            {"role": "user", "content": user_prompt},
+        ],
+        providers=[f"dashscope:{model_ds}", f"openai:{model_oai}"],
+        max_tokens=2000,
+        timeout=60,
+        namespace="stock_qa_ner",
+    )
+    if not res.ok:
+        return [], res.error
+    out: List[Dict[str, Any]] = []
+    for item in _parse_llm_json_array(res.text or ""):
+        mention = str(item.get("mention") or item.get("name") or "").strip()
+        code = str(item.get("code") or "").strip()
+        if not mention and not code:
+            continue
+        if not mention:
+            mention = code
+        out.append({"mention": mention[:80], "code_hint": code[:8] if code else "", "source": "llm_ner"})
+    return out, None
 
 
 def _merge_llm_entities(
     llm_rows: List[Dict[str, Any]],
-    name_pairs: List[Tuple[str, str]],
-    valid_codes: set,
+    index: StockNameIndex,
 ) -> List[Dict[str, Any]]:
+    valid_codes = index.valid_codes
     entities: List[Dict[str, Any]] = []
     seen_sym: set[str] = set()
     for row in llm_rows:
@@ -276,9 +168,9 @@ def _merge_llm_entities(
                 elif hint in valid_codes:
                     code6 = hint[:6] if len(hint) > 6 else hint
         if code6 is None:
-            code6 = _resolve_mention_to_code(mention, name_pairs, valid_codes)
+            code6 = index.resolve(mention)
         if code6 is None and hint:
-            code6 = _resolve_mention_to_code(hint, name_pairs, valid_codes)
+            code6 = index.resolve(hint)
         if code6 is None:
             continue
         sym = normalize_ashare_symbol(code6)
@@ -336,13 +228,10 @@ def _fetch_quote(conn: Any, code6: str) -> Dict[str, Any]:
     row = conn.execute(
         """
         SELECT code, name, latest_price, change_pct, volume, amount, snapshot_time
-        FROM a_stock_realtime
-        WHERE split_part(upper(trim(CAST(code AS VARCHAR))), '.', 1) = ?
-           OR code = ? OR code = ?
-        ORDER BY snapshot_time DESC NULLS LAST
-        LIMIT 1
+        FROM latest_quote
+        WHERE code = ?
         """,
-        [code6, code6, ex],
+        [code6],
     ).fetchone()
     if row:
         price = float(row[2] or 0)
@@ -536,26 +425,6 @@ def _merge_trend_outlook(
     }
 
 
-def _build_valid_codes(conn: Any, name_pairs: List[Tuple[str, str]]) -> set:
-    valid_codes: set[str] = set()
-    for _, c6 in name_pairs:
-        if len(c6) >= 6:
-            valid_codes.add(c6)
-    try:
-        rows = conn.execute(
-            "SELECT DISTINCT split_part(upper(trim(CAST(code AS VARCHAR))), '.', 1) FROM a_stock_basic"
-        ).fetchall()
-        for row in rows or []:
-            d = "".join(x for x in str(row[0] or "") if x.isdigit())[:8]
-            if len(d) >= 6:
-                valid_codes.add(d[:6])
-                if len(d) == 8:
-                    valid_codes.add(d)
-    except Exception:
-        pass
-    return valid_codes
-
-
 def _parse_symbols_override(raw: List[str], valid_codes: set) -> List[str]:
     out: List[str] = []
     seen: set[str] = set()
@@ -580,11 +449,11 @@ def _parse_symbols_override(raw: List[str], valid_codes: set) -> List[str]:
 
 def _build_entities_rule(
     text: str,
-    name_pairs: List[Tuple[str, str]],
-    valid_codes: set,
+    index: StockNameIndex,
 ) -> Tuple[List[Dict[str, Any]], List[str]]:
+    valid_codes = index.valid_codes
     used = [False] * len(text)
-    from_names = extract_name_matches(text, name_pairs, used)
+    from_names = extract_name_matches(text, index, used)
     entities: List[Dict[str, Any]] = []
     order: List[str] = []
     seen: set[str] = set()
@@ -629,8 +498,8 @@ def run_stock_qa_analysis(
     if not conn:
         return {"error": "数据库不可用", "code": 503}
     try:
-        name_pairs = _load_name_pairs(conn)
-        valid_codes = _build_valid_codes(conn, name_pairs)
+        index = _load_name_index(conn)
+        valid_codes = index.valid_codes
 
         entities: List[Dict[str, Any]] = []
         order: List[str] = []
@@ -652,13 +521,13 @@ def run_stock_qa_analysis(
             if not text.strip():
                 return {"error": "文本为空且未提供 symbols_override", "code": 400}
 
-            rule_ent, rule_order = _build_entities_rule(text, name_pairs, valid_codes)
+            rule_ent, rule_order = _build_entities_rule(text, index)
 
             if ner_mode == "rules_only" or not use_llm_ner:
                 entities, order = rule_ent, rule_order[:max_n]
             elif ner_mode == "llm_only":
                 llm_raw, llm_err = _llm_extract_stock_entities(text)
-                entities = _merge_llm_entities(llm_raw, name_pairs, valid_codes)
+                entities = _merge_llm_entities(llm_raw, index)
                 order = []
                 seen_o: set[str] = set()
                 for e in entities:
@@ -671,7 +540,7 @@ def run_stock_qa_analysis(
             else:
                 # hybrid: LLM + 规则去重合并
                 llm_raw, llm_err = _llm_extract_stock_entities(text)
-                llm_ent = _merge_llm_entities(llm_raw, name_pairs, valid_codes)
+                llm_ent = _merge_llm_entities(llm_raw, index)
                 seen_sym = {e["symbol"] for e in llm_ent}
                 merged = list(llm_ent)
                 for e in rule_ent:
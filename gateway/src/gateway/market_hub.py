@@ -0,0 +1,475 @@
+"""
+进程内行情发布/订阅中心（/ws/market 推送）
+
+数据入口：
+- A 股：后台线程每 ``MARKET_HUB_POLL_SEC`` 秒读取 ``a_stock_realtime`` 中 snapshot_time 大于上次水位
+  的新快照（首轮只取最新一次快照），按 code 与上一份快照比较，只发布变化字段；
+- Binance：``MARKET_HUB_BINANCE_SYMBOLS``（逗号分隔）非空时，用一条组合流 WebSocket 订阅这些标的
+  的 K 线（``data_engine.realtime_stream.stream_klines_multi``）。
+
+推送：每个 WebSocket 客户端一个 ``Subscriber``，按 topic（``ashare:600519`` / ``ashare:*`` /
+``binance:BTCUSDT`` / ``*``）过滤；待发送增量按 topic 合并（同一标的未发出前多次变化只发最后状态），
+发送间隔 ``MARKET_HUB_FLUSH_MS``。慢消费者：单次发送超过 ``MARKET_HUB_SEND_TIMEOUT`` 秒，或待发
+topic 数超过 ``MARKET_HUB_MAX_PENDING``，即以 1013 关闭连接。
+
+轮询随订阅启停：首个 WebSocket 订阅者连入时启动 A 股轮询线程，最后一个断开即停止（并丢弃内存快照的
+就绪标记），没有推送对象时不再每 3 秒扫表。``/api/market/realtime`` 只在轮询运行中且已完成首轮时直接读
+内存最新快照，否则查库；REST 请求本身不会启动轮询。
+``MARKET_HUB=0`` 关闭轮询（REST 回到查库，WebSocket 只收到 Binance 等其它来源）。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import atexit
+import datetime as dt
+import json
+import logging
+import math
+import os
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+_log = logging.getLogger(__name__)
+
+_REALTIME_COLUMNS = ["code", "name", "latest_price", "change_pct", "volume", "amount", "snapshot_time"]
+
+
+def hub_enabled() -> bool:
+    return os.environ.get("MARKET_HUB", "1").strip().lower() not in ("0", "false", "no", "off")
+
+
+def _jsonable(v: Any) -> Any:
+    """DuckDB/pandas 取出的值 → JSON 可序列化（NaN→None，时间→ISO 字符串，numpy 标量→Python）。"""
+    if v is None:
+        return None
+    if isinstance(v, (dt.datetime, dt.date)):
+        return v.isoformat()
+    if hasattr(v, "isoformat"):  # pandas.Timestamp
+        return v.isoformat()
+    if hasattr(v, "item"):  # numpy 标量
+        v = v.item()
+    if isinstance(v, float) and math.isnan(v):
+        return None
+    return v
+
+
+def _topic_match(topics: Set[str], source: str, symbol: str) -> bool:
+    return "*" in topics or f"{source}:*" in topics or f"{source}:{symbol}" in topics
+
+
+def _parse_topics(raw: Any) -> Set[str]:
+    if raw is None:
+        return set()
+    items = raw.split(",") if isinstance(raw, str) else list(raw)
+    return {str(t).strip() for t in items if str(t).strip()}
+
+
+def _consume_result(task: "asyncio.Future[Any]") -> None:
+    """取走已结束子任务的异常（如 WebSocketDisconnect），避免 "exception was never retrieved" 日志。"""
+    if not task.cancelled():
+        task.exception()
+
+
+class Subscriber:
+    """单个客户端的订阅：topic 集合 + 按 topic 合并的待发送增量。可在任意线程 offer。"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, topics: Set[str], max_pending: int):
+        self.topics = set(topics)
+        self.max_pending = max(1, int(max_pending))
+        self.overflowed = False
+        self.coalesced = 0
+        self._loop = loop
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._control: List[Dict[str, Any]] = []
+        self._event = asyncio.Event()
+
+    def matches(self, source: str, symbol: str) -> bool:
+        return _topic_match(self.topics, source, symbol)
+
+    def _wake(self) -> None:
+        try:
+            self._loop.call_soon_threadsafe(self._event.set)
+        except RuntimeError:
+            pass  # 事件循环已关闭：连接正在退出
+
+    def offer(self, topic: str, delta: Dict[str, Any]) -> None:
+        with self._lock:
+            cur = self._pending.get(topic)
+            if cur is not None:
+                cur.update(delta)
+                self.coalesced += 1
+            elif len(self._pending) >= self.max_pending:
+                self.overflowed = True
+            else:
+                self._pending[topic] = dict(delta)
+        self._wake()
+
+    def control(self, msg: Dict[str, Any]) -> None:
+        with self._lock:
+            self._control.append(msg)
+        self._wake()
+
+    async def next_batch(self) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """等待并取出 (控制消息, 合并后的增量)。"""
+        await self._event.wait()
+        self._event.clear()
+        with self._lock:
+            control, self._control = self._control, []
+            pending, self._pending = self._pending, {}
+        return control, list(pending.values())
+
+
+class MarketHub:
+    """最新快照簿 + 增量计算 + 订阅者扇出。"""
+
+    def __init__(
+        self,
+        flush_interval_ms: int = 250,
+        max_pending: int = 20000,
+        send_timeout: float = 5.0,
+        poll_interval: float = 3.0,
+        message_rows: int = 1000,
+    ):
+        self.flush_interval = max(0, int(flush_interval_ms)) / 1000.0
+        self.max_pending = max(1, int(max_pending))
+        self.send_timeout = float(send_timeout)
+        self.poll_interval = max(0.1, float(poll_interval))
+        self.message_rows = max(1, int(message_rows))
+        self._books: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._ready: Set[str] = set()
+        self._subs: Set[Subscriber] = set()
+        self._listeners: List[Callable[[str, List[Dict[str, Any]]], None]] = []
+        self._lock = threading.Lock()
+        self._watermark: Any = None
+        self._poller: Optional[threading.Thread] = None
+        self._binance: Optional[threading.Thread] = None
+        self._binance_started = False
+        self._stop = threading.Event()
+        self._stats: Dict[str, float] = {
+            "published_rows_total": 0,
+            "deltas_total": 0,
+            "messages_sent_total": 0,
+            "coalesced_total": 0,
+            "evicted_total": 0,
+            "polls_total": 0,
+            "poll_errors_total": 0,
+            "last_poll_rows": 0,
+        }
+
+    # ---------- 发布 ----------
+
+    def publish(
+        self,
+        source: str,
+        rows: Iterable[Dict[str, Any]],
+        key: str = "symbol",
+        volatile: Tuple[str, ...] = (),
+        gate: Optional[threading.Event] = None,
+    ) -> int:
+        """
+        写入一批行情（任意线程），与上一份比较后把变化字段扇出给订阅者；返回增量条数。
+        volatile：每次都会变的字段（如 snapshot_time），单独变化时只更新快照簿、不产生增量。
+        gate：轮询线程的停止事件；已停止时丢弃本批（与 stop() 在同一把锁下判断）。
+        """
+        deltas: List[Tuple[str, Dict[str, Any]]] = []
+        n_rows = 0
+        with self._lock:
+            if gate is not None and gate.is_set():
+                return 0
+            book = self._books.setdefault(source, {})
+            for row in rows:
+                n_rows += 1
+                symbol = str(row.get(key) or "").strip()
+                if not symbol:
+                    continue
+                clean = {k: _jsonable(v) for k, v in row.items()}
+                prev = book.get(symbol)
+                if prev is None:
+                    delta = clean
+                    book[symbol] = dict(clean)
+                else:
+                    delta = {k: v for k, v in clean.items() if prev.get(k) != v}
+                    prev.update(delta)
+                    if not delta or delta.keys() <= set(volatile):
+                        continue
+                delta[key] = symbol
+                deltas.append((symbol, delta))
+            self._ready.add(source)
+            subs = list(self._subs)
+            listeners = list(self._listeners)
+            self._stats["published_rows_total"] += n_rows
+            self._stats["deltas_total"] += len(deltas)
+        if deltas:
+            for fn in listeners:
+                try:
+                    fn(source, [d for _s, d in deltas])
+                except Exception:
+                    _log.debug("market hub listener failed", exc_info=True)
+        for sub in subs:
+            for symbol, delta in deltas:
+                if sub.matches(source, symbol):
+                    topic = f"{source}:{symbol}"
+                    sub.offer(topic, {"topic": topic, **delta})
+        return len(deltas)
+
+    def latest(self, source: str) -> Optional[List[Dict[str, Any]]]:
+        """某来源的最新快照（每标的一行）；尚未收到过该来源数据时返回 None。"""
+        with self._lock:
+            if source not in self._ready:
+                return None
+            return [dict(r) for r in self._books.get(source, {}).values()]
+
+    def snapshot(self, topics: Set[str]) -> List[Dict[str, Any]]:
+        """订阅 topic 对应的当前完整状态（新订阅时先推一份）。"""
+        out = []
+        with self._lock:
+            for source, book in self._books.items():
+                for symbol, row in book.items():
+                    if _topic_match(topics, source, symbol):
+                        out.append({"topic": f"{source}:{symbol}", **row})
+        return out
+
+    # ---------- 订阅 ----------
+
+    def subscribe(self, loop: asyncio.AbstractEventLoop, topics: Set[str]) -> Subscriber:
+        sub = Subscriber(loop, topics, self.max_pending)
+        with self._lock:
+            self._subs.add(sub)
+        self.start()
+        return sub
+
+    def unsubscribe(self, sub: Subscriber) -> None:
+        with self._lock:
+            self._subs.discard(sub)
+            self._stats["coalesced_total"] += sub.coalesced
+            if not self._subs:
+                self._halt()  # 同一把锁内判断，避免与并发的 subscribe/start 交错
+
+    def add_listener(self, fn: Callable[[str, List[Dict[str, Any]]], None]) -> None:
+        """进程内监听增量：fn(source, deltas) 在发布线程同步调用，须足够轻（如风控指标 O(1) 更新）。"""
+        with self._lock:
+            if fn not in self._listeners:
+                self._listeners.append(fn)
+
+    def remove_listener(self, fn: Callable[[str, List[Dict[str, Any]]], None]) -> None:
+        with self._lock:
+            if fn in self._listeners:
+                self._listeners.remove(fn)
+
+    async def _send(self, websocket: Any, msg: Dict[str, Any]) -> None:
+        await asyncio.wait_for(websocket.send_text(json.dumps(msg, default=str)), self.send_timeout)
+        with self._lock:
+            self._stats["messages_sent_total"] += 1
+
+    async def _send_rows(self, websocket: Any, kind: str, rows: List[Dict[str, Any]]) -> None:
+        for i in range(0, max(1, len(rows)), self.message_rows):
+            await self._send(
+                websocket, {"path": "market", "type": kind, "data": rows[i : i + self.message_rows]}
+            )
+
+    async def _reader(self, websocket: Any, sub: Subscriber) -> None:
+        """处理客户端指令：{"op": "subscribe"|"unsubscribe", "topics": [...]} / 其它文本视为 ping。"""
+        while True:
+            text = await websocket.receive_text()
+            try:
+                cmd = json.loads(text)
+            except ValueError:
+                cmd = None
+            op = cmd.get("op") if isinstance(cmd, dict) else None
+            if op in ("subscribe", "unsubscribe"):
+                topics = _parse_topics(cmd.get("topics"))
+                # 整体替换集合：publish 可能在其它线程同时读取 sub.topics
+                if op == "subscribe":
+                    added = topics - sub.topics
+                    sub.topics = sub.topics | topics
+                    sub.control({"type": "subscribed", "topics": sorted(sub.topics), "_added": added})
+                else:
+                    sub.topics = sub.topics - topics
+                    sub.control({"type": "unsubscribed", "topics": sorted(sub.topics)})
+            else:
+                sub.control({"type": "pong"})
+
+    async def _sender(self, websocket: Any, sub: Subscriber) -> str:
+        await self._send_rows(websocket, "snapshot", self.snapshot(sub.topics))
+        while True:
+            control, deltas = await sub.next_batch()
+            if sub.overflowed:
+                return "overflow"
+            for msg in control:
+                added = msg.pop("_added", None)
+                await self._send(websocket, {"path": "market", **msg})
+                rows = self.snapshot(added) if added else []
+                if rows:
+                    await self._send_rows(websocket, "snapshot", rows)
+            if deltas:
+                await self._send_rows(websocket, "delta", deltas)
+            if self.flush_interval:
+                await asyncio.sleep(self.flush_interval)  # 合并窗口：期间的变化在下一轮一次发出
+
+    async def serve(self, websocket: Any, topics: Set[str]) -> None:
+        """为已 accept 的连接服务直到断开或因慢消费被驱逐。"""
+        sub = self.subscribe(asyncio.get_running_loop(), topics)
+        reader = asyncio.ensure_future(self._reader(websocket, sub))
+        sender = asyncio.ensure_future(self._sender(websocket, sub))
+        try:
+            done, _ = await asyncio.wait({reader, sender}, return_when=asyncio.FIRST_COMPLETED)
+            evict = False
+            if sender in done:
+                exc = sender.exception()
+                evict = isinstance(exc, asyncio.TimeoutError) or (
+                    exc is None and sender.result() == "overflow"
+                )
+            if evict:
+                with self._lock:
+                    self._stats["evicted_total"] += 1
+                try:
+                    await asyncio.wait_for(
+                        websocket.close(code=1013, reason="slow consumer"), self.send_timeout
+                    )
+                except Exception:
+                    pass
+        finally:
+            # 不在 finally 中 await：宿主任务被取消（服务关闭/客户端断开）时再次挂起会吞掉取消
+            for t in (reader, sender):
+                t.add_done_callback(_consume_result)
+                t.cancel()
+            self.unsubscribe(sub)
+
+    # ---------- 数据入口 ----------
+
+    def poll_once(self, gate: Optional[threading.Event] = None) -> int:
+        """读取 a_stock_realtime 水位之后的新快照并发布；返回增量条数。gate 见 publish。"""
+        from data_pipeline.storage.duckdb_manager import get_conn, get_db_path
+
+        if not os.path.isfile(get_db_path()):
+            return 0
+        cols = ", ".join(_REALTIME_COLUMNS)
+        conn = get_conn(read_only=True)
+        try:
+            if self._watermark is None:
+                df = conn.execute(
+                    f"""
+                    SELECT {cols} FROM a_stock_realtime
+                    WHERE snapshot_time = (SELECT MAX(snapshot_time) FROM a_stock_realtime)
+                    """
+                ).fetchdf()
+            else:
+                # 快照按时间追加写入，snapshot_time 区间过滤可借 zonemap 跳过旧行组
+                df = conn.execute(
+                    f"SELECT {cols} FROM a_stock_realtime WHERE snapshot_time > ? ORDER BY snapshot_time",
+                    [self._watermark],
+                ).fetchdf()
+        finally:
+            conn.close()
+        with self._lock:
+            self._stats["polls_total"] += 1
+            self._stats["last_poll_rows"] = len(df)
+        n = self.publish(
+            "ashare", df.to_dict(orient="records"), key="code", volatile=("snapshot_time",), gate=gate
+        )
+        if not df.empty and not (gate is not None and gate.is_set()):
+            self._watermark = df["snapshot_time"].max()
+        return n
+
+    def _poll_loop(self, stop: threading.Event) -> None:
+        while not stop.is_set():
+            try:
+                self.poll_once(stop)
+            except Exception:
+                with self._lock:
+                    self._stats["poll_errors_total"] += 1
+                _log.debug("market hub poll failed", exc_info=True)
+            stop.wait(self.poll_interval)
+
+    def _start_binance(self) -> None:
+        symbols = [
+            s.strip() for s in os.environ.get("MARKET_HUB_BINANCE_SYMBOLS", "").split(",") if s.strip()
+        ]
+        if not symbols:
+            return
+        try:
+            from data_engine.realtime_stream import stream_klines_multi_async
+        except Exception:
+            _log.warning("MARKET_HUB_BINANCE_SYMBOLS set but data_engine/websocket unavailable")
+            return
+
+        def _on_bar(bar: Any) -> None:
+            self.publish(
+                "binance",
+                [
+                    {
+                        "symbol": bar.symbol,
+                        "interval": bar.interval,
+                        "timestamp": bar.timestamp,
+                        "open": bar.open,
+                        "high": bar.high,
+                        "low": bar.low,
+                        "close": bar.close,
+                        "volume": bar.volume,
+                    }
+                ],
+            )
+
+        self._binance = stream_klines_multi_async(
+            symbols, interval=os.environ.get("MARKET_HUB_BINANCE_INTERVAL", "1m"), on_bar=_on_bar
+        )
+
+    def start(self) -> None:
+        """启动数据入口线程（幂等）；subscribe 时调用。每次启动用新的停止事件，A 股快照从最新一次重新建立。"""
+        with self._lock:
+            if self._poller is None and hub_enabled():
+                self._stop = threading.Event()
+                self._watermark = None
+                self._poller = threading.Thread(
+                    target=self._poll_loop, args=(self._stop,), name="market-hub-poller", daemon=True
+                )
+                self._poller.start()
+            start_binance = not self._binance_started
+            self._binance_started = True
+        if start_binance:
+            self._start_binance()
+
+    def stop(self) -> None:
+        """停止 A 股轮询；内存快照不再视为最新（REST 回到查库）。"""
+        with self._lock:
+            self._halt()
+
+    def _halt(self) -> None:
+        """调用方持有 ``_lock``。"""
+        self._stop.set()
+        self._poller = None
+        self._ready.discard("ashare")
+
+    @property
+    def polling(self) -> bool:
+        return self._poller is not None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "subscribers": len(self._subs),
+                "polling": int(self._poller is not None),
+                "symbols": {k: len(v) for k, v in self._books.items()},
+                **self._stats,
+            }
+
+
+_hub: Optional[MarketHub] = None
+_hub_lock = threading.Lock()
+
+
+def get_market_hub() -> MarketHub:
+    global _hub
+    if _hub is None:
+        with _hub_lock:
+            if _hub is None:
+                _hub = MarketHub(
+                    flush_interval_ms=int(os.environ.get("MARKET_HUB_FLUSH_MS", "250")),
+                    max_pending=int(os.environ.get("MARKET_HUB_MAX_PENDING", "20000")),
+                    send_timeout=float(os.environ.get("MARKET_HUB_SEND_TIMEOUT", "5")),
+                    poll_interval=float(os.environ.get("MARKET_HUB_POLL_SEC", "3")),
+                )
+                atexit.register(_hub.stop)
+    return _hub
@@ -7,6 +7,10 @@ from __future__ import annotations
 
 _latency = None
 _request_count = None
+_db_pool_gauge = None
+_audit_gauge = None
+_market_hub_gauge = None
+_backtest_cache_gauge = None
 
 
 def _get_latency_histogram():
@@ -44,6 +48,74 @@ def _get_request_count():
         return None
 
 
+def _get_db_pool_gauge():
+    global _db_pool_gauge
+    if _db_pool_gauge is not None:
+        return _db_pool_gauge
+    try:
+        from prometheus_client import Gauge
+
+        _db_pool_gauge = Gauge(
+            "duckdb_pool",
+            "DuckDB connection pool usage (in_use/idle/acquired/waits/wait seconds/timeouts)",
+            ["path", "metric"],
+        )
+        return _db_pool_gauge
+    except ImportError:
+        return None
+
+
+def _get_audit_gauge():
+    global _audit_gauge
+    if _audit_gauge is not None:
+        return _audit_gauge
+    try:
+        from prometheus_client import Gauge
+
+        _audit_gauge = Gauge(
+            "audit_log_writer",
+            "Background audit log writer (queued/enqueued/dropped/written/batches/errors)",
+            ["metric"],
+        )
+        return _audit_gauge
+    except ImportError:
+        return None
+
+
+def _get_market_hub_gauge():
+    global _market_hub_gauge
+    if _market_hub_gauge is not None:
+        return _market_hub_gauge
+    try:
+        from prometheus_client import Gauge
+
+        _market_hub_gauge = Gauge(
+            "market_hub",
+            "Realtime market hub (subscribers/deltas/messages/coalesced/evicted/polls)",
+            ["metric"],
+        )
+        return _market_hub_gauge
+    except ImportError:
+        return None
+
+
+def _get_backtest_cache_gauge():
+    global _backtest_cache_gauge
+    if _backtest_cache_gauge is not None:
+        return _backtest_cache_gauge
+    try:
+        from prometheus_client import Gauge
+
+        _backtest_cache_gauge = Gauge(
+            "backtest_result_cache",
+            "Backtest result cache (memory_hits/disk_hits/misses/stores/invalidations) by cache",
+            ["cache", "metric"],
+        )
+        return _backtest_cache_gauge
+    except ImportError:
+        return None
+
+
 def path_to_stage(path: str) -> str:
     """将请求路径映射为 pipeline stage 标签。"""
     p = (path or "").strip()
@@ -77,3 +149,64 @@ def record_request(latency_seconds: float, path: str, method: str = "GET") -> No
             c.labels(stage=stage, method=method.upper()).inc()
         except Exception:
             pass
+
+
+def record_db_pool_metrics() -> None:
+    """把 data_pipeline 连接池的 pool_stats() 写入 Prometheus Gauge（/metrics 抓取前调用）。"""
+    g = _get_db_pool_gauge()
+    if g is None:
+        return
+    try:
+        from data_pipeline.storage.connection_pool import pool_stats
+
+        for st in pool_stats():
+            for k, v in st.items():
+                if k != "path":
+                    g.labels(path=st["path"], metric=k).set(float(v))
+    except Exception:
+        pass
+
+
+def record_audit_metrics() -> None:
+    """把审计写入器 stats() 写入 Prometheus Gauge。"""
+    g = _get_audit_gauge()
+    if g is None:
+        return
+    try:
+        from .audit_writer import get_audit_writer
+
+        for k, v in get_audit_writer().stats().items():
+            g.labels(metric=k).set(float(v))
+    except Exception:
+        pass
+
+
+def record_market_hub_metrics() -> None:
+    """把行情 Hub stats() 中的数值项写入 Prometheus Gauge。"""
+    g = _get_market_hub_gauge()
+    if g is None:
+        return
+    try:
+        from .market_hub import get_market_hub
+
+        for k, v in get_market_hub().stats().items():
+            if isinstance(v, (int, float)):
+                g.labels(metric=k).set(float(v))
+    except Exception:
+        pass
+
+
+def record_backtest_cache_metrics() -> None:
+    """把回测结果缓存（接口/流水线共用单例与回测农场）的命中统计写入 Prometheus Gauge。"""
+    g = _get_backtest_cache_gauge()
+    if g is None:
+        return
+    try:
+        from backtest_engine.farm import get_backtest_farm
+        from backtest_engine.result_cache import get_result_cache
+
+        for name, cache in (("api", get_result_cache()), ("farm", get_backtest_farm().cache)):
+            for k, v in cache.stats.items():
+                g.labels(cache=name, metric=k).set(float(v))
+    except Exception:
+        pass
@@ -8,78 +8,76 @@
 - 卖出：同一用户、同一标的在扣减「其他未成交卖单占用」后，可卖数量须 >= 本单数量。
 
 买入：下单时已扣款，成交不再动资金。卖出：成交时 available_cash += 委托价 * 数量（与现价简化一致，避免部分退款复杂度）。
+
+风控：risk_rules 有启用规则时，每笔委托成交前用 risk_engine 编译好的 RiskPlan 做事前检查
+（该用户持仓/总持仓按现价计市值，总资产口径同 /positions/account），未通过的委托保持 pending 并计入 risk_rejected。
+PAPER_FILL_RISK_CHECK=0 可关闭。
 """
 
 from __future__ import annotations
 
 import logging
+import os
 from collections import defaultdict
 from datetime import datetime, timezone
 from typing import Any, Optional
 
-from core.ashare_symbol import normalize_ashare_symbol_bj_display
-
 _log = logging.getLogger(__name__)
 
 
-def _ex_symbol(code6: str) -> str:
-    c = (code6 or "").strip()
-    if len(c) < 6:
-        c = c.zfill(6) if c.isdigit() else "000001"
-    c = "".join(x for x in c if x.isdigit())[:6] or "000001"
-    return normalize_ashare_symbol_bj_display(c)
+def _quotes_for_symbols(conn, symbols: list[str]) -> dict[str, tuple[Optional[float], Optional[str]]]:
+    """整批 pending 委托的 {symbol: (现价, 名称)}，一次关联查询解析。"""
+    try:
+        from data_pipeline.storage.latest_quote import lookup_quotes, normalize_code
+
+        quotes = lookup_quotes(conn, symbols)
+        return {s: quotes.get(normalize_code(s), (None, None)) for s in symbols}
+    except Exception:
+        _log.debug("batch price lookup failed", exc_info=True)
+        return {}
 
 
-def _last_price_and_name(conn, code6: str) -> tuple[Optional[float], Optional[str]]:
-    c6 = "".join(c for c in (code6 or "") if c.isdigit())[:6]
-    if not c6:
-        return None, None
-    ex = _ex_symbol(c6)
+def _risk_plan(conn):
+    """已编译的风控规则；关闭、risk_engine 不可用或无启用规则时返回 None（不做逐单检查）。"""
+    if os.environ.get("PAPER_FILL_RISK_CHECK", "1").strip().lower() in ("0", "false", "no"):
+        return None
     try:
-        row = conn.execute(
-            """
-            SELECT name, latest_price
-            FROM a_stock_realtime
-            WHERE split_part(upper(trim(cast(code as varchar))), '.', 1) = ?
-               OR code = ? OR code = ?
-            ORDER BY snapshot_time DESC NULLS LAST
-            LIMIT 1
-            """,
-            [c6, c6, ex],
-        ).fetchone()
-        if row and row[1] is not None:
-            return float(row[1]), str(row[0] or "") or None
-        row = conn.execute(
-            """
-            SELECT close
-            FROM a_stock_daily
-            WHERE split_part(upper(trim(cast(code as varchar))), '.', 1) = ?
-               OR code = ?
-            ORDER BY date DESC
-            LIMIT 1
-            """,
-            [c6, ex],
-        ).fetchone()
-        if row and row[0] is not None:
-            px = float(row[0])
-            nm: Optional[str] = None
-            try:
-                br = conn.execute(
-                    """
-                    SELECT name FROM a_stock_basic
-                    WHERE split_part(upper(trim(cast(code as varchar))), '.', 1) = ?
-                    LIMIT 1
-                    """,
-                    [c6],
-                ).fetchone()
-                if br and br[0]:
-                    nm = str(br[0])
-            except Exception:
-                pass
-            return px, nm
+        import sys
+
+        root = os.path.abspath(os.path.join(os.path.dirname(__file__), *[os.pardir] * 3))
+        src = os.path.join(root, "risk-engine", "src")
+        if os.path.isdir(src) and src not in sys.path:
+            sys.path.insert(0, src)
+        from risk_engine import get_plan
+
+        plan = get_plan(conn)
     except Exception:
-        _log.debug("last price lookup failed", exc_info=True)
-    return None, None
+        _log.debug("risk plan unavailable", exc_info=True)
+        return None
+    return None if plan.empty else plan
+
+
+def _account_totals(
+    conn, users: list[str], pos: dict[tuple[str, str], int], quotes: dict
+) -> tuple[dict[str, float], dict[str, float]]:
+    """{user: 持仓现价市值} 与 {user: 总资产}（max(账户 total_assets, 可用 + 冻结 + 市值)），一次查询。"""
+    gross: dict[str, float] = defaultdict(float)
+    for (uid, sym), qty in pos.items():
+        last = quotes.get(sym, (None, None))[0]
+        if qty > 0 and last is not None:
+            gross[uid] += qty * last
+    totals: dict[str, float] = {}
+    rows = conn.execute(
+        """
+        SELECT user_id, available_cash, frozen_cash, total_assets
+        FROM hongshan_accounts WHERE user_id IN (SELECT UNNEST(?))
+        """,
+        [users],
+    ).fetchall()
+    for uid, cash, frozen, total in rows or []:
+        u = str(uid)
+        totals[u] = max(float(total or 0), float(cash or 0) + float(frozen or 0) + gross[u])
+    return dict(gross), totals
 
 
 def _price_matches(style: str, side: str, order_price: float, last: float) -> bool:
@@ -162,8 +160,25 @@ def run_paper_fills(conn, user_id: Optional[str] = None) -> dict[str, Any]:
 
     filled_n = 0
     skipped_n = 0
+    rejected_n = 0
     details: list[dict[str, Any]] = []
     now = datetime.now(timezone.utc)
+    plan = _risk_plan(conn) if pending_orders else None
+    symbols = {str(r[2]) for r in pending_orders or []}
+    users = sorted({str(r[1]) for r in pending_orders or []})
+    if plan is not None:
+        # 逐单风控需要这些用户全部持仓的现价，与待撮合标的同一次批量查询
+        user_set = set(users)
+        symbols |= {sym for (uid, sym), qty in pos.items() if qty > 0 and uid in user_set}
+    quotes = _quotes_for_symbols(conn, sorted(symbols))
+    gross: dict[str, float] = {}
+    totals: dict[str, float] = {}
+    if plan is not None:
+        try:
+            gross, totals = _account_totals(conn, users, pos, quotes)
+        except Exception:
+            _log.exception("paper_fill account totals")
+            plan = None
 
     for row in pending_orders or []:
         oid, uid, sym, sname, otype, ostyle, oprice, oqty, _ot = (row + (None,) * 9)[:9]
@@ -182,7 +197,7 @@ def run_paper_fills(conn, user_id: Optional[str] = None) -> dict[str, Any]:
                 skipped_n += 1
                 continue
 
-        last, qname = _last_price_and_name(conn, sym_s)
+        last, qname = quotes.get(sym_s, (None, None))
         if last is None:
             skipped_n += 1
             continue
@@ -191,6 +206,18 @@ def run_paper_fills(conn, user_id: Optional[str] = None) -> dict[str, Any]:
             skipped_n += 1
             continue
 
+        if plan is not None and not plan.check_order(
+            side,
+            qty * last,
+            max(pos.get((uid_s, sym_s), 0), 0) * last,
+            gross.get(uid_s, 0.0),
+            totals.get(uid_s, 0.0),
+        ):
+            skipped_n += 1
+            rejected_n += 1
+            details.append({"id": str(oid), "symbol": sym_s, "side": side, "risk": "rejected"})
+            continue
+
         try:
             name_update = (qname or "").strip() or None
             if not (sname and str(sname).strip()) and name_update:
@@ -242,7 +269,9 @@ def run_paper_fills(conn, user_id: Optional[str] = None) -> dict[str, Any]:
 
             if side == "buy":
                 pos[(uid_s, sym_s)] = pos.get((uid_s, sym_s), 0) + qty
+                gross[uid_s] = gross.get(uid_s, 0.0) + qty * last
             else:
+                gross[uid_s] = gross.get(uid_s, 0.0) - qty * last
                 pos[(uid_s, sym_s)] = pos.get((uid_s, sym_s), 0) - qty
                 pend_res[(uid_s, sym_s)] = max(0, pend_res.get((uid_s, sym_s), 0) - qty)
 
@@ -252,4 +281,9 @@ def run_paper_fills(conn, user_id: Optional[str] = None) -> dict[str, Any]:
             _log.exception("paper_fill order %s", oid)
             details.append({"id": str(oid), "error": str(e)[:120]})
 
-    return {"filled": filled_n, "skipped": skipped_n, "details": details[:50]}
+    return {
+        "filled": filled_n,
+        "skipped": skipped_n,
+        "risk_rejected": rejected_n,
+        "details": details[:50],
+    }
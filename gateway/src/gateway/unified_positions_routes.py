@@ -101,9 +101,7 @@ def _build_position_items(rows: list) -> List[dict[str, Any]]:
             try:
                 one = c2.execute(
                     """
-                    SELECT name, latest_price FROM a_stock_realtime
-                    WHERE REPLACE(REPLACE(CAST(code AS VARCHAR), '.SZ', ''), '.SH', '') = ?
-                    LIMIT 1
+                    SELECT name, latest_price FROM latest_quote WHERE code = ?
                     """,
                     [code6],
                 ).fetchone()
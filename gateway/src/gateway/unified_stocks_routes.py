@@ -1,5 +1,5 @@
 """
-Hongshan /api/stocks/* 兼容路由：数据取自 DuckDB（a_stock_realtime / a_stock_daily / a_stock_basic），与主行情栈一致。
+Hongshan /api/stocks/* 兼容路由：数据取自 DuckDB（latest_quote / a_stock_daily / a_stock_basic），与主行情栈一致。
 """
 
 from __future__ import annotations
@@ -50,13 +50,10 @@ def _get_quote_core(symbol: str) -> dict:
         row = conn.execute(
             """
             SELECT code, name, latest_price, change_pct, volume, amount, snapshot_time
-            FROM a_stock_realtime
-            WHERE split_part(upper(trim(cast(code as varchar))), '.', 1) = ?
-               OR code = ? OR code = ?
-            ORDER BY snapshot_time DESC NULLS LAST
-            LIMIT 1
+            FROM latest_quote
+            WHERE code = ?
             """,
-            [c6, c6, ex],
+            [c6],
         ).fetchone()
         if not row:
             drow = conn.execute(
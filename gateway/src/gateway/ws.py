@@ -1,25 +1,32 @@
-"""WebSocket endpoints: /ws/market, /ws/trades, /ws/portfolio (stub for real-time push)."""
+"""WebSocket endpoints: /ws/market (market hub push), /ws/trades, /ws/portfolio (stubs)."""
 
 import asyncio
-from typing import Set
+from typing import Optional, Set
 
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, Query, WebSocket, WebSocketDisconnect
 
 router = APIRouter()
 _connections: Set[WebSocket] = set()
 
 
 @router.websocket("/market")
-async def ws_market(websocket: WebSocket) -> None:
-    """Real-time market data (stub: wire to data-engine stream)."""
+async def ws_market(
+    websocket: WebSocket,
+    topics: Optional[str] = Query(None, description="逗号分隔：ashare:600519, ashare:*, binance:BTCUSDT, *"),
+) -> None:
+    """
+    实时行情推送（gateway.market_hub）：连接后先收到订阅 topic 的 snapshot，之后只收 delta（变化字段）。
+    发送 {"op": "subscribe"|"unsubscribe", "topics": [...]} 调整订阅；其它文本回 pong。
+    """
+    from .market_hub import _parse_topics, get_market_hub
+
     await websocket.accept()
     _connections.add(websocket)
     try:
-        while True:
-            _ = await websocket.receive_text()
-            await websocket.send_json({"path": "market", "type": "klines", "data": []})
-            await asyncio.sleep(1)
+        await get_market_hub().serve(websocket, _parse_topics(topics))
     except WebSocketDisconnect:
+        pass
+    finally:
         _connections.discard(websocket)
 
 
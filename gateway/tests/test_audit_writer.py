@@ -0,0 +1,79 @@
+"""审计日志后台写入：批量落库、序列分配 id、队列满时按策略丢弃。"""
+
+import pytest
+
+from gateway.audit_writer import AuditLogWriter
+
+
+@pytest.fixture
+def audit_db(tmp_path, monkeypatch):
+    from gateway import audit_writer
+
+    if audit_writer._writer is not None:
+        # 其它用例启动的应用级写线程：先刷写到原库，避免稍后写进本用例的临时库
+        audit_writer._writer.stop()
+        audit_writer._writer = None
+    monkeypatch.setenv("QUANT_DB_PATH", str(tmp_path / "audit.duckdb"))
+    from data_pipeline.storage.connection_pool import close_pools
+    from data_pipeline.storage.duckdb_manager import ensure_tables, get_conn
+
+    close_pools()
+    conn = get_conn()
+    ensure_tables(conn)
+    conn.close()
+    yield get_conn
+    close_pools()
+
+
+def _rows(get_conn):
+    conn = get_conn()
+    rows = conn.execute("SELECT id, method, path FROM audit_log ORDER BY id").fetchall()
+    conn.close()
+    return rows
+
+
+def test_flush_writes_batch_with_sequence_ids(audit_db):
+    w = AuditLogWriter(flush_interval_ms=60000, batch_rows=3)
+    for i in range(7):
+        w.record("GET", f"/api/x/{i}", "127.0.0.1")
+    assert w.flush() == 7
+    rows = _rows(audit_db)
+    assert [r[2] for r in rows] == [f"/api/x/{i}" for i in range(7)]
+    assert [r[0] for r in rows] == list(range(rows[0][0], rows[0][0] + 7))
+    st = w.stats()
+    assert st["written_total"] == 7 and st["batches_total"] == 3 and st["queued"] == 0
+
+
+def test_background_thread_flushes_and_stop_drains(audit_db):
+    w = AuditLogWriter(flush_interval_ms=10, batch_rows=100)
+    w.record("POST", "/api/a", "")
+    w.record("GET", "/api/b", "")
+    w.stop()
+    assert [r[2] for r in _rows(audit_db)] == ["/api/a", "/api/b"]
+
+
+@pytest.mark.parametrize("policy,kept", [("oldest", ["/2", "/3"]), ("newest", ["/0", "/1"])])
+def test_bounded_queue_drop_policy(audit_db, policy, kept):
+    w = AuditLogWriter(flush_interval_ms=60000, batch_rows=100, queue_size=2, drop_policy=policy)
+    w._thread = object()  # 不启动后台线程，手动 flush
+    for i in range(4):
+        w.record("GET", f"/{i}", "")
+    assert w.stats()["dropped_total"] == 2
+    w.flush()
+    assert [r[2] for r in _rows(audit_db)] == kept
+
+
+def test_sequence_starts_after_existing_ids(tmp_path):
+    import duckdb
+
+    from data_pipeline.storage.duckdb_manager import ensure_tables
+
+    conn = duckdb.connect(str(tmp_path / "old.duckdb"))
+    conn.execute(
+        "CREATE TABLE audit_log (id INTEGER PRIMARY KEY, method VARCHAR, path VARCHAR,"
+        " client_host VARCHAR, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+    )
+    conn.execute("INSERT INTO audit_log (id, method) VALUES (41, 'GET')")
+    ensure_tables(conn)
+    assert conn.execute("SELECT nextval('audit_log_id_seq')").fetchone()[0] == 42
+    conn.close()
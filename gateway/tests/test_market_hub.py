@@ -0,0 +1,154 @@
+"""行情 Hub：增量计算、topic 过滤与合并、慢消费者驱逐、a_stock_realtime 水位轮询、/ws/market 推送。"""
+
+import asyncio
+import datetime as dt
+
+import pytest
+
+from gateway.market_hub import MarketHub
+
+
+def test_publish_emits_only_changed_fields():
+    hub = MarketHub()
+    row = {"code": "600519", "latest_price": 1700.0, "amount": 1e9}
+    assert hub.publish("ashare", [row], key="code") == 1
+    assert hub.publish("ashare", [row], key="code") == 0
+    assert hub.publish("ashare", [{**row, "latest_price": 1701.0}], key="code") == 1
+    (latest,) = hub.latest("ashare")
+    assert latest["latest_price"] == 1701.0
+    assert hub.latest("binance") is None
+
+
+def test_subscriber_filters_topics_and_coalesces():
+    async def run():
+        hub = MarketHub()
+        sub = hub.subscribe(asyncio.get_running_loop(), {"ashare:600519", "binance:*"})
+        hub.publish("ashare", [{"code": "600519", "p": 1.0}, {"code": "000001", "p": 2.0}], key="code")
+        hub.publish("ashare", [{"code": "600519", "p": 1.5}], key="code")
+        hub.publish("binance", [{"symbol": "BTCUSDT", "close": 1.0}])
+        _, deltas = await asyncio.wait_for(sub.next_batch(), 1)
+        return {d["topic"]: d for d in deltas}, sub.coalesced
+
+    deltas, coalesced = asyncio.run(run())
+    assert set(deltas) == {"ashare:600519", "binance:BTCUSDT"}
+    assert deltas["ashare:600519"]["p"] == 1.5 and coalesced == 1
+
+
+class _StalledSocket:
+    """首条 snapshot 正常发送，之后每次发送都卡住，模拟不读数据的客户端。"""
+
+    def __init__(self):
+        self.sent = []
+        self.closed = None
+
+    async def send_text(self, text):
+        if self.sent:
+            await asyncio.sleep(10)
+        self.sent.append(text)
+
+    async def receive_text(self):
+        await asyncio.sleep(10)
+
+    async def close(self, code=1000, reason=None):
+        self.closed = code
+
+
+def test_slow_consumer_is_evicted():
+    hub = MarketHub(flush_interval_ms=0, send_timeout=0.05)
+    hub.start = lambda: None
+    ws = _StalledSocket()
+
+    async def run():
+        task = asyncio.ensure_future(hub.serve(ws, {"*"}))
+        await asyncio.sleep(0.01)
+        hub.publish("ashare", [{"code": "600519", "p": 1.0}], key="code")
+        await asyncio.wait_for(task, 2)
+
+    asyncio.run(run())
+    assert ws.closed == 1013
+    st = hub.stats()
+    assert st["evicted_total"] == 1 and st["subscribers"] == 0
+
+
+@pytest.fixture
+def realtime_db(tmp_path, monkeypatch):
+    monkeypatch.setenv("QUANT_DB_PATH", str(tmp_path / "rt.duckdb"))
+    from data_pipeline.storage.duckdb_manager import ensure_tables, get_conn
+
+    conn = get_conn()
+    ensure_tables(conn)
+    conn.close()
+
+    def insert(ts, rows):
+        c = get_conn()
+        c.executemany(
+            "INSERT INTO a_stock_realtime (code, name, latest_price, change_pct, volume, amount, snapshot_time)"
+            " VALUES (?, ?, ?, 0, 0, ?, ?)",
+            [(code, code, price, amount, ts) for code, price, amount in rows],
+        )
+        c.close()
+
+    return insert
+
+
+def test_poll_reads_only_new_snapshots(realtime_db):
+    t0 = dt.datetime(2026, 1, 5, 9, 30)
+    realtime_db(t0 - dt.timedelta(seconds=30), [("600519", 1.0, 1.0)])
+    realtime_db(t0, [("600519", 2.0, 5.0), ("000001", 3.0, 9.0)])
+    hub = MarketHub()
+    assert hub.poll_once() == 2
+    assert {r["code"]: r["latest_price"] for r in hub.latest("ashare")} == {"600519": 2.0, "000001": 3.0}
+    realtime_db(t0 + dt.timedelta(seconds=30), [("600519", 2.0, 5.0), ("000001", 3.5, 9.0)])
+    assert hub.poll_once() == 1
+    assert hub.stats()["last_poll_rows"] == 2
+
+
+def test_ws_market_pushes_snapshot_then_deltas(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from gateway import market_hub
+    from gateway.app import app
+
+    hub = MarketHub(flush_interval_ms=0)
+    hub.start = lambda: None
+    monkeypatch.setattr(market_hub, "_hub", hub)
+    hub.publish("ashare", [{"code": "600519", "p": 1.0}], key="code")
+
+    with TestClient(app).websocket_connect("/ws/market?topics=ashare:600519") as ws:
+        snap = ws.receive_json()
+        assert snap["type"] == "snapshot" and snap["data"][0]["p"] == 1.0
+        ws.send_json({"op": "subscribe", "topics": ["binance:*"]})
+        assert ws.receive_json()["type"] == "subscribed"
+        hub.publish("ashare", [{"code": "600519", "p": 1.2}, {"code": "000001", "p": 9.0}], key="code")
+        delta = ws.receive_json()
+        assert delta["type"] == "delta"
+        assert delta["data"] == [{"topic": "ashare:600519", "p": 1.2, "code": "600519"}]
+
+
+def test_poller_runs_only_while_websocket_subscribers_exist(realtime_db, monkeypatch):
+    import asyncio
+
+    from fastapi.testclient import TestClient
+
+    from gateway import market_hub
+    from gateway.app import app
+
+    realtime_db(dt.datetime(2026, 1, 5, 9, 30), [("600519", 2.0, 5.0)])
+    hub = MarketHub(poll_interval=0.1)
+    monkeypatch.setattr(market_hub, "_hub", hub)
+    client = TestClient(app)
+    client.get("/api/market/realtime")
+    assert not hub.polling and hub.stats()["polls_total"] == 0  # REST 不启动轮询
+
+    async def session():
+        sub = hub.subscribe(asyncio.get_running_loop(), {"*"})
+        assert hub.polling
+        for _ in range(50):
+            if hub.latest("ashare"):
+                break
+            await asyncio.sleep(0.05)
+        assert [r["code"] for r in hub.latest("ashare")] == ["600519"]
+        hub.unsubscribe(sub)
+
+    asyncio.run(session())
+    assert not hub.polling and hub.latest("ashare") is None  # 最后一个订阅断开即停止，REST 回到查库
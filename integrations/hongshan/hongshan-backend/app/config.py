@@ -39,6 +39,9 @@ class Settings(BaseSettings):
     FEISHU_APP_ID: str = ""
     FEISHU_APP_SECRET: str = ""
 
+    # 行情配置：全市场快照后台刷新（间隔见 SPOT_SNAPSHOT_INTERVAL_SEC）；每个 uvicorn worker 各起一个刷新线程
+    SPOT_SNAPSHOT_BACKGROUND: bool = True
+
     # 交易配置
     DEFAULT_INITIAL_CAPITAL: float = 500000
     COMMISSION_RATE: float = 0.0003  # 万分之三
@@ -9,6 +9,7 @@ import logging
 
 from app.config import settings
 from app.db import init_db
+from app.services.spot_snapshot import spot_snapshot
 from app.routes import auth, users, stocks, orders, positions, strategies, risk, websocket
 
 # 配置日志
@@ -98,6 +99,9 @@ async def startup_event():
     if settings.AUTO_INIT_DB:
         logger.info("Initializing database...")
         init_db()
+    if settings.SPOT_SNAPSHOT_BACKGROUND:
+        # 全市场行情快照后台刷新，行情接口只读内存
+        spot_snapshot.start()
     logger.info("Startup complete!")
 
 
@@ -105,3 +109,4 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("Shutting down Hongshan Quant Platform...")
+    spot_snapshot.stop()
@@ -2,6 +2,7 @@
 交易委托 API
 """
 from fastapi import APIRouter, Depends, HTTPException, Query, Body
+from starlette.concurrency import run_in_threadpool
 from typing import List, Optional
 from datetime import datetime
 from decimal import Decimal
@@ -10,6 +11,7 @@ import uuid
 from app.db import get_db
 from sqlalchemy.orm import Session
 from app.models.database import Order, TradeLog, Account, Position, Stock
+from app.services.spot_snapshot import spot_snapshot
 from pydantic import BaseModel, Field
 
 router = APIRouter()
@@ -67,18 +69,15 @@ async def create_order(
     # 验证股票
     stock = db.query(Stock).filter(Stock.symbol == order_data.symbol).first()
     if not stock:
-        # 尝试从 akshare 获取股票信息并创建记录
+        # 从全市场行情快照获取股票信息并创建记录
         try:
-            import akshare as ak
-            stock_info = ak.stock_zh_a_spot_em()
-            stock_data = stock_info[stock_info['代码'] == order_data.symbol]
-            if not stock_data.empty:
-                row = stock_data.iloc[0]
+            quote = await run_in_threadpool(spot_snapshot.get_quote, order_data.symbol)
+            if quote:
                 stock = Stock(
                     symbol=order_data.symbol,
-                    name=row['名称'],
+                    name=quote['name'],
                     exchange="SH" if order_data.symbol.startswith('6') else "SZ",
-                    current_price=float(row['最新价'])
+                    current_price=quote['current_price']
                 )
                 db.add(stock)
                 db.commit()
@@ -4,11 +4,12 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from typing import List, Optional
 from decimal import Decimal
-import akshare as ak
+from starlette.concurrency import run_in_threadpool
 
 from app.db import get_db
 from sqlalchemy.orm import Session
 from app.models.database import Position, Account, Stock
+from app.services.spot_snapshot import spot_snapshot
 
 router = APIRouter()
 
@@ -30,22 +31,21 @@ async def get_positions(
     
     positions = query.all()
     
-    # 更新当前价格和盈亏
+    # 更新当前价格和盈亏：整批持仓只读一次全市场快照
+    quotes = {
+        q["symbol"]: q
+        for q in await run_in_threadpool(spot_snapshot.get_quotes, [pos.symbol for pos in positions])
+    }
     result = []
     for pos in positions:
-        try:
-            # 获取实时行情
-            quote = ak.stock_zh_a_spot_em()
-            stock_data = quote[quote['代码'] == pos.symbol]
-            if not stock_data.empty:
-                row = stock_data.iloc[0]
-                pos.current_price = float(row['最新价'])
-                pos.market_value = pos.current_price * pos.quantity
-                pos.profit = pos.market_value - pos.cost_amount
-                pos.profit_rate = (pos.profit / pos.cost_amount * 100) if pos.cost_amount > 0 else 0
-        except:
-            pass
-        
+        quote = quotes.get(pos.symbol)
+        if quote and quote["current_price"] is not None:
+            # Numeric 列为 Decimal，先转 Decimal 再与成本相减
+            pos.current_price = Decimal(str(quote["current_price"]))
+            pos.market_value = pos.current_price * pos.quantity
+            pos.profit = pos.market_value - pos.cost_amount
+            pos.profit_rate = (pos.profit / pos.cost_amount * 100) if pos.cost_amount > 0 else 0
+
         result.append({
             "id": str(pos.id),
             "symbol": pos.symbol,
@@ -2,6 +2,7 @@
 股票行情 API - 集成 akshare
 """
 from fastapi import APIRouter, Depends, HTTPException, Query
+from starlette.concurrency import run_in_threadpool
 from typing import List, Optional
 from datetime import date, datetime
 import akshare as ak
@@ -10,7 +11,7 @@ import pandas as pd
 from app.db import get_db
 from sqlalchemy.orm import Session
 from app.models.database import Stock, StockDailyBar
-from app.services.cache import cache
+from app.services.spot_snapshot import spot_snapshot
 
 router = APIRouter()
 
@@ -21,65 +22,32 @@ router = APIRouter()
 async def get_stock_quote(symbol: str):
     """
     获取股票实时行情
-    
+
     - symbol: 股票代码，如 600519
     """
-    # 尝试从缓存获取
-    cached = cache.get_stock_quote(symbol)
-    if cached:
-        return cached
-    
-    try:
-        # 使用 akshare 获取实时行情
-        stock_info = ak.stock_zh_a_spot_em()
-        stock_data = stock_info[stock_info['代码'] == symbol]
-        
-        if stock_data.empty:
-            raise HTTPException(status_code=404, detail="股票未找到")
-        
-        row = stock_data.iloc[0]
-        
-        result = {
-            "symbol": symbol,
-            "name": row['名称'],
-            "current_price": float(row['最新价']),
-            "change": float(row['涨跌额']),
-            "change_percent": float(row['涨跌幅']),
-            "open": float(row['今开']),
-            "high": float(row['最高']),
-            "low": float(row['最低']),
-            "pre_close": float(row['昨收']),
-            "volume": int(row['成交量']),
-            "amount": float(row['成交额']),
-            "timestamp": datetime.now().isoformat()
-        }
-        
-        # 写入缓存 (1 分钟)
-        cache.set_stock_quote(symbol, result, ttl=60)
-        
-        return result
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"
+    # 全市场快照在内存中按代码索引；仅快照过期时才在线程池中触发一次（single-flight）刷新
+    if spot_snapshot.is_fresh():
+        quote = spot_snapshot.get_quote(symbol)
+    else:
+        quote = await run_in_threadpool(spot_snapshot.get_quote, symbol)
+
+    if quote is None:
+        if not spot_snapshot.available():
+            raise HTTPException(status_code=503, detail="获取行情失败：全市场行情快照不可用")
+        raise HTTPException(status_code=404, detail="股票未找到")
+    return quote
 
 
 @router.get("/quotes")
 async def get_multiple_quotes(symbols: str = Query(..., description="逗号分隔的股票代码列表")):
-    """批量获取股票行情"""
-    symbol_list = [s.strip() for s in symbols.split(',')]
-    results = []
-    
-    for symbol in symbol_list:
-        try:
-            quote = await get_stock_quote(symbol)
-            results.append(quote)
-        except HTTPException:
-            continue
-    
-    return {"quotes": results, "count": len(results)}
-
+    """批量获取股票行情（整批读同一份全市场快照）"""
+    symbol_list = [s.strip() for s in symbols.split(',') if s.strip()]
+    if spot_snapshot.is_fresh():
+        results = spot_snapshot.get_quotes(symbol_list)
+    else:
+        results = await run_in_threadpool(spot_snapshot.get_quotes, symbol_list)
 
-@router.get("/{symbol}/history")
+    return {"quotes": results, "count": len(results)}
 
 
 # ============== 历史行情 ==============
@@ -1,15 +1,36 @@
 """
-双均线策略回测引擎
+向量化策略回测引擎（双均线 / MACD / RSI 共用）
+
+- 数据：优先经 backtest_engine 的 OHLCV 面板缓存读取主库 quant_system.duckdb 的 a_stock_daily（与 Gateway、回测引擎共用同一份日 K），
+  得到 (日期 × 标的) 收盘价矩阵；主库不可用或缺少的标的再逐只回落到 akshare；
+- 信号：策略函数接收收盘价 DataFrame（每列一只股票，已压实为该股自己的交易日序列），
+  一次按列计算指标，返回买入/卖出/有效 三个布尔矩阵；
+- 撮合：simulate_signals 只按「交易轮次」循环（每轮对全部标的向量化找下一次买入与其后的卖出），
+  持仓、现金、资金曲线由增量数组 cumsum 得到，绩效指标按列一次算出。
+
+规则与原逐 bar 实现一致：空仓遇买入信号按收盘价整手买入（100 股整数倍，含佣金须不超过可用资金），
+持仓遇卖出信号全部卖出（佣金 + 印花税）；持仓中的重复买入信号忽略。
 """
-import pandas as pd
+import logging
+from datetime import date
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
 import numpy as np
-from datetime import date, timedelta
-from typing import List, Dict, Any
-import akshare as ak
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# 策略信号函数：收盘价 DataFrame → (entries, exits, valid)，均为与 close 同形状的 bool ndarray
+SignalFn = Callable[[pd.DataFrame], Tuple[np.ndarray, np.ndarray, np.ndarray]]
+
+_NEWHIGH_ROOT = Path(__file__).resolve().parents[5]
 
 
 def get_stock_data(symbol: str, start_date: date, end_date: date) -> pd.DataFrame:
-    """获取股票历史数据"""
+    """通过 akshare 获取单只股票历史数据（主库缺数据时的回落路径）"""
+    import akshare as ak
+
     df = ak.stock_zh_a_hist(
         symbol=symbol,
         period="daily",
@@ -17,10 +38,10 @@ def get_stock_data(symbol: str, start_date: date, end_date: date) -> pd.DataFram
         end_date=end_date.strftime("%Y%m%d"),
         adjust="qfq"
     )
-    
+
     if df.empty:
         return pd.DataFrame()
-    
+
     # 重命名列
     df = df.rename(columns={
         '日期': 'date',
@@ -31,13 +52,89 @@ def get_stock_data(symbol: str, start_date: date, end_date: date) -> pd.DataFram
         '成交量': 'volume',
         '成交额': 'amount'
     })
-    
+
     df['date'] = pd.to_datetime(df['date'])
     df.set_index('date', inplace=True)
-    
+
     return df
 
 
+# ============== 数据加载 ==============
+
+def _load_close_from_duckdb(symbols: List[str], start_date: date, end_date: date) -> pd.DataFrame:
+    """
+    经共享的 backtest_engine 截面加载器读主库 a_stock_daily：进程级 OHLCV 面板缓存（panel_store）命中时不查库，
+    关闭缓存时由其一次 SQL 读取。返回 (日期 × 6 位代码) 收盘价矩阵；主库不可用时返回空表。
+    """
+    import os
+    import sys
+
+    for pkg in ("data-pipeline", "backtest-engine"):
+        src = _NEWHIGH_ROOT / pkg / "src"
+        if src.is_dir() and str(src) not in sys.path:
+            sys.path.insert(0, str(src))
+    try:
+        from backtest_engine.data_loader import load_close_panel_from_db
+        from data_pipeline.storage.duckdb_manager import get_db_path
+    except ImportError:
+        return pd.DataFrame()
+    if not os.path.isfile(get_db_path()):
+        return pd.DataFrame()
+
+    panel = load_close_panel_from_db(symbols, start_date.isoformat(), end_date.isoformat())
+    if panel.empty:
+        return pd.DataFrame()
+    panel = panel.rename(columns=lambda code: str(code).split('.', 1)[0])
+    return panel.loc[:, ~panel.columns.duplicated()].dropna(how='all')
+
+
+def load_close_panel(symbols: List[str], start_date: date, end_date: date) -> pd.DataFrame:
+    """
+    收盘价矩阵（index 为日期，columns 为请求的 6 位代码，无 K 线处为 NaN）。
+    主库整批一次读取；主库缺失的标的逐只走 akshare。
+    """
+    symbols = list(dict.fromkeys(str(s).strip() for s in symbols if str(s).strip()))
+    try:
+        panel = _load_close_from_duckdb(symbols, start_date, end_date)
+    except Exception as e:
+        logger.warning(f"读取主库日 K 失败，回落 akshare：{e}")
+        panel = pd.DataFrame()
+
+    frames = {s: panel[s] for s in symbols if s in panel.columns and panel[s].notna().any()}
+    for symbol in symbols:
+        if symbol in frames:
+            continue
+        try:
+            df = get_stock_data(symbol, start_date, end_date)
+            if not df.empty:
+                frames[symbol] = df['close'].astype(float)
+        except Exception as e:
+            logger.warning(f"获取 {symbol} 历史数据失败：{e}")
+    if not frames:
+        return pd.DataFrame()
+    return pd.DataFrame(frames).sort_index()[[s for s in symbols if s in frames]]
+
+
+def compact_panel(close: pd.DataFrame) -> Tuple[pd.DataFrame, np.ndarray]:
+    """
+    每列只保留该股自己有 K 线的行并上移（尾部补 NaN），使指标与逐只计算一致。
+    返回 (压实后的收盘价, 行号映射 order)：compact.iloc[i, j] 对应原 close 的第 order[i, j] 行。
+    """
+    values = close.to_numpy(dtype=float)
+    order = np.argsort(np.isnan(values), axis=0, kind="stable")
+    compact = np.take_along_axis(values, order, axis=0)
+    return pd.DataFrame(compact, columns=close.columns), order
+
+
+# ============== 信号 ==============
+
+def crossover_signals(fast: pd.DataFrame, slow: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """fast 上穿 slow 买入、下穿卖出（状态序列 diff，首行无信号）。"""
+    state = (fast > slow).astype(int)
+    positions = state.diff()
+    return (positions == 1).to_numpy(), (positions == -1).to_numpy(), positions.notna().to_numpy()
+
+
 def calculate_ma(df: pd.DataFrame, short_window: int = 5, long_window: int = 20) -> pd.DataFrame:
     """计算移动平均线"""
     df = df.copy()
@@ -46,18 +143,173 @@ def calculate_ma(df: pd.DataFrame, short_window: int = 5, long_window: int = 20)
     return df
 
 
-def generate_signals(df: pd.DataFrame) -> pd.DataFrame:
-    """生成交易信号"""
-    df = df.copy()
-    
-    # 金叉：短周期上穿长周期
-    df['signal'] = 0
-    df['signal'] = np.where(df['ma_short'] > df['ma_long'], 1, 0)
-    
-    # 交易信号：1-买入，-1-卖出
-    df['positions'] = df['signal'].diff()
-    
-    return df
+def ma_cross_signals(close: pd.DataFrame, short_window: int = 5, long_window: int = 20):
+    """双均线：短均线上穿长均线买入，下穿卖出。"""
+    return crossover_signals(
+        close.rolling(window=short_window).mean(),
+        close.rolling(window=long_window).mean(),
+    )
+
+
+# ============== 撮合内核 ==============
+
+def _next_true(mask: np.ndarray) -> np.ndarray:
+    """nxt[t, j] = 第 t 行及之后第一个 True 的行号，不存在为 T（多一行哨兵便于 t+1 访问）。"""
+    t_len, n = mask.shape
+    idx = np.where(mask, np.arange(t_len)[:, None], t_len)
+    nxt = np.minimum.accumulate(idx[::-1], axis=0)[::-1]
+    return np.vstack([nxt, np.full((1, n), t_len)])
+
+
+def simulate_signals(
+    close: np.ndarray,
+    entries: np.ndarray,
+    exits: np.ndarray,
+    valid: np.ndarray,
+    initial_capital: float,
+    commission_rate: float = 0.0003,
+    stamp_tax_rate: float = 0.001,
+) -> Dict[str, np.ndarray]:
+    """
+    多标的向量化撮合：close / entries / exits / valid 均为 (T, N)。
+    循环次数 = 单只股票最多交易轮次，每轮对全部标的同时定位买点与卖点。
+    返回资金曲线 value（无效行 NaN）与每只股票的买入/卖出/盈利笔数。
+    """
+    t_len, n = close.shape
+    ok_px = valid & ~np.isnan(close)
+    next_entry = _next_true(entries & ok_px)
+    next_exit = _next_true(exits & ok_px)
+
+    cash_delta = np.zeros((t_len + 1, n))
+    share_delta = np.zeros((t_len + 1, n))
+    cash = np.full(n, float(initial_capital))
+    cols = np.arange(n)
+    cursor = np.zeros(n, dtype=int)
+    buys = np.zeros(n, dtype=int)
+    sells = np.zeros(n, dtype=int)
+    wins = np.zeros(n, dtype=int)
+
+    active = np.ones(n, dtype=bool)
+    while active.any():
+        ent = next_entry[np.minimum(cursor, t_len), cols]
+        active &= ent < t_len
+        if not active.any():
+            break
+        j = cols[active]
+        e = ent[active]
+        px = close[e, j]
+        shares = np.floor(cash[j] / px / 100) * 100
+        cost = shares * px * (1 + commission_rate)
+        filled = (cash[j] > 0) & (shares >= 100) & (cost <= cash[j])
+
+        # 买入失败（资金不足一手）：保持空仓，从下一行继续找买点
+        cursor[j[~filled]] = e[~filled] + 1
+        j, e, px, shares, cost = j[filled], e[filled], px[filled], shares[filled], cost[filled]
+        cash[j] -= cost
+        buys[j] += 1
+        np.add.at(cash_delta, (e, j), -cost)
+        np.add.at(share_delta, (e, j), shares)
+
+        x = next_exit[e + 1, j]
+        closed = x < t_len
+        jc, xc, sc, cc = j[closed], x[closed], shares[closed], cost[closed]
+        revenue = sc * close[xc, jc] * (1 - commission_rate - stamp_tax_rate)
+        cash[jc] += revenue
+        sells[jc] += 1
+        wins[jc] += revenue > cc
+        np.add.at(cash_delta, (xc, jc), revenue)
+        np.add.at(share_delta, (xc, jc), -sc)
+        cursor[jc] = xc + 1
+        # 期末仍持仓的标的不再有后续交易
+        active[j[~closed]] = False
+
+    held_cash = initial_capital + np.cumsum(cash_delta[:t_len], axis=0)
+    held_shares = np.cumsum(share_delta[:t_len], axis=0)
+    value = held_cash + held_shares * np.nan_to_num(close)
+    value[~(valid & ~np.isnan(close))] = np.nan
+    return {"value": value, "buys": buys, "sells": sells, "wins": wins}
+
+
+def _column_metrics(value: np.ndarray, dates: np.ndarray, initial_capital: float) -> Dict[str, np.ndarray]:
+    """按列计算收益、年化、夏普、最大回撤（value 中 NaN 行不参与）。"""
+    has = ~np.isnan(value)
+    n_obs = has.sum(axis=0)
+    t_idx = np.arange(value.shape[0])[:, None]
+    first = np.where(has, t_idx, value.shape[0]).min(axis=0)
+    last = np.where(has, t_idx, -1).max(axis=0)
+    cols = np.arange(value.shape[1])
+    safe_last = np.maximum(last, 0)
+    final = value[safe_last, cols]
+    total_return = (final - initial_capital) / initial_capital * 100
+
+    days = (
+        dates[safe_last, cols] - dates[np.minimum(first, value.shape[0] - 1), cols]
+    ).astype("timedelta64[D]").astype(float)
+    with np.errstate(invalid="ignore", divide="ignore", over="ignore"):
+        annual = np.where(days > 0, ((1 + total_return / 100) ** (365 / np.where(days > 0, days, 1)) - 1) * 100, 0.0)
+
+        prev = np.vstack([np.full((1, value.shape[1]), np.nan), value[:-1]])
+        rets = value / prev - 1
+        cnt = (~np.isnan(rets)).sum(axis=0)
+        mean = np.nanmean(np.where(cnt > 0, rets, 0), axis=0)
+        std = np.where(cnt > 1, np.nanstd(np.where(cnt > 1, rets, 0), axis=0, ddof=1), 0.0)
+        sharpe = np.where(std > 0, np.sqrt(252) * mean / np.where(std > 0, std, 1), 0.0)
+
+        peak = np.fmax.accumulate(value, axis=0)
+        max_dd = np.nanmin(np.where(has, (value - peak) / peak, np.inf), axis=0) * 100
+    max_dd = np.where(n_obs > 0, max_dd, 0.0)
+    return {
+        "final": final,
+        "total_return": total_return,
+        "annual_return": annual,
+        "sharpe_ratio": sharpe,
+        "max_drawdown": max_dd,
+        "n_obs": n_obs,
+    }
+
+
+def backtest_panel(
+    close: pd.DataFrame,
+    signal_fn: SignalFn,
+    initial_capital: float,
+    commission_rate: float = 0.0003,
+    stamp_tax_rate: float = 0.001,
+) -> List[Dict[str, Any]]:
+    """整批标的一次回测，返回每只股票的结果（结构同原 run_backtest，另含 symbol）。"""
+    if close.empty:
+        return []
+    compact, order = compact_panel(close)
+    entries, exits, valid = signal_fn(compact)
+    sim = simulate_signals(
+        compact.to_numpy(dtype=float), entries, exits, valid,
+        initial_capital, commission_rate, stamp_tax_rate,
+    )
+    dates = close.index.values.astype("datetime64[D]")[order]
+    m = _column_metrics(sim["value"], dates, initial_capital)
+
+    results = []
+    for j, symbol in enumerate(close.columns):
+        if m["n_obs"][j] == 0:
+            continue
+        col = sim["value"][:, j]
+        keep = ~np.isnan(col)
+        sells = int(sim["sells"][j])
+        wins = int(sim["wins"][j])
+        results.append({
+            'symbol': symbol,
+            'total_return': round(float(m["total_return"][j]), 4),
+            'annual_return': round(float(m["annual_return"][j]), 4),
+            'sharpe_ratio': round(float(m["sharpe_ratio"][j]), 4),
+            'max_drawdown': round(float(m["max_drawdown"][j]), 4),
+            'total_trades': int(sim["buys"][j]) + sells,
+            'winning_trades': wins,
+            'win_rate': round(wins / sells * 100, 4) if sells else 0,
+            'final_capital': round(float(m["final"][j]), 2),
+            'portfolio_values': [
+                {'date': str(d), 'value': float(v)} for d, v in zip(dates[keep, j], col[keep])
+            ],
+        })
+    return results
 
 
 def run_backtest(
@@ -66,146 +318,33 @@ def run_backtest(
     commission_rate: float = 0.0003,
     stamp_tax_rate: float = 0.001
 ) -> Dict[str, Any]:
-    """执行回测"""
-    capital = initial_capital
-    position = 0
-    trades = []
-    portfolio_values = []
-    
-    for i, row in df.iterrows():
-        if pd.isna(row['positions']):
-            continue
-            
-        # 买入信号
-        if row['positions'] == 1 and capital > 0:
-            # 计算可买数量（100 股的整数倍）
-            shares = int(capital / row['close'] / 100) * 100
-            if shares >= 100:
-                cost = shares * row['close']
-                commission = cost * commission_rate
-                total_cost = cost + commission
-                
-                if total_cost <= capital:
-                    capital -= total_cost
-                    position = shares
-                    trades.append({
-                        'date': i,
-                        'type': 'buy',
-                        'price': row['close'],
-                        'shares': shares,
-                        'cost': total_cost
-                    })
-        
-        # 卖出信号
-        elif row['positions'] == -1 and position > 0:
-            revenue = position * row['close']
-            commission = revenue * commission_rate
-            stamp_tax = revenue * stamp_tax_rate
-            net_revenue = revenue - commission - stamp_tax
-            
-            capital += net_revenue
-            trades.append({
-                'date': i,
-                'type': 'sell',
-                'price': row['close'],
-                'shares': position,
-                'revenue': net_revenue
-            })
-            position = 0
-        
-        # 计算组合价值
-        portfolio_value = capital + (position * row['close'] if position > 0 else 0)
-        portfolio_values.append({
-            'date': i,
-            'value': portfolio_value
-        })
-    
-    # 计算收益指标
-    portfolio_df = pd.DataFrame(portfolio_values)
-    portfolio_df.set_index('date', inplace=True)
-    
-    total_return = (portfolio_df['value'].iloc[-1] - initial_capital) / initial_capital * 100
-    
-    # 年化收益
-    days = (portfolio_df.index[-1] - portfolio_df.index[0]).days
-    annual_return = ((1 + total_return/100) ** (365/days) - 1) * 100 if days > 0 else 0
-    
-    # 夏普比率
-    daily_returns = portfolio_df['value'].pct_change().dropna()
-    sharpe_ratio = np.sqrt(252) * daily_returns.mean() / daily_returns.std() if daily_returns.std() > 0 else 0
-    
-    # 最大回撤
-    rolling_max = portfolio_df['value'].cummax()
-    drawdown = (portfolio_df['value'] - rolling_max) / rolling_max
-    max_drawdown = drawdown.min() * 100
-    
-    # 交易统计
-    total_trades = len(trades)
-    buy_trades = [t for t in trades if t['type'] == 'buy']
-    sell_trades = [t for t in trades if t['type'] == 'sell']
-    
-    # 计算胜率
-    winning_trades = 0
-    if len(sell_trades) > 0 and len(buy_trades) > 0:
-        for i, sell in enumerate(sell_trades):
-            if i < len(buy_trades):
-                if sell['revenue'] > buy_trades[i]['cost']:
-                    winning_trades += 1
-    
-    win_rate = (winning_trades / len(sell_trades) * 100) if sell_trades else 0
-    
-    return {
-        'total_return': round(total_return, 4),
-        'annual_return': round(annual_return, 4),
-        'sharpe_ratio': round(sharpe_ratio, 4),
-        'max_drawdown': round(max_drawdown, 4),
-        'total_trades': total_trades,
-        'winning_trades': winning_trades,
-        'win_rate': round(win_rate, 4),
-        'final_capital': round(portfolio_df['value'].iloc[-1], 2),
-        'portfolio_values': portfolio_df.to_dict('records')
-    }
+    """单只回测（兼容旧接口）：df 含 close 与 positions（1 买入 / -1 卖出 / NaN 跳过）。"""
+    positions = df['positions']
+    close = pd.DataFrame({'symbol': df['close'].astype(float).to_numpy()}, index=df.index)
 
+    def _given(_close: pd.DataFrame):
+        p = positions.to_numpy(dtype=float)[:, None]
+        return p == 1, p == -1, ~np.isnan(p)
 
-def run_ma_cross_backtest(
+    results = backtest_panel(close, _given, initial_capital, commission_rate, stamp_tax_rate)
+    if not results:
+        raise ValueError("no bars to backtest")
+    result = results[0]
+    result.pop('symbol')
+    return result
+
+
+def run_strategy_backtest(
     symbols: List[str],
     start_date: date,
     end_date: date,
-    initial_capital: float = 500000,
-    params: Dict[str, Any] = None
+    initial_capital: float,
+    signal_fn: SignalFn,
 ) -> Dict[str, Any]:
-    """运行双均线策略回测"""
-    if params is None:
-        params = {'short_window': 5, 'long_window': 20}
-    
-    short_window = params.get('short_window', 5)
-    long_window = params.get('long_window', 20)
-    
-    results = []
-    
-    for symbol in symbols:
-        try:
-            # 获取数据
-            df = get_stock_data(symbol, start_date, end_date)
-            if df.empty:
-                continue
-            
-            # 计算均线
-            df = calculate_ma(df, short_window, long_window)
-            
-            # 生成信号
-            df = generate_signals(df)
-            
-            # 执行回测
-            result = run_backtest(df, initial_capital / len(symbols))
-            
-            result['symbol'] = symbol
-            results.append(result)
-            
-        except Exception as e:
-            print(f"回测 {symbol} 失败：{e}")
-            continue
-    
+    """通用多标的回测：一次加载收盘价矩阵、一次计算信号与撮合，汇总为简单平均。"""
+    close = load_close_panel(symbols, start_date, end_date)
+    results = backtest_panel(close, signal_fn, initial_capital / (len(symbols) or 1))
+
     # 汇总结果
     if not results:
         return {
@@ -216,14 +355,14 @@ def run_ma_cross_backtest(
             'total_trades': 0,
             'win_rate': 0
         }
-    
+
     # 简单平均
-    avg_return = np.mean([r['total_return'] for r in results])
-    avg_sharpe = np.mean([r['sharpe_ratio'] for r in results])
-    avg_drawdown = np.mean([r['max_drawdown'] for r in results])
+    avg_return = float(np.mean([r['total_return'] for r in results]))
+    avg_sharpe = float(np.mean([r['sharpe_ratio'] for r in results]))
+    avg_drawdown = float(np.mean([r['max_drawdown'] for r in results]))
     total_trades = sum([r['total_trades'] for r in results])
-    avg_win_rate = np.mean([r['win_rate'] for r in results])
-    
+    avg_win_rate = float(np.mean([r['win_rate'] for r in results]))
+
     return {
         'total_return': round(avg_return, 4),
         'annual_return': round(avg_return * 365 / ((end_date - start_date).days or 1), 4),
@@ -236,6 +375,26 @@ def run_ma_cross_backtest(
     }
 
 
+def run_ma_cross_backtest(
+    symbols: List[str],
+    start_date: date,
+    end_date: date,
+    initial_capital: float = 500000,
+    params: Dict[str, Any] = None
+) -> Dict[str, Any]:
+    """运行双均线策略回测"""
+    if params is None:
+        params = {'short_window': 5, 'long_window': 20}
+
+    short_window = params.get('short_window', 5)
+    long_window = params.get('long_window', 20)
+
+    return run_strategy_backtest(
+        symbols, start_date, end_date, initial_capital,
+        lambda close: ma_cross_signals(close, short_window, long_window),
+    )
+
+
 # 测试
 if __name__ == "__main__":
     result = run_ma_cross_backtest(
@@ -245,7 +404,7 @@ if __name__ == "__main__":
         initial_capital=500000,
         params={'short_window': 5, 'long_window': 20}
     )
-    
+
     print("=" * 50)
     print("双均线策略回测结果")
     print("=" * 50)
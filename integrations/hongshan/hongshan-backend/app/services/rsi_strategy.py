@@ -2,10 +2,9 @@
 RSI 策略回测引擎
 """
 import pandas as pd
-import numpy as np
 from datetime import date
 from typing import List, Dict, Any
-from app.services.backtest_engine import get_stock_data, run_backtest
+from app.services.backtest_engine import run_strategy_backtest
 
 
 def calculate_rsi(df: pd.DataFrame, period: int = 14) -> pd.DataFrame:
@@ -30,21 +29,19 @@ def calculate_rsi(df: pd.DataFrame, period: int = 14) -> pd.DataFrame:
     return df
 
 
-def generate_rsi_signals(df: pd.DataFrame, oversold: int = 30, overbought: int = 70) -> pd.DataFrame:
-    """生成 RSI 交易信号"""
-    df = df.copy()
-    
-    # 信号：超卖买入，超买卖出
-    df['signal'] = 0
-    df.loc[df['rsi'] < oversold, 'signal'] = 1  # 超卖买入
-    df.loc[df['rsi'] > overbought, 'signal'] = -1  # 超买卖出
-    
-    # 交易信号 (信号变化时)
-    df['positions'] = 0
-    df.loc[(df['signal'] == 1) & (df['signal'].shift(1) != 1), 'positions'] = 1
-    df.loc[(df['signal'] == -1) & (df['signal'].shift(1) != -1), 'positions'] = -1
-    
-    return df
+def rsi_signals(close: pd.DataFrame, period: int = 14, oversold: int = 30, overbought: int = 70):
+    """RSI 交易信号（按列向量化）：刚进入超卖区买入，刚进入超买区卖出。"""
+    delta = close.diff()
+    avg_gain = delta.clip(lower=0).rolling(window=period).mean()
+    avg_loss = (-delta).clip(lower=0).rolling(window=period).mean()
+    rsi = 100 - (100 / (1 + avg_gain / avg_loss))
+
+    zone = pd.DataFrame(0, index=close.index, columns=close.columns)
+    zone = zone.mask(rsi < oversold, 1).mask(rsi > overbought, -1)
+    prev = zone.shift(1)
+    entries = ((zone == 1) & (prev != 1)).to_numpy()
+    exits = ((zone == -1) & (prev != -1)).to_numpy()
+    return entries, exits, close.notna().to_numpy()
 
 
 def run_rsi_backtest(
@@ -57,62 +54,15 @@ def run_rsi_backtest(
     """运行 RSI 策略回测"""
     if params is None:
         params = {'period': 14, 'oversold': 30, 'overbought': 70}
-    
+
     period = params.get('period', 14)
     oversold = params.get('oversold', 30)
     overbought = params.get('overbought', 70)
-    
-    results = []
-    
-    for symbol in symbols:
-        try:
-            # 获取数据
-            df = get_stock_data(symbol, start_date, end_date)
-            if df.empty:
-                continue
-            
-            # 计算 RSI
-            df = calculate_rsi(df, period)
-            
-            # 生成信号
-            df = generate_rsi_signals(df, oversold, overbought)
-            
-            # 执行回测
-            result = run_backtest(df, initial_capital / len(symbols))
-            result['symbol'] = symbol
-            results.append(result)
-            
-        except Exception as e:
-            print(f"RSI 回测 {symbol} 失败：{e}")
-            continue
-    
-    if not results:
-        return {
-            'total_return': 0,
-            'annual_return': 0,
-            'sharpe_ratio': 0,
-            'max_drawdown': 0,
-            'total_trades': 0,
-            'win_rate': 0
-        }
-    
-    # 汇总结果
-    avg_return = np.mean([r['total_return'] for r in results])
-    avg_sharpe = np.mean([r['sharpe_ratio'] for r in results])
-    avg_drawdown = np.mean([r['max_drawdown'] for r in results])
-    total_trades = sum([r['total_trades'] for r in results])
-    avg_win_rate = np.mean([r['win_rate'] for r in results])
-    
-    return {
-        'total_return': round(avg_return, 4),
-        'annual_return': round(avg_return * 365 / ((end_date - start_date).days or 1), 4),
-        'sharpe_ratio': round(avg_sharpe, 4),
-        'max_drawdown': round(avg_drawdown, 4),
-        'total_trades': total_trades,
-        'win_rate': round(avg_win_rate, 4),
-        'symbols': symbols,
-        'details': results
-    }
+
+    return run_strategy_backtest(
+        symbols, start_date, end_date, initial_capital,
+        lambda close: rsi_signals(close, period, oversold, overbought),
+    )
 
 
 # 测试
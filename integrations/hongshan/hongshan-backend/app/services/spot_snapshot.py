@@ -0,0 +1,171 @@
+"""
+全市场实时行情快照服务
+ak.stock_zh_a_spot_em() 每次返回整个 A 股市场，按单只股票调用代价极高。
+本服务每个周期只拉取一次全市场数据，按代码建索引，单只/批量行情都直接读内存。
+
+- 后台线程按 SPOT_SNAPSHOT_INTERVAL_SEC（默认 15 秒）刷新；未启动后台线程时按需刷新；
+- 并发请求遇到快照过期时只有一个线程去拉取（single-flight），其余线程等待同一次结果；
+- 拉取失败时继续使用旧快照，超过 SPOT_SNAPSHOT_MAX_STALE_SEC（默认 300 秒）才视为不可用。
+- 快照在进程内存中：uvicorn 多 worker（--workers N）时每个 worker 各有一份快照和一个后台线程，
+  每个周期共拉取 N 次全市场数据；多 worker 部署可设 SPOT_SNAPSHOT_BACKGROUND=false 改为按需刷新，
+  或调大 SPOT_SNAPSHOT_INTERVAL_SEC。
+"""
+import logging
+import math
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+def _num(value, cast=float):
+    """停牌等情况下 akshare 返回 NaN/None，统一转为 None。"""
+    try:
+        v = float(value)
+    except (TypeError, ValueError):
+        return None
+    if math.isnan(v):
+        return None
+    return cast(v)
+
+
+def _load_spot_frame() -> pd.DataFrame:
+    import akshare as ak
+
+    return ak.stock_zh_a_spot_em()
+
+
+def _build_index(df: pd.DataFrame, fetched_at: datetime) -> Dict[str, dict]:
+    """全市场 DataFrame → {代码: 行情字典}，字段与 /api/stocks/quote 返回一致。"""
+    ts = fetched_at.isoformat()
+    index: Dict[str, dict] = {}
+    for row in df.to_dict("records"):
+        symbol = str(row.get("代码") or "").strip()
+        if not symbol:
+            continue
+        index[symbol] = {
+            "symbol": symbol,
+            "name": row.get("名称", ""),
+            "current_price": _num(row.get("最新价")),
+            "change": _num(row.get("涨跌额")),
+            "change_percent": _num(row.get("涨跌幅")),
+            "open": _num(row.get("今开")),
+            "high": _num(row.get("最高")),
+            "low": _num(row.get("最低")),
+            "pre_close": _num(row.get("昨收")),
+            "volume": _num(row.get("成交量"), int),
+            "amount": _num(row.get("成交额")),
+            "timestamp": ts,
+        }
+    return index
+
+
+class SpotSnapshotService:
+    """全市场行情快照：周期刷新 + 按代码索引 + single-flight。"""
+
+    def __init__(
+        self,
+        loader: Callable[[], pd.DataFrame] = _load_spot_frame,
+        interval: Optional[float] = None,
+        max_stale: Optional[float] = None,
+    ):
+        self.loader = loader
+        self.interval = interval if interval is not None else float(os.environ.get("SPOT_SNAPSHOT_INTERVAL_SEC", "15"))
+        self.max_stale = max_stale if max_stale is not None else float(os.environ.get("SPOT_SNAPSHOT_MAX_STALE_SEC", "300"))
+        self._index: Dict[str, dict] = {}
+        self._fetched_at = 0.0  # time.monotonic()，最近一次成功刷新
+        self._attempted_at = 0.0  # 最近一次刷新尝试结束（成功或失败）
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {"refreshes": 0, "failures": 0}
+
+    # ---------- 刷新 ----------
+
+    def _age(self) -> float:
+        return time.monotonic() - self._fetched_at if self._fetched_at else float("inf")
+
+    def is_fresh(self) -> bool:
+        return self._age() < self.interval
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        拉取一次全市场行情。并发调用时只有持锁线程真正请求，
+        其余线程拿到锁后发现快照已更新即直接返回。
+        """
+        started = time.monotonic()
+        with self._refresh_lock:
+            if self._attempted_at >= started:
+                # 等锁期间已有其它线程完成了一次拉取，直接复用其结果
+                return self._fetched_at >= started
+            if not force and self.is_fresh():
+                return True
+            try:
+                df = self.loader()
+                if df is None or df.empty:
+                    raise ValueError("empty spot frame")
+                self._index = _build_index(df, datetime.now())
+                self._fetched_at = time.monotonic()
+                self.stats["refreshes"] += 1
+                logger.info(f"全市场行情快照已刷新：{len(self._index)} 只")
+                return True
+            except Exception as e:
+                self.stats["failures"] += 1
+                logger.error(f"全市场行情快照刷新失败：{e}")
+                return False
+            finally:
+                self._attempted_at = time.monotonic()
+
+    def _ensure(self) -> Dict[str, dict]:
+        if not self.is_fresh():
+            self.refresh()
+        if self._age() > self.max_stale:
+            return {}
+        return self._index
+
+    # ---------- 查询 ----------
+
+    def get_quote(self, symbol: str) -> Optional[dict]:
+        """单只行情；快照中不存在返回 None。"""
+        quote = self._ensure().get(str(symbol).strip())
+        return dict(quote) if quote else None
+
+    def get_quotes(self, symbols: Iterable[str]) -> List[dict]:
+        """批量行情（按请求顺序，跳过不存在的代码），整批只读一次快照。"""
+        index = self._ensure()
+        out = []
+        for s in symbols:
+            quote = index.get(str(s).strip())
+            if quote:
+                out.append(dict(quote))
+        return out
+
+    def available(self) -> bool:
+        """当前快照是否可用（不触发刷新）。"""
+        return bool(self._index) and self._age() <= self.max_stale
+
+    # ---------- 后台线程 ----------
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="spot-snapshot", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.refresh(force=True)
+            self._stop.wait(self.interval)
+
+
+# 单例
+spot_snapshot = SpotSnapshotService()
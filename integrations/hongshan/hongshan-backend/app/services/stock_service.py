@@ -30,46 +30,17 @@ class StockService:
             行情数据字典
         """
         try:
-            # 检查缓存
-            cache_key = f"quote_{symbol}"
-            if cache_key in self.cache:
-                data, timestamp = self.cache[cache_key]
-                if (datetime.now() - timestamp).seconds < self.cache_ttl:
-                    logger.info(f"使用缓存数据：{symbol}")
-                    return data
-            
-            # 调用 akshare 获取实时行情
-            # 使用 stock_zh_a_spot_em 获取 A 股实时行情
-            df = ak.stock_zh_a_spot_em()
-            
-            # 查找指定股票
-            stock_data = df[df['代码'] == symbol]
-            
-            if stock_data.empty:
+            # 全市场快照按代码索引，周期内多次查询不再重复拉取整个市场
+            from app.services.spot_snapshot import spot_snapshot
+
+            quote = spot_snapshot.get_quote(symbol)
+            if quote is None:
                 logger.warning(f"未找到股票：{symbol}")
                 return None
-            
-            row = stock_data.iloc[0]
-            
-            result = {
-                "symbol": symbol,
-                "name": row.get('名称', ''),
-                "price": float(row.get('最新价', 0)),
-                "change": float(row.get('涨跌额', 0)),
-                "change_percent": float(row.get('涨跌幅', 0)),
-                "open": float(row.get('今开', 0)),
-                "high": float(row.get('最高', 0)),
-                "low": float(row.get('最低', 0)),
-                "pre_close": float(row.get('昨收', 0)),
-                "volume": int(row.get('成交量', 0)),
-                "amount": float(row.get('成交额', 0)),
-                "timestamp": datetime.now()
-            }
-            
-            # 更新缓存
-            self.cache[cache_key] = (result, datetime.now())
-            
-            logger.info(f"获取行情成功：{symbol} - {result['name']}")
+
+            result = dict(quote)
+            result["price"] = result.pop("current_price")
+            result["timestamp"] = datetime.fromisoformat(result["timestamp"])
             return result
             
         except Exception as e:
@@ -4,7 +4,7 @@
 
 from __future__ import annotations
 
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from .gene import StrategyGene
 
@@ -16,42 +16,103 @@ def _eval_strategy_id(gene: StrategyGene) -> Optional[str]:
     return s or None
 
 
-def _resolve_eval_symbol(eval_strategy_id: Optional[str], default_symbol: str) -> str:
+def _add_repo_paths(*dirs: str) -> None:
+    import os
+    import sys
+
+    _root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    for _d in dirs:
+        _p = os.path.join(_root, _d)
+        if os.path.isdir(_p) and _p not in sys.path:
+            sys.path.insert(0, _p)
+
+
+def _resolve_eval_symbols(eval_strategy_ids: List[Optional[str]], default_symbol: str) -> Dict[str, str]:
     """
-    在库中选一只「该策略有信号且存在日 K」的标的，避免固定 000001 与实盘信号池脱节。
+    批量版 _resolve_eval_symbol：一条 SQL 为每个策略选「有信号且存在日 K」、信号分最高的标的；
+    返回 {strategy_id: code}，未命中的策略不在结果中（调用方回落 default_symbol）。
     """
-    if not eval_strategy_id:
-        return default_symbol
+    sids = sorted({s for s in eval_strategy_ids if s})
+    if not sids:
+        return {}
     try:
         import os
-        import sys
 
-        _root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        dp = os.path.join(_root, "data-pipeline", "src")
-        if os.path.isdir(dp) and dp not in sys.path:
-            sys.path.insert(0, dp)
+        _add_repo_paths("data-pipeline/src")
         from data_pipeline.storage.duckdb_manager import get_conn, get_db_path
 
         if not os.path.isfile(get_db_path()):
-            return default_symbol
+            return {}
         conn = get_conn(read_only=True)
-        row = conn.execute(
+        rows = conn.execute(
             """
-            SELECT t.code
-            FROM trade_signals t
-            WHERE t.strategy_id = ?
-              AND t.code IN (SELECT DISTINCT code FROM a_stock_daily)
-            ORDER BY t.signal_score DESC NULLS LAST, t.snapshot_time DESC NULLS LAST
-            LIMIT 1
+            SELECT strategy_id, code FROM (
+                SELECT t.strategy_id, t.code,
+                    ROW_NUMBER() OVER (
+                        PARTITION BY t.strategy_id
+                        ORDER BY t.signal_score DESC NULLS LAST, t.snapshot_time DESC NULLS LAST
+                    ) AS rn
+                FROM trade_signals t
+                WHERE t.strategy_id IN (SELECT UNNEST(?))
+                  AND t.code IN (SELECT DISTINCT code FROM a_stock_daily)
+            ) WHERE rn = 1
             """,
-            [eval_strategy_id],
-        ).fetchone()
+            [sids],
+        ).fetchall()
         conn.close()
-        if row and row[0]:
-            return str(row[0])
+        return {str(r[0]): str(r[1]) for r in rows if r[1]}
     except Exception:
-        pass
-    return default_symbol
+        return {}
+
+
+def _resolve_eval_symbol(eval_strategy_id: Optional[str], default_symbol: str) -> str:
+    """
+    在库中选一只「该策略有信号且存在日 K」的标的，避免固定 000001 与实盘信号池脱节。
+    """
+    if not eval_strategy_id:
+        return default_symbol
+    return _resolve_eval_symbols([eval_strategy_id], default_symbol).get(eval_strategy_id, default_symbol)
+
+
+def _eval_window(start_date: Optional[str], end_date: Optional[str]) -> Tuple[str, str]:
+    from datetime import datetime, timedelta
+
+    end = end_date or datetime.now().strftime("%Y-%m-%d")
+    start = start_date or (datetime.now() - timedelta(days=365)).strftime("%Y-%m-%d")
+    return start, end
+
+
+def _evaluation_from_backtest(
+    out: Dict[str, Any], use_symbol: str, eval_sid: Optional[str], use_multi_objective: bool
+) -> Dict[str, Any]:
+    if out.get("error"):
+        return {
+            "fitness": 0.0,
+            "error": out["error"],
+            "eval_symbol": use_symbol,
+            "eval_strategy_id": eval_sid,
+        }
+    if use_multi_objective:
+        from .multi_objective import fitness_from_backtest_result
+
+        fitness = fitness_from_backtest_result(out, use_composite=True)
+    else:
+        sharpe = out.get("sharpe_ratio")
+        total_return = out.get("total_return")
+        fitness = (
+            float(sharpe)
+            if sharpe is not None
+            else (float(total_return) if total_return is not None else 0.0)
+        )
+    return {
+        "fitness": fitness,
+        "sharpe_ratio": out.get("sharpe_ratio"),
+        "total_return": out.get("total_return"),
+        "max_drawdown": out.get("max_drawdown"),
+        "error": None,
+        "eval_symbol": use_symbol,
+        "eval_strategy_id": eval_sid,
+    }
 
 
 def evaluate_gene(
@@ -64,60 +125,81 @@ def evaluate_gene(
 ) -> Dict[str, Any]:
     """
     用回测引擎评估：按 eval_strategy_id / strategy_id 过滤 trade_signals，并解析可交易标的代码。
+    结果按基因参数 + 数据版本缓存（backtest_engine.result_cache，与 evaluate_genes 的农场缓存同键）。
     返回 { "fitness", "sharpe_ratio", "total_return", "max_drawdown", "error", "eval_symbol", "eval_strategy_id" }。
     """
     try:
-        import os
-        import sys
-        from datetime import datetime, timedelta
-
-        _root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        for _d in ["backtest-engine/src", "data-pipeline/src", "core/src"]:
-            _p = os.path.join(_root, _d)
-            if os.path.isdir(_p) and _p not in sys.path:
-                sys.path.insert(0, _p)
-        from backtest_engine import run_backtest_from_db
+        _add_repo_paths("backtest-engine/src", "data-pipeline/src", "core/src")
+        from backtest_engine import cached_backtest, run_backtest_from_db
+        from backtest_engine.farm import BacktestJob
 
         eval_sid = _eval_strategy_id(gene)
         use_symbol = _resolve_eval_symbol(eval_sid, symbol)
-
-        end = end_date or datetime.now().strftime("%Y-%m-%d")
-        start = start_date or (datetime.now() - timedelta(days=365)).strftime("%Y-%m-%d")
-        out = run_backtest_from_db(
+        start, end = _eval_window(start_date, end_date)
+        job = BacktestJob(
             symbol=use_symbol,
             start_date=start,
             end_date=end,
             signal_source="trade_signals",
             strategy_id=eval_sid,
             init_cash=init_cash,
+            params={"rule_tree": gene.rule_tree, "params": gene.params},
         )
-        if out.get("error"):
-            return {
-                "fitness": 0.0,
-                "error": out["error"],
-                "eval_symbol": use_symbol,
-                "eval_strategy_id": eval_sid,
-            }
-        if use_multi_objective:
-            from .multi_objective import fitness_from_backtest_result
-
-            fitness = fitness_from_backtest_result(out, use_composite=True)
-        else:
-            sharpe = out.get("sharpe_ratio")
-            total_return = out.get("total_return")
-            fitness = (
-                float(sharpe)
-                if sharpe is not None
-                else (float(total_return) if total_return is not None else 0.0)
-            )
-        return {
-            "fitness": fitness,
-            "sharpe_ratio": out.get("sharpe_ratio"),
-            "total_return": out.get("total_return"),
-            "max_drawdown": out.get("max_drawdown"),
-            "error": None,
-            "eval_symbol": use_symbol,
-            "eval_strategy_id": eval_sid,
-        }
+        out = cached_backtest(
+            job.cache_key(),
+            lambda: run_backtest_from_db(
+                symbol=use_symbol,
+                start_date=start,
+                end_date=end,
+                signal_source="trade_signals",
+                strategy_id=eval_sid,
+                init_cash=init_cash,
+            ),
+        )
+        return _evaluation_from_backtest(out, use_symbol, eval_sid, use_multi_objective)
     except (ImportError, ModuleNotFoundError, KeyError, TypeError, ValueError) as e:
         return {"fitness": 0.0, "error": str(e)}
+
+
+def evaluate_genes(
+    genes: List[StrategyGene],
+    symbol: str = "000001.SZ",
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    init_cash: float = 10000.0,
+    use_multi_objective: bool = True,
+) -> List[Dict[str, Any]]:
+    """
+    批量评估（结果顺序与 genes 一致，字段同 evaluate_gene）：评估标的一条 SQL 解析，
+    回测交给 backtest_engine.farm —— 日 K/信号整批加载进共享内存，进程池并行，
+    按基因参数哈希 + 数据版本缓存（重复基因与跨代未变的个体不重复回测，库表层跨进程复用）。
+    """
+    if not genes:
+        return []
+    try:
+        _add_repo_paths("backtest-engine/src", "data-pipeline/src", "core/src")
+        from backtest_engine.farm import BacktestJob, run_backtest_jobs
+
+        sids = [_eval_strategy_id(g) for g in genes]
+        resolved = _resolve_eval_symbols(sids, symbol)
+        start, end = _eval_window(start_date, end_date)
+        symbols = [resolved.get(sid, symbol) if sid else symbol for sid in sids]
+        jobs = [
+            BacktestJob(
+                symbol=sym,
+                start_date=start,
+                end_date=end,
+                signal_source="trade_signals",
+                strategy_id=sid,
+                init_cash=init_cash,
+                params={"rule_tree": g.rule_tree, "params": g.params},
+            )
+            for g, sid, sym in zip(genes, sids, symbols)
+        ]
+        outs = run_backtest_jobs(jobs)
+        return [
+            _evaluation_from_backtest(out, sym, sid, use_multi_objective)
+            for out, sym, sid in zip(outs, symbols, sids)
+        ]
+    except (ImportError, ModuleNotFoundError, KeyError, TypeError, ValueError) as e:
+        return [{"fitness": 0.0, "error": str(e)} for _ in genes]
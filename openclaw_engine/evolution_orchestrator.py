@@ -5,11 +5,11 @@
 from __future__ import annotations
 
 import os
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 from .gene import StrategyGene
 from .genetic import crossover, mutate, selection
-from .evaluation import evaluate_gene
+from .evaluation import evaluate_gene, evaluate_genes
 from .population_manager import load_population_from_market, save_gene_to_market
 
 
@@ -37,6 +37,17 @@ def passes_strategy_market_gate(ev: Dict[str, Any]) -> bool:
     return True
 
 
+def _evaluate_all(genes: List[StrategyGene], symbol: str, backend: Optional[str]) -> List[Dict[str, Any]]:
+    """
+    backend（默认环境变量 OPENCLAW_EVAL_BACKEND，缺省 farm）：
+    farm=整批交给本地回测农场（共享内存 + 进程池 + 参数哈希缓存）；serial=逐个 evaluate_gene。
+    """
+    mode = (backend or os.environ.get("OPENCLAW_EVAL_BACKEND", "farm")).strip().lower()
+    if mode == "serial":
+        return [evaluate_gene(g, symbol=symbol) for g in genes]
+    return evaluate_genes(genes, symbol=symbol)
+
+
 def run_evolution_cycle(
     population_limit: int = 10,
     elite_size: int = 2,
@@ -44,10 +55,11 @@ def run_evolution_cycle(
     mutation_rate: float = 0.1,
     symbol: str = "000001.SZ",
     persist_to_market: bool = True,
+    backend: Optional[str] = None,
 ) -> Dict[str, Any]:
     """
     执行一轮进化：从 strategy_market 加载种群，评估适应度，选择+交叉+变异生成子代，评估子代，
-    若子代适应度超过阈值则写入 strategy_market。
+    若子代适应度超过阈值则写入 strategy_market。种群与子代各整批评估一次（见 _evaluate_all）。
     返回 { "generation": 1, "population_size", "offspring_evaluated", "saved": int, "best_fitness", "error" }。
     """
     result = {
@@ -66,10 +78,7 @@ def run_evolution_cycle(
             return result
         result["population_size"] = len(population)
         pop_dicts = [g.to_dict() for g in population]
-        fitness_scores = []
-        for g in population:
-            ev = evaluate_gene(g, symbol=symbol)
-            fitness_scores.append(ev.get("fitness") or 0.0)
+        fitness_scores = [ev.get("fitness") or 0.0 for ev in _evaluate_all(population, symbol, backend)]
         selected = selection(pop_dicts, fitness_scores, elite_size=elite_size)
         if len(selected) < 2:
             return result
@@ -93,8 +102,7 @@ def run_evolution_cycle(
         saved = 0
         filtered = 0
         staged: List[Dict[str, Any]] = []
-        for child in offspring:
-            ev = evaluate_gene(child, symbol=symbol)
+        for child, ev in zip(offspring, _evaluate_all(offspring, symbol, backend)):
             result["offspring_evaluated"] += 1
             f = ev.get("fitness") or 0
             if best_fitness is not None and f >= best_fitness * 0.9:
@@ -0,0 +1,76 @@
+"""整批评估：与逐个 evaluate_gene 结果一致且顺序不变，重复基因只回测一次。"""
+
+import datetime as dt
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from openclaw_engine.evaluation import evaluate_gene, evaluate_genes
+from openclaw_engine.gene import StrategyGene
+
+
+@pytest.fixture
+def seeded_db(tmp_path, monkeypatch):
+    monkeypatch.setenv("QUANT_DB_PATH", str(tmp_path / "evo.duckdb"))
+    monkeypatch.setenv("OHLCV_PANEL_CACHE", "0")
+    from data_pipeline.storage.duckdb_manager import ensure_tables, get_conn
+
+    conn = get_conn()
+    ensure_tables(conn)
+    dates = pd.bdate_range(end=dt.date.today() - dt.timedelta(days=7), periods=120)
+    rng = np.random.default_rng(3)
+    for code in ("600519.SH", "000001.SZ"):
+        px = 20 * np.cumprod(1 + rng.normal(0, 0.02, len(dates)))
+        conn.executemany(
+            "INSERT INTO a_stock_daily (code, date, open, high, low, close, volume, amount)"
+            " VALUES (?, ?, ?, ?, ?, ?, 1e5, 1e6)",
+            [(code, d.date(), p, p, p, p) for d, p in zip(dates, px)],
+        )
+    sigs = [
+        ("600519.SH", "buy", "alpha", 0.9, dates[10]),
+        ("600519.SH", "sell", "alpha", 0.9, dates[50]),
+        ("000001.SZ", "buy", "beta", 0.8, dates[20]),
+        ("000001.SZ", "sell", "beta", 0.8, dates[90]),
+    ]
+    conn.executemany(
+        "INSERT INTO trade_signals (code, signal, strategy_id, signal_score, snapshot_time) VALUES (?, ?, ?, ?, ?)",
+        [(c, s, sid, sc, d.to_pydatetime()) for c, s, sid, sc, d in sigs],
+    )
+    conn.close()
+
+
+def test_batch_matches_serial_and_keeps_order(seeded_db, monkeypatch):
+    from backtest_engine.farm import get_backtest_farm
+
+    genes = [
+        StrategyGene({"source": "t"}, {"eval_strategy_id": "beta"}, "beta"),
+        StrategyGene({"source": "t"}, {"eval_strategy_id": "alpha"}, "alpha"),
+        StrategyGene({"source": "t"}, {"eval_strategy_id": "alpha"}, "alpha"),
+    ]
+    farm = get_backtest_farm()
+    farm.clear_cache()
+    before = farm.stats["computed"]
+    batch = evaluate_genes(genes)
+    assert farm.stats["computed"] - before == 2
+    assert [ev["eval_symbol"] for ev in batch] == ["000001.SZ", "600519.SH", "600519.SH"]
+    monkeypatch.setenv("BACKTEST_RESULT_CACHE", "0")  # 串行参照真实重算，不读农场落下的缓存
+    for gene, ev in zip(genes, batch):
+        ref = evaluate_gene(gene)
+        assert ev["error"] is None and ref["error"] is None
+        assert ev["fitness"] == pytest.approx(ref["fitness"])
+        assert ev["total_return"] == pytest.approx(ref["total_return"])
+
+
+def test_serial_evaluation_reuses_persisted_results(seeded_db):
+    from backtest_engine import get_backtest_farm, get_result_cache
+
+    gene = StrategyGene({"source": "t"}, {"eval_strategy_id": "alpha"}, "alpha")
+    get_backtest_farm().clear_cache()
+    cache = get_result_cache()
+    batch = evaluate_genes([gene])[0]
+    before = dict(cache.stats)
+    ev = evaluate_gene(gene)  # 与农场同键：命中 backtest_result_cache 表，不再回测
+    assert cache.stats["disk_hits"] + cache.stats["memory_hits"] > before["disk_hits"] + before["memory_hits"]
+    assert cache.stats["stores"] == before["stores"]
+    assert ev["fitness"] == pytest.approx(batch["fitness"])
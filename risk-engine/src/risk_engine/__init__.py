@@ -16,6 +16,8 @@ from .volatility_filter import (
     should_disable_strategy_volatility,
 )
 from .rules import load_rules, evaluate, save_rule
+from .plan import RiskPlan, get_plan, invalidate_plan
+from .metrics import RollingRiskMetrics, RiskMetricsService, get_risk_metrics
 
 __all__ = [
     "current_drawdown",
@@ -31,4 +33,10 @@ __all__ = [
     "load_rules",
     "evaluate",
     "save_rule",
+    "RiskPlan",
+    "get_plan",
+    "invalidate_plan",
+    "RollingRiskMetrics",
+    "RiskMetricsService",
+    "get_risk_metrics",
 ]
@@ -0,0 +1,337 @@
+"""
+增量风控指标：回撤、EWMA 波动、滚动 VaR、行业暴露，每个新权益点 / 价格 tick O(1) 更新。
+
+- ``update_equity(value)``：新的资金快照（如 sim_account_snapshots 一行）。更新运行峰值、当前/最大回撤，
+  收益率进入长度 RISK_METRICS_WINDOW（默认 250）的滚动窗口：EWMA 方差（λ=RISK_EWMA_LAMBDA，默认 0.94）
+  递推；参数法 VaR 用窗口内运行和 / 平方和；历史法 VaR 用有序窗口（bisect 插入/删除）取分位；
+- ``update_price(code, price)``：持仓标的新价，增量修正该标的市值、所属行业（a_stock_basic.sector）
+  市值与总市值，并以 现金 + 总市值 更新盯市回撤（不产生收益率样本）；
+- ``status(plan)``：当前状态，含 drawdown_ok / exposure_ok / volatility_ok（阈值取 RiskPlan 与
+  RISK_MAX_VOLATILITY，默认 0.5）。
+
+``RiskMetricsService`` 在此之上从 DuckDB 增量同步（只读写入序号水位之后的新快照，最新一点按盯市市值计），
+并可挂到行情 Hub 按 tick 更新价格；``/api/risk/status`` 读取其状态。
+"""
+
+from __future__ import annotations
+
+import bisect
+import math
+import os
+import threading
+from collections import deque
+from statistics import NormalDist
+from typing import Any, Dict, Iterable, List, Optional
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, str(default)))
+    except ValueError:
+        return default
+
+
+class RollingRiskMetrics:
+    """单账户的增量风控状态（线程安全）。"""
+
+    def __init__(
+        self,
+        window: Optional[int] = None,
+        ewma_lambda: Optional[float] = None,
+        var_confidence: Optional[float] = None,
+        periods_per_year: int = 252,
+    ):
+        self.window = max(2, int(window or _env_float("RISK_METRICS_WINDOW", 250)))
+        self.ewma_lambda = float(ewma_lambda if ewma_lambda is not None else _env_float("RISK_EWMA_LAMBDA", 0.94))
+        self.var_confidence = float(
+            var_confidence if var_confidence is not None else _env_float("RISK_VAR_CONFIDENCE", 0.95)
+        )
+        self.periods_per_year = periods_per_year
+        self._z = NormalDist().inv_cdf(self.var_confidence)
+        self._lock = threading.Lock()
+
+        # 权益 / 回撤
+        self.equity: Optional[float] = None
+        self.peak = 0.0
+        self.drawdown = 0.0
+        self.max_drawdown = 0.0
+        self._last_sample: Optional[float] = None
+        # 收益率窗口
+        self._returns: deque = deque()
+        self._sorted: List[float] = []
+        self._sum = 0.0
+        self._sumsq = 0.0
+        self._ewma_var: Optional[float] = None
+        # 持仓 / 暴露
+        self.cash = 0.0
+        self._qty: Dict[str, float] = {}
+        self._price: Dict[str, float] = {}
+        self._sector: Dict[str, str] = {}
+        self._sector_mv: Dict[str, float] = {}
+        self.gross = 0.0
+        self.ticks = 0
+
+    # ---------- 权益 ----------
+
+    def _mark(self, value: float) -> None:
+        self.equity = value
+        if value > self.peak:
+            self.peak = value
+        self.drawdown = (self.peak - value) / self.peak if self.peak > 0 else 0.0
+        if self.drawdown > self.max_drawdown:
+            self.max_drawdown = self.drawdown
+
+    def _push_return(self, r: float) -> None:
+        self._returns.append(r)
+        bisect.insort(self._sorted, r)
+        self._sum += r
+        self._sumsq += r * r
+        if len(self._returns) > self.window:
+            old = self._returns.popleft()
+            del self._sorted[bisect.bisect_left(self._sorted, old)]
+            self._sum -= old
+            self._sumsq -= old * old
+        lam = self.ewma_lambda
+        self._ewma_var = r * r if self._ewma_var is None else lam * self._ewma_var + (1 - lam) * r * r
+
+    def update_equity(self, value: float) -> float:
+        """新的资金快照；返回当前回撤。"""
+        value = float(value)
+        with self._lock:
+            prev = self._last_sample
+            if prev is not None and prev > 0:
+                self._push_return(value / prev - 1)
+            self._last_sample = value
+            self._mark(value)
+            self.ticks += 1
+            return self.drawdown
+
+    def seed_equity(self, values: Iterable[float]) -> None:
+        """用历史资金序列初始化：峰值与最大回撤覆盖全序列，收益率只保留最近 window 个。"""
+        import numpy as np
+
+        arr = np.asarray(list(values), dtype=float)
+        arr = arr[~np.isnan(arr)]
+        if not arr.size:
+            return
+        peak = np.maximum.accumulate(arr)
+        dd = np.where(peak > 0, (peak - arr) / peak, 0.0)
+        with self._lock:
+            self.peak = max(self.peak, float(peak[-1]))
+            self.max_drawdown = max(self.max_drawdown, float(dd.max()))
+        for v in arr[-(self.window + 1):]:
+            self.update_equity(float(v))
+
+    # ---------- 价格 / 暴露 ----------
+
+    def set_positions(
+        self,
+        positions: Dict[str, float],
+        prices: Dict[str, float],
+        sectors: Optional[Dict[str, str]] = None,
+        cash: Optional[float] = None,
+    ) -> None:
+        """整体替换持仓（同步时调用，O(持仓数)）；之后的 update_price 为 O(1)。"""
+        sectors = sectors or {}
+        with self._lock:
+            if cash is not None:
+                self.cash = float(cash)
+            self._qty = {c: float(q) for c, q in positions.items() if q}
+            self._price = {c: float(prices[c]) for c in self._qty if prices.get(c) is not None}
+            self._sector = {c: sectors.get(c) or "未知" for c in self._qty}
+            self._sector_mv = {}
+            self.gross = 0.0
+            for c, q in self._qty.items():
+                mv = q * self._price.get(c, 0.0)
+                self.gross += mv
+                s = self._sector[c]
+                self._sector_mv[s] = self._sector_mv.get(s, 0.0) + mv
+
+    def update_price(self, code: str, price: float) -> bool:
+        """持仓标的的新价格；非持仓返回 False。"""
+        with self._lock:
+            qty = self._qty.get(code)
+            if qty is None or price is None:
+                return False
+            price = float(price)
+            delta = qty * (price - self._price.get(code, 0.0))
+            self._price[code] = price
+            self.gross += delta
+            s = self._sector[code]
+            self._sector_mv[s] = self._sector_mv.get(s, 0.0) + delta
+            if self.equity is not None:
+                self._mark(self.cash + self.gross)
+            self.ticks += 1
+            return True
+
+    def market_value(self) -> float:
+        """现金 + 持仓按当前价格的市值。"""
+        with self._lock:
+            return self.cash + self.gross
+
+    # ---------- 指标 ----------
+
+    def ewma_volatility(self) -> float:
+        """年化 EWMA 波动率。"""
+        return math.sqrt(self._ewma_var * self.periods_per_year) if self._ewma_var else 0.0
+
+    def historical_var(self) -> float:
+        """历史法 VaR（单期、占权益比例）：窗口收益率 (1-置信度) 分位的损失，线性插值。"""
+        n = len(self._sorted)
+        if n < 2:
+            return 0.0
+        pos = (1 - self.var_confidence) * (n - 1)
+        lo = int(math.floor(pos))
+        hi = min(lo + 1, n - 1)
+        q = self._sorted[lo] + (self._sorted[hi] - self._sorted[lo]) * (pos - lo)
+        return max(0.0, -q)
+
+    def parametric_var(self) -> float:
+        """参数法（正态）VaR：z·σ − μ，σ 为窗口样本标准差。"""
+        n = len(self._returns)
+        if n < 2:
+            return 0.0
+        mean = self._sum / n
+        var = max(0.0, (self._sumsq - n * mean * mean) / (n - 1))
+        return max(0.0, self._z * math.sqrt(var) - mean)
+
+    def status(self, plan: Any = None) -> Dict[str, Any]:
+        """当前状态；plan（RiskPlan）给定时按其最严阈值给出 *_ok。"""
+        max_vol = _env_float("RISK_MAX_VOLATILITY", 0.5)
+        with self._lock:
+            equity = self.equity if self.equity is not None else 0.0
+            vol = self.ewma_volatility()
+            hist_var = self.historical_var()
+            param_var = self.parametric_var()
+            exposure = self.gross / equity if equity > 0 else 0.0
+            sectors = {
+                s: round(mv / equity, 6) if equity > 0 else 0.0
+                for s, mv in sorted(self._sector_mv.items(), key=lambda kv: -kv[1])
+                if mv
+            }
+            dd_max = getattr(plan, "drawdown_max", math.inf)
+            exp_max = getattr(plan, "exposure_max", math.inf)
+            return {
+                "drawdown_ok": self.drawdown <= dd_max,
+                "exposure_ok": exposure <= exp_max,
+                "volatility_ok": vol <= max_vol,
+                "equity": round(equity, 2),
+                "peak": round(self.peak, 2),
+                "drawdown": round(self.drawdown, 6),
+                "max_drawdown": round(self.max_drawdown, 6),
+                "ewma_volatility": round(vol, 6),
+                "var_confidence": self.var_confidence,
+                "var_historical": round(hist_var, 6),
+                "var_parametric": round(param_var, 6),
+                "var_historical_amount": round(hist_var * equity, 2),
+                "var_parametric_amount": round(param_var * equity, 2),
+                "window": len(self._returns),
+                "gross_exposure": round(self.gross, 2),
+                "exposure_pct": round(exposure, 6),
+                "sector_exposure": sectors,
+                "ticks": self.ticks,
+            }
+
+
+class RiskMetricsService:
+    """模拟盘账户的风控指标：从 sim_* 表增量同步，订阅行情 tick 更新持仓价格。"""
+
+    def __init__(self, metrics: Optional[RollingRiskMetrics] = None):
+        self.metrics = metrics or RollingRiskMetrics()
+        self._watermark: Any = None
+        self._sync_lock = threading.Lock()
+
+    def sync(self, conn: Any) -> int:
+        """
+        读 sim_account_snapshots 写入序号（seq）水位之后的新快照（首次读全量初始化峰值/最大回撤）。
+        水位按 seq 而非 snapshot_time：历史回放写入的快照时刻早于已同步的快照也能读到。
+        有新快照时刷新持仓、最新价（lookup_quotes 一次批量）与行业，最新一点按
+        现金 + 持仓盯市市值计（与行情 tick 同一口径；快照自身的 equity 是 avg_price 成本价）。返回新快照数。
+        """
+        with self._sync_lock:
+            first = self._watermark is None
+            if first:
+                rows = conn.execute(
+                    "SELECT seq, cash, total_assets FROM sim_account_snapshots ORDER BY snapshot_time"
+                ).fetchall()
+            else:
+                rows = conn.execute(
+                    "SELECT seq, cash, total_assets FROM sim_account_snapshots WHERE seq > ? ORDER BY seq",
+                    [self._watermark],
+                ).fetchall()
+            if rows:
+                self._watermark = max(int(r[0] or 0) for r in rows)
+            elif first:
+                self._watermark = 0
+            # 持仓只随模拟盘步进（同时写快照）变化：无新快照时沿用内存持仓，价格由行情 tick 更新
+            if rows or first:
+                self._sync_positions(conn, float(rows[-1][1] or 0) if rows else None)
+            if rows:
+                values = [float(r[2]) for r in rows]
+                values[-1] = self.metrics.market_value()
+                if first:
+                    self.metrics.seed_equity(values)
+                else:
+                    for v in values:
+                        self.metrics.update_equity(v)
+            return len(rows)
+
+    def _sync_positions(self, conn: Any, cash: Optional[float]) -> None:
+        from data_pipeline.storage.latest_quote import _raw_variants, code6_sql, lookup_quotes, normalize_code
+
+        positions: Dict[str, float] = {}
+        avg: Dict[str, float] = {}
+        for code, qty, avg_price in conn.execute("SELECT code, qty, avg_price FROM sim_positions").fetchall():
+            c6 = normalize_code(code)
+            if c6:
+                positions[c6] = positions.get(c6, 0.0) + float(qty or 0)
+                avg[c6] = float(avg_price or 0)
+        prices = {c: px for c, (px, _n) in lookup_quotes(conn, positions).items() if px is not None}
+        for c in positions:
+            prices.setdefault(c, avg.get(c, 0.0))
+        sectors: Dict[str, str] = {}
+        if positions:
+            raw = _raw_variants(positions)
+            for c6, sector in conn.execute(
+                f"""
+                SELECT {code6_sql("code")}, any_value(sector) FROM a_stock_basic
+                WHERE code IN (SELECT UNNEST(?)) GROUP BY 1
+                """,
+                [raw],
+            ).fetchall():
+                if sector:
+                    sectors[str(c6)] = str(sector)
+        self.metrics.set_positions(positions, prices, sectors, cash=cash)
+
+    def on_market_deltas(self, source: str, deltas: List[Dict[str, Any]]) -> None:
+        """行情 Hub 监听器：A 股增量中带 latest_price 的持仓标的逐条更新。"""
+        if source != "ashare":
+            return
+        from data_pipeline.storage.latest_quote import normalize_code
+
+        for d in deltas:
+            px = d.get("latest_price")
+            if px is not None:
+                self.metrics.update_price(normalize_code(d.get("code")), px)
+
+    def status(self, conn: Any = None) -> Dict[str, Any]:
+        """同步（conn 给定时）后返回状态，*_ok 使用 get_plan() 的阈值。"""
+        from .plan import get_plan
+
+        if conn is not None:
+            self.sync(conn)
+        return self.metrics.status(get_plan(conn))
+
+
+_SERVICE: Optional[RiskMetricsService] = None
+_SERVICE_LOCK = threading.Lock()
+
+
+def get_risk_metrics() -> RiskMetricsService:
+    """进程内单例。"""
+    global _SERVICE
+    if _SERVICE is None:
+        with _SERVICE_LOCK:
+            if _SERVICE is None:
+                _SERVICE = RiskMetricsService()
+    return _SERVICE
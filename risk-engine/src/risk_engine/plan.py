@@ -0,0 +1,217 @@
+"""
+预编译风控规则：risk_rules 只在缓存失效时读库，编译为阈值数组，评估全部在 NumPy / 标量上完成。
+
+- 组合级：``RiskPlan.evaluate_arrays(codes, qty, price, total_assets, equity_curve)``，结果与
+  ``rules.evaluate`` 一致（violations 顺序、文案相同）；
+- 逐单事前：``RiskPlan.check_order(side, notional, position_notional, gross_notional, total_assets, drawdown)``，
+  只做几次浮点比较，供模拟盘 / 纸面撮合在每一笔委托上调用；
+- 缓存：``get_plan()`` 按库文件路径在进程内缓存编译结果（传入的 conn 决定读哪个库；内存库或无法
+  确定路径的连接不缓存），``save_rule`` 写入后 ``invalidate_plan()``；
+  其它进程写入的规则在 RISK_PLAN_TTL_SEC（默认 30 秒）后生效。
+"""
+
+from __future__ import annotations
+
+import math
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+SINGLE_POSITION = "single_position_pct_max"
+MAX_DRAWDOWN = "max_drawdown_pct"
+MAX_EXPOSURE = "max_exposure_pct"
+
+
+class RiskPlan:
+    """已启用规则的编译结果：按原顺序保留 (rule_type, value)，另存各类最严阈值用于逐单检查。"""
+
+    __slots__ = ("rules", "single_max", "drawdown_max", "exposure_max")
+
+    def __init__(self, rules: Sequence[Tuple[str, float]] = ()):
+        self.rules: Tuple[Tuple[str, float], ...] = tuple(rules)
+
+        def _min(kind: str) -> float:
+            vals = [v for t, v in self.rules if t == kind]
+            return min(vals) if vals else math.inf
+
+        self.single_max = _min(SINGLE_POSITION)
+        self.drawdown_max = _min(MAX_DRAWDOWN)
+        self.exposure_max = _min(MAX_EXPOSURE)
+
+    @classmethod
+    def compile(cls, rules: List[Dict[str, Any]]) -> "RiskPlan":
+        """load_rules 的结果 → RiskPlan（未知 rule_type 保留但不参与评估，与 evaluate 一致）。"""
+        return cls([(str(r.get("rule_type") or ""), float(r.get("value") or 0)) for r in rules or []])
+
+    @property
+    def empty(self) -> bool:
+        return not self.rules
+
+    # ---------- 组合级 ----------
+
+    def evaluate(
+        self,
+        positions: List[Dict[str, Any]],
+        total_assets: float,
+        equity_curve: Optional[List[float]] = None,
+    ) -> Dict[str, Any]:
+        """positions 为 [{"code", "qty", "avg_price"}]，持仓市值按 avg_price 计（与 rules.evaluate 相同）。"""
+        if self.empty:
+            return {"pass": True, "violations": []}
+        codes = [p.get("code") for p in positions]
+        qty = np.fromiter((float(p.get("qty") or 0) for p in positions), float, len(positions))
+        price = np.fromiter((float(p.get("avg_price") or 0) for p in positions), float, len(positions))
+        return self.evaluate_arrays(codes, qty, price, total_assets, equity_curve)
+
+    def evaluate_arrays(
+        self,
+        codes: Sequence[Any],
+        qty: np.ndarray,
+        price: np.ndarray,
+        total_assets: float,
+        equity_curve: Optional[Sequence[float]] = None,
+    ) -> Dict[str, Any]:
+        """按数组评估全部规则；返回 {"pass": bool, "violations": [...]}。"""
+        violations: List[Dict[str, Any]] = []
+        if self.empty:
+            return {"pass": True, "violations": violations}
+        notional = np.asarray(qty, dtype=float) * np.asarray(price, dtype=float)
+        dd = None
+        for rule_type, value in self.rules:
+            if rule_type == SINGLE_POSITION:
+                if total_assets <= 0:
+                    continue
+                pct = notional / total_assets
+                for k in np.flatnonzero(pct > value):
+                    violations.append(
+                        {
+                            "rule_type": rule_type,
+                            "value": value,
+                            "message": f"single_position_pct {codes[k]} {pct[k]:.2%} > {value:.2%}",
+                        }
+                    )
+            elif rule_type == MAX_DRAWDOWN and equity_curve is not None and len(equity_curve):
+                if dd is None:
+                    dd = current_drawdown_array(equity_curve)
+                if dd > value:
+                    violations.append(
+                        {
+                            "rule_type": rule_type,
+                            "value": value,
+                            "message": f"current_drawdown {dd:.2%} > {value:.2%}",
+                        }
+                    )
+            elif rule_type == MAX_EXPOSURE and total_assets > 0:
+                exposure_pct = float(notional.sum()) / total_assets
+                if exposure_pct > value:
+                    violations.append(
+                        {
+                            "rule_type": rule_type,
+                            "value": value,
+                            "message": f"exposure_pct {exposure_pct:.2%} > {value:.2%}",
+                        }
+                    )
+        return {"pass": not violations, "violations": violations}
+
+    # ---------- 逐单事前 ----------
+
+    def check_order(
+        self,
+        side: str,
+        notional: float,
+        position_notional: float,
+        gross_notional: float,
+        total_assets: float,
+        drawdown: float = 0.0,
+    ) -> bool:
+        """
+        单笔委托事前检查：买入后该标的市值 / 组合总市值占总资产比例及当前回撤均不超过最严阈值。
+        卖出只会降低仓位与暴露，始终放行。total_assets <= 0 时比例类规则不评估（与 evaluate 一致）。
+        """
+        if drawdown > self.drawdown_max:
+            return False
+        if str(side).upper() != "BUY" or total_assets <= 0:
+            return True
+        if (position_notional + notional) / total_assets > self.single_max:
+            return False
+        return (gross_notional + notional) / total_assets <= self.exposure_max
+
+
+def current_drawdown_array(equity_curve: Sequence[float]) -> float:
+    """当前回撤（与 drawdown_control.current_drawdown 相同口径）。"""
+    arr = np.asarray(equity_curve, dtype=float)
+    if not arr.size:
+        return 0.0
+    peak = float(arr.max())
+    return (peak - float(arr[-1])) / peak if peak > 0 else 0.0
+
+
+# ---------- 进程内缓存 ----------
+
+_PLANS: Dict[str, Tuple[RiskPlan, float]] = {}  # 库文件绝对路径 -> (编译结果, 编译时刻 monotonic)
+_PLAN_LOCK = threading.Lock()
+
+
+def _plan_ttl() -> float:
+    try:
+        return float(os.environ.get("RISK_PLAN_TTL_SEC", "30"))
+    except ValueError:
+        return 30.0
+
+
+def _db_key(conn: Any) -> Optional[str]:
+    """缓存键：conn 所连库文件的绝对路径；conn 为 None 时为统一库路径；内存库或取不到路径时为 None。"""
+    try:
+        if conn is None:
+            from data_pipeline.storage.duckdb_manager import get_db_path
+
+            path = get_db_path()
+        else:
+            pool = getattr(conn, "_pool", None)  # 池化游标代理：直接取池的库路径，不查库
+            path = getattr(pool, "path", None) or conn.execute(
+                "SELECT path FROM duckdb_databases() WHERE database_name = current_database()"
+            ).fetchone()[0]
+    except Exception:
+        return None
+    return os.path.abspath(path) if path else None
+
+
+def get_plan(conn: Any = None) -> RiskPlan:
+    """
+    conn 所连库当前生效的 RiskPlan；该库的缓存未失效时不读 risk_rules。
+    conn 为 None 时针对统一库，需要刷新时自行打开连接。
+    """
+    key = _db_key(conn)
+    hit = _PLANS.get(key) if key is not None else None
+    if hit is not None and time.monotonic() - hit[1] < _plan_ttl():
+        return hit[0]
+    from .rules import _get_conn, load_rules
+
+    with _PLAN_LOCK:
+        hit = _PLANS.get(key) if key is not None else None
+        if hit is not None and time.monotonic() - hit[1] < _plan_ttl():
+            return hit[0]
+        own = conn is None
+        if own:
+            conn = _get_conn()
+        try:
+            rules = load_rules(conn) if conn is not None else []
+        finally:
+            if own and conn is not None:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+        plan = RiskPlan.compile(rules)
+        if key is not None:
+            _PLANS[key] = (plan, time.monotonic())
+        return plan
+
+
+def invalidate_plan() -> None:
+    """规则变更后丢弃全部缓存，下次 get_plan 重新编译。"""
+    with _PLAN_LOCK:
+        _PLANS.clear()
@@ -68,7 +68,7 @@ def _emit_alert(violation: Dict[str, Any], context: Dict[str, Any]) -> None:
         ensure_tables(conn)
         conn.execute(
             """INSERT INTO audit_log (id, method, path, client_host, created_at)
-               SELECT COALESCE(MAX(id), 0) + 1, 'RISK_ALERT', ?, ?, CURRENT_TIMESTAMP FROM audit_log
+               VALUES (nextval('audit_log_id_seq'), 'RISK_ALERT', ?, ?, CURRENT_TIMESTAMP)
             """,
             [violation.get("message", ""), context.get("client_host", "")],
         )
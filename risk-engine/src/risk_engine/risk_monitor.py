@@ -32,7 +32,9 @@ def evaluate_current(
     equity_curve: 可选，用于回撤类规则。
     返回: { "pass": bool, "violations": [...], "recommended_actions": ["reject_order"|"reduce_position"|"alert", ...] }
     """
-    from .rules import evaluate
+    import numpy as np
+
+    from .plan import get_plan
 
     close_conn = conn is None
     if conn is None:
@@ -40,32 +42,31 @@ def evaluate_current(
     if conn is None:
         return {"pass": True, "violations": [], "recommended_actions": []}
 
+    plan = get_plan(conn)
+    if positions is not None:
+        codes = [p.get("code") for p in positions]
+        qty = np.array([float(p.get("qty") or 0) for p in positions], dtype=float)
+        price = np.array([float(p.get("avg_price") or 0) for p in positions], dtype=float)
+    else:
+        codes, qty, price = [], np.zeros(0), np.zeros(0)
     if positions is None or total_assets is None:
         try:
             if positions is None:
-                df = conn.execute("SELECT code, side, qty, avg_price FROM sim_positions").fetchdf()
-                positions = []
-                if df is not None and not df.empty:
-                    for _, r in df.iterrows():
-                        positions.append(
-                            {
-                                "code": r.get("code"),
-                                "qty": r.get("qty"),
-                                "avg_price": r.get("avg_price") or 0,
-                            }
-                        )
+                cols = conn.execute(
+                    "SELECT code, qty, COALESCE(avg_price, 0) AS avg_price FROM sim_positions"
+                ).fetchnumpy()
+                codes = list(cols["code"])
+                qty = np.asarray(cols["qty"], dtype=float)
+                price = np.asarray(cols["avg_price"], dtype=float)
             if total_assets is None:
                 row = conn.execute(
                     "SELECT total_assets FROM sim_account_snapshots ORDER BY snapshot_time DESC LIMIT 1"
                 ).fetchone()
                 total_assets = float(row[0]) if row and row[0] is not None else 0.0
         except Exception:
-            positions = positions or []
             total_assets = total_assets or 0.0
 
-    res = evaluate(
-        positions=positions, total_assets=total_assets, equity_curve=equity_curve, conn=conn
-    )
+    res = plan.evaluate_arrays(codes, qty, price, total_assets, equity_curve)
     violations = res.get("violations") or []
     recommended = []
     for v in violations:
@@ -1,15 +1,13 @@
 """
 可配置风控规则：从 risk_rules 表加载，在信号执行前评估。
 规则类型：single_position_pct_max, max_drawdown_pct, max_exposure_pct。
+评估走 plan.RiskPlan（编译后缓存，save_rule 时失效），不再每次调用都读库。
 """
 
 from __future__ import annotations
 
 from typing import Any, Dict, List, Optional
 
-from .drawdown_control import current_drawdown, drawdown_ok
-from .exposure_limit import total_exposure_notional
-
 
 def _get_conn():
     try:
@@ -41,72 +39,20 @@ def evaluate(
     total_assets: float,
     equity_curve: Optional[List[float]] = None,
     conn: Any = None,
+    rules: Optional[List[Dict[str, Any]]] = None,
 ) -> Dict[str, Any]:
     """
     根据 risk_rules 评估当前持仓与资金是否通过风控。
     positions: [{"code": str, "qty": float, "avg_price": float}, ...]
     total_assets: 总资产（现金+持仓市值）
     equity_curve: 可选，资金曲线用于回撤检查
+    rules: 可选，预先 load_rules 的结果；缺省时使用 get_plan() 缓存的编译规则（save_rule 后失效）
     返回: { "pass": bool, "violations": [{"rule_type": str, "value": float, "message": str}, ...] }
     """
-    violations: List[Dict[str, str]] = []
-    close_conn = False
-    if conn is None:
-        conn = _get_conn()
-        close_conn = True
-    if conn is None:
-        return {"pass": True, "violations": []}
-    try:
-        rules = load_rules(conn)
-    finally:
-        if close_conn and conn is not None:
-            try:
-                conn.close()
-            except Exception:
-                pass
-    if not rules:
-        return {"pass": True, "violations": []}
-    pos_notional = sum(float(p.get("qty") or 0) * float(p.get("avg_price") or 0) for p in positions)
-    prices = {p.get("code"): float(p.get("avg_price") or 0) for p in positions}
-    positions_dict = {p.get("code"): float(p.get("qty") or 0) for p in positions}
-    for r in rules:
-        rule_type = str(r.get("rule_type") or "")
-        value = float(r.get("value") or 0)
-        if rule_type == "single_position_pct_max":
-            if total_assets <= 0:
-                continue
-            for code, qty in positions_dict.items():
-                notional = qty * prices.get(code, 0)
-                pct = notional / total_assets
-                if pct > value:
-                    violations.append(
-                        {
-                            "rule_type": rule_type,
-                            "value": value,
-                            "message": f"single_position_pct {code} {pct:.2%} > {value:.2%}",
-                        }
-                    )
-        elif rule_type == "max_drawdown_pct" and equity_curve:
-            if not drawdown_ok(equity_curve, max_drawdown_pct=value):
-                dd = current_drawdown(equity_curve)
-                violations.append(
-                    {
-                        "rule_type": rule_type,
-                        "value": value,
-                        "message": f"current_drawdown {dd:.2%} > {value:.2%}",
-                    }
-                )
-        elif rule_type == "max_exposure_pct" and total_assets > 0:
-            exposure_pct = pos_notional / total_assets
-            if exposure_pct > value:
-                violations.append(
-                    {
-                        "rule_type": rule_type,
-                        "value": value,
-                        "message": f"exposure_pct {exposure_pct:.2%} > {value:.2%}",
-                    }
-                )
-    return {"pass": len(violations) == 0, "violations": violations}
+    from .plan import RiskPlan, get_plan
+
+    plan = RiskPlan.compile(rules) if rules is not None else get_plan(conn)
+    return plan.evaluate(positions, total_assets, equity_curve)
 
 
 def save_rule(
@@ -131,6 +77,9 @@ def save_rule(
                 [nid, rule_type, value, enabled],
             )
         conn.close()
+        from .plan import invalidate_plan
+
+        invalidate_plan()
         return True
     except Exception:
         return False
@@ -1,7 +1,15 @@
-"""写入 market_signals 表，使用统一 lib 模块。"""
+"""
+写入 market_signals 表，使用统一 lib 模块。
+
+- ``write_signals(signals, signal_type, conn=None)``：signals 可为 [(code, type, score)]、含 code/score 列的
+  DataFrame 或 Arrow 表；DELETE 该 type + 批量 INSERT ... SELECT 在同一事务内完成，中途失败整体回滚；
+- ``ScanContext``：一轮扫描共用的连接（scan_orchestrator 打开一次，依次交给各 scanner），退出时关闭。
+"""
 
 from __future__ import annotations
 
+from typing import Any, Optional
+
 from lib.database import get_connection, ensure_core_tables
 
 
@@ -10,21 +18,85 @@ def _get_conn():
     return get_connection(read_only=False)
 
 
-def write_signals(signals: list[tuple[str, str, float]], signal_type: str) -> int:
-    """写入 market_signals (code, signal_type, score)，先删该 type 再插入。"""
-    conn = get_connection(read_only=False)
+class ScanContext:
+    """一轮扫描的共享连接：with ScanContext() as ctx: run_x(conn=ctx.conn)。传入 conn 时不建表、不关闭。"""
+
+    def __init__(self, conn: Any = None):
+        self._owns = conn is None
+        self.conn = _get_conn() if conn is None else conn
+        if self._owns and self.conn:
+            ensure_core_tables(self.conn)
+
+    def __enter__(self) -> "ScanContext":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._owns and self.conn:
+            try:
+                self.conn.close()
+            except Exception:
+                pass
+        self.conn = None
+
+
+def _signal_frame(signals: Any, signal_type: str):
+    """统一为 (code, signal_type, score) 三列 DataFrame。"""
+    import pandas as pd
+
+    if hasattr(signals, "to_pandas"):  # pyarrow.Table
+        signals = signals.to_pandas()
+    if isinstance(signals, pd.DataFrame):
+        df = pd.DataFrame(
+            {
+                "code": signals["code"].astype(str),
+                "signal_type": signals["signal_type"].astype(str) if "signal_type" in signals else signal_type,
+                "score": pd.to_numeric(signals["score"], errors="coerce").astype(float),
+            }
+        )
+    else:
+        df = pd.DataFrame(list(signals or []), columns=["code", "signal_type", "score"])
+        df["score"] = df["score"].astype(float)
+    return df
+
+
+def write_signals(signals: Any, signal_type: str, conn: Any = None) -> int:
+    """写入 market_signals (code, signal_type, score)，同一事务内先删该 type 再批量插入；返回该 type 行数。"""
+    ctx = ScanContext(conn)
+    conn = ctx.conn
     if not conn:
         return 0
+    df = _signal_frame(signals, signal_type)
+    try:
+        conn.execute("BEGIN TRANSACTION")
+        try:
+            conn.execute("DELETE FROM market_signals WHERE signal_type = ?", [signal_type])
+            if len(df):
+                conn.register("_scan_signals", df)
+                try:
+                    conn.execute(
+                        "INSERT INTO market_signals (code, signal_type, score) "
+                        "SELECT code, signal_type, score FROM _scan_signals"
+                    )
+                finally:
+                    conn.unregister("_scan_signals")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        n = conn.execute(
+            "SELECT COUNT(*) FROM market_signals WHERE signal_type = ?", [signal_type]
+        ).fetchone()[0]
+        return int(n)
+    finally:
+        ctx.close()
 
-    ensure_core_tables(conn)
-    conn.execute("DELETE FROM market_signals WHERE signal_type = ?", [signal_type])
-    for code, st, score in signals:
-        conn.execute(
-            "INSERT INTO market_signals (code, signal_type, score) VALUES (?, ?, ?)",
-            [code, st, float(score)],
-        )
-    n = conn.execute(
-        "SELECT COUNT(*) FROM market_signals WHERE signal_type = ?", [signal_type]
-    ).fetchone()[0]
-    conn.close()
-    return int(n)
+
+def query_frame(conn: Any, sql: str) -> Optional[Any]:
+    """扫描输入查询；表缺失等错误返回 None（调用方按空结果处理，与历史行为一致）。"""
+    try:
+        return conn.execute(sql).fetchdf()
+    except Exception:
+        return None
@@ -3,26 +3,19 @@
 from __future__ import annotations
 
 
-def run_fund_flow_scanner() -> int:
-    from ._storage import _get_conn, write_signals
+def run_fund_flow_scanner(conn=None) -> int:
+    """得分 = 50 + 主力净流入(亿)，截断到 [0, 100]；conn 为 None 时自行打开连接（scan_orchestrator 传入共享连接）。"""
+    from ._storage import ScanContext, query_frame, write_signals
 
-    conn = _get_conn()
-    if not conn:
-        return write_signals([], "fundflow")
-    try:
-        df = conn.execute(
-            "SELECT code, name, main_net_inflow FROM a_stock_fundflow ORDER BY main_net_inflow DESC NULLS LAST LIMIT 200"
-        ).fetchdf()
-    except Exception:
-        df = None
-    finally:
-        conn.close()
-    if df is None or df.empty:
-        return write_signals([], "fundflow")
-    signals = []
-    for _, row in df.iterrows():
-        code = str(row.get("code", ""))
-        inflow = float(row.get("main_net_inflow") or 0)
-        score = min(100.0, max(0.0, 50.0 + inflow / 1e8))
-        signals.append((code, "fundflow", score))
-    return write_signals(signals, "fundflow")
+    with ScanContext(conn) as ctx:
+        if not ctx.conn:
+            return 0
+        df = query_frame(
+            ctx.conn,
+            "SELECT code, name, main_net_inflow FROM a_stock_fundflow ORDER BY main_net_inflow DESC NULLS LAST LIMIT 200",
+        )
+        if df is None or df.empty:
+            return write_signals([], "fundflow", ctx.conn)
+        inflow = df["main_net_inflow"].fillna(0).astype(float)
+        df["score"] = (50.0 + inflow / 1e8).clip(0.0, 100.0)
+        return write_signals(df, "fundflow", ctx.conn)
@@ -2,6 +2,8 @@
 
 from __future__ import annotations
 
+from typing import Optional
+
 import pandas as pd
 
 
@@ -19,8 +21,8 @@ class FundSpikeDetector:
             ensure_core_tables(c)
         return c
 
-    def detect_spikes(self, volume_ratio_min: float = 2.0) -> pd.DataFrame:
-        """成交额 > 前 5 日均值 * volume_ratio_min 的标的。"""
+    def detect_spikes(self, volume_ratio_min: float = 2.0, lookback_days: Optional[int] = None) -> pd.DataFrame:
+        """成交额 > 前 5 日均值 * volume_ratio_min 的标的；lookback_days 给定时窗口只扫最近 N 个自然日。"""
         conn = self._get_conn()
         try:
             df = conn.execute("""
@@ -36,12 +38,13 @@ class FundSpikeDetector:
                         ) AS avg_amount_5
                     FROM a_stock_daily
                     WHERE amount IS NOT NULL AND amount > 0
+                      AND (? IS NULL OR date >= (SELECT MAX(date) FROM a_stock_daily) - to_days(CAST(? AS INTEGER)))
                 )
                 SELECT code, date, amount,
                        amount / NULLIF(avg_amount_5, 0) AS volume_ratio
                 FROM base
                 WHERE avg_amount_5 IS NOT NULL AND avg_amount_5 > 0
-            """).fetchdf()
+            """, [lookback_days, lookback_days]).fetchdf()
         except Exception:
             return pd.DataFrame(columns=["code", "date", "amount", "volume_ratio"])
         if df is None or df.empty:
@@ -5,8 +5,9 @@
 
 from __future__ import annotations
 
+import os
+
 import pandas as pd
-from datetime import datetime
 
 
 class SniperScoreEngine:
@@ -48,110 +49,149 @@ class SniperScoreEngine:
     ) -> pd.DataFrame:
         """
         汇总 theme/fund/volume/limitup 信号，对每只涨停标的打分，筛选 score >= min_score。
+        题材排名、板块归属、资金异动、量能结构与涨停池在一条 DuckDB 查询内关联；日线窗口只扫
+        涨停池标的最近 SNIPER_LOOKBACK_DAYS（默认 30）个自然日，耗时不随 a_stock_daily 历史增长。
         返回 DataFrame: code, theme, sniper_score, confidence.
         """
-        from .theme_detector import ThemeDetector
-        from .fund_spike_detector import FundSpikeDetector
-        from .volume_pattern_detector import VolumePatternDetector
-        from .limitup_behavior_detector import LimitUpBehaviorDetector
-
+        empty = pd.DataFrame(columns=["code", "theme", "sniper_score", "confidence"])
         conn = self._get_conn()
         if not conn:
-            return pd.DataFrame(columns=["code", "theme", "sniper_score", "confidence"])
-        themes = ThemeDetector(conn).detect_hot_themes()
-        spikes = FundSpikeDetector(conn).detect_spikes(volume_ratio_min=2.0)
-        pattern = VolumePatternDetector(conn).detect_pattern(ratio_min=1.8)
-        limit_df = LimitUpBehaviorDetector(conn).detect_limit_behavior()
-
-        if limit_df is None or limit_df.empty:
-            return pd.DataFrame(columns=["code", "theme", "sniper_score", "confidence"])
-
-        # 取最近交易日（用于 spike/pattern 过滤）
+            return empty
         try:
-            latest_date = conn.execute("SELECT MAX(date) FROM a_stock_daily").fetchone()[0]
+            df = conn.execute(
+                SNIPER_SQL, [_lookback_days(), FUND_SPIKE_RATIO, VOLUME_PATTERN_RATIO]
+            ).fetchdf()
         except Exception:
-            latest_date = None
-
-        # 板块排名 → theme_score 0~1（rank 1 最好）
-        sector_rank = {}
-        if themes is not None and not themes.empty:
-            for _, r in themes.iterrows():
-                sector_rank[str(r["sector"])] = 1.0 / (1 + int(r.get("rank", 99)))
-
-        # 涨停标的列表
-        codes = limit_df["code"].astype(str).unique().tolist()
-        # 涨停所在板块（从 basic 取）
-        code_sector = {}
-        try:
-            for c in codes:
-                row = conn.execute(
-                    "SELECT sector FROM a_stock_basic WHERE code = ?", [c]
-                ).fetchone()
-                code_sector[c] = str(row[0]) if row and row[0] else "未分类"
-        except Exception:
-            for c in codes:
-                code_sector[c] = "未分类"
-
-        spike_set = set()
-        if latest_date and spikes is not None and not spikes.empty:
-            recent = spikes[spikes["date"].astype(str) == str(latest_date)]
-            spike_set = set(recent["code"].astype(str).tolist())
-
-        pattern_set = set()
-        if latest_date and pattern is not None and not pattern.empty:
-            recent = pattern[pattern["date"].astype(str) == str(latest_date)]
-            pattern_set = set(recent["code"].astype(str).tolist())
-
-        results = []
-        for _, row in limit_df.iterrows():
-            code = str(row.get("code", ""))
-            if not code:
-                continue
-            theme = code_sector.get(code, "未分类")
-            theme_score = min(1.0, sector_rank.get(theme, 0.3) * 3)  # 0~1
-            fund_score = 0.9 if code in spike_set else 0.3
-            volume_score = 0.9 if code in pattern_set else 0.3
-            # 连板数 1->0.5, 2->0.7, 3+->0.95
-            lt = int(row.get("limit_up_times", 1) or 1)
-            limit_score = min(0.95, 0.4 + lt * 0.2)
-
-            score = self.calculate_score(theme_score, fund_score, volume_score, limit_score)
-            confidence = min(0.99, score)
-            results.append(
-                {"code": code, "theme": theme, "sniper_score": score, "confidence": confidence}
-            )
-
-        df = pd.DataFrame(results)
-        if df.empty:
-            return pd.DataFrame(columns=["code", "theme", "sniper_score", "confidence"])
+            return empty
+        if df is None or df.empty:
+            return empty
+
+        # 板块排名 → theme_score 0~1（rank 1 最好；无排名按 0.3）
+        theme_score = (df["rank_score"].fillna(0.3) * 3).clip(upper=1.0)
+        fund_score = df["fund_spike"].map({True: 0.9, False: 0.3})
+        volume_score = df["volume_pattern"].map({True: 0.9, False: 0.3})
+        # 连板数 1->0.6, 2->0.8, 3+->0.95
+        limit_score = (0.4 + df["limit_up_times"].astype(int) * 0.2).clip(upper=0.95)
+        score = self.calculate_score(theme_score, fund_score, volume_score, limit_score)
+        df = pd.DataFrame(
+            {"code": df["code"], "theme": df["theme"], "sniper_score": score, "confidence": score.clip(upper=0.99)}
+        )
         df = (
             df[df["sniper_score"] >= min_score]
-            .sort_values("sniper_score", ascending=False)
+            .sort_values("sniper_score", ascending=False, kind="stable")
             .head(top_n)
         )
         return df.reset_index(drop=True)
 
 
-def run_sniper(min_score: float = 0.7, top_n: int = 50) -> int:
-    """运行狙击引擎并写入 sniper_candidates 表，返回写入条数。"""
-    engine = SniperScoreEngine()
-    df = engine.run(min_score=min_score, top_n=top_n)
-    if df is None or df.empty:
-        return 0
-    conn = engine._get_conn()
-    if not conn:
-        return 0
+FUND_SPIKE_RATIO = 2.0  # 成交额 / 前 5 日均值
+VOLUME_PATTERN_RATIO = 1.8  # 成交量 / 前 5 日均量
+
+
+def _lookback_days() -> int:
+    """资金异动 / 量能结构只需最近 6 根日线；按自然日回看，覆盖长假与短期停牌。"""
     try:
-        from data_pipeline.storage.duckdb_manager import ensure_tables
-
-        ensure_tables(conn)
-    except Exception:
-        pass
-    conn.execute("DELETE FROM sniper_candidates")
-    conn.register("tmp", df)
-    conn.execute("""
-        INSERT INTO sniper_candidates (code, theme, sniper_score, confidence)
-        SELECT code, theme, sniper_score, confidence FROM tmp
-    """)
-    n = len(df)
-    return n
+        return max(7, int(os.environ.get("SNIPER_LOOKBACK_DAYS", "30")))
+    except ValueError:
+        return 30
+
+
+# 参数：回看自然日数、资金异动阈值、量能结构阈值。
+# 与各 Detector 口径一致：题材按涨停池 LEFT JOIN a_stock_basic 计数、名次取 pandas rank 的平均名次再截断；
+# 标的板块为空时归「未分类」；异动 / 量能只看 a_stock_daily 的最近交易日。
+SNIPER_SQL = """
+WITH lim AS (
+    SELECT code,
+           CASE WHEN COALESCE(limit_up_times, 0) = 0 THEN 1 ELSE limit_up_times END AS limit_up_times,
+           row_number() OVER () AS ord
+    FROM a_stock_limitup
+    WHERE code IS NOT NULL AND code <> ''
+),
+themes AS (
+    SELECT COALESCE(b.sector, '未分类') AS sector, COUNT(*) AS limitups
+    FROM a_stock_limitup l
+    LEFT JOIN a_stock_basic b ON l.code = b.code
+    GROUP BY 1
+),
+theme_rank AS (
+    SELECT sector,
+           1.0 / (1 + FLOOR(RANK() OVER (ORDER BY limitups DESC)
+                           + (COUNT(*) OVER (PARTITION BY limitups) - 1) / 2.0)) AS rank_score
+    FROM themes
+),
+code_theme AS (
+    SELECT code, any_value(sector) AS sector
+    FROM a_stock_basic
+    WHERE code IN (SELECT code FROM lim) AND sector IS NOT NULL AND sector <> ''
+    GROUP BY code
+),
+latest AS (SELECT MAX(date) AS d FROM a_stock_daily),
+recent AS (
+    SELECT d.code, d.date, d.amount, d.volume
+    FROM a_stock_daily d, latest
+    WHERE d.code IN (SELECT code FROM lim) AND d.date >= latest.d - to_days(CAST(? AS INTEGER))
+),
+amount_ratio AS (
+    SELECT code, date,
+           amount / AVG(amount) OVER (
+               PARTITION BY code ORDER BY date ROWS BETWEEN 5 PRECEDING AND 1 PRECEDING
+           ) AS ratio
+    FROM recent
+    WHERE amount IS NOT NULL AND amount > 0
+),
+volume_ratio AS (
+    SELECT code, date,
+           volume / AVG(volume) OVER (
+               PARTITION BY code ORDER BY date ROWS BETWEEN 5 PRECEDING AND 1 PRECEDING
+           ) AS ratio
+    FROM recent
+    WHERE volume IS NOT NULL AND volume > 0
+),
+spike AS (
+    SELECT DISTINCT a.code FROM amount_ratio a, latest WHERE a.date = latest.d AND a.ratio >= ?
+),
+pattern AS (
+    SELECT DISTINCT v.code FROM volume_ratio v, latest WHERE v.date = latest.d AND v.ratio >= ?
+)
+SELECT l.code,
+       COALESCE(ct.sector, '未分类') AS theme,
+       tr.rank_score,
+       s.code IS NOT NULL AS fund_spike,
+       p.code IS NOT NULL AS volume_pattern,
+       l.limit_up_times
+FROM lim l
+LEFT JOIN code_theme ct ON ct.code = l.code
+LEFT JOIN theme_rank tr ON tr.sector = COALESCE(ct.sector, '未分类')
+LEFT JOIN spike s ON s.code = l.code
+LEFT JOIN pattern p ON p.code = l.code
+ORDER BY l.ord
+"""
+
+
+def run_sniper(min_score: float = 0.7, top_n: int = 50, conn=None) -> int:
+    """运行狙击引擎并写入 sniper_candidates 表（同一事务内删旧插新），返回写入条数。conn 为共享扫描连接时不关闭。"""
+    from .._storage import ScanContext
+
+    with ScanContext(conn) as ctx:
+        if not ctx.conn:
+            return 0
+        df = SniperScoreEngine(ctx.conn).run(min_score=min_score, top_n=top_n)
+        if df is None or df.empty:
+            return 0
+        c = ctx.conn
+        c.execute("BEGIN TRANSACTION")
+        try:
+            c.execute("DELETE FROM sniper_candidates")
+            c.register("_sniper_tmp", df)
+            try:
+                c.execute("""
+                    INSERT INTO sniper_candidates (code, theme, sniper_score, confidence)
+                    SELECT code, theme, sniper_score, confidence FROM _sniper_tmp
+                """)
+            finally:
+                c.unregister("_sniper_tmp")
+            c.execute("COMMIT")
+        except Exception:
+            c.execute("ROLLBACK")
+            raise
+        return len(df)
@@ -2,6 +2,8 @@
 
 from __future__ import annotations
 
+from typing import Optional
+
 import pandas as pd
 
 
@@ -19,8 +21,8 @@ class VolumePatternDetector:
             ensure_core_tables(c)
         return c
 
-    def detect_pattern(self, ratio_min: float = 1.8) -> pd.DataFrame:
-        """按 code 取最近日线，计算 vol_ma5、ratio = volume/vol_ma5，筛选 ratio > ratio_min。"""
+    def detect_pattern(self, ratio_min: float = 1.8, lookback_days: Optional[int] = None) -> pd.DataFrame:
+        """按 code 取最近日线，计算 vol_ma5、ratio = volume/vol_ma5，筛选 ratio > ratio_min；lookback_days 同 FundSpikeDetector。"""
         conn = self._get_conn()
         try:
             df = conn.execute("""
@@ -33,12 +35,13 @@ class VolumePatternDetector:
                            ) AS vol_ma5
                     FROM a_stock_daily
                     WHERE volume IS NOT NULL AND volume > 0
+                      AND (? IS NULL OR date >= (SELECT MAX(date) FROM a_stock_daily) - to_days(CAST(? AS INTEGER)))
                 )
                 SELECT code, date, volume, vol_ma5,
                        volume / NULLIF(vol_ma5, 0) AS ratio
                 FROM daily
                 WHERE vol_ma5 IS NOT NULL AND vol_ma5 > 0
-            """).fetchdf()
+            """, [lookback_days, lookback_days]).fetchdf()
         except Exception:
             return pd.DataFrame(columns=["code", "date", "volume", "vol_ma5", "ratio"])
         if df is None or df.empty:
@@ -3,26 +3,19 @@
 from __future__ import annotations
 
 
-def run_limit_up_scanner() -> int:
-    from ._storage import _get_conn, write_signals
+def run_limit_up_scanner(conn=None) -> int:
+    """得分 = min(100, 50 + 涨停次数×10)；conn 为 None 时自行打开连接（scan_orchestrator 传入共享连接）。"""
+    from ._storage import ScanContext, query_frame, write_signals
 
-    conn = _get_conn()
-    if not conn:
-        return write_signals([], "limitup")
-    try:
-        df = conn.execute(
-            "SELECT code, name, limit_up_times FROM a_stock_limitup ORDER BY limit_up_times DESC NULLS LAST LIMIT 200"
-        ).fetchdf()
-    except Exception:
-        df = None
-    finally:
-        conn.close()
-    if df is None or df.empty:
-        return write_signals([], "limitup")
-    signals = []
-    for _, row in df.iterrows():
-        code = str(row.get("code", ""))
-        times = int(row.get("limit_up_times") or 0)
-        score = min(100.0, 50.0 + times * 10.0)
-        signals.append((code, "limitup", score))
-    return write_signals(signals, "limitup")
+    with ScanContext(conn) as ctx:
+        if not ctx.conn:
+            return 0
+        df = query_frame(
+            ctx.conn,
+            "SELECT code, name, limit_up_times FROM a_stock_limitup ORDER BY limit_up_times DESC NULLS LAST LIMIT 200",
+        )
+        if df is None or df.empty:
+            return write_signals([], "limitup", ctx.conn)
+        times = df["limit_up_times"].fillna(0).astype(int)
+        df["score"] = (50.0 + times * 10.0).clip(upper=100.0)
+        return write_signals(df, "limitup", ctx.conn)
@@ -3,26 +3,19 @@
 from __future__ import annotations
 
 
-def run_trend_scanner() -> int:
-    from ._storage import _get_conn, write_signals
+def run_trend_scanner(conn=None) -> int:
+    """得分 = min(100, 50 + 涨跌幅)；conn 为 None 时自行打开连接（scan_orchestrator 传入共享连接）。"""
+    from ._storage import ScanContext, query_frame, write_signals
 
-    conn = _get_conn()
-    if not conn:
-        return write_signals([], "trend")
-    try:
-        df = conn.execute(
-            "SELECT code, name, change_pct FROM a_stock_realtime WHERE change_pct > 0 ORDER BY change_pct DESC NULLS LAST LIMIT 100"
-        ).fetchdf()
-    except Exception:
-        df = None
-    finally:
-        conn.close()
-    if df is None or df.empty:
-        return write_signals([], "trend")
-    signals = []
-    for _, row in df.iterrows():
-        code = str(row.get("code", ""))
-        pct = float(row.get("change_pct") or 0)
-        score = min(100.0, 50.0 + pct)
-        signals.append((code, "trend", score))
-    return write_signals(signals, "trend")
+    with ScanContext(conn) as ctx:
+        if not ctx.conn:
+            return 0
+        df = query_frame(
+            ctx.conn,
+            "SELECT code, name, change_pct FROM a_stock_realtime WHERE change_pct > 0 ORDER BY change_pct DESC NULLS LAST LIMIT 100",
+        )
+        if df is None or df.empty:
+            return write_signals([], "trend", ctx.conn)
+        pct = df["change_pct"].fillna(0).astype(float)
+        df["score"] = (50.0 + pct).clip(upper=100.0)
+        return write_signals(df, "trend", ctx.conn)
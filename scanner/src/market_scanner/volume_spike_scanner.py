@@ -3,25 +3,20 @@
 from __future__ import annotations
 
 
-def run_volume_spike_scanner() -> int:
-    from ._storage import _get_conn, write_signals
+def run_volume_spike_scanner(conn=None) -> int:
+    """得分按成交额名次递减：max(0, 80 − 名次×0.5)；conn 为 None 时自行打开连接（scan_orchestrator 传入共享连接）。"""
+    import numpy as np
 
-    conn = _get_conn()
-    if not conn:
-        return write_signals([], "volume")
-    try:
-        df = conn.execute(
-            "SELECT code, name, amount FROM a_stock_realtime ORDER BY amount DESC NULLS LAST LIMIT 100"
-        ).fetchdf()
-    except Exception:
-        df = None
-    finally:
-        conn.close()
-    if df is None or df.empty:
-        return write_signals([], "volume")
-    signals = []
-    for i, (_, row) in enumerate(df.iterrows()):
-        code = str(row.get("code", ""))
-        score = max(0.0, 80.0 - i * 0.5)
-        signals.append((code, "volume", score))
-    return write_signals(signals, "volume")
+    from ._storage import ScanContext, query_frame, write_signals
+
+    with ScanContext(conn) as ctx:
+        if not ctx.conn:
+            return 0
+        df = query_frame(
+            ctx.conn,
+            "SELECT code, name, amount FROM a_stock_realtime ORDER BY amount DESC NULLS LAST LIMIT 100",
+        )
+        if df is None or df.empty:
+            return write_signals([], "volume", ctx.conn)
+        df["score"] = np.maximum(0.0, 80.0 - np.arange(len(df)) * 0.5)
+        return write_signals(df, "volume", ctx.conn)
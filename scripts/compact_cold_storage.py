@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""冷热分层压实：把超过保留期的快照 / 日 K 行移到按年月分区的 Parquet（COLD_STORAGE_DIR），建议每日收盘后执行。
+
+用法：python scripts/compact_cold_storage.py [--tables a_stock_realtime audit_log]
+保留天数见 COLD_RETAIN_DAYS_<TABLE>，详见 data_pipeline/storage/cold_storage.py。
+"""
+
+import argparse
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "data-pipeline", "src"))
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="冷热分层压实")
+    ap.add_argument("--tables", nargs="*", help="只处理这些表（默认全部分层表）")
+    args = ap.parse_args()
+
+    from data_pipeline.storage.cold_storage import run_compaction
+
+    result = run_compaction(tables=args.tables or None)
+    print(json.dumps(result, ensure_ascii=False, indent=2, default=str))
+    sys.exit(1 if result["errors"] else 0)
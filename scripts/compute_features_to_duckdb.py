@@ -1,11 +1,18 @@
 #!/usr/bin/env python3
 """
-从 DuckDB daily_bars 计算日线特征（RSI/MACD/ATR 等）并写入 features_daily。
+计算日线特征（RSI/MACD/ATR 等）并写入 features_daily。
 供 OpenClaw 持续训练与策略回测使用；进化循环中在数据补全后执行。
 
+默认走 data_pipeline.etl.build_factors 增量路径：从 a_stock_daily 只读取各标的 last_date 之后的
+新 K 线、按 features_state 中的递推状态追加新行；--rebuild 全量批量重算。
+a_stock_daily 为空（仅复制了 daily_bars 的库）或指定 --from-daily-bars 时，沿用旧的
+daily_bars 逐只全量计算路径（--limit / --max-symbols 只作用于该路径）。
+
 用法（仓库根目录，已激活 .venv）：
   python scripts/compute_features_to_duckdb.py
-  python scripts/compute_features_to_duckdb.py --symbols 600519,000001 --limit 200
+  python scripts/compute_features_to_duckdb.py --symbols 600519,000001
+  python scripts/compute_features_to_duckdb.py --rebuild
+  python scripts/compute_features_to_duckdb.py --from-daily-bars --symbols 600519,000001 --limit 200
 """
 
 from __future__ import annotations
@@ -14,7 +21,7 @@ import os
 import sys
 
 ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-for d in ["data-engine/src", "core/src", "feature-engine/src"]:
+for d in ["data-engine/src", "data-pipeline/src", "core/src", "feature-engine/src"]:
     p = os.path.join(ROOT, d)
     if os.path.isdir(p) and p not in sys.path:
         sys.path.insert(0, p)
@@ -39,10 +46,40 @@ def _safe_float(v) -> float | None:
         return None
 
 
+def run_incremental(symbols: list[str] | None = None, rebuild: bool = False) -> dict | None:
+    """
+    a_stock_daily → features_daily 增量构建（build_factors）。
+    a_stock_daily 无数据时返回 None（由调用方回退 daily_bars 路径）；否则返回与 run 相同格式。
+    """
+    from data_pipeline.etl import build_factors
+    from data_pipeline.storage.duckdb_manager import get_conn
+
+    conn = get_conn(read_only=True)
+    try:
+        n_codes = conn.execute("SELECT COUNT(DISTINCT code) FROM a_stock_daily").fetchone()[0]
+    except Exception:
+        n_codes = 0
+    finally:
+        conn.close()
+    if not n_codes:
+        return None
+
+    codes = [s.split(".", maxsplit=1)[0] for s in symbols] if symbols else [None]
+    written = errors = 0
+    for code in codes:
+        try:
+            written += build_factors(code=code, rebuild=rebuild)
+        except Exception as e:
+            errors += 1
+            if os.environ.get("DEBUG_FEATURES") == "1":
+                sys.stderr.write(f"[DEBUG] build_factors({code}) failed: {e}\n")
+    return {"written": written, "symbols_processed": len(symbols) if symbols else n_codes, "errors": errors}
+
+
 def run(
     symbols: list[str] | None = None, limit_per_symbol: int = 500, max_symbols: int = 200
 ) -> dict:
-    """计算特征并写入 features_daily。返回 { written: int, symbols_processed: int, errors: int }。"""
+    """daily_bars 逐只全量计算特征并写入 features_daily。返回 { written: int, symbols_processed: int, errors: int }。"""
     import duckdb
     from data_engine.connector_astock_duckdb import (
         _order_book_id_to_symbol,
@@ -225,18 +262,26 @@ def main() -> int:
     import argparse
 
     parser = argparse.ArgumentParser(
-        description="Compute features from daily_bars -> features_daily"
+        description="Compute features -> features_daily (incremental from a_stock_daily by default)"
     )
     parser.add_argument(
         "--symbols", type=str, default=None, help="Comma-separated symbols (default: from DuckDB)"
     )
-    parser.add_argument("--limit", type=int, default=500, help="Bars per symbol")
     parser.add_argument(
-        "--max-symbols", type=int, default=200, help="Max symbols when loading from DB"
+        "--rebuild", action="store_true", help="Full batch rebuild of features_daily / features_state"
+    )
+    parser.add_argument(
+        "--from-daily-bars", action="store_true", help="Legacy full recompute from daily_bars"
+    )
+    parser.add_argument("--limit", type=int, default=500, help="Bars per symbol (daily_bars path)")
+    parser.add_argument(
+        "--max-symbols", type=int, default=200, help="Max symbols when loading from DB (daily_bars path)"
     )
     args = parser.parse_args()
     symbols = args.symbols.split(",") if args.symbols else None
-    out = run(symbols=symbols, limit_per_symbol=args.limit, max_symbols=args.max_symbols)
+    out = None if args.from_daily_bars else run_incremental(symbols=symbols, rebuild=args.rebuild)
+    if out is None:
+        out = run(symbols=symbols, limit_per_symbol=args.limit, max_symbols=args.max_symbols)
     print(
         "Written:", out["written"], "Symbols:", out["symbols_processed"], "Errors:", out["errors"]
     )
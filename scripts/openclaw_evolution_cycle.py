@@ -163,12 +163,12 @@ def run_strategy_loop() -> list[str]:
 
 
 def run_compute_features_to_duckdb() -> dict:
-    """从 daily_bars 计算特征写入 features_daily，供策略/回测与持续训练使用。"""
+    """增量计算特征写入 features_daily（只追加新 K 线），供策略/回测与持续训练使用。"""
     script = os.path.join(ROOT, "scripts", "compute_features_to_duckdb.py")
     if not os.path.isfile(script):
         _log("compute_features_to_duckdb.py not found; skip feature write")
         return {"written": 0, "symbols_processed": 0, "errors": 0}
-    _log("Computing features (daily_bars -> features_daily)...")
+    _log("Computing features (incremental -> features_daily)...")
     r = subprocess.run(
         [sys.executable, script, "--limit", "500", "--max-symbols", "200"],
         cwd=ROOT,
@@ -195,7 +195,7 @@ def run_data_loop() -> list[str]:
             if os.path.isdir(p) and p not in sys.path:
                 sys.path.insert(0, p)
         from scheduler import connect_pipeline  # type: ignore
-    s = connect_pipeline()
+    s = connect_pipeline(feature_engine_build=run_compute_features_to_duckdb)
     ran = s.run_pipeline("data_update", "feature_generation")
     _log("Data steps completed: " + ", ".join(ran))
     return ran
@@ -34,7 +34,7 @@ for x in "$@"; do
 done
 
 if [ "$RUN_FEATURES_ONLY" = true ]; then
-  echo "[*] Running only: compute_features_to_duckdb.py (optional: --symbols 600519,000001 --limit 500 --max-symbols 200)"
+  echo "[*] Running only: compute_features_to_duckdb.py (incremental; optional: --symbols 600519,000001 --rebuild)"
   "$PYTHON" scripts/compute_features_to_duckdb.py
   exit $?
 fi
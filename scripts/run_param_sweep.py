@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""全市场参数扫描 + 滚动（walk-forward）验证，建议夜间执行；各策略族结果写入 pipeline_meta['param_sweep:<family>']。
+
+用法：
+  python scripts/run_param_sweep.py                                  # 三个策略族，默认网格
+  python scripts/run_param_sweep.py --family breakout --train-bars 250 --test-bars 60
+  python scripts/run_param_sweep.py --optuna 200 --storage journal:data/optuna_sweep.log   # 非网格搜索，可多进程共用同一 storage
+"""
+
+import argparse
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for d in ("ai-lab/src", "backtest-engine/src", "feature-engine/src", "data-pipeline/src", "core/src"):
+    sys.path.insert(0, os.path.join(ROOT, d))
+
+if __name__ == "__main__":
+    from ai_lab.param_sweep import FAMILIES, load_sweep_panel, optimize_family, walk_forward
+
+    ap = argparse.ArgumentParser(description="策略参数扫描 / walk-forward")
+    ap.add_argument("--family", choices=FAMILIES, nargs="*", help="策略族（默认全部）")
+    ap.add_argument("--start", default=None, help="起始日期 YYYY-MM-DD（默认面板窗口起点）")
+    ap.add_argument("--end", default=None)
+    ap.add_argument("--train-bars", type=int, default=250)
+    ap.add_argument("--test-bars", type=int, default=60)
+    ap.add_argument("--metric", default="sharpe_ratio")
+    ap.add_argument("--optuna", type=int, default=0, help="改用 Optuna 搜索 N 次试验（非网格）")
+    ap.add_argument("--storage", default=None, help="Optuna storage：RDB URL 或 journal:<path>")
+    args = ap.parse_args()
+
+    panel = load_sweep_panel(start_date=args.start, end_date=args.end)
+    if not panel or panel["close"].empty:
+        print("价格面板为空：请确认 a_stock_daily 已有数据")
+        sys.exit(1)
+
+    from data_pipeline.strategy_market_writer import record_pipeline_meta
+
+    summary = {}
+    for family in args.family or FAMILIES:
+        if args.optuna > 0:
+            study = optimize_family(
+                family, panel["close"], panel["high"], panel["low"],
+                n_trials=args.optuna, metric=args.metric, storage=args.storage,
+            )
+            out = {"mode": "optuna", "best_params": study.best_params, f"best_{args.metric}": study.best_value}
+        else:
+            wf = walk_forward(
+                family, panel["close"], panel["high"], panel["low"],
+                train_bars=args.train_bars, test_bars=args.test_bars, metric=args.metric,
+            )
+            out = {
+                "mode": "walk_forward",
+                "windows": len(wf),
+                "latest_params": wf["params"].iloc[-1] if len(wf) else None,
+                f"mean_test_{args.metric}": float(wf[f"test_{args.metric}"].mean()) if len(wf) else None,
+                "mean_test_total_return": float(wf["test_total_return"].mean()) if len(wf) else None,
+            }
+        out["symbols"] = int(panel["close"].shape[1])
+        summary[family] = out
+        record_pipeline_meta(f"param_sweep:{family}", out)
+
+    print(json.dumps(summary, ensure_ascii=False, indent=2, default=str))
@@ -1,7 +1,11 @@
 # simulation-world — 市场模拟环境
 from .env import MarketSimEnv, make_env
+from .vector_env import HistoricalPanel, VectorMarketEnv, make_vector_env
 
 __all__ = [
     "MarketSimEnv",
     "make_env",
+    "HistoricalPanel",
+    "VectorMarketEnv",
+    "make_vector_env",
 ]
@@ -0,0 +1,378 @@
+"""
+Vectorized market environment over real daily bars — N parallel episodes stepped with array ops.
+
+Data: ``HistoricalPanel`` holds a (dates x symbols) close panel plus a (dates x symbols x F) feature
+tensor, usually loaded from ``a_stock_daily`` joined with the ``features_daily`` store.
+Env: ``VectorMarketEnv`` follows the Gymnasium vector API
+(reset -> (obs, infos), step -> (obs, rewards, terminated, truncated, infos)); finished envs are
+reset within the same step and their last observation is returned in ``infos["final_observation"]``.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+FEATURE_COLUMNS = ("rsi", "macd", "macd_signal", "macd_hist", "vwap", "atr", "momentum", "volatility")
+REWARD_TYPES = ("returns", "log_returns", "sharpe")
+
+# price-level features are divided by close so observations are comparable across symbols
+_PRICE_SCALED = ("macd", "macd_signal", "macd_hist", "atr")
+# per-leg commission + slippage of backtest_engine.cost_models defaults (0.02% + 0.1%)
+DEFAULT_FEE_RATE = 0.0012
+
+
+def _normalize_features(close: np.ndarray, feats: np.ndarray, names: Sequence[str]) -> np.ndarray:
+    """Scale-free float32 features; missing values become 0."""
+    out = np.empty(feats.shape, dtype=np.float32)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        inv = 1.0 / close
+        for j, name in enumerate(names):
+            col = feats[:, :, j]
+            if name == "rsi":
+                col = col / 100.0 - 0.5
+            elif name == "vwap":
+                col = col * inv - 1.0
+            elif name in _PRICE_SCALED:
+                col = col * inv
+            out[:, :, j] = col
+    out[~np.isfinite(out)] = 0.0
+    return out
+
+
+def _ffill(panel: np.ndarray) -> np.ndarray:
+    """Forward-fill NaN along axis 0 (suspended days keep the last close)."""
+    idx = np.where(np.isfinite(panel), np.arange(panel.shape[0])[:, None], 0)
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    return panel[idx, np.arange(panel.shape[1])[None, :]]
+
+
+@dataclass(frozen=True)
+class HistoricalPanel:
+    """
+    Aligned daily panel. ``close`` is float64 (T, S), NaN before listing / after delisting;
+    ``features`` is float32 (T, S, F), already normalized (see ``_normalize_features``).
+    """
+
+    dates: np.ndarray
+    symbols: Tuple[str, ...]
+    close: np.ndarray
+    features: np.ndarray
+    feature_names: Tuple[str, ...]
+
+    @classmethod
+    def from_arrays(
+        cls,
+        close: Any,
+        features: Any = None,
+        dates: Any = None,
+        symbols: Optional[Sequence[str]] = None,
+        feature_names: Sequence[str] = (),
+    ) -> "HistoricalPanel":
+        """
+        Build from raw arrays. ``close`` may be a (T, S) array or a DataFrame (index = dates,
+        columns = symbols); ``features`` is a raw (T, S, F) tensor named by ``feature_names``.
+        """
+        if hasattr(close, "columns"):
+            symbols = symbols or [str(c) for c in close.columns]
+            dates = close.index.to_numpy() if dates is None else dates
+            close = close.to_numpy(dtype=np.float64)
+        close = np.asarray(close, dtype=np.float64)
+        if close.ndim == 1:
+            close = close[:, None]
+        t, s = close.shape
+        if features is None:
+            raw = np.zeros((t, s, 0), dtype=np.float64)
+            feature_names = ()
+        else:
+            raw = np.asarray(features, dtype=np.float64).reshape(t, s, -1)
+            if len(feature_names) != raw.shape[2]:
+                raise ValueError(f"features have {raw.shape[2]} columns but {len(feature_names)} names")
+        return cls(
+            dates=np.asarray(dates) if dates is not None else np.arange(t),
+            symbols=tuple(symbols) if symbols is not None else tuple(str(i) for i in range(s)),
+            close=close,
+            features=_normalize_features(close, raw, feature_names),
+            feature_names=tuple(feature_names),
+        )
+
+    @classmethod
+    def from_db(
+        cls,
+        conn: Any = None,
+        symbols: Optional[Sequence[str]] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        feature_columns: Sequence[str] = FEATURE_COLUMNS,
+    ) -> "HistoricalPanel":
+        """
+        One query over ``a_stock_daily`` LEFT JOIN ``features_daily`` (rows without stored features
+        observe zeros), scattered into the panel with ``np.unique`` — no per-symbol loop.
+        """
+        own = conn is None
+        if own:
+            from data_pipeline.storage.duckdb_manager import get_conn
+
+            conn = get_conn(read_only=True)
+        try:
+            where, params = ["d.close > 0"], []
+            if symbols:
+                where.append("d.code IN (SELECT UNNEST(?))")
+                params.append(list(symbols))
+            if start_date:
+                where.append("d.date >= ?")
+                params.append(start_date)
+            if end_date:
+                where.append("d.date <= ?")
+                params.append(end_date)
+            feat_sql = "".join(f", f.{c} AS f_{c}" for c in feature_columns)
+            cols = conn.execute(
+                f"SELECT d.code, d.date, d.close{feat_sql} FROM a_stock_daily d "
+                "LEFT JOIN features_daily f ON f.symbol = d.code AND f.trade_date = d.date "
+                f"WHERE {' AND '.join(where)}",
+                params,
+            ).fetchnumpy()
+        finally:
+            if own:
+                conn.close()
+
+        def _col(name: str) -> np.ndarray:
+            v = cols[name]
+            if isinstance(v, np.ma.MaskedArray):
+                return v.astype(np.float64).filled(np.nan)
+            return np.asarray(v, dtype=np.float64)
+
+        codes, si = np.unique(np.asarray(cols["code"]).astype(str), return_inverse=True)
+        dates, ti = np.unique(np.asarray(cols["date"]), return_inverse=True)
+        close = np.full((len(dates), len(codes)), np.nan)
+        close[ti, si] = _col("close")
+        raw = np.full((len(dates), len(codes), len(feature_columns)), np.nan)
+        for j, c in enumerate(feature_columns):
+            raw[ti, si, j] = _col(f"f_{c}")
+        return cls.from_arrays(close, raw, dates=dates, symbols=list(codes), feature_names=feature_columns)
+
+
+class VectorMarketEnv:
+    """
+    ``num_envs`` independent long-only episodes over a ``HistoricalPanel``.
+
+    Each episode picks a random symbol and a random start bar with at least ``window`` bars of
+    history and ``episode_length`` bars ahead. At bar t the agent sees the last ``window`` close
+    returns, the stored features of bar t and its current position, and chooses a target position
+    that is held over bar t -> t+1:
+
+    - ``action_type="discrete"``: 0 = flat, 1 = hold current position, 2 = fully long;
+    - ``action_type="continuous"``: target weight in [0, 1] (shape (num_envs, 1) or (num_envs,)).
+
+    Reward per step = position * return - fee_rate * |position change|; ``fee_rate`` defaults to
+    ``backtest_engine.cost_models.effective_fee_per_order()``. ``reward_type`` may also be
+    ``log_returns`` or ``sharpe`` (differential Sharpe ratio, Moody & Saffell, EMA rate ``sharpe_eta``).
+    Suspended days (NaN close inside a symbol's history) carry the last close, i.e. zero return.
+    """
+
+    metadata: Dict[str, Any] = {"render_modes": [], "autoreset_mode": "same_step"}
+    render_mode = None
+
+    def __init__(
+        self,
+        panel: HistoricalPanel,
+        num_envs: int = 64,
+        episode_length: int = 252,
+        window: int = 5,
+        action_type: str = "discrete",
+        reward_type: str = "returns",
+        fee_rate: Optional[float] = None,
+        sharpe_eta: float = 0.01,
+        seed: Optional[int] = None,
+    ):
+        if action_type not in ("discrete", "continuous"):
+            raise ValueError(f"action_type must be 'discrete' or 'continuous', got {action_type!r}")
+        if reward_type not in REWARD_TYPES:
+            raise ValueError(f"reward_type must be one of {REWARD_TYPES}, got {reward_type!r}")
+        self.panel = panel
+        self.num_envs = int(num_envs)
+        self.episode_length = int(episode_length)
+        self.window = int(window)
+        self.action_type = action_type
+        self.reward_type = reward_type
+        self.fee_rate = float(fee_rate) if fee_rate is not None else _default_fee_rate()
+        self.sharpe_eta = float(sharpe_eta)
+        self._rng = np.random.default_rng(seed)
+
+        close = panel.close
+        finite = np.isfinite(close)
+        t_len = close.shape[0]
+        has = finite.any(axis=0)
+        self._first = np.where(has, finite.argmax(axis=0), t_len)
+        self._last = np.where(has, t_len - 1 - finite[::-1].argmax(axis=0), -1)
+        filled = _ffill(close)
+        # _ret[t] = close[t] / close[t-1] - 1, zero where either side is missing
+        ret = np.zeros_like(filled)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ret[1:] = filled[1:] / filled[:-1] - 1.0
+        ret[~np.isfinite(ret)] = 0.0
+        self._ret = ret
+        self._ret_f32 = ret.astype(np.float32)
+
+        lo = self._first + self.window
+        hi = self._last - self.episode_length
+        self._eligible = np.flatnonzero(hi >= lo)
+        if len(self._eligible) == 0:
+            raise ValueError(
+                f"no symbol has window + episode_length = {self.window + self.episode_length} bars of history"
+            )
+        self._start_lo = lo
+        self._start_span = np.maximum(hi - lo + 1, 1)
+
+        n = self.num_envs
+        self._sym = np.zeros(n, dtype=np.int64)
+        self._t = np.zeros(n, dtype=np.int64)
+        self._steps = np.zeros(n, dtype=np.int64)
+        self._pos = np.zeros(n, dtype=np.float64)
+        self._equity = np.ones(n, dtype=np.float64)
+        self._sharpe_a = np.zeros(n, dtype=np.float64)
+        self._sharpe_b = np.zeros(n, dtype=np.float64)
+        self._lags = np.arange(self.window - 1, -1, -1)
+
+        self.obs_dim = self.window + len(panel.feature_names) + 1
+        self._init_spaces()
+
+    # -- spaces -----------------------------------------------------------
+
+    def _init_spaces(self) -> None:
+        n, d = self.num_envs, self.obs_dim
+        try:
+            from gymnasium import spaces
+
+            self.single_observation_space = spaces.Box(-np.inf, np.inf, shape=(d,), dtype=np.float32)
+            if self.action_type == "discrete":
+                self.single_action_space = spaces.Discrete(3)
+                self.action_space = spaces.MultiDiscrete(np.full(n, 3))
+            else:
+                self.single_action_space = spaces.Box(0.0, 1.0, shape=(1,), dtype=np.float32)
+                self.action_space = spaces.Box(0.0, 1.0, shape=(n, 1), dtype=np.float32)
+            self.observation_space = spaces.Box(-np.inf, np.inf, shape=(n, d), dtype=np.float32)
+        except ImportError:
+            # same dict form as MarketSimEnv when gymnasium is not installed
+            self.single_observation_space = {"shape": (d,)}
+            self.observation_space = {"shape": (n, d)}
+            if self.action_type == "discrete":
+                self.single_action_space = {"n": 3}
+                self.action_space = {"shape": (n,), "n": 3}
+            else:
+                self.single_action_space = {"shape": (1,), "low": 0.0, "high": 1.0}
+                self.action_space = {"shape": (n, 1), "low": 0.0, "high": 1.0}
+
+    # -- core -------------------------------------------------------------
+
+    def _sample_starts(self, mask: np.ndarray) -> None:
+        k = int(mask.sum())
+        if not k:
+            return
+        sym = self._eligible[self._rng.integers(0, len(self._eligible), size=k)]
+        self._sym[mask] = sym
+        self._t[mask] = self._start_lo[sym] + self._rng.integers(0, self._start_span[sym])
+        self._steps[mask] = 0
+        self._pos[mask] = 0.0
+        self._equity[mask] = 1.0
+        self._sharpe_a[mask] = 0.0
+        self._sharpe_b[mask] = 0.0
+
+    def _obs(self) -> np.ndarray:
+        rows = self._t[:, None] - self._lags[None, :]
+        rets = self._ret_f32[rows, self._sym[:, None]]
+        feats = self.panel.features[self._t, self._sym]
+        return np.concatenate([rets, feats, self._pos[:, None].astype(np.float32)], axis=1)
+
+    def _infos(self) -> Dict[str, np.ndarray]:
+        return {
+            "symbol_index": self._sym.copy(),
+            "t": self._t.copy(),
+            "position": self._pos.copy(),
+            "equity": self._equity.copy(),
+        }
+
+    def reset(self, *, seed: Optional[int] = None, options: Optional[Dict[str, Any]] = None) -> Tuple[np.ndarray, Dict[str, Any]]:
+        """Start fresh episodes in every env. Returns (obs (num_envs, obs_dim), infos)."""
+        if seed is not None:
+            self._rng = np.random.default_rng(seed)
+        self._sample_starts(np.ones(self.num_envs, dtype=bool))
+        return self._obs(), self._infos()
+
+    def _target(self, actions: Any) -> np.ndarray:
+        a = np.asarray(actions)
+        if self.action_type == "discrete":
+            a = a.reshape(self.num_envs)
+            return np.where(a == 2, 1.0, np.where(a == 0, 0.0, self._pos))
+        return np.clip(a.reshape(self.num_envs).astype(np.float64), 0.0, 1.0)
+
+    def _reward(self, r: np.ndarray) -> np.ndarray:
+        if self.reward_type == "returns":
+            return r
+        if self.reward_type == "log_returns":
+            return np.log1p(np.maximum(r, -0.999999))
+        # differential Sharpe ratio on the EMA estimates of the first two moments
+        a, b, eta = self._sharpe_a, self._sharpe_b, self.sharpe_eta
+        da, db = r - a, r * r - b
+        var = b - a * a
+        with np.errstate(divide="ignore", invalid="ignore"):
+            d = np.where(var > 1e-12, (b * da - 0.5 * a * db) / np.power(np.maximum(var, 1e-12), 1.5), 0.0)
+        self._sharpe_a = a + eta * da
+        self._sharpe_b = b + eta * db
+        return d
+
+    def step(self, actions: Any) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, Dict[str, Any]]:
+        """
+        Apply target positions for all envs at once. Returns (obs, rewards, terminated, truncated,
+        infos); ``terminated`` marks the symbol's last bar, ``truncated`` the episode_length cap.
+        """
+        target = self._target(actions)
+        cost = self.fee_rate * np.abs(target - self._pos)
+        self._t += 1
+        self._steps += 1
+        r = target * self._ret[self._t, self._sym] - cost
+        self._pos = target
+        self._equity *= 1.0 + r
+        rewards = self._reward(r).astype(np.float32)
+
+        terminated = self._t >= self._last[self._sym]
+        truncated = (self._steps >= self.episode_length) & ~terminated
+        done = terminated | truncated
+        infos = self._infos()
+        infos["cost"] = cost
+        if done.any():
+            infos["final_observation"] = self._obs()
+            infos["_final_observation"] = done
+            self._sample_starts(done)
+        return self._obs(), rewards, terminated, truncated, infos
+
+    def close(self) -> None:
+        pass
+
+
+def _default_fee_rate() -> float:
+    try:
+        from backtest_engine.cost_models import effective_fee_per_order
+
+        return float(effective_fee_per_order())
+    except ImportError:
+        return DEFAULT_FEE_RATE
+
+
+def make_vector_env(
+    panel: Optional[HistoricalPanel] = None,
+    num_envs: int = 64,
+    episode_length: int = 252,
+    reward_type: str = "returns",
+    **kwargs: Any,
+) -> VectorMarketEnv:
+    """Factory: panel defaults to the whole market loaded from the unified DuckDB."""
+    return VectorMarketEnv(
+        panel if panel is not None else HistoricalPanel.from_db(),
+        num_envs=num_envs,
+        episode_length=episode_length,
+        reward_type=reward_type,
+        **kwargs,
+    )
@@ -7,3 +7,35 @@ def test_env_reset_step():
     assert obs.shape == (6,)
     obs, reward, term, trunc, info = env.step(1)
     assert not term or env._step >= 5
+
+
+def test_vector_env_steps_real_panel_with_costs():
+    import numpy as np
+
+    from simulation_world import HistoricalPanel, VectorMarketEnv
+
+    t, s = 60, 3
+    close = np.cumprod(1 + np.linspace(0.001, 0.01, t)[:, None] * np.ones((1, s)), axis=0) * 10
+    close[:10, 2] = np.nan  # listed later
+    close[30, 1] = np.nan  # suspended day
+    rsi = np.full((t, s, 1), 70.0)
+    panel = HistoricalPanel.from_arrays(close, rsi, feature_names=["rsi"])
+    env = VectorMarketEnv(panel, num_envs=16, episode_length=20, window=5, fee_rate=0.001, seed=0)
+    obs, info = env.reset(seed=1)
+    assert obs.shape == (16, 5 + 1 + 1)
+    assert np.allclose(obs[:, 5], 0.2)  # rsi 70 -> 70/100 - 0.5
+    assert (info["t"] >= 5).all()
+
+    t0, sym = info["t"], info["symbol_index"]
+    obs, reward, term, trunc, info = env.step(np.full(16, 2))
+    expected = close[t0 + 1, sym] / close[t0, sym] - 1 - 0.001
+    assert np.allclose(reward, expected, atol=1e-6)
+    assert np.allclose(obs[:, -1], 1.0)
+
+    # holding costs nothing; episodes truncate at episode_length and auto-reset
+    for _ in range(19):
+        obs, reward, term, trunc, info = env.step(np.ones(16, dtype=int))
+    assert trunc.all() and not term.any()
+    assert info["final_observation"].shape == obs.shape
+    assert np.allclose(obs[:, -1], 0.0)
+    assert np.isfinite(obs).all()
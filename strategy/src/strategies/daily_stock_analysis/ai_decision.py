@@ -8,7 +8,7 @@ import asyncio
 import logging
 import json
 import os
-from typing import Dict, Any
+from typing import Any, Dict, List
 from datetime import datetime
 
 from .config import DailyStockConfig
@@ -291,11 +291,10 @@ class AIDecisionMaker:
             return await self._generate_mock_ai_response(analysis_data)
 
     async def _call_gpt4_ai(self, analysis_data: Dict[str, Any]) -> str:
-        """调用GPT-4 AI（模拟）"""
-        # 这里应该集成实际的OpenAI API
-
-        await asyncio.sleep(0.5)
-        return await self._generate_mock_ai_response(analysis_data)
+        """调用 GPT-4（共享 LLM 客户端，OpenAI 失败时回退通义 / DeepSeek）"""
+        return await self._call_chat_chain(
+            self._prepare_qwen_prompt(analysis_data), ["openai", "dashscope", "deepseek"], analysis_data
+        )
 
     async def _call_claude_ai(self, analysis_data: Dict[str, Any]) -> str:
         """调用Claude AI（模拟）"""
@@ -304,64 +303,46 @@ class AIDecisionMaker:
         await asyncio.sleep(0.5)
         return await self._generate_mock_ai_response(analysis_data)
 
-    async def _call_qwen_ai(self, analysis_data: Dict[str, Any]) -> str:
-        """调用通义千问 AI（真实API）"""
-        if not DASHSCOPE_AVAILABLE:
-            self.logger.warning("dashscope模块未安装，使用模拟响应")
-            return await self._generate_mock_ai_response(analysis_data)
-
-        if "dashscope" not in self.api_keys:
-            self.logger.warning("未配置dashscope API Key，使用模拟响应")
-            return await self._generate_mock_ai_response(analysis_data)
-
-        try:
-            # 准备分析提示
-            prompt = self._prepare_qwen_prompt(analysis_data)
-
-            # 根据配置选择模型（百炼/Coding Plan 部分套餐不支持 qwen-plus，用 qwen-turbo 替代）
-            model_map = {
-                "qwen-max": "qwen-max",
-                "qwen-plus": "qwen-turbo",  # 避免 400 model qwen-plus is not supported
-                "qwen-turbo": "qwen-turbo",
-            }
-            model_name = model_map.get(self.config.ai_model, "qwen-turbo")
-
-            self.logger.info("调用通义千问AI: %s", model_name)
-
-            # 调用dashscope API
-            response = dashscope.Generation.call(
-                model=model_name,
-                prompt=prompt,
-                temperature=self.config.ai_temperature,
-                max_tokens=2000,
-            )
-
-            if response.status_code == 200:
-                ai_text = response.output.text
-                self.logger.info("AI响应长度: %s 字符", len(ai_text))
-                return ai_text
-            if response.status_code == 400 and "not supported" in str(getattr(response, "message", "")):
-                if model_name != "qwen-turbo":
-                    self.logger.warning("模型 %s 不可用，降级为 qwen-turbo", model_name)
-                    response = dashscope.Generation.call(
-                        model="qwen-turbo",
-                        prompt=prompt,
-                        temperature=self.config.ai_temperature,
-                        max_tokens=2000,
-                    )
-                    if response.status_code == 200:
-                        return response.output.text
-            if response.status_code != 200:
-                self.logger.error(
-                    "通义千问API调用失败: %s - %s",
-                    getattr(response, "code", response.status_code),
-                    getattr(response, "message", ""),
-                )
-                return await self._generate_mock_ai_response(analysis_data)
+    def _qwen_model(self) -> str:
+        # 百炼/Coding Plan 部分套餐不支持 qwen-plus，用 qwen-turbo 替代
+        model_map = {
+            "qwen-max": "qwen-max",
+            "qwen-plus": "qwen-turbo",  # 避免 400 model qwen-plus is not supported
+            "qwen-turbo": "qwen-turbo",
+        }
+        return model_map.get(self.config.ai_model, "qwen-turbo")
+
+    def _provider_chain(self) -> List[str]:
+        """按配置模型排列的回退链；同一提供方不支持所选模型时降级 qwen-turbo。"""
+        if self.config.ai_model == "gpt-4":
+            return ["openai", "dashscope", "deepseek"]
+        return [f"dashscope:{self._qwen_model()}", "dashscope:qwen-turbo", "openai", "deepseek"]
+
+    async def _call_chat_chain(
+        self, prompt: str, providers: List[str], analysis_data: Dict[str, Any]
+    ) -> str:
+        """经共享 LLM 客户端调用（连接复用、并发上限、响应缓存）；全部失败时返回模拟响应。"""
+        from core.llm import get_llm_client
+
+        res = await get_llm_client().achat(
+            [{"role": "user", "content": prompt}],
+            providers=providers,
+            max_tokens=2000,
+            temperature=self.config.ai_temperature,
+            namespace="daily_stock_analysis",
+        )
+        if res.ok:
+            self.logger.info("AI响应长度: %s 字符（%s:%s，缓存=%s）", len(res.text), res.provider, res.model, res.cached)
+            return res.text
+        self.logger.error("LLM 调用失败: %s", res.error)
+        return await self._generate_mock_ai_response(analysis_data)
 
-        except Exception as e:  # pylint: disable=broad-exception-caught  # external AI API calls can fail in many ways
-            self.logger.error("调用通义千问AI异常: %s", e)
-            return await self._generate_mock_ai_response(analysis_data)
+    async def _call_qwen_ai(self, analysis_data: Dict[str, Any]) -> str:
+        """调用通义千问 AI（OpenAI 兼容接口，失败回退 qwen-turbo → OpenAI → DeepSeek）"""
+        self.logger.info("调用通义千问AI: %s", self._qwen_model())
+        return await self._call_chat_chain(
+            self._prepare_qwen_prompt(analysis_data), self._provider_chain(), analysis_data
+        )
 
     def _prepare_qwen_prompt(self, analysis_data: Dict[str, Any]) -> str:
         """准备通义千问分析提示"""
@@ -570,6 +551,53 @@ class AIDecisionMaker:
                 "status": "error",
             }
 
+    async def get_stocks_analysis(
+        self, symbols: List[str], market_data: Dict[str, Any] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        批量个股分析：每 LLM_BATCH_SIZE（默认 10）只合并为一个提示，各批并发请求（受提供方并发上限约束），
+        替代逐只调用。回复中缺失的个股（或未配置 OpenAI 兼容提供方时）回退到 get_stock_analysis 单只分析。
+        """
+        from core.llm import get_llm_client
+
+        stocks = [await self._prepare_stock_data(s, market_data) for s in symbols]
+        fields = ("name", "current_price", "change_percent", "volume", "market_cap", "pe_ratio", "sector")
+        items = [
+            (st["symbol"], json.dumps({k: st.get(k) for k in fields}, ensure_ascii=False))
+            for st in stocks
+        ]
+        out, errors = await get_llm_client().achat_batched(
+            items,
+            system="你是一个专业的股票分析师。",
+            instruction=(
+                "逐只分析以下股票，每只给出 JSON："
+                '{"action": "买入/持有/卖出", "reason": "理由", "confidence": 0-1 之间的数, "risk": "风险提示"}'
+            ),
+            providers=self._provider_chain(),
+            max_tokens=4000,
+            temperature=self.config.ai_temperature,
+            namespace="daily_stock_analysis_batch",
+        )
+        if errors:
+            self.logger.warning("批量个股分析部分失败: %s", "; ".join(errors)[:300])
+        now = datetime.now().isoformat()
+        results: Dict[str, Dict[str, Any]] = {}
+        for sym in symbols:
+            if sym in out:
+                value = out[sym]
+                results[sym] = {
+                    "symbol": sym,
+                    "analysis": value if isinstance(value, dict) else {"raw_text": str(value)},
+                    "timestamp": now,
+                    "model": self.config.ai_model,
+                    "status": "success",
+                }
+        # 缺失的个股并发回退单只分析（并发度同样受提供方上限约束）
+        missing = [sym for sym in dict.fromkeys(symbols) if sym not in results]
+        fallbacks = await asyncio.gather(*(self.get_stock_analysis(sym, market_data) for sym in missing))
+        results.update(zip(missing, fallbacks))
+        return {sym: results[sym] for sym in symbols}
+
     async def _prepare_stock_data(
         self, symbol: str, market_data: Dict[str, Any] = None
     ) -> Dict[str, Any]:
@@ -85,6 +85,7 @@ class DailyStockAnalyzer:
             "news": {},
             "analysis": {},
             "recommendations": {},
+            "stock_analyses": {},
             "summary": {},
             "duration_seconds": 0,
         }
@@ -115,6 +116,16 @@ class DailyStockAnalyzer:
             )
             results["recommendations"] = recommendations
 
+            # 4b. 个股批量分析（多只合并为少量提示并发请求，见 AIDecisionMaker.get_stocks_analysis）
+            all_symbols = (
+                [s for lst in symbols.values() for s in lst] if isinstance(symbols, dict) else list(symbols or [])
+            )
+            if all_symbols:
+                self.logger.info("步骤4b: 批量分析 %d 只股票", len(all_symbols))
+                results["stock_analyses"] = await self.ai_decision_maker.get_stocks_analysis(
+                    all_symbols, market_data=market_data
+                )
+
             # 5. 生成摘要
             self.logger.info("步骤5: 生成分析摘要")
             # 从 analysis_results 中提取关键信息生成摘要
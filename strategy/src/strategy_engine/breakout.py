@@ -4,37 +4,42 @@ from typing import List, Tuple
 
 import numpy as np
 
-from core import OHLCV, Signal
+from core import OHLCVLike, Signal, as_ohlcv_frame
+from feature_engine import kernels
 
 
 def breakout_signals(
-    ohlcv_list: List[OHLCV],
+    ohlcv_list: OHLCVLike,
     lookback: int = 20,
 ) -> List[Signal]:
     """
     BUY when close > max(high of lookback), SELL when close < min(low of lookback).
     HOLD otherwise.
     """
-    highs = np.array([b.high for b in ohlcv_list], dtype=float)
-    lows = np.array([b.low for b in ohlcv_list], dtype=float)
-    closes = np.array([b.close for b in ohlcv_list], dtype=float)
+    frame = as_ohlcv_frame(ohlcv_list)
+    highs = frame.high
+    lows = frame.low
+    closes = frame.close
     n = len(closes)
     signals = [Signal.HOLD] * n
     if n < lookback + 1:
         return signals
 
+    # channel over the previous ``lookback`` bars (excluding the current one)
+    highest = np.full(n, np.nan)
+    lowest = np.full(n, np.nan)
+    highest[1:] = kernels.rolling_max(highs[:-1], lookback)
+    lowest[1:] = kernels.rolling_min(lows[:-1], lookback)
     for i in range(lookback, n):
-        highest = np.max(highs[i - lookback : i])
-        lowest = np.min(lows[i - lookback : i])
-        if closes[i] > highest:
+        if closes[i] > highest[i]:
             signals[i] = Signal.BUY
-        elif closes[i] < lowest:
+        elif closes[i] < lowest[i]:
             signals[i] = Signal.SELL
     return signals
 
 
 def breakout_entries_exits(
-    ohlcv_list: List[OHLCV],
+    ohlcv_list: OHLCVLike,
     lookback: int = 20,
 ) -> Tuple[List[bool], List[bool]]:
     """Return (entries, exits) for backtest."""
@@ -4,20 +4,16 @@ from typing import List, Tuple
 
 import numpy as np
 
-from core import OHLCV, Signal
+from core import OHLCVLike, Signal, as_ohlcv_frame
+from feature_engine import kernels
 
 
 def _sma(closes: np.ndarray, period: int) -> np.ndarray:
-    out = np.full(len(closes), np.nan)
-    if len(closes) < period:
-        return out
-    for i in range(period - 1, len(closes)):
-        out[i] = np.mean(closes[i - period + 1 : i + 1])
-    return out
+    return kernels.rolling_mean(closes, period)
 
 
 def trend_following_signals(
-    ohlcv_list: List[OHLCV],
+    ohlcv_list: OHLCVLike,
     fast_period: int = 10,
     slow_period: int = 50,
 ) -> List[Signal]:
@@ -25,7 +21,8 @@ def trend_following_signals(
     BUY when fast MA crosses above slow MA, SELL when fast crosses below slow.
     HOLD otherwise.
     """
-    closes = np.array([b.close for b in ohlcv_list], dtype=float)
+    frame = as_ohlcv_frame(ohlcv_list)
+    closes = frame.close
     n = len(closes)
     signals = [Signal.HOLD] * n
     if n < slow_period:
@@ -33,18 +30,20 @@ def trend_following_signals(
 
     fast = _sma(closes, fast_period)
     slow = _sma(closes, slow_period)
-    for i in range(1, n):
-        if np.isnan(fast[i]) or np.isnan(slow[i]) or np.isnan(fast[i - 1]) or np.isnan(slow[i - 1]):
-            continue
-        if fast[i - 1] <= slow[i - 1] and fast[i] > slow[i]:
-            signals[i] = Signal.BUY
-        elif fast[i - 1] >= slow[i - 1] and fast[i] < slow[i]:
-            signals[i] = Signal.SELL
+    # NaN comparisons are False, so warm-up bars never cross
+    cross_up = np.zeros(n, dtype=bool)
+    cross_down = np.zeros(n, dtype=bool)
+    cross_up[1:] = (fast[:-1] <= slow[:-1]) & (fast[1:] > slow[1:])
+    cross_down[1:] = (fast[:-1] >= slow[:-1]) & (fast[1:] < slow[1:])
+    for i in np.flatnonzero(cross_up):
+        signals[i] = Signal.BUY
+    for i in np.flatnonzero(cross_down):
+        signals[i] = Signal.SELL
     return signals
 
 
 def trend_following_entries_exits(
-    ohlcv_list: List[OHLCV],
+    ohlcv_list: OHLCVLike,
     fast_period: int = 10,
     slow_period: int = 50,
 ) -> Tuple[List[bool], List[bool]]:
@@ -0,0 +1,37 @@
+"""批量个股分析：批量回复缺失的个股并发回退单只分析，结果按请求顺序返回。"""
+
+import asyncio
+import time
+
+import core.llm
+
+
+class _Client:
+    async def achat_batched(self, items, **kwargs):
+        return {"600519": {"action": "持有"}}, []
+
+
+def test_missing_symbols_fall_back_concurrently(monkeypatch):
+    from strategies.daily_stock_analysis.ai_decision import AIDecisionMaker
+    from strategies.daily_stock_analysis.config import DailyStockConfig
+
+    monkeypatch.setattr(core.llm, "get_llm_client", lambda: _Client())
+    maker = AIDecisionMaker(DailyStockConfig())
+    in_flight, peak = [0], [0]
+
+    async def single(symbol, market_data=None):
+        in_flight[0] += 1
+        peak[0] = max(peak[0], in_flight[0])
+        await asyncio.sleep(0.2)
+        in_flight[0] -= 1
+        return {"symbol": symbol, "status": "success", "fallback": True}
+
+    monkeypatch.setattr(maker, "get_stock_analysis", single)
+    symbols = ["000001", "600519", "000002", "300750", "601988"]
+    t0 = time.perf_counter()
+    res = asyncio.run(maker.get_stocks_analysis(symbols))
+    assert time.perf_counter() - t0 < 0.6  # 4 只回退串行需 0.8s
+    assert peak[0] == 4
+    assert list(res) == symbols
+    assert res["600519"]["analysis"] == {"action": "持有"}
+    assert all(res[s]["fallback"] for s in symbols if s != "600519")
@@ -18,6 +18,7 @@ backend = os.environ.get("CELERY_RESULT_BACKEND", "redis://127.0.0.1:6379/0")
 
 try:
     from celery import Celery
+    from celery.schedules import crontab
 
     app = Celery(
         "system_core",
@@ -45,6 +46,10 @@ try:
             "task": "system_core.tasks.pipeline_tasks.run_full_cycle_task",
             "schedule": 60.0,
         },
+        "cold-compaction-daily": {
+            "task": "system_core.tasks.data_tasks.run_cold_compaction_task",
+            "schedule": crontab(hour=3, minute=30),
+        },
     }
 except ImportError:
     app = None  # type: ignore
@@ -17,12 +17,14 @@ def update(
     daily_kline_codes_limit: int = 0,
     use_incremental_daily_kline: bool = False,
     use_incremental_longhubang: bool = False,
+    run_features: bool = True,
 ) -> Dict[str, Any]:
     """
     按开关执行各 collector，返回各步骤写入条数或状态。
     run_daily_kline 为 True 且 daily_kline_codes_limit > 0 时批量拉日 K（耗时长）。
     use_incremental_daily_kline 为 True 时优先用数据源增量更新日 K（按 last_date 拉新数据）。
     use_incremental_longhubang 为 True 时用数据源增量更新龙虎榜。
+    run_features 为 True 时在日 K 更新后增量构建 features_daily（build_factors，只追加新 bar）。
     """
     result = {
         "stock_list": 0,
@@ -31,6 +33,7 @@ def update(
         "fundflow": 0,
         "limitup": 0,
         "longhubang": 0,
+        "features": 0,
         "errors": [],
     }
     try:
@@ -77,6 +80,14 @@ def update(
             except (ValueError, TypeError, OSError, AttributeError) as e:
                 result["errors"].append(f"daily_kline batch: {e}")
 
+    if run_daily_kline and run_features:
+        try:
+            from data_pipeline.etl import build_factors  # pylint: disable=import-outside-toplevel
+
+            result["features"] = build_factors()
+        except (ImportError, ValueError, TypeError, OSError, AttributeError, RuntimeError) as e:
+            result["errors"].append(f"features: {e}")
+
     if run_realtime:
         try:
             result["realtime"] = update_realtime_quotes()
@@ -1,5 +1,6 @@
 """
 市场扫描调度：执行 limit_up、fund_flow、volume_spike、trend 扫描与 hotmoney_sniper。
+各扫描器共用一个 ScanContext 连接（只连一次库、只建一次表），各自输出在单事务内批量替换。
 """
 
 from __future__ import annotations
@@ -25,29 +26,35 @@ def run() -> Dict[str, Any]:
             run_trend_scanner,
             run_sniper,
         )
+        from market_scanner._storage import ScanContext
     except ImportError as e:
         result["errors"].append(str(e))
         return result
 
-    try:
-        result["limit_up"] = run_limit_up_scanner()
-    except (RuntimeError, ValueError, TypeError, OSError) as e:
-        result["errors"].append(f"limit_up: {e}")
-    try:
-        result["fund_flow"] = run_fund_flow_scanner()
-    except (RuntimeError, ValueError, TypeError, OSError) as e:
-        result["errors"].append(f"fund_flow: {e}")
-    try:
-        result["volume_spike"] = run_volume_spike_scanner()
-    except (RuntimeError, ValueError, TypeError, OSError) as e:
-        result["errors"].append(f"volume_spike: {e}")
-    try:
-        result["trend"] = run_trend_scanner()
-    except (RuntimeError, ValueError, TypeError, OSError) as e:
-        result["errors"].append(f"trend: {e}")
-    try:
-        result["sniper"] = run_sniper(min_score=0.7, top_n=50)
-    except (RuntimeError, ValueError, TypeError, OSError) as e:
-        result["errors"].append(f"sniper: {e}")
+    with ScanContext() as ctx:
+        conn = ctx.conn
+        if not conn:
+            result["errors"].append("scan: database connection unavailable")
+            return result
+        try:
+            result["limit_up"] = run_limit_up_scanner(conn=conn)
+        except (RuntimeError, ValueError, TypeError, OSError) as e:
+            result["errors"].append(f"limit_up: {e}")
+        try:
+            result["fund_flow"] = run_fund_flow_scanner(conn=conn)
+        except (RuntimeError, ValueError, TypeError, OSError) as e:
+            result["errors"].append(f"fund_flow: {e}")
+        try:
+            result["volume_spike"] = run_volume_spike_scanner(conn=conn)
+        except (RuntimeError, ValueError, TypeError, OSError) as e:
+            result["errors"].append(f"volume_spike: {e}")
+        try:
+            result["trend"] = run_trend_scanner(conn=conn)
+        except (RuntimeError, ValueError, TypeError, OSError) as e:
+            result["errors"].append(f"trend: {e}")
+        try:
+            result["sniper"] = run_sniper(min_score=0.7, top_n=50, conn=conn)
+        except (RuntimeError, ValueError, TypeError, OSError) as e:
+            result["errors"].append(f"sniper: {e}")
 
     return result
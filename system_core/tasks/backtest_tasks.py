@@ -12,8 +12,7 @@ except (ImportError, RuntimeError, OSError):
     app = None
 
 
-def _run_backtest_sync(payload: Dict[str, Any]) -> Dict[str, Any]:
-    import os
+def _ensure_paths() -> None:
     import sys
 
     root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -22,6 +21,10 @@ def _run_backtest_sync(payload: Dict[str, Any]) -> Dict[str, Any]:
         if os.path.isdir(p) and p not in sys.path:
             sys.path.insert(0, p)
 
+
+def _run_backtest_sync(payload: Dict[str, Any]) -> Dict[str, Any]:
+    _ensure_paths()
+
     from backtest_engine.run_with_db import run_backtest_from_db
 
     symbol = str(payload.get("symbol") or "000001.SZ")
@@ -56,6 +59,47 @@ def _run_backtest_sync(payload: Dict[str, Any]) -> Dict[str, Any]:
     return out
 
 
+def run_parallel_backtests_local(specs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    无 broker 的批量回测：payload 与 run_strategy_backtest_task 相同，整批交给 backtest_engine.farm
+    （日 K/信号一次加载进共享内存，进程池并行，单任务超时），结果顺序与 specs 一致；
+    strategy_market 写入在本进程串行完成，避免多进程争抢 DuckDB 写锁。
+    """
+    if not specs:
+        return {"count": 0, "results": [], "mode": "empty"}
+    _ensure_paths()
+    from backtest_engine.farm import BacktestJob, run_backtest_jobs
+
+    jobs = [
+        BacktestJob(
+            symbol=str(p.get("symbol") or "000001.SZ"),
+            start_date=str(p.get("start_date") or ""),
+            end_date=str(p.get("end_date") or ""),
+            signal_source=str(p.get("signal_source") or "trade_signals"),
+            strategy_id=p.get("strategy_id_filter") or None,
+            init_cash=float(p.get("init_cash") or 10000.0),
+            fees=float(p.get("fees") or 0.001),
+            slippage=float(p.get("slippage") or 0.0),
+        )
+        for p in specs
+    ]
+    results: List[Dict[str, Any]] = []
+    for payload, out in zip(specs, run_backtest_jobs(jobs)):
+        strategy_id = str(payload.get("strategy_id") or "celery_backtest")
+        out["strategy_id"] = strategy_id
+        if not out.get("error") and payload.get("persist", True):
+            try:
+                from data_pipeline.strategy_market_writer import upsert_strategy_market_from_backtest
+
+                upsert_strategy_market_from_backtest(
+                    strategy_id, str(payload.get("name") or strategy_id), out
+                )
+            except Exception as e:
+                out["persist_error"] = str(e)[:500]
+        results.append(out)
+    return {"count": len(results), "results": results, "mode": "local_farm"}
+
+
 if app is not None:
 
     @app.task(
@@ -86,10 +130,14 @@ if app is not None:
     def run_parallel_backtests_group_task(specs: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
         多策略回测：默认 CELERY_BACKTEST_USE_PARALLEL_GROUP=1 时用 Celery group 并行；
+        CELERY_BACKTEST_PARALLEL_BACKEND=local 时改用本地回测农场（run_parallel_backtests_local，不经 broker）；
         失败或非并行时回退为当前进程顺序执行。
         """
         if not specs:
             return {"count": 0, "results": [], "mode": "empty"}
+        backend = os.environ.get("CELERY_BACKTEST_PARALLEL_BACKEND", "group").strip().lower()
+        if backend == "local":
+            return run_parallel_backtests_local(specs)
         use_parallel = os.environ.get("CELERY_BACKTEST_USE_PARALLEL_GROUP", "1").strip().lower() in (
             "1",
             "true",
@@ -19,6 +19,7 @@ if app is not None:
         run_limitup: bool = True,
         run_longhubang: bool = True,
         daily_kline_codes_limit: int = 0,
+        run_features: bool = True,
     ):
         from system_core.data_orchestrator import update
 
@@ -30,4 +31,15 @@ if app is not None:
             run_limitup=run_limitup,
             run_longhubang=run_longhubang,
             daily_kline_codes_limit=daily_kline_codes_limit,
+            run_features=run_features,
         )
+
+    @app.task(bind=True, name="system_core.tasks.data_tasks.run_cold_compaction_task")
+    def run_cold_compaction_task(self):
+        """把超过保留期的快照 / 日 K 行压实到冷分区 Parquet（见 data_pipeline.storage.cold_storage）。"""
+        from data_pipeline.storage.cold_storage import run_compaction
+        from data_pipeline.strategy_market_writer import record_pipeline_meta
+
+        result = run_compaction()
+        record_pipeline_meta("cold_compaction_last", result)
+        return result
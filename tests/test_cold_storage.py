@@ -0,0 +1,88 @@
+"""冷热分层：过期行压实到按年月分区的 Parquet，<table>_all 视图合并冷热数据，中断的暂存批次可恢复。"""
+
+import datetime as dt
+import os
+
+import pytest
+
+pytest.importorskip("duckdb")
+
+
+@pytest.fixture
+def conn(tmp_path, monkeypatch):
+    monkeypatch.setenv("QUANT_DB_PATH", str(tmp_path / "tier.duckdb"))
+    monkeypatch.setenv("COLD_STORAGE_DIR", str(tmp_path / "cold"))
+    from data_pipeline.storage.duckdb_manager import ensure_tables, get_conn
+
+    c = get_conn()
+    ensure_tables(c)
+    yield c
+    c.close()
+
+
+def test_compaction_moves_old_rows_and_views_union_tiers(conn, tmp_path, monkeypatch):
+    from data_pipeline.storage import run_compaction, source_table
+
+    now = dt.datetime(2026, 3, 31, 12)
+    conn.execute(
+        "INSERT INTO a_stock_realtime (code, latest_price, snapshot_time) "
+        "SELECT '600519', i, TIMESTAMP '2026-01-01' + to_days(CAST(i AS INTEGER)) FROM range(90) t(i)"
+    )
+    conn.execute(
+        "INSERT INTO a_stock_daily (code, date, amount) "
+        "SELECT '600519', DATE '2025-01-01' + CAST(i AS INTEGER), 1.0 FROM range(400) t(i)"
+    )
+    monkeypatch.setenv("COLD_RETAIN_DAYS_A_STOCK_DAILY", "100")
+    res = run_compaction(conn, tables=["a_stock_realtime", "a_stock_daily"], now=now)
+    assert not res["errors"]
+    moved = {t["table"]: t["rows"] for t in res["tables"]}
+    # 实时快照保留 7 天：2026-03-24 12:00 之前的 83 行入冷层；日 K 保留 100 天（2025-12-21 之前 354 行）
+    assert moved == {"a_stock_realtime": 83, "a_stock_daily": 354}
+
+    assert conn.execute("SELECT COUNT(*) FROM a_stock_realtime").fetchone()[0] == 7
+    assert conn.execute("SELECT COUNT(*), SUM(latest_price) FROM a_stock_realtime_all").fetchone() == (90, sum(range(90)))
+    parts = sorted(os.listdir(tmp_path / "cold" / "a_stock_realtime" / "year=2026"))
+    assert parts == ["month=1", "month=2", "month=3"]
+    assert conn.execute(
+        "SELECT COUNT(*) FROM a_stock_realtime_all WHERE snapshot_time < TIMESTAMP '2026-02-01'"
+    ).fetchone()[0] == 31
+
+    assert source_table(conn, "a_stock_daily") == "a_stock_daily_all"
+    assert conn.execute("SELECT COUNT(*), MIN(date) FROM a_stock_daily_all").fetchone() == (400, dt.date(2025, 1, 1))
+
+    # 再跑一次无过期行，不产生新文件
+    again = run_compaction(conn, tables=["a_stock_realtime"], now=now)
+    assert again["tables"][0]["rows"] == 0
+    assert conn.execute("SELECT COUNT(*) FROM a_stock_realtime_all").fetchone()[0] == 90
+
+
+def test_audit_and_news_are_not_compacted_by_default(conn):
+    from data_pipeline.storage import run_compaction
+
+    conn.execute("INSERT INTO news_items (ts, title, url) VALUES (TIMESTAMP '2020-01-01', 't', 'u')")
+    conn.execute(
+        "INSERT INTO audit_log (id, path, created_at) VALUES (nextval('audit_log_id_seq'), '/x', TIMESTAMP '2020-01-01')"
+    )
+    res = run_compaction(conn, tables=["audit_log", "news_items"], now=dt.datetime(2026, 3, 31))
+    assert [t["rows"] for t in res["tables"]] == [0, 0]
+    assert conn.execute("SELECT COUNT(*) FROM news_items").fetchone()[0] == 1
+    assert conn.execute("SELECT COUNT(*) FROM audit_log").fetchone()[0] == 1
+
+
+def test_recover_staging_publishes_committed_and_drops_uncommitted(conn, tmp_path):
+    from data_pipeline.storage.cold_storage import recover_staging
+
+    staging = tmp_path / "cold" / "audit_log" / "_staging"
+    for batch in ("bdone", "blost"):
+        d = staging / batch / "year=2026" / "month=1"
+        d.mkdir(parents=True)
+        conn.execute(
+            f"COPY (SELECT 1 AS id, TIMESTAMP '2026-01-02' AS created_at) TO '{d / 'part_0.parquet'}' (FORMAT parquet)"
+        )
+    conn.execute("INSERT INTO pipeline_meta (k, v) VALUES ('cold_pending:audit_log:bdone', 'bdone')")
+
+    recover_staging(conn, "audit_log")
+    published = os.listdir(tmp_path / "cold" / "audit_log" / "year=2026" / "month=1")
+    assert published == ["bdone_part_0.parquet"]
+    assert not os.listdir(staging)
+    assert conn.execute("SELECT COUNT(*) FROM pipeline_meta WHERE k LIKE 'cold_pending:%'").fetchone()[0] == 0
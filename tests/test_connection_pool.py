@@ -0,0 +1,201 @@
+"""进程级 DuckDB 连接池：单实例复用、归还即清理、只读请求用只读实例、空闲释放文件锁、DDL 只跑一次。"""
+
+import threading
+
+import pytest
+
+duckdb = pytest.importorskip("duckdb")
+
+
+@pytest.fixture
+def pooled_db(tmp_path, monkeypatch):
+    monkeypatch.setenv("QUANT_DB_PATH", str(tmp_path / "pool.duckdb"))
+    monkeypatch.setenv("QUANT_DB_POOL_SIZE", "2")
+    monkeypatch.setenv("QUANT_DB_POOL_TIMEOUT", "0.2")
+    from data_pipeline.storage.connection_pool import close_pools
+
+    close_pools()
+    yield
+    close_pools()
+
+
+def test_cursors_are_reused_and_tables_ensured_once(pooled_db):
+    from data_pipeline.storage import ensure_tables, get_conn, pool_stats
+
+    conn = get_conn()
+    assert conn.tables_ensured
+    ensure_tables(conn)  # 已建表：直接返回
+    conn.execute("INSERT INTO pipeline_meta (k, v) VALUES ('a', '1')")
+    conn.close()
+
+    for _ in range(5):
+        c = get_conn(read_only=True)
+        assert c.execute("SELECT v FROM pipeline_meta WHERE k = ?", ["a"]).fetchone()[0] == "1"
+        c.close()
+
+    (st,) = pool_stats()
+    assert st["opens_total"] == 1
+    assert st["cursors_created"] == 1
+    assert st["acquired_total"] == 6 and st["in_use"] == 0
+
+
+def test_read_only_requests_open_a_real_read_only_instance(pooled_db):
+    from data_pipeline.storage import close_pools, get_conn, pool_stats
+
+    get_conn().close()  # 建库建表
+    close_pools()
+    conn = get_conn(read_only=True)
+    assert pool_stats()[0]["mode"] == "read_only"
+    with pytest.raises(duckdb.Error):
+        conn.execute("INSERT INTO pipeline_meta (k, v) VALUES ('b', '2')")
+    assert conn.execute("WITH x AS (SELECT 1 AS n) SELECT n FROM x").fetchone()[0] == 1
+    conn.close()
+
+    writer = get_conn()  # 只读游标归还后重开为读写实例
+    writer.execute("INSERT INTO pipeline_meta (k, v) VALUES ('b', '2')")
+    assert pool_stats()[0]["mode"] == "read_write"
+    reader = get_conn(read_only=True)  # 读写实例打开期间共用，按语句拦截写入
+    with pytest.raises(duckdb.Error):
+        reader.execute("DELETE FROM pipeline_meta")
+    reader.close()
+    writer.close()
+
+
+def test_schema_ddl_is_checkpointed_before_the_process_dies(pooled_db, tmp_path):
+    import subprocess
+    import sys
+
+    # 池化实例首次打开即 CHECKPOINT：进程被强杀（os._exit，不走 atexit）后库文件仍可只读打开
+    script = "import os; from data_pipeline.storage import get_conn; get_conn().close(); os._exit(0)"
+    subprocess.run([sys.executable, "-c", script], check=True, timeout=120)
+    conn = duckdb.connect(str(tmp_path / "pool.duckdb"), read_only=True)
+    assert conn.execute("SELECT COUNT(*) FROM pipeline_meta").fetchone()[0] == 0
+    conn.close()
+
+
+def test_idle_instance_releases_file_lock_for_other_processes(pooled_db, monkeypatch):
+    import os
+    import subprocess
+    import sys
+    import time
+
+    from data_pipeline.storage import close_pools, get_conn, pool_stats
+
+    monkeypatch.setenv("QUANT_DB_POOL_IDLE_SEC", "0.05")
+    close_pools()
+    conn = get_conn()
+    conn.execute("INSERT INTO pipeline_meta (k, v) VALUES ('a', '1')")
+    conn.close()
+    deadline = time.time() + 5
+    while pool_stats()[0]["mode"] is not None and time.time() < deadline:
+        time.sleep(0.02)
+    assert pool_stats()[0]["mode"] is None
+
+    script = "import duckdb, sys; c = duckdb.connect(sys.argv[1]); c.execute(\"INSERT INTO pipeline_meta (k, v) VALUES ('b', '2')\"); c.close()"
+    done = subprocess.run([sys.executable, "-c", script, os.environ["QUANT_DB_PATH"]], capture_output=True, text=True)
+    assert done.returncode == 0, done.stderr
+    conn = get_conn(read_only=True)
+    assert conn.execute("SELECT COUNT(*) FROM pipeline_meta").fetchone()[0] == 2
+    conn.close()
+
+
+def test_release_drops_registered_views_and_open_transactions(pooled_db):
+    import pandas as pd
+
+    from data_pipeline.storage import get_conn
+
+    conn = get_conn()
+    conn.register("tmp_rows", pd.DataFrame({"k": ["x"], "v": ["y"]}))
+    conn.execute("BEGIN TRANSACTION")
+    conn.execute("INSERT INTO pipeline_meta (k, v) SELECT k, v FROM tmp_rows")
+    conn.close()  # 未提交：归还时回滚
+
+    conn = get_conn()
+    assert conn.execute("SELECT COUNT(*) FROM pipeline_meta").fetchone()[0] == 0
+    with pytest.raises(duckdb.Error):
+        conn.execute("SELECT * FROM tmp_rows")
+    conn.close()
+
+
+def test_exhausted_pool_waits_then_times_out(pooled_db):
+    from data_pipeline.storage import get_conn, pool_stats
+    from data_pipeline.storage.connection_pool import PoolTimeout
+
+    a, b = get_conn(), get_conn()
+    with pytest.raises(PoolTimeout):
+        get_conn()
+
+    threading.Timer(0.05, a.close).start()
+    c = get_conn()  # 等到 a 归还
+    c.close()
+    b.close()
+    (st,) = pool_stats()
+    assert st["timeouts_total"] == 1
+    assert st["waits_total"] == 2 and st["wait_seconds_max"] > 0
+
+
+def test_nested_reader_does_not_yield_to_a_queued_writer(pooled_db, monkeypatch):
+    import time
+
+    from data_pipeline.storage import close_pools, get_conn, pool_stats
+
+    get_conn().close()
+    monkeypatch.setenv("QUANT_DB_POOL_TIMEOUT", "5")
+    close_pools()
+    outer = get_conn(read_only=True)
+    assert pool_stats()[0]["mode"] == "read_only"
+    got = {}
+
+    def write():
+        w = get_conn()  # 排队：等 outer 归还后升级为读写实例
+        w.execute("INSERT INTO pipeline_meta (k, v) VALUES ('w', '1')")
+        got["mode"] = pool_stats()[0]["mode"]
+        w.close()
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    time.sleep(0.1)  # 写者已在排队
+    inner = get_conn(read_only=True)  # 同线程嵌套读：不让位给写者，否则互相等到超时
+    assert inner.execute("SELECT COUNT(*) FROM pipeline_meta").fetchone()[0] == 0
+    inner.close()
+    outer.close()
+    writer.join(2)
+    assert got == {"mode": "read_write"}
+    assert pool_stats()[0]["timeouts_total"] == 0
+
+
+def test_nested_upgrade_to_read_write_fails_fast(pooled_db, monkeypatch):
+    import time
+
+    from data_pipeline.storage import close_pools, get_conn
+    from data_pipeline.storage.connection_pool import PoolUpgradeError
+
+    get_conn().close()
+    monkeypatch.setenv("QUANT_DB_POOL_TIMEOUT", "5")
+    close_pools()
+    reader = get_conn(read_only=True)
+    start = time.perf_counter()
+    with pytest.raises(PoolUpgradeError):
+        get_conn()
+    assert time.perf_counter() - start < 1
+    reader.close()
+    writer = get_conn()  # 归还后正常升级
+    writer.execute("INSERT INTO pipeline_meta (k, v) VALUES ('u', '1')")
+    writer.close()
+
+
+def test_unclosed_connection_is_returned_on_gc(pooled_db):
+    from data_pipeline.storage import get_conn, pool_stats
+
+    get_conn().execute("SELECT 1").fetchone()
+    (st,) = pool_stats()
+    assert st["in_use"] == 0 and st["idle"] == 1
+
+
+def test_pool_can_be_disabled(pooled_db, monkeypatch):
+    from data_pipeline.storage import get_conn
+
+    monkeypatch.setenv("QUANT_DB_POOL", "0")
+    conn = get_conn()
+    assert isinstance(conn, duckdb.DuckDBPyConnection)
+    conn.close()
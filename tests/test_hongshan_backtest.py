@@ -0,0 +1,120 @@
+"""红山后端向量化回测：与原逐只逐 bar 循环逐项一致；收盘价经共享的 OHLCV 面板缓存读取。"""
+
+import importlib.util
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+_MODULE = Path(__file__).resolve().parents[1] / "integrations/hongshan/hongshan-backend/app/services/backtest_engine.py"
+
+
+@pytest.fixture(scope="module")
+def engine():
+    spec = importlib.util.spec_from_file_location("hongshan_backtest_engine", _MODULE)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def _loop_backtest(df, initial_capital, commission_rate=0.0003, stamp_tax_rate=0.001):
+    """原 run_backtest 的逐 bar 循环（向量化之前的实现），作为对照。"""
+    capital, position = initial_capital, 0
+    buys, sells, values = [], [], []
+    for i, row in df.iterrows():
+        if pd.isna(row["positions"]):
+            continue
+        if row["positions"] == 1 and capital > 0:
+            shares = int(capital / row["close"] / 100) * 100
+            if shares >= 100:
+                total_cost = shares * row["close"] * (1 + commission_rate)
+                if total_cost <= capital:
+                    capital -= total_cost
+                    position = shares
+                    buys.append(total_cost)
+        elif row["positions"] == -1 and position > 0:
+            revenue = position * row["close"]
+            net = revenue - revenue * commission_rate - revenue * stamp_tax_rate
+            capital += net
+            sells.append(net)
+            position = 0
+        values.append({"date": i, "value": capital + (position * row["close"] if position > 0 else 0)})
+
+    pv = pd.DataFrame(values).set_index("date")["value"]
+    total_return = (pv.iloc[-1] - initial_capital) / initial_capital * 100
+    days = (pv.index[-1] - pv.index[0]).days
+    daily = pv.pct_change().dropna()
+    wins = sum(1 for k, s in enumerate(sells) if k < len(buys) and s > buys[k])
+    return {
+        "total_return": round(total_return, 4),
+        "annual_return": round(((1 + total_return / 100) ** (365 / days) - 1) * 100 if days > 0 else 0, 4),
+        "sharpe_ratio": round(np.sqrt(252) * daily.mean() / daily.std() if daily.std() > 0 else 0, 4),
+        "max_drawdown": round(((pv - pv.cummax()) / pv.cummax()).min() * 100, 4),
+        "total_trades": len(buys) + len(sells),
+        "winning_trades": wins,
+        "win_rate": round(wins / len(sells) * 100 if sells else 0, 4),
+        "final_capital": round(pv.iloc[-1], 2),
+        "values": pv.to_numpy(),
+    }
+
+
+def test_vectorized_panel_matches_per_symbol_loop(engine):
+    rng = np.random.default_rng(7)
+    dates = pd.bdate_range("2024-01-02", periods=260)
+    close = pd.DataFrame(
+        {f"S{k}": 10 * np.cumprod(1 + rng.normal(0, 0.025, len(dates))) for k in range(6)}, index=dates
+    )
+    close.iloc[:40, 1] = np.nan  # 晚上市
+    close.iloc[100:110, 2] = np.nan  # 停牌
+    close["S3"] *= 120  # 高价股：资金不足一手的买入信号被跳过
+    capital = 20000.0
+
+    results = {
+        r["symbol"]: r for r in engine.backtest_panel(close, lambda c: engine.ma_cross_signals(c, 5, 20), capital)
+    }
+    assert set(results) == set(close.columns)
+    for symbol in close.columns:
+        df = close[[symbol]].dropna().rename(columns={symbol: "close"})
+        df = engine.calculate_ma(df, 5, 20)
+        df["positions"] = np.where(df["ma_short"] > df["ma_long"], 1, 0)
+        df["positions"] = df["positions"].diff()
+        expected = _loop_backtest(df, capital)
+        got = results[symbol]
+        for key in ("total_return", "annual_return", "sharpe_ratio", "max_drawdown", "win_rate", "final_capital"):
+            assert got[key] == pytest.approx(expected[key], abs=1e-3), (symbol, key)
+        assert got["total_trades"] == expected["total_trades"]
+        assert got["winning_trades"] == expected["winning_trades"]
+        np.testing.assert_allclose([p["value"] for p in got["portfolio_values"]], expected["values"], rtol=1e-9)
+    assert results["S0"]["total_trades"] > 0
+
+
+def test_close_panel_reads_through_shared_panel_store(engine, tmp_path, monkeypatch):
+    duckdb = pytest.importorskip("duckdb")
+    pytest.importorskip("backtest_engine")
+    from backtest_engine.panel_store import get_panel_store
+
+    path = tmp_path / "hs.duckdb"
+    monkeypatch.setenv("QUANT_DB_PATH", str(path))
+    monkeypatch.setattr(engine, "get_stock_data", lambda *a: pytest.fail("akshare fallback used"))
+    conn = duckdb.connect(str(path))
+    conn.execute("CREATE TABLE a_stock_daily (code VARCHAR, date DATE, open DOUBLE, high DOUBLE, low DOUBLE, "
+                 "close DOUBLE, volume DOUBLE, amount DOUBLE)")
+    for d, px in [(date(2026, 3, 2), 10.0), (date(2026, 3, 3), 10.5), (date(2026, 3, 4), 11.0)]:
+        conn.execute("INSERT INTO a_stock_daily VALUES ('600519.SH', ?, ?, ?, ?, ?, 1, 1)", [d, px, px, px, px])
+        conn.execute("INSERT INTO a_stock_daily VALUES ('000001.SZ', ?, ?, ?, ?, ?, 1, 1)", [d, 1, 1, 1, px / 10])
+    conn.close()
+
+    store = get_panel_store()
+    store.invalidate()
+    try:
+        panel = engine.load_close_panel(["600519", "000001"], date(2026, 3, 3), date(2026, 3, 4))
+        assert list(panel.columns) == ["600519", "000001"]
+        assert panel["600519"].tolist() == [10.5, 11.0]
+        assert store.stats["loads"] >= 1
+        loads = store.stats["loads"]
+        engine.load_close_panel(["600519"], date(2026, 3, 2), date(2026, 3, 4))
+        assert store.stats["loads"] == loads  # 第二次命中面板缓存
+    finally:
+        store.invalidate()
@@ -0,0 +1,165 @@
+"""并发限速日 K 拉取：令牌桶限速、异常退避重试、分组水位、单写线程分批落库（本地桩接口）。"""
+
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("duckdb")
+
+
+class StubHistApi:
+    """模拟 akshare 东财日 K 接口：按 code 生成 start~end 的工作日行情，可注入瞬时失败。"""
+
+    def __init__(self, flaky=None, empty=()):
+        self.flaky = dict(flaky or {})  # code -> 前 N 次调用抛异常
+        self.empty = set(empty)
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def stock_zh_a_hist_em(self, symbol, period, start_date, end_date, adjust):
+        with self._lock:
+            self.calls.append((symbol, start_date, end_date))
+            if self.flaky.get(symbol, 0) > 0:
+                self.flaky[symbol] -= 1
+                raise ConnectionError("reset by peer")
+        if symbol in self.empty:
+            return pd.DataFrame()
+        dates = pd.bdate_range(start_date, end_date)
+        return pd.DataFrame(
+            {
+                "日期": dates.strftime("%Y-%m-%d"),
+                "开盘": 10.0,
+                "最高": 11.0,
+                "最低": 9.0,
+                "收盘": 10.5,
+                "成交量": 1000.0,
+                "成交额": 10500.0,
+            }
+        )
+
+    def stock_zh_a_hist(self, symbol, start_date, end_date, period, adjust):
+        if symbol in self.flaky and self.flaky[symbol] > 0:
+            raise ConnectionError("reset by peer")
+        return pd.DataFrame()
+
+
+@pytest.fixture
+def conn(tmp_path, monkeypatch):
+    monkeypatch.setenv("QUANT_DB_PATH", str(tmp_path / "kline.duckdb"))
+    monkeypatch.setenv("KLINE_FETCH_BATCH_ROWS", "10")
+    from data_pipeline.storage.duckdb_manager import ensure_tables, get_conn
+
+    c = get_conn()
+    ensure_tables(c)
+    yield c
+    c.close()
+
+
+def test_token_bucket_limits_rate():
+    from data_pipeline.data_sources.fetch_engine import TokenBucket
+
+    bucket = TokenBucket(rate=50, burst=1)
+    t0 = time.perf_counter()
+    for _ in range(6):
+        bucket.acquire()
+    assert time.perf_counter() - t0 >= 5 / 50 * 0.9
+
+
+def test_engine_retries_then_records_failures():
+    from data_pipeline.data_sources.fetch_engine import FetchEngine
+
+    attempts = {}
+
+    def fetch_one(task, throttle):
+        throttle("stub")
+        attempts[task] = attempts.get(task, 0) + 1
+        if task == "bad" or (task == "flaky" and attempts[task] < 3):
+            raise TimeoutError(task)
+        return None if task == "none" else pd.DataFrame({"code": [task]})
+
+    engine = FetchEngine(fetch_one, workers=4, rate=0, max_retries=2, backoff_base=0)
+    data, stats = engine.run(["ok", "flaky", "bad", "none"])
+    assert sorted(data["code"]) == ["flaky", "ok"]
+    assert attempts == {"ok": 1, "flaky": 3, "bad": 3, "none": 1}
+    assert (stats.fetched, stats.empty, stats.failed, stats.retries) == (2, 1, 1, 4)
+    assert stats.errors[0][0] == "bad"
+
+
+def test_failing_on_batch_stops_run_without_blocking_workers():
+    from data_pipeline.data_sources.fetch_engine import FetchEngine
+
+    fetched = []
+
+    def fetch_one(task, throttle):
+        fetched.append(task)
+        return pd.DataFrame({"code": [task]})
+
+    def on_batch(rows, stats, done):
+        raise RuntimeError("progress sink down")
+
+    engine = FetchEngine(fetch_one, workers=2, rate=0, max_retries=0, batch_rows=1)
+    box = {}
+
+    def run():
+        try:
+            engine.run(range(200), writer=len, on_batch=on_batch)
+        except RuntimeError as e:
+            box["err"] = e
+
+    t = threading.Thread(target=run, daemon=True)
+    t.start()
+    t.join(10)
+    assert not t.is_alive(), "workers blocked on the bounded result queue"
+    assert "progress sink down" in str(box["err"])
+    assert len(fetched) < 200  # 写入失败后剩余任务不再拉取
+
+
+def test_run_incremental_uses_per_code_watermarks(conn, monkeypatch):
+    import datetime as dt
+
+    from data_pipeline.data_sources import ashare_daily_kline
+    from data_pipeline.data_sources.ashare_daily_kline import AShareDailyKlineSource
+
+    class FixedNow(dt.datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return cls(2026, 3, 13, 16, 0)  # 周五收盘后；无日线标的的一年回填以此为基准
+
+    monkeypatch.setattr(ashare_daily_kline, "datetime", FixedNow)
+    end = pd.Timestamp("2026-03-13")
+    d1, d2 = pd.Timestamp("2026-03-06"), pd.Timestamp("2026-03-11")
+    conn.execute(
+        "INSERT INTO a_stock_daily (code, date, close) VALUES ('000001', ?, 1.0), ('600519', ?, 1.0)",
+        [d1.date(), d2.date()],
+    )
+    api = StubHistApi(flaky={"300750": 1}, empty={"688001"})
+    src = AShareDailyKlineSource(api=api)
+    codes = ["000001", "600519", "300750", "688001", "000002.SZ"]
+    n = src.run_incremental(
+        conn, codes=codes, end_key=end.strftime("%Y%m%d"), backoff_base=0, max_retries=2, rate=0
+    )
+
+    starts = {code: start for code, start, _ in api.calls}
+    assert starts["000001"] == (d1 + pd.Timedelta(days=1)).strftime("%Y%m%d")
+    assert starts["600519"] == (d2 + pd.Timedelta(days=1)).strftime("%Y%m%d")
+    assert starts["000002"] < (end - pd.Timedelta(days=360)).strftime("%Y%m%d")  # 无日线：约一年回填
+    counts = dict(
+        conn.execute("SELECT code, COUNT(*) FROM a_stock_daily GROUP BY code").fetchall()
+    )
+    assert counts["000001"] == 1 + 5 and counts["600519"] == 1 + 2
+    assert counts["300750"] == counts["000002"] > 200  # 瞬时失败后重试成功
+    assert "688001" not in counts
+    assert n == sum(counts.values()) - 2
+
+
+def test_fetch_with_request_sleep_keeps_concatenated_result(monkeypatch):
+    from data_pipeline.data_sources.ashare_daily_kline import AShareDailyKlineSource
+
+    api = StubHistApi()
+    df = AShareDailyKlineSource(api=api).fetch(
+        start_key="20240105", end_key="20240110", codes=["000001", "600519"], request_sleep_sec=0.01
+    )
+    assert sorted(df["code"].unique()) == ["000001", "600519"]
+    assert len(df) == 2 * 3
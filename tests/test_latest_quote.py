@@ -0,0 +1,112 @@
+"""latest_quote：采集时按 6 位代码维护最新行情，批量价格查询一次关联，回退日线收盘。"""
+
+import datetime as dt
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("duckdb")
+
+
+@pytest.fixture
+def conn(tmp_path, monkeypatch):
+    monkeypatch.setenv("QUANT_DB_PATH", str(tmp_path / "quote.duckdb"))
+    from data_pipeline.storage.duckdb_manager import ensure_tables, get_conn
+
+    c = get_conn()
+    ensure_tables(c)
+    yield c
+    c.close()
+
+
+def _snapshot(conn, ts, rows):
+    from data_pipeline.storage.latest_quote import upsert_latest_quotes
+
+    df = pd.DataFrame(
+        [
+            {
+                "code": code,
+                "name": name,
+                "latest_price": px,
+                "change_pct": 0.0,
+                "volume": 1,
+                "amount": 1.0,
+                "snapshot_time": ts,
+            }
+            for code, name, px in rows
+        ]
+    )
+    conn.register("tmp_rt", df)
+    conn.execute("INSERT INTO a_stock_realtime SELECT * FROM tmp_rt")
+    upsert_latest_quotes(conn, "tmp_rt")
+    conn.unregister("tmp_rt")
+
+
+def test_upsert_keeps_newest_snapshot_per_normalized_code(conn):
+    t0 = dt.datetime(2026, 1, 5, 9, 30)
+    _snapshot(conn, t0, [("600519", "茅台", 1700.0), ("000001.SZ", "平安", 10.0)])
+    _snapshot(conn, t0 + dt.timedelta(seconds=30), [("600519.SH", "茅台", 1701.0)])
+    _snapshot(conn, t0 - dt.timedelta(seconds=30), [("000001", "平安", 9.0)])  # 迟到的旧快照
+    rows = dict(conn.execute("SELECT code, latest_price FROM latest_quote").fetchall())
+    assert rows == {"600519": 1701.0, "000001": 10.0}
+
+
+def test_lookup_quotes_resolves_batch_with_daily_fallback(conn):
+    from data_pipeline.storage.latest_quote import lookup_quote, lookup_quotes
+
+    _snapshot(conn, dt.datetime(2026, 1, 5, 9, 30), [("600519", "茅台", 1700.0)])
+    conn.execute(
+        "INSERT INTO a_stock_daily (code, date, close) VALUES "
+        "('300750', DATE '2026-01-02', 200.0), ('300750', DATE '2026-01-05', 210.0)"
+    )
+    conn.execute("INSERT INTO a_stock_basic (code, name) VALUES ('300750.SZ', '宁德时代')")
+    quotes = lookup_quotes(conn, ["600519.SH", "300750", "688999"])
+    assert quotes == {"600519": (1700.0, "茅台"), "300750": (210.0, "宁德时代")}
+    assert lookup_quote(conn, "sz300750") == (210.0, "宁德时代")
+    assert lookup_quote(conn, "300750", daily_fallback=False) == (None, None)
+
+
+def test_existing_snapshots_backfilled_on_table_creation(tmp_path):
+    import duckdb
+
+    from data_pipeline.storage.duckdb_manager import ensure_tables
+
+    c = duckdb.connect(str(tmp_path / "old.duckdb"))
+    c.execute(
+        "CREATE TABLE a_stock_realtime (code VARCHAR, name VARCHAR, latest_price DOUBLE,"
+        " change_pct DOUBLE, volume BIGINT, amount DOUBLE, snapshot_time TIMESTAMP)"
+    )
+    c.execute(
+        "INSERT INTO a_stock_realtime VALUES "
+        "('600519', 'a', 1.0, 0, 0, 0, TIMESTAMP '2026-01-05 09:30:00'),"
+        "('600519', 'a', 2.0, 0, 0, 0, TIMESTAMP '2026-01-05 09:30:30')"
+    )
+    ensure_tables(c)
+    assert c.execute("SELECT latest_price FROM latest_quote WHERE code = '600519'").fetchone()[0] == 2.0
+    c.close()
+
+
+def test_paper_fills_price_whole_batch_in_one_lookup(conn, monkeypatch):
+    from gateway import paper_fill_engine
+    from data_pipeline.storage import latest_quote
+
+    _snapshot(conn, dt.datetime(2026, 1, 5, 9, 30), [("600519", "茅台", 100.0), ("000001", "平安", 10.0)])
+    conn.execute("INSERT INTO hongshan_accounts (user_id) VALUES ('u1')")
+    orders = [
+        ("o1", "600519.SH", "buy", 101.0),
+        ("o2", "600519", "buy", 99.0),  # 限价低于现价：不成交
+        ("o3", "000001.SZ", "buy", 10.5),
+    ]
+    conn.executemany(
+        "INSERT INTO hongshan_paper_orders (id, user_id, symbol, order_type, order_price, order_quantity)"
+        " VALUES (?, 'u1', ?, ?, ?, 100)",
+        orders,
+    )
+    calls = []
+    real = latest_quote.lookup_quotes
+    monkeypatch.setattr(latest_quote, "lookup_quotes", lambda c, codes, **kw: calls.append(1) or real(c, codes, **kw))
+
+    res = paper_fill_engine.run_paper_fills(conn)
+    assert res["filled"] == 2 and res["skipped"] == 1 and len(calls) == 1
+    names = dict(conn.execute("SELECT id, stock_name FROM hongshan_paper_orders WHERE status = 'filled'").fetchall())
+    assert names == {"o1": "茅台", "o3": "平安"}
@@ -0,0 +1,125 @@
+"""增量风控指标：逐点更新结果与全量重算一致，价格 tick 增量修正行业暴露，从模拟盘表增量同步。"""
+
+import datetime as dt
+import math
+from statistics import NormalDist
+
+import numpy as np
+import pytest
+
+pytest.importorskip("duckdb")
+
+
+def test_incremental_metrics_match_full_recompute():
+    from risk_engine import RollingRiskMetrics, current_drawdown, max_drawdown
+
+    rng = np.random.default_rng(7)
+    equity = 1_000_000 * np.cumprod(1 + rng.normal(0.0005, 0.02, 400))
+    m = RollingRiskMetrics(window=60, ewma_lambda=0.94, var_confidence=0.95)
+    for v in equity:
+        m.update_equity(v)
+
+    assert m.drawdown == pytest.approx(current_drawdown(list(equity)))
+    assert m.max_drawdown == pytest.approx(max_drawdown(list(equity)))
+
+    r = (equity[1:] / equity[:-1] - 1)[-60:]
+    assert m.historical_var() == pytest.approx(max(0.0, -np.quantile(r, 0.05)))
+    z = NormalDist().inv_cdf(0.95)
+    assert m.parametric_var() == pytest.approx(max(0.0, z * r.std(ddof=1) - r.mean()), rel=1e-6)
+
+    all_r = equity[1:] / equity[:-1] - 1
+    var = all_r[0] ** 2
+    for x in all_r[1:]:
+        var = 0.94 * var + 0.06 * x * x
+    assert m.ewma_volatility() == pytest.approx(math.sqrt(var * 252))
+
+    seeded = RollingRiskMetrics(window=60)
+    seeded.seed_equity(equity)
+    assert seeded.max_drawdown == pytest.approx(m.max_drawdown)
+    assert seeded.historical_var() == pytest.approx(m.historical_var())
+
+
+def test_price_ticks_update_sector_exposure_and_drawdown():
+    from risk_engine import RiskPlan, RollingRiskMetrics
+
+    m = RollingRiskMetrics()
+    m.update_equity(10_000.0)
+    m.set_positions(
+        {"600519": 10, "000001": 100},
+        {"600519": 500.0, "000001": 10.0},
+        {"600519": "白酒", "000001": "银行"},
+        cash=4_000.0,
+    )
+    assert m.update_price("600519", 450.0)
+    assert not m.update_price("300750", 1.0)  # 非持仓
+    st = m.status(RiskPlan([("max_drawdown_pct", 0.1), ("max_exposure_pct", 0.5)]))
+    assert st["equity"] == 9_500.0 and st["drawdown"] == pytest.approx(0.05)
+    assert st["sector_exposure"] == {"白酒": pytest.approx(4_500 / 9_500, abs=1e-6), "银行": pytest.approx(1_000 / 9_500, abs=1e-6)}
+    assert st["drawdown_ok"] and not st["exposure_ok"] and st["volatility_ok"]
+    assert st["window"] == 0  # tick 只盯市，不产生收益率样本
+
+
+def test_service_syncs_incrementally_and_follows_market_deltas(tmp_path, monkeypatch):
+    monkeypatch.setenv("QUANT_DB_PATH", str(tmp_path / "metrics.duckdb"))
+    from data_pipeline.storage.duckdb_manager import ensure_tables, get_conn
+    from risk_engine import RiskMetricsService, invalidate_plan
+
+    c = get_conn()
+    ensure_tables(c)
+    invalidate_plan()
+    t0 = dt.datetime(2026, 1, 5, 15)
+    c.executemany(
+        "INSERT INTO sim_account_snapshots (snapshot_time, cash, equity, total_assets) VALUES (?, ?, ?, ?)",
+        [(t0, 10_000.0, 10_000.0, 10_000.0), (t0 + dt.timedelta(days=1), 9_000.0, 11_000.0, 11_000.0)],
+    )
+    c.execute("INSERT INTO sim_positions (code, side, qty, avg_price) VALUES ('600519', 'LONG', 100, 18.0)")
+    c.execute("INSERT INTO a_stock_daily (code, date, close) VALUES ('600519.SH', DATE '2026-01-06', 20.0)")
+    c.execute("INSERT INTO a_stock_basic (code, name, sector) VALUES ('600519.SH', '贵州茅台', '白酒')")
+
+    svc = RiskMetricsService()
+    assert svc.sync(c) == 2
+    st = svc.status(c)
+    assert st["equity"] == 11_000.0 and st["sector_exposure"] == {"白酒": pytest.approx(2_000 / 11_000, abs=1e-6)}
+
+    svc.on_market_deltas("ashare", [{"code": "600519", "latest_price": 10.0}, {"code": "000001"}])
+    assert svc.metrics.equity == 10_000.0 and svc.metrics.drawdown == pytest.approx(1 / 11)
+
+    c.execute(
+        "INSERT INTO sim_account_snapshots (snapshot_time, cash, equity, total_assets) VALUES (?, 9000, 9900, 9900)",
+        [t0 + dt.timedelta(days=2)],
+    )
+    assert svc.sync(c) == 1 and svc.sync(c) == 0
+    assert svc.metrics.window == 250 and len(svc.metrics._returns) == 2
+    c.close()
+    invalidate_plan()
+
+
+def test_sync_marks_latest_snapshot_to_market_and_reads_backdated_rows(tmp_path, monkeypatch):
+    monkeypatch.setenv("QUANT_DB_PATH", str(tmp_path / "metrics_seq.duckdb"))
+    from data_pipeline.storage.duckdb_manager import ensure_tables, get_conn
+    from risk_engine import RiskMetricsService
+
+    c = get_conn()
+    ensure_tables(c)
+    t0 = dt.datetime(2026, 3, 2, 15)
+    # step_simulated 的快照按 avg_price 计持仓：9000 + 100 × 18
+    c.execute(
+        "INSERT INTO sim_account_snapshots (snapshot_time, cash, equity, total_assets) VALUES (?, 9000, 1800, 10800)",
+        [t0],
+    )
+    c.execute("INSERT INTO sim_positions (code, side, qty, avg_price) VALUES ('600519', 'LONG', 100, 18.0)")
+    c.execute("INSERT INTO a_stock_daily (code, date, close) VALUES ('600519.SH', DATE '2026-03-02', 20.0)")
+
+    svc = RiskMetricsService()
+    assert svc.sync(c) == 1
+    assert svc.metrics.equity == 11_000.0  # 与 tick 同一口径：现金 + 盯市市值
+    svc.on_market_deltas("ashare", [{"code": "600519", "latest_price": 21.0}])
+    assert svc.metrics.equity == 11_100.0
+
+    # 历史回放写入的快照时刻早于水位，按写入序号仍能同步到
+    c.execute(
+        "INSERT INTO sim_account_snapshots (snapshot_time, cash, equity, total_assets) VALUES (?, 9000, 1800, 10800)",
+        [t0 - dt.timedelta(days=30)],
+    )
+    assert svc.sync(c) == 1 and svc.sync(c) == 0
+    c.close()
@@ -0,0 +1,156 @@
+"""风控预编译规则：结果与逐条评估一致，save_rule 后缓存失效，模拟盘与纸面撮合逐单事前检查。"""
+
+import datetime as dt
+
+import numpy as np
+import pytest
+
+pytest.importorskip("duckdb")
+
+
+@pytest.fixture
+def conn(tmp_path, monkeypatch):
+    monkeypatch.setenv("QUANT_DB_PATH", str(tmp_path / "risk.duckdb"))
+    from data_pipeline.storage.duckdb_manager import ensure_tables, get_conn
+    from risk_engine import invalidate_plan
+
+    c = get_conn()
+    ensure_tables(c)
+    invalidate_plan()
+    yield c
+    c.close()
+    invalidate_plan()
+
+
+RULES = [
+    {"id": 1, "rule_type": "single_position_pct_max", "value": 0.2},
+    {"id": 2, "rule_type": "max_drawdown_pct", "value": 0.1},
+    {"id": 3, "rule_type": "max_exposure_pct", "value": 0.5},
+]
+
+
+def test_plan_evaluate_matches_rule_semantics():
+    from risk_engine import RiskPlan, evaluate
+
+    positions = [
+        {"code": "600519", "qty": 100, "avg_price": 30.0},
+        {"code": "000001", "qty": 1000, "avg_price": 1.0},
+    ]
+    res = evaluate(positions, total_assets=10_000.0, equity_curve=[100, 120, 100], rules=RULES)
+    assert not res["pass"]
+    assert [v["message"] for v in res["violations"]] == [
+        "single_position_pct 600519 30.00% > 20.00%",
+        "current_drawdown 16.67% > 10.00%",
+    ]
+    plan = RiskPlan.compile(RULES)
+    arr = plan.evaluate_arrays(
+        ["600519", "000001"], np.array([100.0, 1000.0]), np.array([30.0, 1.0]), 10_000.0, [100, 120, 100]
+    )
+    assert arr == res
+    assert RiskPlan.compile([]).evaluate(positions, 1.0) == {"pass": True, "violations": []}
+
+
+def test_check_order_uses_strictest_limits():
+    from risk_engine import RiskPlan
+
+    plan = RiskPlan.compile(RULES + [{"rule_type": "max_exposure_pct", "value": 0.4}])
+    # 买入后单票 15%、总暴露 35%：通过
+    assert plan.check_order("buy", 1_000, 500, 2_500, 10_000)
+    # 单票超 20%
+    assert not plan.check_order("BUY", 1_600, 500, 0, 10_000)
+    # 总暴露超更严的 40%
+    assert not plan.check_order("BUY", 1_000, 0, 3_500, 10_000)
+    # 卖出始终放行；回撤超限时一律拒绝
+    assert plan.check_order("SELL", 9_000, 9_000, 9_000, 10_000)
+    assert not plan.check_order("SELL", 100, 100, 100, 10_000, drawdown=0.2)
+
+
+def test_plan_cached_until_save_rule(conn, monkeypatch):
+    from risk_engine import get_plan, rules, save_rule
+
+    assert get_plan(conn).empty
+    calls = []
+    real = rules.load_rules
+    monkeypatch.setattr(rules, "load_rules", lambda c: calls.append(1) or real(c))
+    assert get_plan(conn).empty and calls == []  # 命中缓存不读库
+
+    assert save_rule("max_exposure_pct", 0.3)
+    plan = get_plan(conn)
+    assert len(calls) == 1 and plan.exposure_max == 0.3
+
+
+def test_plan_cache_is_keyed_by_database(conn, tmp_path):
+    import duckdb
+
+    from data_pipeline.storage.duckdb_manager import ensure_tables
+    from risk_engine import get_plan
+
+    assert get_plan(conn).empty  # 统一库（池化连接）无规则，已缓存
+    other = duckdb.connect(str(tmp_path / "other.duckdb"))
+    ensure_tables(other)
+    other.execute("INSERT INTO risk_rules (id, rule_type, value) VALUES (1, 'max_exposure_pct', 0.3)")
+    assert get_plan(other).exposure_max == 0.3  # 另一个库不会拿到统一库的缓存
+    assert get_plan(conn).empty and get_plan().empty
+    other.close()
+
+    mem = duckdb.connect(":memory:")
+    ensure_tables(mem)
+    assert get_plan(mem).empty
+    mem.execute("INSERT INTO risk_rules (id, rule_type, value) VALUES (1, 'max_exposure_pct', 0.2)")
+    assert get_plan(mem).exposure_max == 0.2  # 内存库不缓存
+    mem.close()
+
+
+def test_step_simulated_rejects_orders_pre_trade(conn):
+    from execution_engine.simulated import step_simulated
+    from risk_engine import save_rule
+
+    t = dt.datetime(2026, 1, 5, 9, 30)
+    conn.executemany(
+        "INSERT INTO trade_signals (code, signal, confidence, target_price, stop_loss, signal_score, snapshot_time)"
+        " VALUES (?, 'BUY', 0.5, ?, 0, 0.9, ?)",
+        [("600519", 100.0, t), ("000001", 10.0, t)],
+    )
+    conn.close()
+    assert save_rule("single_position_pct_max", 0.05)
+
+    res = step_simulated(initial_cash=100_000.0, risk_check=True)
+    # 600519 一手 10,000 占 10% > 5% 被拒；000001 一手 1,000 通过
+    assert res["ok"] and res["orders_created"] == 1 and res["risk_rejected"] == 1
+    assert res["cash"] == pytest.approx(99_000.0)
+
+
+def test_paper_fills_check_each_order_against_plan(conn):
+    from data_pipeline.storage.latest_quote import upsert_latest_quotes
+    from gateway import paper_fill_engine
+    from risk_engine import invalidate_plan
+
+    import pandas as pd
+
+    quotes = pd.DataFrame(
+        [
+            {"code": c, "name": c, "latest_price": px, "change_pct": 0.0, "volume": 1, "amount": 1.0,
+             "snapshot_time": dt.datetime(2026, 1, 5, 9, 30)}
+            for c, px in [("600519", 100.0), ("000001", 10.0)]
+        ]
+    )
+    conn.register("q", quotes)
+    upsert_latest_quotes(conn, "q")
+    conn.unregister("q")
+    conn.execute("INSERT INTO hongshan_accounts (user_id, available_cash, total_assets) VALUES ('u1', 100000, 100000)")
+    conn.executemany(
+        "INSERT INTO hongshan_paper_orders (id, user_id, symbol, order_type, order_style, order_price, order_quantity, order_time)"
+        " VALUES (?, 'u1', ?, 'buy', 'market', ?, ?, ?)",
+        [
+            ("o1", "600519", 100.0, 100, dt.datetime(2026, 1, 5, 9, 31)),  # 10%
+            ("o2", "000001", 10.0, 500, dt.datetime(2026, 1, 5, 9, 32)),  # 累计暴露 15%
+            ("o3", "000001", 10.0, 100, dt.datetime(2026, 1, 5, 9, 33)),  # 累计 16% > 15%
+        ],
+    )
+    conn.execute("INSERT INTO risk_rules (id, rule_type, value) VALUES (1, 'max_exposure_pct', 0.15)")
+    invalidate_plan()
+
+    res = paper_fill_engine.run_paper_fills(conn)
+    assert res["filled"] == 2 and res["risk_rejected"] == 1
+    status = dict(conn.execute("SELECT id, status FROM hongshan_paper_orders").fetchall())
+    assert status == {"o1": "filled", "o2": "filled", "o3": "pending"}
@@ -0,0 +1,105 @@
+"""扫描输出层：DataFrame 批量写 market_signals（单事务替换），调度器共用一个连接跑全部扫描器。"""
+
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+_ROOT = Path(__file__).resolve().parents[1]
+for _p in (_ROOT, _ROOT / "scanner" / "src"):
+    s = str(_p)
+    if _p.is_dir() and s not in sys.path:
+        sys.path.insert(0, s)
+
+pytest.importorskip("duckdb")
+
+
+@pytest.fixture
+def conn(tmp_path, monkeypatch):
+    monkeypatch.setenv("QUANT_DB_PATH", str(tmp_path / "scan.duckdb"))
+    from data_pipeline.storage.duckdb_manager import ensure_tables, get_conn
+
+    c = get_conn()
+    ensure_tables(c)
+    yield c
+    c.close()
+
+
+def test_write_signals_replaces_type_in_one_transaction(conn):
+    from market_scanner._storage import write_signals
+
+    conn.execute("INSERT INTO market_signals (code, signal_type, score) VALUES ('1', 'trend', 1), ('2', 'volume', 2)")
+    df = pd.DataFrame({"code": ["600519", "000001"], "score": [60, 70.5]})
+    assert write_signals(df, "trend", conn) == 2
+    assert write_signals([("300750", "volume", 55.0)], "volume", conn) == 1
+    rows = conn.execute("SELECT code, signal_type, score FROM market_signals ORDER BY code").fetchall()
+    assert rows == [("000001", "trend", 70.5), ("300750", "volume", 55.0), ("600519", "trend", 60.0)]
+
+    # 插入失败（code 为空违反 NOT NULL）时 DELETE 一并回滚，旧信号保留
+    with pytest.raises(Exception):
+        write_signals([(None, "trend", 1.0)], "trend", conn)
+    assert conn.execute("SELECT COUNT(*) FROM market_signals WHERE signal_type = 'trend'").fetchone()[0] == 2
+
+
+def test_scanners_score_vectorized_on_shared_connection(conn):
+    from market_scanner import (
+        run_fund_flow_scanner,
+        run_limit_up_scanner,
+        run_trend_scanner,
+        run_volume_spike_scanner,
+    )
+
+    conn.execute("INSERT INTO a_stock_limitup (code, name, limit_up_times) VALUES ('600519', 'a', 3), ('000001', 'b', 8)")
+    conn.execute("INSERT INTO a_stock_fundflow (code, name, main_net_inflow) VALUES ('600519', 'a', 2e8), ('000001', 'b', -9e9)")
+    conn.execute(
+        "INSERT INTO a_stock_realtime (code, name, change_pct, amount) VALUES ('600519', 'a', 5.0, 10), ('000001', 'b', -1.0, 20)"
+    )
+    assert run_limit_up_scanner(conn=conn) == 2
+    assert run_fund_flow_scanner(conn=conn) == 2
+    assert run_trend_scanner(conn=conn) == 1
+    assert run_volume_spike_scanner(conn=conn) == 2
+    got = {
+        (c, t): s
+        for c, t, s in conn.execute("SELECT code, signal_type, score FROM market_signals").fetchall()
+    }
+    assert got == {
+        ("600519", "limitup"): 80.0,
+        ("000001", "limitup"): 100.0,
+        ("600519", "fundflow"): 52.0,
+        ("000001", "fundflow"): 0.0,
+        ("600519", "trend"): 55.0,
+        ("000001", "volume"): 80.0,
+        ("600519", "volume"): 79.5,
+    }
+
+
+def test_sniper_scores_in_one_query_over_recent_window(conn, monkeypatch):
+    from market_scanner.hotmoney_sniper import SniperScoreEngine, run_sniper
+
+    monkeypatch.setenv("SNIPER_LOOKBACK_DAYS", "10")
+    # 600519 最近日成交额/量放大 10 倍；000001 的放量在回看窗口之外
+    conn.execute(
+        """
+        INSERT INTO a_stock_daily (code, date, amount, volume)
+        SELECT c, DATE '2026-01-01' + i::INT,
+               CASE WHEN (c = '600519' AND i = 40) OR (c = '000001' AND i = 5) THEN 100 ELSE 10 END,
+               CASE WHEN c = '600519' AND i = 40 THEN 100 ELSE 10 END
+        FROM range(41) t(i), (VALUES ('600519'), ('000001')) v(c)
+        """
+    )
+    conn.execute("INSERT INTO a_stock_limitup (code, limit_up_times) VALUES ('600519', 3), ('000001', NULL), ('300750', 1)")
+    conn.execute("INSERT INTO a_stock_basic (code, sector) VALUES ('600519', '白酒'), ('000001', '白酒'), ('300750', '')")
+
+    df = SniperScoreEngine(conn).run(min_score=0.0, top_n=10)
+    got = {r.code: (r.theme, round(r.sniper_score, 6)) for r in df.itertuples()}
+    # 白酒 2 只涨停排第 1 → theme 1.0；空板块归「未分类」且无排名 → 0.3×3 = 0.9
+    assert got == {
+        "600519": ("白酒", round(1.0 * 0.3 + 0.9 * 0.3 + 0.9 * 0.2 + 0.95 * 0.2, 6)),
+        "000001": ("白酒", round(1.0 * 0.3 + 0.3 * 0.3 + 0.3 * 0.2 + 0.6 * 0.2, 6)),
+        "300750": ("未分类", round(0.9 * 0.3 + 0.3 * 0.3 + 0.3 * 0.2 + 0.6 * 0.2, 6)),
+    }
+    assert list(df["code"]) == ["600519", "000001", "300750"]
+
+    assert run_sniper(min_score=0.7, top_n=50, conn=conn) == 1
+    assert conn.execute("SELECT code FROM sniper_candidates").fetchall() == [("600519",)]
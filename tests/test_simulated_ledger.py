@@ -0,0 +1,197 @@
+"""模拟盘内存账本：整步撮合在内存完成，订单/持仓/快照一次事务批量落库；多日回放按 T+N 执行、只落库一次。"""
+
+import datetime as dt
+
+import pytest
+
+pytest.importorskip("duckdb")
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setenv("QUANT_DB_PATH", str(tmp_path / "sim.duckdb"))
+    from data_pipeline.storage.duckdb_manager import ensure_tables, get_conn
+
+    c = get_conn()
+    ensure_tables(c)
+    c.close()
+    return tmp_path / "sim.duckdb"
+
+
+def _signals(conn, rows):
+    conn.executemany(
+        "INSERT INTO trade_signals (code, signal, confidence, target_price, stop_loss, signal_score, snapshot_time)"
+        " VALUES (?, ?, 0.5, ?, 0, ?, ?)",
+        rows,
+    )
+
+
+def test_step_simulated_persists_whole_step_in_memory_ledger(db):
+    from data_pipeline.storage.duckdb_manager import get_conn
+    from execution_engine.simulated import get_orders, get_positions, step_simulated
+
+    c = get_conn()
+    t = dt.datetime(2026, 1, 5, 9, 30)
+    _signals(c, [("600519", "BUY", 0.0, 0.9, t), ("000001", "BUY", 12.0, 0.8, t)])
+    c.execute("INSERT INTO a_stock_daily (code, date, close) VALUES ('600519.SH', DATE '2026-01-02', 100.0)")
+    c.execute("INSERT INTO sim_positions (code, side, qty, avg_price) VALUES ('300750', 'LONG', 100, 50.0)")
+    c.execute(
+        "INSERT INTO sim_orders (id, code, side, qty, price, status)"
+        " VALUES (nextval('sim_orders_id_seq'), '300750', 'BUY', 100, 50.0, 'filled')"
+    )
+    c.close()
+
+    res = step_simulated(initial_cash=20_000.0)
+    assert res["ok"] and res["orders_created"] == 2
+    assert res["cash"] == pytest.approx(20_000.0 - 100 * 100.0 - 100 * 12.0)
+    orders = {o["code"]: o for o in get_orders(limit=10)}
+    assert {orders["600519"]["id"], orders["000001"]["id"]} == {2, 3}
+    assert orders["600519"]["price"] == 100.0  # target_price 缺失 → 日线收盘
+    positions = {p["code"]: p["qty"] for p in get_positions()}
+    assert positions == {"300750": 100.0, "600519": 100.0, "000001": 100.0}
+
+
+def test_ledger_flush_is_atomic_and_updates_positions(db):
+    from data_pipeline.storage.duckdb_manager import get_conn
+    from execution_engine.simulated import SimLedger
+
+    c = get_conn()
+    c.execute("INSERT INTO sim_positions (code, side, qty, avg_price) VALUES ('600519', 'LONG', 100, 10.0)")
+    c.execute("INSERT INTO sim_positions (code, side, qty, avg_price) VALUES ('000001', 'LONG', 200, 5.0)")
+    ledger = SimLedger.load(c, initial_cash=1_000.0)
+    now = dt.datetime(2026, 1, 5, 15, 0)
+    assert ledger.sell("600519", 12.0, 100, now)  # 清仓
+    assert ledger.sell("000001", 6.0, 100, now)  # 减仓
+    assert ledger.buy("300750", 2.0, 100, now)
+    ledger.snapshot(now)
+    assert ledger.flush(c) == {"orders": 3, "positions": 3, "snapshots": 1}
+
+    rows = dict(c.execute("SELECT code, qty FROM sim_positions").fetchall())
+    assert rows == {"000001": 100.0, "300750": 100.0}
+    assert c.execute("SELECT cash FROM sim_account_snapshots").fetchone()[0] == pytest.approx(1_000 + 1200 + 600 - 200)
+
+    # 落库失败整体回滚：快照 cash 为 NULL 触发 NOT NULL 约束
+    ledger.buy("300750", 2.0, 100, now)
+    ledger.snapshots.append((now + dt.timedelta(days=1), None, 0.0, 0.0))
+    with pytest.raises(Exception):
+        ledger.flush(c)
+    assert c.execute("SELECT COUNT(*) FROM sim_account_snapshots").fetchone()[0] == 1
+    assert dict(c.execute("SELECT code, qty FROM sim_positions").fetchall())["300750"] == 100.0
+    assert c.execute("SELECT COUNT(*) FROM sim_orders").fetchone()[0] == 3
+    c.close()
+
+
+def test_concurrent_ledgers_get_distinct_order_ids(db, tmp_path):
+    import duckdb
+
+    from data_pipeline.storage.duckdb_manager import ensure_tables, get_conn
+    from execution_engine.simulated import SimLedger
+
+    c = get_conn()
+    now = dt.datetime(2026, 1, 5, 15, 0)
+    a, b = SimLedger.load(c, initial_cash=10_000.0), SimLedger.load(c, initial_cash=10_000.0)
+    for ledger, code in ((a, "600519"), (b, "000001")):
+        ledger.buy(code, 10.0, 100, now)
+        ledger.buy(code, 10.0, 100, now)
+    a.flush(c)
+    b.flush(c)  # 两本账都从同一状态读入：旧的 MAX(id)+1 会撞主键
+    ids = [r[0] for r in c.execute("SELECT id FROM sim_orders ORDER BY id").fetchall()]
+    c.close()
+    assert ids == [1, 2, 3, 4]
+
+    # 旧库：首次建序列时从现有最大 id 之后开始
+    legacy = duckdb.connect(str(tmp_path / "legacy.duckdb"))
+    legacy.execute("CREATE TABLE sim_orders (id INTEGER PRIMARY KEY, code VARCHAR NOT NULL, side VARCHAR NOT NULL,"
+                   " qty DOUBLE NOT NULL, price DOUBLE, status VARCHAR, created_at TIMESTAMP, filled_at TIMESTAMP)")
+    legacy.execute("INSERT INTO sim_orders (id, code, side, qty) VALUES (7, '300750', 'BUY', 100)")
+    ensure_tables(legacy)
+    assert legacy.execute("SELECT nextval('sim_orders_id_seq')").fetchone()[0] == 8
+    legacy.close()
+
+
+def test_run_simulated_history_steps_daily_and_marks_to_close(db):
+    from data_pipeline.storage.duckdb_manager import get_conn
+    from execution_engine.simulated import get_account_snapshots, run_simulated_history
+
+    c = get_conn()
+    d0 = dt.date(2026, 1, 5)
+    c.executemany(
+        "INSERT INTO a_stock_daily (code, date, close) VALUES ('600519.SH', ?, ?)",
+        [(d0 - dt.timedelta(days=3), 9.0), (d0, 10.0), (d0 + dt.timedelta(days=1), 11.0), (d0 + dt.timedelta(days=2), 12.0)],
+    )
+    _signals(
+        c,
+        [
+            ("600519", "BUY", 0.0, 0.9, dt.datetime(2026, 1, 5, 10)),
+            ("600519", "SELL", 0.0, 0.1, dt.datetime(2026, 1, 7, 10)),
+        ],
+    )
+    res = run_simulated_history(
+        d0, d0 + dt.timedelta(days=2), initial_cash=10_000.0, execution_lag_days=0, conn=c
+    )
+    c.close()
+
+    assert res["ok"] and res["days"] == 3 and res["orders_created"] == 2
+    assert res["cash"] == pytest.approx(10_000 - 1_000 + 1_200)
+    snaps = sorted(get_account_snapshots(), key=lambda s: s["snapshot_time"])
+    assert [round(s["total_assets"], 2) for s in snaps] == [10_000.0, 10_100.0, 10_200.0]
+
+
+def test_replay_applies_t_plus_1_lag_and_risk_rules_in_memory(db):
+    from data_pipeline.storage.duckdb_manager import get_conn
+    from execution_engine.simulated import replay_simulated
+
+    c = get_conn()
+    days = [dt.date(2026, 1, 2), dt.date(2026, 1, 5), dt.date(2026, 1, 6), dt.date(2026, 1, 7)]
+    c.executemany(
+        "INSERT INTO a_stock_daily (code, date, close) VALUES (?, ?, ?)",
+        [("600519", d, 10.0 + i) for i, d in enumerate(days)] + [("000001.SZ", days[0], 5.0)],
+    )
+    _signals(
+        c,
+        [
+            # 周五收盘后的信号 → 下一交易日（周一）按收盘成交
+            ("600519", "BUY", 0.0, 0.9, dt.datetime(2026, 1, 2, 16)),
+            ("000001", "BUY", 0.0, 0.9, dt.datetime(2026, 1, 2, 16)),
+            ("600519", "SELL", 0.0, 0.1, dt.datetime(2026, 1, 6, 16)),
+        ],
+    )
+    res = replay_simulated(days[0], days[-1], initial_cash=10_000.0, execution_lag_days=1, conn=c)
+    assert res["orders_created"] == 3
+    assert [p["date"] for p in res["equity_curve"]] == [str(d) for d in days]
+    # 周一买入 600519@11、000001@5（停牌沿用前收），周二盯市 12，周三卖出 @13
+    assert [p["value"] for p in res["equity_curve"]] == [10_000.0, 10_000.0, 10_100.0, 10_200.0]
+    assert res["total_return"] == pytest.approx(2.0)
+    assert c.execute("SELECT COUNT(*) FROM sim_orders").fetchone()[0] == 0  # 默认不落库
+
+    c.execute("INSERT INTO risk_rules (id, rule_type, value) VALUES (1, 'max_exposure_pct', 0.12)")
+    checked = replay_simulated(days[0], days[-1], initial_cash=10_000.0, risk_check=True, conn=c)
+    c.close()
+    # 逐单事前检查：买入 600519 后暴露 11%，再买 000001 将达 16% > 12%，该笔被拒；卖出不受限
+    assert checked["orders_created"] == 2 and checked["risk_rejected"] == 1
+    assert checked["risk_blocked_days"] == 0 and checked["cash"] == pytest.approx(10_200.0)
+
+
+def test_replay_fills_at_execution_close_and_skips_codes_without_bars(db):
+    from data_pipeline.storage.duckdb_manager import get_conn
+    from execution_engine.simulated import replay_simulated
+
+    c = get_conn()
+    days = [dt.date(2026, 1, 2), dt.date(2026, 1, 5)]
+    c.executemany(
+        "INSERT INTO a_stock_daily (code, date, close) VALUES ('600519.SH', ?, ?)", [(days[0], 10.0), (days[1], 11.0)]
+    )
+    _signals(
+        c,
+        [
+            # target_price 是信号日的报价：T+1 执行时按执行日收盘成交，而不是 99
+            ("600519", "BUY", 99.0, 0.9, dt.datetime(2026, 1, 2, 16)),
+            # 回放区间内没有任何 K 线：不按 DEFAULT_STUB_PRICE 成交
+            ("688999", "BUY", 0.0, 0.9, dt.datetime(2026, 1, 2, 16)),
+        ],
+    )
+    res = replay_simulated(days[0], days[-1], initial_cash=10_000.0, execution_lag_days=1, conn=c)
+    c.close()
+    assert res["orders_created"] == 1 and res["unfilled"] == 1
+    assert res["cash"] == pytest.approx(10_000.0 - 100 * 11.0)
+    assert [p["value"] for p in res["equity_curve"]] == [10_000.0, 10_000.0]
@@ -0,0 +1,100 @@
+"""红山后端全市场行情快照：single-flight 刷新、NaN 转 None、拉取失败沿用旧快照。"""
+
+import importlib.util
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+_MODULE = Path(__file__).resolve().parents[1] / "integrations/hongshan/hongshan-backend/app/services/spot_snapshot.py"
+
+
+@pytest.fixture(scope="module")
+def spot():
+    spec = importlib.util.spec_from_file_location("hongshan_spot_snapshot", _MODULE)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def _frame(price=10.0, **overrides):
+    row = {
+        "代码": "600519",
+        "名称": "贵州茅台",
+        "最新价": price,
+        "涨跌额": 0.5,
+        "涨跌幅": 5.0,
+        "今开": 9.5,
+        "最高": 10.2,
+        "最低": 9.4,
+        "昨收": 9.5,
+        "成交量": 12345.0,
+        "成交额": 1.2e6,
+    }
+    row.update(overrides)
+    return pd.DataFrame([row, {**row, "代码": "000001", "名称": "平安银行"}])
+
+
+def test_concurrent_callers_share_one_fetch(spot):
+    calls = []
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.2)
+        return _frame()
+
+    svc = spot.SpotSnapshotService(loader=loader, interval=60, max_stale=300)
+    barrier = threading.Barrier(8)
+    results = []
+
+    def worker():
+        barrier.wait()
+        results.append(svc.get_quote("600519"))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert len(results) == 8 and all(q and q["current_price"] == 10.0 for q in results)
+    assert svc.stats == {"refreshes": 1, "failures": 0}
+
+
+def test_nan_fields_become_none(spot):
+    svc = spot.SpotSnapshotService(
+        loader=lambda: _frame(price=np.nan, **{"成交量": np.nan, "涨跌幅": None}), interval=60, max_stale=300
+    )
+    quote = svc.get_quote("600519")
+    assert quote["current_price"] is None
+    assert quote["volume"] is None
+    assert quote["change_percent"] is None
+    assert quote["open"] == 9.5
+
+    ok = spot.SpotSnapshotService(loader=_frame, interval=60, max_stale=300).get_quote("000001")
+    assert ok["volume"] == 12345 and isinstance(ok["volume"], int)
+
+
+def test_failed_fetch_serves_stale_snapshot_until_max_stale(spot):
+    frames = [_frame(price=10.0)]
+
+    def loader():
+        if not frames:
+            raise ConnectionError("eastmoney down")
+        return frames.pop()
+
+    svc = spot.SpotSnapshotService(loader=loader, interval=0, max_stale=0.3)  # interval=0：每次查询都重新拉取
+    assert svc.get_quote("600519")["current_price"] == 10.0
+
+    stale = svc.get_quotes(["600519", "000001", "999999"])
+    assert [q["symbol"] for q in stale] == ["600519", "000001"]
+    assert stale[0]["current_price"] == 10.0
+    assert svc.stats["failures"] == 1 and svc.available()
+
+    time.sleep(0.35)
+    assert svc.get_quote("600519") is None
+    assert not svc.available()
@@ -42,3 +42,74 @@ def test_extract_name_matches_respects_used_mask():
     used = [True, True]
     m = extract_name_matches("xx", [("xx", "1")], used=used)
     assert m == []
+
+
+def _brute_force_matches(text, names_sorted):
+    """旧实现：逐名 text.find，长名优先占位。"""
+    used = [False] * len(text)
+    out = []
+    for name, code in names_sorted:
+        if len(name) < 3:
+            continue
+        start = 0
+        while (idx := text.find(name, start)) >= 0:
+            end = idx + len(name)
+            if any(used[idx:end]):
+                start = idx + 1
+                continue
+            used[idx:end] = [True] * len(name)
+            out.append((name, code))
+            start = end
+    return out
+
+
+def test_extract_name_matches_automaton_parity_with_find_scan():
+    import random
+
+    rng = random.Random(7)
+    alphabet = "银行招商平安科技股份中国"
+    names = {"".join(rng.choice(alphabet) for _ in range(rng.randint(3, 5))) for _ in range(200)}
+    names_sorted = sorted(((n, f"{600000 + i}") for i, n in enumerate(sorted(names))), key=lambda x: -len(x[0]))
+    for _ in range(20):
+        text = "".join(rng.choice(alphabet + "，。") for _ in range(300))
+        assert extract_name_matches(text, names_sorted) == _brute_force_matches(text, names_sorted)
+
+
+def test_stock_name_index_resolve_and_rebuild_on_change(monkeypatch):
+    import duckdb
+
+    from data_pipeline.storage import stock_name_index as sni
+
+    monkeypatch.setattr(sni, "_index", None)
+    monkeypatch.setenv("STOCK_NAME_INDEX_CHECK_SEC", "0")
+    conn = duckdb.connect()
+    conn.execute("CREATE TABLE a_stock_basic (code VARCHAR, name VARCHAR)")
+    conn.execute(
+        "INSERT INTO a_stock_basic VALUES ('600519.SH', '贵州茅台'), ('000001.SZ', '平安银行'), "
+        "('600666.SH', '*ST瑞德康'), ('000002.SZ', '万 科Ａ股')"
+    )
+    idx = sni.get_stock_name_index(conn)
+    assert sni.get_stock_name_index(conn) is idx
+    assert idx.resolve("600519") == "600519"
+    assert idx.resolve("茅台") == "600519"  # 提及是简称子串
+    assert idx.resolve("平安银行股份有限公司") == "000001"  # 简称是提及子串
+    assert idx.resolve("瑞德康") == "600666"  # 去 *ST 别名
+    assert idx.codes_in("万科A股和贵州茅台，再看贵州茅台") == ["000002", "600519"]
+
+    conn.execute("UPDATE a_stock_basic SET name = '茅台集团' WHERE code = '600519.SH'")
+    idx2 = sni.get_stock_name_index(conn)
+    assert idx2 is not idx
+    assert idx2.codes_in("茅台集团公告") == ["600519"]
+
+
+def test_stock_name_index_drops_ambiguous_pinyin_initials(monkeypatch):
+    from data_pipeline.storage import stock_name_index as sni
+
+    fake = {"中国银行": "ZGYH", "中国银河": "ZGYH", "贵州茅台": "GZMT"}
+    monkeypatch.setattr(sni, "_pinyin_initials_fn", lambda: fake.get)
+    idx = sni.StockNameIndex.from_rows(
+        [("601988.SH", "中国银行"), ("601881.SH", "中国银河"), ("600519.SH", "贵州茅台")]
+    )
+    assert idx.lookup["GZMT"] == "600519"
+    assert "ZGYH" not in idx.lookup
+    assert idx.lookup["中国银行"] == "601988" and idx.lookup["中国银河"] == "601881"